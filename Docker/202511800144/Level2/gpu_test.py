@@ -1,25 +1,70 @@
 """
 GPU测试脚本
 用于验证Docker容器中的GPU加速功能
+
+加上 --profile 时做一次硬件性能探测（没有 GPU、没有装 PyTorch 的机器也能跑）：
+- 矩阵乘法 GFLOPS：每种设备、每种数据类型（CPU float32 / float64 / bfloat16，GPU float32 / float16 / bfloat16），
+  CPU 的 float32 还按线程数各测一遍
+- 内存带宽（大数组复制，CPU 和每块 GPU 分别测）
+- JPEG 解码速度（1080p，单线程和默认线程数）
+- 检测模型延迟（--model 给出时）：每个可用后端（CPU / 每块 GPU / 同名 .onnx）× 线程数 × 批大小，
+  每个组合在独立子进程里测，线程数设置不会互相影响
+最后把结果和选出的最佳配置（设备、线程数、批大小）写进运行时配置文件，
+推理入口启动时读取（YOLO/common/runtime_profile.py）。推理入口都用 ultralytics 加载 .pt 模型，
+所以最佳配置只在 PyTorch 后端的结果里选；ONNX 的结果只记录在 "detector" 里做对比。
+
+配置文件格式（version 1）：
+    {"version": 1, "host": 主机名, "cpu_count": 逻辑 CPU 数, "created": 时间,
+     "imgsz": 测试用的输入尺寸（只做记录，推理入口仍用自己的 imgsz）,
+     "best": {"device": "cpu" / "0", "backend": "torch", "threads": 线程数, "batch": 批大小,
+              "model": 测试用的模型, "latency_ms": 每批延迟, "throughput": 张/秒},
+     "matmul_gflops": {...}, "memory_gbps": {...}, "jpeg_decode": {...}, "detector": [...]}
+
+用法：
+    python gpu_test.py                                  # GPU 兼容性测试（原来的功能）
+    python gpu_test.py --profile                        # 只测硬件，按矩阵乘法结果选线程数
+    python gpu_test.py --profile --model best.pt --out ~/.plate_runtime_profile.json
 """
 
-import torch
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
 import subprocess
 import sys
-import os
+import time
+
+PROFILE_VERSION = 1
+DEFAULT_PROFILE = os.environ.get("PLATE_RUNTIME_PROFILE") or os.path.join(
+    os.path.expanduser("~"), ".plate_runtime_profile.json")
+# 控制各个数学库线程池大小的环境变量（必须在导入 torch / numpy 之前设置）
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+# 推理入口能直接使用的后端（runtime_profile.py 也只接受这些）
+RUNNABLE_BACKENDS = ("torch",)
+
+
+def import_torch():
+    """没装 PyTorch 时返回 None（CPU 机器上只做 numpy / OpenCV 部分的测试）"""
+    try:
+        import torch
+        return torch
+    except ImportError:
+        return None
+
 
 def check_nvidia_smi():
     """检查nvidia-smi命令是否正常工作"""
     print("=" * 50)
     print("1. 检查nvidia-smi命令输出")
     print("=" * 50)
-    
+
     try:
-        result = subprocess.run(['nvidia-smi'], 
-                              capture_output=True, 
-                              text=True, 
+        result = subprocess.run(['nvidia-smi'],
+                              capture_output=True,
+                              text=True,
                               timeout=10)
-        
+
         if result.returncode == 0:
             print("✓ nvidia-smi命令执行成功")
             print("\nGPU信息:")
@@ -29,7 +74,7 @@ def check_nvidia_smi():
             print("✗ nvidia-smi命令执行失败")
             print(f"错误信息: {result.stderr}")
             return False
-            
+
     except Exception as e:
         print(f"✗ 执行nvidia-smi时发生错误: {e}")
         return False
@@ -39,64 +84,69 @@ def check_pytorch_gpu():
     print("=" * 50)
     print("2. 检查PyTorch GPU支持")
     print("=" * 50)
-    
+
+    torch = import_torch()
+    if torch is None:
+        print("✗ 未安装PyTorch")
+        return False
+
     # 检查CUDA是否可用
     cuda_available = torch.cuda.is_available()
     print(f"CUDA可用: {'✓' if cuda_available else '✗'}")
-    
+
     if not cuda_available:
         print("CUDA不可用，请检查安装")
         return False
-    
+
     # 获取GPU数量
     gpu_count = torch.cuda.device_count()
     print(f"GPU数量: {gpu_count}")
-    
+
     # 显示每个GPU的详细信息
     for i in range(gpu_count):
         print(f"\nGPU {i} 详细信息:")
         print(f"  设备名称: {torch.cuda.get_device_name(i)}")
         print(f"  CUDA计算能力: sm_{torch.cuda.get_device_capability(i)[0]}{torch.cuda.get_device_capability(i)[1]}")
         print(f"  总显存: {torch.cuda.get_device_properties(i).total_memory / 1024**3:.2f} GB")
-    
+
     print(f"\n3. 执行兼容性测试")
     print("=" * 50)
-    
+
     try:
         # 设置环境变量来捕获更详细的错误信息
         os.environ['CUDA_LAUNCH_BLOCKING'] = '1'
-        
+
         # 测试1: 简单的张量创建和移动
         print("测试1: 张量创建和移动...")
         x = torch.tensor([1.0, 2.0, 3.0]).cuda()
         print(f"✓ 张量创建成功: {x.device}")
-        
+
         # 测试2: 简单的计算
         print("测试2: 简单计算...")
         y = x * 2
         print(f"✓ 计算成功: {y.cpu().numpy()}")
-        
+
         # 测试3: 矩阵运算（小规模）
         print("测试3: 小规模矩阵运算...")
         a = torch.randn(100, 100).cuda()
         b = torch.randn(100, 100).cuda()
         c = torch.matmul(a, b)
         print(f"✓ 矩阵运算成功: {c.shape}")
-        
+
         # 测试4: 检查CUDA功能
         print("测试4: CUDA功能检查...")
         print(f"  CUDA版本: {torch.version.cuda}")
         print(f"  当前设备: {torch.cuda.current_device()}")
         print(f"  设备属性: {torch.cuda.get_device_properties(0)}")
-        
+
         return True
-        
+
     except Exception as e:
         print(f"✗ 兼容性测试失败: {e}")
         print("\n详细诊断:")
         print(f"PyTorch版本: {torch.__version__}")
         print(f"CUDA版本: {torch.version.cuda if hasattr(torch.version, 'cuda') else 'N/A'}")
-        print(f"计算能力: sm_{torch.cuda.get_device_capability(0)[0]}{torch.cuda.get_device_capability(0)[1]}")        
+        print(f"计算能力: sm_{torch.cuda.get_device_capability(0)[0]}{torch.cuda.get_device_capability(0)[1]}")
         return False
 
 def check_system_info():
@@ -104,47 +154,348 @@ def check_system_info():
     print("=" * 50)
     print("系统信息")
     print("=" * 50)
-    
+
+    torch = import_torch()
     print(f"Python版本: {sys.version.split()[0]}")
+    print(f"CPU: {platform.processor() or platform.machine()}，{os.cpu_count()} 个逻辑CPU")
+    if torch is None:
+        print("PyTorch版本: 未安装")
+        return
     print(f"PyTorch版本: {torch.__version__}")
     if hasattr(torch.version, 'cuda'):
         print(f"PyTorch CUDA版本: {torch.version.cuda}")
     print(f"CUDA可用: {torch.cuda.is_available()}")
 
+
+# --------------------- 硬件性能探测 ---------------------
+def timeit(fn, sync=None, min_time=0.5, warmup=1):
+    """反复调用 fn 至少 min_time 秒，返回平均每次耗时（秒）"""
+    for _ in range(warmup):
+        fn()
+    if sync:
+        sync()
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        if sync:
+            sync()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def thread_counts(limit=None):
+    """1、2、4 …… 直到逻辑 CPU 数（最后一个总是 CPU 数本身）"""
+    cpus = limit or os.cpu_count() or 1
+    counts = []
+    t = 1
+    while t < cpus:
+        counts.append(t)
+        t *= 2
+    return counts + [cpus]
+
+
+def cuda_devices(torch):
+    if torch is None or not torch.cuda.is_available():
+        return []
+    return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+
+
+def bench_matmul(torch, quick=False):
+    """每种设备、数据类型的矩阵乘法 GFLOPS；CPU float32 额外按线程数各测一遍"""
+    result = {}
+    if torch is None:
+        import numpy as np
+        n = 512 if quick else 1024
+        result["cpu"] = {}
+        for dtype in ("float32", "float64"):
+            a = np.random.rand(n, n).astype(dtype)
+            b = np.random.rand(n, n).astype(dtype)
+            result["cpu"][dtype] = round(2 * n ** 3 / timeit(lambda: a @ b) / 1e9, 1)
+        return result, {}
+
+    def measure(device, dtype, n):
+        a = torch.randn(n, n, device=device).to(dtype)
+        b = torch.randn(n, n, device=device).to(dtype)
+        sync = torch.cuda.synchronize if device.startswith("cuda") else None
+        return round(2 * n ** 3 / timeit(lambda: torch.matmul(a, b), sync) / 1e9, 1)
+
+    n = 512 if quick else 1024
+    result["cpu"] = {}
+    for name in ("float32", "float64", "bfloat16"):
+        try:
+            result["cpu"][name] = measure("cpu", getattr(torch, name), n)
+        except RuntimeError:
+            pass  # 老版本 / 老 CPU 不支持 bfloat16
+    for device in cuda_devices(torch):
+        result[device] = {}
+        for name in ("float32", "float16", "bfloat16"):
+            try:
+                result[device][name] = measure(device, getattr(torch, name), 2048 if quick else 4096)
+            except RuntimeError:
+                pass
+
+    scaling = {}
+    original = torch.get_num_threads()
+    for t in thread_counts():
+        torch.set_num_threads(t)
+        scaling[str(t)] = measure("cpu", torch.float32, n)
+    torch.set_num_threads(original)
+    return result, scaling
+
+
+def bench_memory(torch, quick=False):
+    """大数组复制的内存带宽（GB/s，读 + 写）"""
+    import numpy as np
+    size = (64 if quick else 256) * 1024 * 1024
+    a = np.ones(size // 8, dtype=np.float64)
+    b = np.empty_like(a)
+    result = {"cpu": round(2 * size / timeit(lambda: np.copyto(b, a)) / 1e9, 1)}
+    for device in cuda_devices(torch):
+        x = torch.ones(size // 4, dtype=torch.float32, device=device)
+        y = torch.empty_like(x)
+        seconds = timeit(lambda: y.copy_(x), torch.cuda.synchronize)
+        result[device] = round(2 * size / seconds / 1e9, 1)
+    return result
+
+
+def bench_jpeg(quick=False):
+    """1080p JPEG 的解码速度（单线程 / OpenCV 默认线程数）"""
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return None
+    # 平滑的随机图（压缩率接近真实照片，纯噪声会让 JPEG 特别大）
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 255, (68, 120, 3), dtype=np.uint8)
+    img = cv2.resize(small, (1920, 1080), interpolation=cv2.INTER_CUBIC)
+    data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1]
+    min_time = 0.3 if quick else 1.0
+    result = {"width": 1920, "height": 1080, "bytes": int(data.size)}
+    original = cv2.getNumThreads()
+    for label, threads in (("single", 1), ("default", original)):
+        cv2.setNumThreads(threads)
+        seconds = timeit(lambda: cv2.imdecode(data, cv2.IMREAD_COLOR), min_time=min_time)
+        result[f"{label}_images_per_s"] = round(1 / seconds, 1)
+        result[f"{label}_mpix_per_s"] = round(1920 * 1080 / seconds / 1e6, 1)
+    cv2.setNumThreads(original)
+    return result
+
+
+def _detector_worker(config, model_path, imgsz, batches, runs, queue):
+    """子进程：按给定线程数加载模型，测每种批大小的延迟"""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(config["threads"])
+    try:
+        import numpy as np
+        torch = import_torch()
+        if torch is not None:
+            torch.set_num_threads(config["threads"])
+        try:
+            import cv2
+            cv2.setNumThreads(config["threads"])
+        except ImportError:
+            pass
+        from ultralytics import YOLO
+        model = YOLO(model_path)
+        device = config["device"]
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 255, (imgsz, imgsz, 3), dtype=np.uint8)
+        rows = []
+        for batch in batches:
+            imgs = [img] * batch
+            call = lambda: model(imgs if batch > 1 else img, imgsz=imgsz, device=device, verbose=False)
+            call()  # 预热（第一次推理包含初始化）
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                call()
+                times.append((time.perf_counter() - start) * 1000)
+            times.sort()
+            latency = times[len(times) // 2]
+            rows.append(dict(config, batch=batch, latency_ms=round(latency, 2),
+                             throughput=round(batch * 1000 / latency, 1)))
+        queue.put(rows)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def bench_detector(torch, model_path, imgsz=640, batches=(1, 2, 4, 8), runs=10, threads=None):
+    """
+    检测模型延迟：每个后端 × 线程数 × 批大小
+    后端：CPU（torch）、每块 GPU、模型旁边的同名 .onnx（装了 onnxruntime 时，CPU 运行）
+    """
+    configs = [{"backend": "torch", "device": "cpu", "threads": t} for t in (threads or thread_counts())]
+    for device in cuda_devices(torch):
+        configs.append({"backend": "torch", "device": device.split(":")[1],
+                        "threads": min(4, os.cpu_count() or 1)})
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    if os.path.exists(onnx_path):
+        try:
+            import onnxruntime  # noqa: F401
+            configs += [{"backend": "onnx", "device": "cpu", "threads": t, "model": onnx_path}
+                        for t in (threads or thread_counts())]
+        except ImportError:
+            print(f"⚠️ 找到 {onnx_path}，但没有安装 onnxruntime，跳过 ONNX 后端")
+
+    ctx = mp.get_context("spawn")
+    rows = []
+    for config in configs:
+        queue = ctx.Queue()
+        path = config.get("model", model_path)
+        p = ctx.Process(target=_detector_worker, args=(config, path, imgsz, batches, runs, queue))
+        p.start()
+        try:
+            result = queue.get(timeout=600)
+        except Exception:
+            result = {"error": "超时"}
+        p.join()
+        label = f"{config['backend']}/{config['device']}，{config['threads']} 线程"
+        if isinstance(result, dict):
+            print(f"   ✗ {label}：{result['error']}")
+            continue
+        for row in result:
+            row["model"] = path
+            print(f"   {label}，批大小 {row['batch']}：{row['latency_ms']} ms/批，{row['throughput']} 张/秒")
+        rows += result
+    return rows
+
+
+def choose_best(detector_rows, matmul, scaling, max_latency_ms):
+    """
+    选最佳配置：有检测模型结果时取推理入口能用的后端（RUNNABLE_BACKENDS）里、每批延迟不超过
+    max_latency_ms 的组合中吞吐量最高的，否则按矩阵乘法选（有 GPU 用 GPU，CPU 线程数取 float32 GFLOPS 最高的那一档）
+    """
+    runnable = [r for r in detector_rows if r["backend"] in RUNNABLE_BACKENDS]
+    candidates = [r for r in runnable if r["latency_ms"] <= max_latency_ms] or runnable
+    if candidates:
+        best = max(candidates, key=lambda r: r["throughput"])
+        return {k: best[k] for k in ("backend", "device", "threads", "batch", "latency_ms", "throughput", "model")}
+    threads = int(max(scaling, key=scaling.get)) if scaling else (os.cpu_count() or 1)
+    gpus = [d for d in matmul if d.startswith("cuda")]
+    if gpus and matmul[gpus[0]].get("float32", 0) > matmul.get("cpu", {}).get("float32", 0):
+        return {"backend": "torch", "device": gpus[0].split(":")[1], "threads": min(4, threads), "batch": 1}
+    return {"backend": "torch", "device": "cpu", "threads": threads, "batch": 1}
+
+
+def run_profile(model_path=None, out_path=DEFAULT_PROFILE, imgsz=640, batches=(1, 2, 4, 8), threads=None,
+                max_latency_ms=200.0, quick=False):
+    """硬件性能探测，写运行时配置文件，返回配置内容"""
+    torch = import_torch()
+    print("=" * 60)
+    print(f"硬件性能探测：{platform.node()}，{os.cpu_count()} 个逻辑CPU，"
+          f"PyTorch {'未安装' if torch is None else torch.__version__}，GPU {len(cuda_devices(torch))} 块")
+    print("=" * 60)
+
+    print("1. 矩阵乘法 GFLOPS")
+    matmul, scaling = bench_matmul(torch, quick)
+    for device, values in matmul.items():
+        print(f"   {device}：" + "，".join(f"{k} {v}" for k, v in values.items()))
+    if scaling:
+        print("   CPU float32 按线程数：" + "，".join(f"{t} 线程 {v}" for t, v in scaling.items()))
+
+    print("2. 内存带宽 GB/s")
+    memory = bench_memory(torch, quick)
+    print("   " + "，".join(f"{k} {v}" for k, v in memory.items()))
+
+    print("3. JPEG 解码（1080p）")
+    jpeg = bench_jpeg(quick)
+    if jpeg is None:
+        print("   ✗ 没有安装 OpenCV，跳过")
+    else:
+        print(f"   单线程 {jpeg['single_images_per_s']} 张/秒（{jpeg['single_mpix_per_s']} MPix/s），"
+              f"默认线程 {jpeg['default_images_per_s']} 张/秒")
+
+    detector = []
+    if model_path:
+        print(f"4. 检测模型延迟（{model_path}，imgsz {imgsz}）")
+        detector = bench_detector(torch, model_path, imgsz, batches, 3 if quick else 10, threads)
+    else:
+        print("4. 检测模型延迟：未指定 --model，按矩阵乘法结果选择线程数")
+
+    best = choose_best(detector, matmul, scaling, max_latency_ms)
+    faster = [r for r in detector if r["backend"] not in RUNNABLE_BACKENDS
+              and r["latency_ms"] <= max_latency_ms and r["throughput"] > best.get("throughput", 0)]
+    if faster:
+        top = max(faster, key=lambda r: r["throughput"])
+        print(f"ℹ️ {top['backend']} 后端更快（{top['throughput']} 张/秒），但推理入口目前只能用 PyTorch 模型，未选用")
+    profile = {
+        "version": PROFILE_VERSION,
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "imgsz": imgsz,
+        "best": best,
+        "matmul_gflops": matmul,
+        "matmul_threads": scaling,
+        "memory_gbps": memory,
+        "jpeg_decode": jpeg,
+        "detector": detector,
+    }
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    print("=" * 60)
+    print(f"🎯 最佳配置：设备 {best['device']}（{best['backend']}），{best['threads']} 线程，批大小 {best['batch']}")
+    print(f"💾 运行时配置已写入：{out_path}")
+    return profile
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="GPU兼容性测试 / 硬件性能探测")
+    parser.add_argument("--profile", action="store_true", help="做硬件性能探测并写运行时配置文件")
+    parser.add_argument("--model", type=str, default=None, help="测延迟用的检测模型（ultralytics 权重）")
+    parser.add_argument("--out", type=str, default=DEFAULT_PROFILE, help="运行时配置文件路径")
+    parser.add_argument("--imgsz", type=int, default=640, help="检测输入尺寸")
+    parser.add_argument("--batches", type=str, default="1,2,4,8", help="要测的批大小")
+    parser.add_argument("--threads", type=str, default=None, help="要测的线程数（默认 1,2,4,… 到 CPU 数）")
+    parser.add_argument("--max-latency-ms", type=float, default=200.0, help="选择配置时每批延迟的上限")
+    parser.add_argument("--quick", action="store_true", help="缩短每项测试的时间")
+    args = parser.parse_args()
+    if args.profile:
+        run_profile(args.model, args.out, args.imgsz, [int(b) for b in args.batches.split(",")],
+                    [int(t) for t in args.threads.split(",")] if args.threads else None,
+                    args.max_latency_ms, args.quick)
+        return 0
+
     print("开始GPU兼容性测试...")
     print("=" * 60)
     print("目标设备: NVIDIA GeForce RTX 5060 (sm_120)")
     print("=" * 60)
-    
+
     # 检查系统信息
     check_system_info()
     print()
-    
+
     # 检查nvidia-smi
     nvidia_smi_success = check_nvidia_smi()
     print()
-    
+
     # 检查PyTorch GPU支持
     pytorch_gpu_success = check_pytorch_gpu()
     print()
-    
+
     # 输出测试结果摘要
     print("=" * 60)
     print("测试结果摘要:")
     print("=" * 60)
-    
+
     print(f"nvidia-smi测试: {'通过 ✓' if nvidia_smi_success else '失败 ✗'}")
     print(f"PyTorch GPU测试: {'通过 ✓' if pytorch_gpu_success else '失败 ✗'}")
-    
+
     if nvidia_smi_success and pytorch_gpu_success:
         print("\n🎉 所有测试通过！GPU加速环境配置成功！")
         print("您的RTX 5060 GPU现在可以正常使用PyTorch进行加速计算")
         return 0
     else:
         print("\n❌ 测试失败")
+        print("（没有GPU的机器可以用 --profile 只做CPU性能探测）")
         return 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -1,31 +1,73 @@
 import cv2
 import os
+import sys
 import argparse
 import time
-from ultralytics import YOLO
 from pathlib import Path
 
-def process_single_image(model, img_path, save_dir, conf_threshold=0.5):
-    """处理单张图片并保存结果"""
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from output_writer import AsyncOutputWriter, add_writer_args, writer_from_args
+from plate_index import PlateVideoIndexer, add_index_args, index_from_args
+from video_scan import add_scan_args, format_report, save_events, scan_video
+from plate_renderer import PlateRenderer
+from model_store import load_model
+from detection_sidecar import add_sidecar_args, sidecar_from_args
+from plate_ocr import result_boxes
+from latest_frame_capture import LatestFrameCapture
+from fast_decode import add_decode_args, decode_image
+from video_segments import add_segment_args, process_video_parallel
+from runtime_profile import add_profile_args, profile_from_args
+from folder_watch import Checkpoint, add_watch_args, watch_folder
+from testset_scheduler import (CostModel, add_schedule_args, make_jobs, print_plan, print_report,
+                               run_schedule, scan_testset)
+
+# 推理设备（默认 CPU；有运行时配置时用配置里实测最快的设备，见 common/runtime_profile.py）
+DEVICE = "cpu"
+# 多进程处理测试集时每个工作进程自己的模型和设置（init_schedule_worker 里填写）
+_scheduled = {}
+
+def process_single_image(model, img_path, save_dir, conf_threshold=0.5, writer=None, renderer=None,
+                         decode_tolerance=None):
+    """
+    处理单张图片并保存结果（传入 writer 时异步写盘）
+    decode_tolerance 不为 None 时按检测输入尺寸（640）降分辨率解码 JPEG，结果图也是缩小后的分辨率
+    """
     # 读取图片
-    img = cv2.imread(img_path)
+    if decode_tolerance is None:
+        img = cv2.imread(img_path)
+    else:
+        decoded = decode_image(img_path, 640, decode_tolerance)
+        img = decoded.image
+        if img is not None and decoded.factor > 1:
+            print(f"1/{decoded.factor} 解码 {decoded.decode_ms:.1f} ms：{os.path.basename(img_path)}")
     if img is None:
         print(f"警告：无法读取图片 {img_path}")
         return
     
-    # 推理（强制CPU）
-    results = model(img, conf=conf_threshold, device="cpu", verbose=False)
+    # 推理（默认 CPU，有运行时配置时用配置里的设备，见 DEVICE）
+    results = model(img, conf=conf_threshold, device=DEVICE, verbose=False)
     
-    # 绘制检测框
-    annotated_img = results[0].plot(conf=True, labels=True)
+    # 绘制检测框（直接画在原图上，不再整图复制）
+    renderer = renderer or PlateRenderer()
+    annotated_img = renderer.render_result(img, results[0])
     
     # 保存结果
     save_path = os.path.join(save_dir, "images", os.path.basename(img_path))
-    cv2.imwrite(save_path, annotated_img)
-    print(f"图片结果已保存：{save_path}")
+    if writer is None:
+        cv2.imwrite(save_path, annotated_img)
+        print(f"图片结果已保存：{save_path}")
+    else:
+        writer.submit(save_path, annotated_img)
+        print(f"图片结果已提交保存：{save_path}（写盘队列 {writer.queue_depth}）")
 
-def process_single_video(model, video_path, save_dir, conf_threshold=0.5):
-    """处理单个视频并保存结果"""
+def process_single_video(model, video_path, save_dir, conf_threshold=0.5, writer=None,
+                         index=None, reader=None, index_every=5, renderer=None, sidecar=None):
+    """
+    处理单个视频并保存结果（传入 writer 时异步写入视频帧）
+    传入 index（PlateIndex）和 reader（PlateReader）时，把识别到的车牌写入检索索引
+    传入 sidecar（SidecarOptions）时不重新编码视频，只写逐帧检测结果和叠加字幕轨
+    """
     # 打开视频
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -42,9 +84,19 @@ def process_single_video(model, video_path, save_dir, conf_threshold=0.5):
     save_path = os.path.join(save_dir, "videos", f"{video_name}_result.mp4")
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     
-    # 设置视频编码器
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(save_path, fourcc, fps, (width, height))
+    # 设置视频编码器（旁路模式下原视频不动，只写检测结果）
+    out = None
+    if sidecar is not None:
+        side = sidecar.open(os.path.dirname(save_path), video_path, fps, width, height)
+        save_path = side.path
+    elif writer is None:
+        out = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    else:
+        out = writer.open_video(save_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    indexer = None
+    if index is not None:
+        indexer = PlateVideoIndexer(index, reader, video_path, fps, every_n=index_every)
+    renderer = renderer or PlateRenderer()
     
     # 处理视频帧
     frame_count = 0
@@ -55,11 +107,14 @@ def process_single_video(model, video_path, save_dir, conf_threshold=0.5):
             break
         
         # 推理
-        results = model(frame, conf=conf_threshold, device="cpu", verbose=False)
-        annotated_frame = results[0].plot(conf=True, labels=True)
-        
-        # 写入结果视频
-        out.write(annotated_frame)
+        results = model(frame, conf=conf_threshold, device=DEVICE, verbose=False)
+        if indexer is not None:
+            indexer.process(frame_count, frame, results[0])
+        if out is None:
+            side.write(frame_count, result_boxes(results[0]))
+        else:
+            # 写入结果视频
+            out.write(renderer.render_result(frame, results[0]))
         
         frame_count += 1
         if frame_count % 30 == 0:  # 每30帧打印一次进度
@@ -67,15 +122,49 @@ def process_single_video(model, video_path, save_dir, conf_threshold=0.5):
     
     # 释放资源
     cap.release()
-    out.release()
+    if out is None:
+        overlays = side.close()[1:]
+        print(f"检测结果共 {side.detections} 个框，字幕轨：{', '.join(overlays) or '无'}")
+    else:
+        out.release()
     elapsed = time.time() - start_time
     print(f"视频结果已保存：{save_path}（耗时 {elapsed:.2f} 秒）")
+    if indexer is not None:
+        print(f"车牌索引已写入 {indexer.close()} 条记录：{index.db_path}")
+
+def process_single_video_fast(model, video_path, save_dir, conf_threshold=0.5,
+                              scan_stride=10, scan_imgsz=320):
+    """快速扫描视频（先粗后细），只保存车牌事件JSON，不生成结果视频"""
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    save_path = os.path.join(save_dir, "videos", f"{video_name}_events.json")
+    try:
+        events, report = scan_video(model, video_path, scan_stride, scan_imgsz, conf=conf_threshold)
+    except IOError as e:
+        print(f"警告：{e}")
+        return
+    save_events(events, report, save_path)
+    print(f"视频 {video_name} 快速扫描完成：{format_report(report)}")
+    print(f"车牌事件已保存：{save_path}")
+
+def process_testset(model_path, testset_dir, conf_threshold=0.5, writer=None,
+                    index=None, reader=None, index_every=5, scan_stride=0, scan_imgsz=320,
+                    sidecar=None, decode_tolerance=None, segment_workers=0, segment_annotate=False,
+                    workers=1, image_batch=16, detect_ms=30.0):
+    """
+    批量处理测试集（图片和视频，scan_stride > 0 时视频使用快速扫描，传入 sidecar 时视频只写检测结果，
+    decode_tolerance 不为 None 时图片降分辨率解码，segment_workers > 1 时每个视频分段多进程并行处理，
+    workers > 1 时按估算代价最长优先分给多个进程，见 process_testset_scheduled；这时不支持 index 和 segment_workers）
+    """
+    if workers > 1:
+        if index is not None or segment_workers > 1:
+            raise ValueError("多进程处理测试集（workers > 1）时不支持写车牌索引，也不再分段处理单个视频")
+        process_testset_scheduled(model_path, testset_dir, conf_threshold, writer, scan_stride, scan_imgsz,
+                                  sidecar, decode_tolerance, workers, image_batch, detect_ms)
+        return
 
-def process_testset(model_path, testset_dir, conf_threshold=0.5):
-    """批量处理测试集（图片和视频）"""
     # 1. 初始化模型
     print(f"加载模型：{model_path}")
-    model = YOLO(model_path)
+    model = load_model(model_path)  # 路径或模型库条目名（离线，带校验）
     
     # 2. 创建结果保存目录
     save_root = os.path.join(os.path.dirname(model_path), "test_results")
@@ -83,6 +172,9 @@ def process_testset(model_path, testset_dir, conf_threshold=0.5):
     os.makedirs(os.path.join(save_root, "videos"), exist_ok=True)
     print(f"所有结果将保存到：{save_root}")
     
+    # 不保存图片/视频时不需要绘制检测框
+    renderer = PlateRenderer(enabled=writer is None or writer.write_images)
+    
     # 3. 遍历测试集目录，区分图片和视频
     supported_img_ext = (".jpg", ".jpeg", ".png", ".bmp")
     supported_video_ext = (".mp4", ".avi", ".mov", ".mkv")
@@ -91,19 +183,158 @@ def process_testset(model_path, testset_dir, conf_threshold=0.5):
         file_path = os.path.join(testset_dir, file)
         if file.lower().endswith(supported_img_ext):
             # 处理图片
-            process_single_image(model, file_path, save_root, conf_threshold)
+            process_single_image(model, file_path, save_root, conf_threshold, writer, renderer,
+                                 decode_tolerance)
         elif file.lower().endswith(supported_video_ext):
             # 处理视频
-            process_single_video(model, file_path, save_root, conf_threshold)
+            if segment_workers > 1:
+                # 和逐帧处理一样：没有指定 --sidecar 时输出带框视频，指定了只写检测结果（--segment-annotate 时两者都要）
+                process_video_parallel(model_path, file_path, os.path.join(save_root, "videos"),
+                                       segment_workers, conf=conf_threshold, device=DEVICE,
+                                       annotate=segment_annotate or sidecar is None,
+                                       sidecar_fmt=sidecar.fmt if sidecar is not None else "bin",
+                                       overlays=sidecar.overlays if sidecar is not None else ())
+            elif scan_stride > 0:
+                process_single_video_fast(model, file_path, save_root, conf_threshold,
+                                          scan_stride, scan_imgsz)
+            else:
+                process_single_video(model, file_path, save_root, conf_threshold, writer,
+                                     index, reader, index_every, renderer, sidecar)
         else:
             print(f"跳过不支持的文件：{file}")
     
+    # 等待后台写盘完成
+    if writer is not None:
+        writer.close()
+        print(writer.summary())
+    if index is not None:
+        index.close()
+    print("测试集处理完成！所有结果已保存。")
+
+def init_schedule_worker(model_path, device, options):
+    """多进程处理测试集：工作进程启动时加载一次模型"""
+    global DEVICE
+    DEVICE = device
+    _scheduled["model"] = load_model(model_path)
+    _scheduled.update(options)
+
+def run_schedule_job(job):
+    """多进程处理测试集：处理一个任务（一批图片或一个视频），返回这个任务的写盘统计"""
+    opts = _scheduled
+    writer = AsyncOutputWriter(**opts["writer"]) if opts["writer"] is not None else None
+    renderer = PlateRenderer(enabled=writer is None or writer.write_images)
+    if job["kind"] == "images":
+        for img_path in job["paths"]:
+            process_single_image(_scheduled["model"], img_path, opts["save_root"], opts["conf"], writer,
+                                 renderer, opts["decode_tolerance"])
+    elif opts["scan_stride"] > 0:
+        process_single_video_fast(_scheduled["model"], job["paths"][0], opts["save_root"], opts["conf"],
+                                  opts["scan_stride"], opts["scan_imgsz"])
+    else:
+        process_single_video(_scheduled["model"], job["paths"][0], opts["save_root"], opts["conf"], writer,
+                             renderer=renderer, sidecar=opts["sidecar"])
+    if writer is None:
+        return None
+    writer.close()
+    return writer.stats.as_dict()
+
+def process_testset_scheduled(model_path, testset_dir, conf_threshold=0.5, writer=None, scan_stride=0,
+                              scan_imgsz=320, sidecar=None, decode_tolerance=None, workers=2,
+                              image_batch=16, detect_ms=30.0):
+    """
+    多进程处理测试集：先按帧数、分辨率估算每个文件的代价，图片打包成批，
+    再按最长优先分给 workers 个进程（长视频最先开始），最后报告 makespan 和利用率
+    """
+    items, skipped = scan_testset(testset_dir, CostModel(detect_ms))
+    for name in skipped:
+        print(f"跳过不支持的文件：{name}")
+    jobs = make_jobs(items, image_batch)
+    if not jobs:
+        print("测试集里没有图片或视频")
+        return
+    print_plan(jobs, workers)
+
+    save_root = os.path.join(os.path.dirname(model_path), "test_results")
+    os.makedirs(os.path.join(save_root, "images"), exist_ok=True)
+    os.makedirs(os.path.join(save_root, "videos"), exist_ok=True)
+    print(f"所有结果将保存到：{save_root}")
+    # 写盘器不能跨进程传递，只传设置，每个任务在工作进程里各开一个
+    writer_opts = None
+    if writer is not None:
+        writer_opts = {"max_workers": writer.max_workers, "max_queue": writer.max_queue,
+                       "jpeg_quality": writer.jpeg_quality, "thumbnail_width": writer.thumbnail_width,
+                       "write_images": writer.write_images}
+    options = {"save_root": save_root, "conf": conf_threshold, "writer": writer_opts, "sidecar": sidecar,
+               "decode_tolerance": decode_tolerance, "scan_stride": scan_stride, "scan_imgsz": scan_imgsz}
+    report = run_schedule(jobs, workers, run_schedule_job, init_schedule_worker,
+                          (model_path, DEVICE, options))
+
+    if writer is not None:
+        # 汇总各个任务的写盘统计
+        for job_stats in report.pop("results"):
+            if job_stats is not None:
+                writer.stats.observe_depth(job_stats.pop("max_queue_depth"))
+                writer.stats.add(**job_stats)
+        writer.close()
+        print(writer.summary())
+    print_report(report)
     print("测试集处理完成！所有结果已保存。")
 
-def run_camera_inference(model_path, conf_threshold=0.5):
-    """摄像头实时推理（方便快速验证）"""
-    model = YOLO(model_path)
-    cap = cv2.VideoCapture(0)  # 0表示默认摄像头
+def watch_testset(model_path, testset_dir, conf_threshold=0.5, writer=None, decode_tolerance=None,
+                  max_batch=8, max_wait_ms=200, method="auto", interval=0.5, idle_exit=None):
+    """
+    持续监听测试集目录（摄像头往里丢图片），新图片凑批后一次推理整批，不用再定时重跑 process_testset
+    已处理的图片记在 test_results/watch_checkpoint.jsonl，重启后跳过
+    """
+    print(f"加载模型：{model_path}")
+    model = load_model(model_path)
+    save_root = os.path.join(os.path.dirname(model_path), "test_results")
+    os.makedirs(os.path.join(save_root, "images"), exist_ok=True)
+    renderer = PlateRenderer(enabled=writer is None or writer.write_images)
+    checkpoint = Checkpoint(os.path.join(save_root, "watch_checkpoint.jsonl"))
+
+    def handle_batch(paths):
+        images = []
+        for path in paths:
+            if decode_tolerance is None:
+                images.append(cv2.imread(path))
+            else:
+                images.append(decode_image(path, 640, decode_tolerance).image)
+        valid = [i for i, img in enumerate(images) if img is not None]
+        records = [{"image": os.path.basename(p), "boxes": None} for p in paths]
+        if valid:
+            # 整批一次推理（ultralytics 支持传入图片列表）
+            results = model([images[i] for i in valid], conf=conf_threshold, device=DEVICE, verbose=False)
+            for i, result in zip(valid, results):
+                records[i]["boxes"] = len(result.boxes)
+                annotated_img = renderer.render_result(images[i], result)
+                save_path = os.path.join(save_root, "images", os.path.basename(paths[i]))
+                if writer is None:
+                    cv2.imwrite(save_path, annotated_img)
+                else:
+                    writer.submit(save_path, annotated_img)
+        for record in records:
+            if record["boxes"] is None:
+                print(f"警告：无法读取图片 {record['image']}")
+            else:
+                print(f"{record['image']}：检测到 {record['boxes']} 个车牌")
+        return records
+
+    watch_folder(testset_dir, handle_batch, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                 checkpoint=checkpoint, method=method, interval=interval, idle_exit=idle_exit)
+    checkpoint.close()
+    if writer is not None:
+        writer.close()
+        print(writer.summary())
+
+def run_camera_inference(model_path, conf_threshold=0.5, source=0):
+    """
+    摄像头实时推理（方便快速验证）
+    source: 摄像头编号（0表示默认摄像头），也可以是视频文件路径（按视频FPS模拟摄像头）
+    """
+    model = load_model(model_path)
+    # 后台线程只保留最新帧：推理比摄像头慢时跳过旧帧，画面不会越来越滞后
+    cap = LatestFrameCapture(source).start()
     window_name = "摄像头实时推理"
     
     if not cap.isOpened():
@@ -111,28 +342,31 @@ def run_camera_inference(model_path, conf_threshold=0.5):
         return
     
     print("摄像头推理启动，按 'q' 键退出...")
+    renderer = PlateRenderer()
     while True:
         ret, frame = cap.read()
         if not ret:
             break
         
         # 推理
-        results = model(frame, conf=conf_threshold, device="cpu", verbose=False)
-        annotated_frame = results[0].plot(conf=True, labels=True)
+        results = model(frame, conf=conf_threshold, device=DEVICE, verbose=False)
+        annotated_frame = renderer.render_result(frame, results[0])
         
         # 显示
         cv2.imshow(window_name, annotated_frame)
+        cap.mark_result()
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
     
     cap.release()
     cv2.destroyAllWindows()
+    cap.print_summary()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="YOLOv8测试集推理工具")
     parser.add_argument("--model", type=str, 
                         default="D:/yolo model new 2/yolo/ultralytics/runs/plate_detection/yolov8n_cpu_train/weights/best.pt",
-                        help="模型权重路径（best.pt）")
+                        help="模型权重路径（best.pt）或模型库条目名（见 common/model_store.py）")
     parser.add_argument("--testset", type=str, 
                         default="D:/yolo model new 2/testdatasets/images",  # 测试集目录
                         help="测试集文件夹路径")
@@ -140,13 +374,45 @@ if __name__ == "__main__":
                         help="置信度阈值（推荐0.2-0.5）")
     parser.add_argument("--camera", action="store_true", 
                         help="使用摄像头实时推理（不处理测试集）")
+    parser.add_argument("--camera-source", type=str, default="0",
+                        help="摄像头编号，或用视频文件 / 录制的摄像头会话（会话目录@倍速）模拟摄像头（配合 --camera）")
+    add_writer_args(parser)
+    add_index_args(parser)
+    add_scan_args(parser)
+    add_sidecar_args(parser)
+    add_decode_args(parser)
+    add_segment_args(parser)
+    add_profile_args(parser)
+    add_watch_args(parser)
+    add_schedule_args(parser)
     
     args = parser.parse_args()
+    if args.workers > 1 and not (args.camera or args.watch):
+        # 长视频已经和其他文件并行；索引写入和单个视频分段只在单进程模式下可用
+        if args.index:
+            parser.error("--index 只支持单进程模式，不能和 --workers 同时使用")
+        if args.segment_workers > 1:
+            parser.error("--segment-workers 只支持单进程模式，不能和 --workers 同时使用")
+    profile = profile_from_args(args)  # 加载模型之前设置线程数
+    if profile is not None:
+        DEVICE = profile.device
     
     if args.camera:
         # 摄像头实时推理
-        run_camera_inference(args.model, args.conf)
+        run_camera_inference(args.model, args.conf, args.camera_source)
+    elif args.watch:
+        # 持续监听测试集目录，新图片凑批处理
+        watch_testset(args.model, args.testset, args.conf, writer_from_args(args),
+                      args.decode_tolerance if args.fast_decode else None,
+                      args.watch_batch, args.watch_wait_ms, args.watch_method, args.watch_interval,
+                      args.watch_idle_exit)
     else:
         # 批量处理测试集
-        process_testset(args.model, args.testset, args.conf)
+        index, reader = index_from_args(args)
+        process_testset(args.model, args.testset, args.conf, writer_from_args(args),
+                        index, reader, args.index_every,
+                        args.scan_stride if args.fast_scan else 0, args.scan_imgsz,
+                        sidecar_from_args(args), args.decode_tolerance if args.fast_decode else None,
+                        args.segment_workers, args.segment_annotate,
+                        args.workers, args.image_batch, args.detect_ms)
     
\ No newline at end of file
@@ -1,27 +1,44 @@
 import cv2
 import argparse
+import sys
 import time
-from ultralytics import YOLO  # 导入YOLOv8库
-
-def yolov8_realtime_inference(model_path, source, conf_threshold=0.5):
+from pathlib import Path
+
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from camera_pipeline import add_pipeline_args, run_pipeline
+from plate_renderer import PlateRenderer
+from telemetry import Telemetry, add_telemetry_args, telemetry_from_args
+from model_store import load_model  # 本地模型库（离线加载 YOLOv8 权重）
+from slo_controller import add_slo_args, slo_from_args
+from runtime_config import add_runtime_args, runtime_from_args
+from replay_source import open_source
+from replay_spec import is_replay, source_arg
+from runtime_profile import add_profile_args, profile_from_args
+
+def yolov8_realtime_inference(model_path, source, conf_threshold=0.5, telemetry=None, slo=None, device="cpu"):
     """
     YOLOv8 实时推理函数
     :param model_path: 训练好的模型路径（.pt文件）
-    :param source: 输入源（摄像头编号如"0"，或视频文件路径如"test.mp4"）
+    :param source: 输入源（摄像头编号如"0"，视频文件路径如"test.mp4"，或录制的摄像头会话如"sessions/day1@4"）
     :param conf_threshold: 置信度阈值（过滤低置信度检测结果）
+    :param telemetry: 运行时监控（Telemetry），None 表示不记录
+    :param slo: 延迟 SLO 控制器（SloController），处理不过来时自动降低输入尺寸 / 隔帧检测
+    :param device: 推理设备（默认 CPU；运行时配置实测 GPU 更快时由 __main__ 传入）
     """
     # 1. 加载训练好的模型（指定CPU设备，避免GPU兼容性问题）
     print(f"正在加载模型：{model_path}")
-    model = YOLO(model_path)  # 加载权重文件
+    model = load_model(model_path)  # 加载权重文件（路径或模型库条目名）
     print("模型加载完成，开始推理...")
 
     # 2. 打开输入源（摄像头或视频文件）
-    # 判断输入源是摄像头（数字）还是视频文件（路径字符串）
+    # 判断输入源是摄像头（数字）、录制的摄像头会话（按录制节奏回放）还是视频文件（路径字符串）
+    cap = open_source(source)
     if source.isdigit():
-        cap = cv2.VideoCapture(int(source))  # 打开摄像头（0为默认摄像头）
         window_title = "YOLOv8 车牌检测（摄像头实时）"
+    elif is_replay(source):
+        window_title = f"YOLOv8 车牌检测（回放：{source}）"
     else:
-        cap = cv2.VideoCapture(source)  # 打开视频文件
         window_title = f"YOLOv8 车牌检测（视频：{source}）"
 
     # 检查输入源是否成功打开
@@ -37,31 +54,38 @@ def yolov8_realtime_inference(model_path, source, conf_threshold=0.5):
     # 4. 初始化FPS计算变量
     prev_time = time.time()  # 上一帧的时间
     fps = 0  # 实时帧率
+    renderer = PlateRenderer()  # 直接画在当前帧上，不再每帧复制整帧
+    telemetry = telemetry or Telemetry(enabled=False)
 
     # 5. 循环读取帧并推理
     while cap.isOpened():
         # 读取一帧图像
-        ret, frame = cap.read()
+        with telemetry.stage("read"):
+            ret, frame = cap.read()
         if not ret:
             print("推理结束（视频已播放完毕或摄像头已断开）")
             break
+        frame_start = time.perf_counter()
 
         # ---------------------- 核心：YOLOv8推理 ----------------------
-        # 强制用CPU推理（device="cpu"），避免GPU架构不兼容问题
-        results = model(
-            frame,
-            conf=conf_threshold,  # 置信度阈值
-            device="cpu",         # 关键：指定CPU设备
-            verbose=False         # 关闭推理过程日志（减少输出干扰）
-        )
+        # 默认用CPU推理（device="cpu"），避免GPU架构不兼容问题；gpu_test.py --profile 测过 GPU 可用且更快时按配置
+        # 开启 SLO 控制时按当前档位的输入尺寸推理，隔帧检测时其余帧沿用上一次的结果
+        if slo is None or slo.should_detect():
+            with telemetry.stage("detect"):
+                results = model(
+                    frame,
+                    conf=conf_threshold,  # 置信度阈值
+                    device=device,        # 关键：指定推理设备（默认CPU）
+                    verbose=False,        # 关闭推理过程日志（减少输出干扰）
+                    **({"imgsz": slo.imgsz} if slo else {})
+                )
+            telemetry.inc("detections", len(results[0].boxes))
+        telemetry.inc("frames")
 
         # ---------------------- 结果可视化 ----------------------
-        # 在原图上绘制检测框、类别名称和置信度（YOLOv8内置plot()方法）
-        annotated_frame = results[0].plot(
-            conf=True,   # 显示置信度
-            labels=True, # 显示类别名称
-            boxes=True   # 显示检测框
-        )
+        # 在原图上绘制检测框、类别名称和置信度
+        with telemetry.stage("render"):
+            annotated_frame = renderer.render_result(frame, results[0])
 
         # ---------------------- 计算并显示FPS ----------------------
         curr_time = time.time()
@@ -80,16 +104,24 @@ def yolov8_realtime_inference(model_path, source, conf_threshold=0.5):
         )
 
         # ---------------------- 显示结果 ----------------------
-        cv2.imshow(window_title, annotated_frame)
+        with telemetry.stage("display"):
+            cv2.imshow(window_title, annotated_frame)
+            key = cv2.waitKey(1) & 0xFF
+        telemetry.tick()
+        if slo is not None:
+            slo.record((time.perf_counter() - frame_start) * 1000)
 
         # 按下「q键」退出推理（等待1毫秒获取键盘输入）
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        if key == ord('q'):
             print("用户按下q键，退出推理")
             break
 
     # 6. 释放资源（关闭摄像头/视频文件，销毁窗口）
     cap.release()
     cv2.destroyAllWindows()
+    telemetry.close()
+    if slo is not None:
+        slo.print_summary()
     print("资源已释放，程序结束")
 
 # ---------------------- 命令行参数解析（方便快速切换输入源） ----------------------
@@ -102,13 +134,13 @@ if __name__ == "__main__":
         "--model",
         type=str,
         default="D:/yolo model new 2/yolo/ultralytics/runs/plate_detection/yolov8n_cpu_train/weights/best.pt",
-        help="训练好的模型路径（默认：你的best.pt路径）"
+        help="训练好的模型路径或模型库条目名（默认：你的best.pt路径）"
     )
     parser.add_argument(
         "--source",
-        type=str,
+        type=source_arg,
         default="0",  # 默认使用电脑摄像头（编号0）
-        help="输入源（摄像头编号如'0'，或视频文件路径如'test_video.mp4'）"
+        help="输入源（摄像头编号如'0'，视频文件路径如'test_video.mp4'，或录制的摄像头会话如'sessions/day1@4'）"
     )
     parser.add_argument(
         "--conf",
@@ -116,13 +148,39 @@ if __name__ == "__main__":
         default="0.5",  # 默认置信度阈值0.5（过滤低置信度结果）
         help="置信度阈值（如0.3、0.5，值越高误检越少）"
     )
+    # 多进程流水线（--workers N：采集和推理分到不同进程，通过共享内存传帧）
+    add_pipeline_args(parser)
+    # 运行时监控（--metrics-port 暴露 /metrics，--metrics-log-every 定时打印汇总）
+    add_telemetry_args(parser)
+    # 延迟 SLO 控制（--slo-ms 50：处理不过来时自动降低输入尺寸 / 隔帧检测）
+    add_slo_args(parser)
+    add_runtime_args(parser)
+    # 运行时配置（gpu_test.py --profile 实测的最佳设备和线程数）
+    add_profile_args(parser)
 
     # 解析参数
     args = parser.parse_args()
+    if args.workers > 0 and args.slo_ms:
+        # 多进程流水线里各推理进程各自检测，没有统一的每帧耗时可以用来换档
+        parser.error("--slo-ms 只支持单进程模式，不能和 --workers 同时使用")
+    profile = profile_from_args(args)
+    device = profile.device if profile is not None else "cpu"
 
     # 调用推理函数（传入解析后的参数）
-    yolov8_realtime_inference(
-        model_path=args.model,
-        source=args.source,
-        conf_threshold=args.conf
-    )
\ No newline at end of file
+    telemetry = telemetry_from_args(args)
+    if args.workers > 0:
+        run_pipeline(args.model, args.source, args.conf, args.workers, args.slots, args.policy,
+                     device=device, telemetry=telemetry, threads=args.threads_per_worker or None,
+                     pin_cpus=args.pin_cpus)
+    else:
+        # 单进程模式下 --threads-per-worker / --pin-cpus 作用于本进程（覆盖运行时配置里的线程数）
+        if args.threads_per_worker or args.pin_cpus:
+            runtime_from_args(args, 1)[0].apply(verbose=True)
+        yolov8_realtime_inference(
+            model_path=args.model,
+            source=args.source,
+            conf_threshold=args.conf,
+            telemetry=telemetry,
+            slo=slo_from_args(args),
+            device=device
+        )
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+多进程摄像头检测流水线
+
+    采集进程 --(FrameRing 共享内存)--> N 个推理进程 --(结果队列)--> 主进程（显示 + 统计）
+
+- 采集进程只负责 cap.read() 并把帧写入共享内存，解码抖动不会直接卡住推理
+- 推理进程各自加载一次模型，直接在共享内存里的帧上推理，只把检测框（很小）通过队列发回
+- 主进程按结果序号取帧画框显示，并统计每一帧从采集到拿到结果的延迟分解：
+      写入  采集完成 -> 帧写进共享内存
+      排队  写进共享内存 -> 被推理进程领取
+      推理  领取 -> 推理完成
+      回传  推理完成 -> 主进程收到结果
+      总计  采集完成 -> 主进程收到结果
+
+用法：
+    python camera_pipeline.py --model best.pt --source 0 --workers 2 --policy latest
+    python camera_pipeline.py --model best.pt --source test.mp4 --workers 4 --policy block --no-show
+"""
+
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+
+from frame_ring import POLICIES, FrameRing
+from plate_renderer import PlateRenderer
+from runtime_config import add_runtime_args, plan_workers, print_plan
+from telemetry import Telemetry
+
+STAGES = ("写入", "排队", "推理", "回传", "总计")
+
+
+def open_source(source):
+    """摄像头编号、视频文件，或 replay_source 录制的回放会话（"会话目录@倍速"）"""
+    from replay_source import open_source as _open
+    return _open(source)
+
+
+def probe_frame_shape(source):
+    """读一帧确定帧形状（共享内存按这个大小分配）"""
+    cap = open_source(source)
+    ok, frame = cap.read() if cap.isOpened() else (False, None)
+    cap.release()
+    if not ok:
+        return None
+    return frame.shape
+
+
+def capture_main(source, ring, stop_event):
+    """采集进程：读帧写入共享内存，读完或收到停止信号后通知推理进程"""
+    import cv2
+    cap = open_source(source)
+    frame_idx = 0
+    height, width = ring.shape[:2]
+    try:
+        while not stop_event.is_set():
+            ok, frame = cap.read()
+            t_capture = time.time()
+            if not ok:
+                break
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (width, height))
+            ring.write(frame, frame_idx, t_capture)
+            frame_idx += 1
+    finally:
+        cap.release()
+        ring.close_writer()
+
+
+def worker_main(worker_id, ring, results, model_path, conf, device, runtime):
+    """推理进程：领取帧 -> 推理 -> 归还帧 -> 发回检测框"""
+    runtime.apply()  # 限制线程数 / 绑核，必须在加载模型之前
+    from model_store import load_model
+    from plate_ocr import result_boxes
+
+    model = load_model(model_path)
+    try:
+        while True:
+            item = ring.acquire(timeout=0.5)
+            if item is None:
+                if ring.closed:
+                    break
+                continue
+            slot, meta, frame = item
+            t_acquired = time.time()
+            try:
+                # 直接在共享内存里的帧上推理，不复制
+                boxes = result_boxes(model(frame, conf=conf, device=device, verbose=False)[0])
+            finally:
+                ring.release(slot)
+            meta.update(worker=worker_id, boxes=boxes, t_acquired=t_acquired, t_done=time.time())
+            results.put(meta)
+    finally:
+        results.put({"worker": worker_id, "exited": True})  # 通知主进程该推理进程已退出
+
+
+class LatencyStats:
+    """各阶段延迟（保留最近 window 个样本）"""
+
+    def __init__(self, window=2000):
+        self.samples = {stage: deque(maxlen=window) for stage in STAGES}
+        self.count = 0
+
+    def add(self, meta, t_received):
+        self.count += 1
+        for stage, ms in zip(STAGES, (
+                meta["t_written"] - meta["t_capture"],
+                meta["t_acquired"] - meta["t_written"],
+                meta["t_done"] - meta["t_acquired"],
+                t_received - meta["t_done"],
+                t_received - meta["t_capture"])):
+            self.samples[stage].append(ms * 1000)
+
+    def report(self):
+        lines = []
+        for stage in STAGES:
+            values = sorted(self.samples[stage])
+            if not values:
+                continue
+            p50 = values[len(values) // 2]
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            lines.append(f"   {stage}: p50 {p50:.1f} ms | p95 {p95:.1f} ms | max {values[-1]:.1f} ms")
+        return "\n".join(lines)
+
+
+def run_pipeline(model_path, source, conf=0.5, workers=1, slots=8, policy="latest",
+                 device="cpu", show=True, report_every=5.0, telemetry=None, threads=None,
+                 pin_cpus=False):
+    """
+    运行多进程检测流水线
+    :param workers: 推理进程数
+    :param slots: 共享内存帧槽数量
+    :param policy: 槽满时的处理策略（latest / oldest / block）
+    :param show: 是否显示画面（按 q 退出）
+    :param report_every: 每隔多少秒打印一次延迟统计
+    :param telemetry: 运行时监控（Telemetry），各阶段延迟和丢帧数同时记录进去
+    :param threads: 每个推理进程的计算线程数（None 表示按 CPU 拓扑自动分配）
+    :param pin_cpus: 是否把推理进程绑定到分到的物理核上
+    """
+    shape = probe_frame_shape(source)
+    if shape is None:
+        print(f"错误：无法打开输入源 {source}")
+        return
+    ring = FrameRing(shape, slots, policy)
+    results = mp.Queue()
+    stop_event = mp.Event()
+    # 留一个物理核给采集进程和主进程（核数够用时）
+    runtimes = plan_workers(workers, threads, pin_cpus, reserve=1)
+    print_plan(runtimes)
+
+    procs = [mp.Process(target=capture_main, args=(source, ring, stop_event), name="capture")]
+    procs += [mp.Process(target=worker_main, name=f"infer-{runtime.worker_id}",
+                         args=(runtime.worker_id, ring, results, model_path, conf, device, runtime))
+              for runtime in runtimes]
+    for p in procs:
+        p.start()
+    print(f"流水线已启动：{shape[1]}x{shape[0]}，{workers} 个推理进程，{slots} 个帧槽，策略 {policy}")
+
+    stats = LatencyStats()
+    telemetry = telemetry or Telemetry(enabled=False)
+    renderer = PlateRenderer()  # snapshot 已经是副本，直接在上面画
+    per_worker = [0] * workers
+    alive = dict(enumerate(procs[1:]))  # 推理进程编号 -> 进程
+    start = last_report = time.time()
+    window_title = "车牌检测（多进程流水线）"
+    try:
+        while alive:
+            try:
+                meta = results.get(timeout=0.05)
+            except queue.Empty:
+                meta = False
+                # 被杀掉或崩溃的推理进程发不出退出通知：队列空闲时检查进程状态，避免一直等下去
+                for worker_id, p in list(alive.items()):
+                    if not p.is_alive():
+                        if p.exitcode != 0:
+                            print(f"❌ 推理进程 {p.name} 异常退出（exitcode={p.exitcode}）")
+                        del alive[worker_id]
+            if meta and meta.get("exited"):
+                alive.pop(meta["worker"], None)
+                continue
+            if meta:
+                t_received = time.time()
+                stats.add(meta, t_received)
+                per_worker[meta["worker"]] += 1
+                if telemetry.enabled:
+                    telemetry.observe("queue", meta["t_acquired"] - meta["t_written"])
+                    telemetry.observe("detect", meta["t_done"] - meta["t_acquired"])
+                    telemetry.observe("total", t_received - meta["t_capture"])
+                    telemetry.inc("frames")
+                    telemetry.inc("detections", len(meta["boxes"]))
+                    telemetry.set_counter("dropped_frames", ring.counters()["dropped"])
+                if show:
+                    import cv2
+                    _, frame = ring.snapshot(meta["seq"])
+                    if frame is not None:
+                        fps = stats.count / max(time.time() - start, 1e-6)
+                        cv2.imshow(window_title, renderer.render(frame, meta["boxes"], info=[f"FPS: {fps:.1f}"]))
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        print("用户按下q键，退出推理")
+                        stop_event.set()
+            telemetry.tick()
+            if time.time() - last_report >= report_every:
+                last_report = time.time()
+                print(f"已处理 {stats.count} 帧，{ring.counters()}\n{stats.report()}")
+    except KeyboardInterrupt:
+        stop_event.set()
+    finally:
+        stop_event.set()
+        for p in procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        counters = ring.counters()
+        ring.close()
+        telemetry.set_counter("dropped_frames", counters["dropped"])
+        telemetry.close()
+        if show:
+            import cv2
+            cv2.destroyAllWindows()
+
+    elapsed = time.time() - start
+    print("=" * 60)
+    print(f"采集 {counters['captured']} 帧，处理 {stats.count} 帧，按策略丢弃 {counters['dropped']} 帧"
+          f"（{policy}），平均 {stats.count / max(elapsed, 1e-6):.1f} FPS")
+    print(f"各推理进程处理帧数：{per_worker}")
+    print("延迟分解（采集 -> 结果）：")
+    print(stats.report())
+    print("=" * 60)
+
+
+def add_pipeline_args(parser):
+    """给命令行脚本添加多进程流水线参数"""
+    group = parser.add_argument_group("多进程流水线")
+    group.add_argument("--workers", type=int, default=0,
+                       help="推理进程数（0 表示单进程，不使用流水线）")
+    group.add_argument("--slots", type=int, default=8, help="共享内存帧槽数量")
+    group.add_argument("--policy", choices=POLICIES, default="latest",
+                       help="槽满时的处理策略：latest 只处理最新帧 / oldest 丢新帧 / block 不丢帧")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多进程摄像头车牌检测流水线")
+    parser.add_argument("--model", type=str, required=True, help="YOLO 车牌检测模型路径")
+    parser.add_argument("--source", type=str, default="0", help="摄像头编号、视频文件路径，或录制的摄像头会话（目录@倍速）")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--device", type=str, default="cpu", help="推理设备")
+    parser.add_argument("--no-show", action="store_true", help="不显示画面")
+    add_pipeline_args(parser)
+    add_runtime_args(parser)
+    args = parser.parse_args()
+    run_pipeline(args.model, args.source, args.conf, max(1, args.workers), args.slots,
+                 args.policy, args.device, not args.no_show,
+                 threads=args.threads_per_worker or None, pin_cpus=args.pin_cpus)
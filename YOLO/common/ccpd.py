@@ -0,0 +1,70 @@
+"""
+CCPD 数据集文件名编码 / 解析
+
+CCPD 图片的标注直接写在文件名里，例如：
+    025-95_113-154&383_386&473-386&473_177&454_154&383_363&402-0_0_22_27_27_33_16-37-15.jpg
+各字段（用 - 分隔）：
+    面积占比 - 水平_垂直倾斜角 - 左上&右下 车牌框 - 四个角点（右下、左下、左上、右上）
+    - 车牌字符索引（省份_字母_后续字符...） - 亮度 - 模糊度
+CCPD2020（新能源绿牌）车牌为 8 位，后续字符多一位。
+"""
+
+import os
+
+PROVINCES = ["皖", "沪", "津", "渝", "冀", "晋", "蒙", "辽", "吉", "黑", "苏", "浙", "京", "闽", "赣",
+             "鲁", "豫", "鄂", "湘", "粤", "桂", "琼", "川", "贵", "云", "藏", "陕", "甘", "青", "宁",
+             "新", "警", "学", "O"]
+ALPHABETS = ["A", "B", "C", "D", "E", "F", "G", "H", "J", "K", "L", "M", "N", "P", "Q", "R", "S",
+             "T", "U", "V", "W", "X", "Y", "Z", "O"]
+ADS = ["A", "B", "C", "D", "E", "F", "G", "H", "J", "K", "L", "M", "N", "P", "Q", "R", "S", "T",
+       "U", "V", "W", "X", "Y", "Z", "0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "O"]
+
+
+def decode_plate(indices):
+    """字符索引列表 -> 车牌号"""
+    chars = [PROVINCES[indices[0]], ALPHABETS[indices[1]]]
+    chars += [ADS[i] for i in indices[2:]]
+    return "".join(chars)
+
+
+def encode_plate(plate):
+    """车牌号 -> 字符索引列表"""
+    return [PROVINCES.index(plate[0]), ALPHABETS.index(plate[1])] + [ADS.index(c) for c in plate[2:]]
+
+
+def parse_name(filename):
+    """
+    解析 CCPD 文件名
+    :return: {"box": (x1, y1, x2, y2), "points": [(x, y) * 4], "plate", "tilt", "area",
+              "brightness", "blur"}，不是 CCPD 格式时返回 None
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    parts = stem.split("-")
+    if len(parts) < 7:
+        return None
+    try:
+        (x1, y1), (x2, y2) = [tuple(int(v) for v in p.split("&")) for p in parts[2].split("_")]
+        points = [tuple(int(v) for v in p.split("&")) for p in parts[3].split("_")]
+        plate = decode_plate([int(i) for i in parts[4].split("_")])
+        return {
+            "box": (x1, y1, x2, y2),
+            "points": points,
+            "plate": plate,
+            "tilt": tuple(int(v) for v in parts[1].split("_")),
+            "area": int(parts[0]),
+            "brightness": int(parts[5]),
+            "blur": int(parts[6]),
+        }
+    except (ValueError, IndexError):
+        return None
+
+
+def make_name(box, plate, points=None, tilt=(90, 90), area=10, brightness=100, blur=10, ext=".jpg"):
+    """生成 CCPD 格式的文件名（合成数据用）"""
+    x1, y1, x2, y2 = box
+    if points is None:
+        points = [(x2, y2), (x1, y2), (x1, y1), (x2, y1)]
+    return (f"{area:03d}-{tilt[0]}_{tilt[1]}-{x1}&{y1}_{x2}&{y2}-"
+            + "_".join(f"{x}&{y}" for x, y in points)
+            + "-" + "_".join(str(i) for i in encode_plate(plate))
+            + f"-{brightness}-{blur}{ext}")
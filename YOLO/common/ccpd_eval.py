@@ -0,0 +1,288 @@
+"""
+CCPD 精度 / 延迟评估
+
+在 CCPD 测试集上跑一组配置（模型 × imgsz × conf），真值直接从文件名解析（ccpd.parse_name），
+每个配置统计：
+    mAP50 / mAP50-95   车牌检测（单类别，COCO 101 点插值）
+    车牌准确率          置信度最高的框裁剪后 OCR，和真值车牌号完全一致的图片比例
+    去省份准确率        不比较第一位省份汉字（识别模型对汉字最不稳定，单独看一下）
+    延迟               每张图片 检测 / 检测 + OCR 的 p50、p95（不含读图）
+然后按延迟和精度指标（--metric）求 Pareto 前沿，输出表格（CSV + JSON）和散点图，
+指定 --floor 时给出满足精度下限的最快配置。
+
+测试集可以是图片目录（递归查找），也可以是 CCPD2019 的 splits/test.txt（路径相对于 CCPD 根目录）。
+
+用法：
+    python ccpd_eval.py --data D:/CCPD2019/splits/test.txt --models best.pt yolov8s.pt \\
+        --imgsz 320 480 640 --conf 0.25 0.3 0.5 --limit 1000 --floor 0.9
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+
+import cv2
+
+from ccpd import parse_name
+from model_store import load_model
+from plate_ocr import PlateReader, crop_plate, result_boxes
+from stage_timing import percentile
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+METRICS = ("plate_acc", "plate_acc_no_province", "map50", "map50_95")
+
+
+def load_testset(data, limit=0):
+    """
+    读取测试集，返回 [(图片路径, 真值), ...]（不是 CCPD 文件名的图片跳过）
+    :param data: 图片目录，或每行一个相对路径的 split 文件
+    :param limit: 最多取多少张（按文件名排序后等间隔抽取，0 表示全部）
+    """
+    if os.path.isfile(data):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(data)))  # splits/test.txt -> CCPD 根目录
+        with open(data, "r", encoding="utf-8") as f:
+            paths = [os.path.join(root, line.strip()) for line in f if line.strip()]
+    else:
+        paths = [os.path.join(d, name) for d, _, names in os.walk(data)
+                 for name in names if name.lower().endswith(IMAGE_EXTS)]
+    samples = []
+    for path in sorted(paths):
+        truth = parse_name(path)
+        if truth is not None:
+            samples.append((path, truth))
+    if limit and len(samples) > limit:
+        step = len(samples) / limit
+        samples = [samples[int(i * step)] for i in range(limit)]
+    return samples
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def average_precision(detections, truths, iou_thr=0.5):
+    """
+    单类别 AP（COCO 101 点插值）
+    :param detections: [(图片序号, 置信度, (x1, y1, x2, y2)), ...]
+    :param truths: {图片序号: [(x1, y1, x2, y2), ...]}
+    """
+    total = sum(len(v) for v in truths.values())
+    if total == 0:
+        return 0.0
+    matched = {k: [False] * len(v) for k, v in truths.items()}
+    tp, fp = [], []
+    for img_id, _, box in sorted(detections, key=lambda d: -d[1]):
+        gts = truths.get(img_id, [])
+        best, best_iou = -1, iou_thr
+        for i, gt in enumerate(gts):
+            iou = box_iou(box, gt)
+            if iou >= best_iou and not matched[img_id][i]:
+                best, best_iou = i, iou
+        if best >= 0:
+            matched[img_id][best] = True
+        tp.append(1 if best >= 0 else 0)
+        fp.append(0 if best >= 0 else 1)
+
+    precisions, recalls = [], []
+    tp_sum = fp_sum = 0
+    for t, f in zip(tp, fp):
+        tp_sum += t
+        fp_sum += f
+        precisions.append(tp_sum / (tp_sum + fp_sum))
+        recalls.append(tp_sum / total)
+    # 精度包络：每个召回率位置取右侧最大精度
+    for i in range(len(precisions) - 2, -1, -1):
+        precisions[i] = max(precisions[i], precisions[i + 1])
+    ap, j = 0.0, 0
+    for r in (i / 100 for i in range(101)):
+        while j < len(recalls) and recalls[j] < r:
+            j += 1
+        ap += precisions[j] if j < len(recalls) else 0.0
+    return ap / 101
+
+
+def evaluate_config(model, samples, reader, imgsz, conf, device, expand=4, warmup=3):
+    """在测试集上评估一个配置，返回指标字典"""
+    detections, truths = [], {}
+    det_ms, e2e_ms = [], []
+    correct = correct_tail = read_count = 0
+    for i, (path, truth) in enumerate(samples):
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        if i < warmup:  # 预热：前几张各多跑一次，不计时
+            model(img, conf=conf, imgsz=imgsz, device=device, verbose=False)
+        start = time.perf_counter()
+        result = model(img, conf=conf, imgsz=imgsz, device=device, verbose=False)[0]
+        boxes = result_boxes(result)
+        det_done = time.perf_counter()
+        plate = ""
+        if reader is not None and boxes:
+            crop = crop_plate(img, max(boxes, key=lambda b: b[4]), expand)
+            if crop is not None:
+                plate, _ = reader.read(crop)
+        end = time.perf_counter()
+
+        truths[i] = [truth["box"]]
+        detections += [(i, b[4], b[:4]) for b in boxes]
+        det_ms.append((det_done - start) * 1000)
+        e2e_ms.append((end - start) * 1000)
+        read_count += 1
+        if plate == truth["plate"]:
+            correct += 1
+        if plate and plate[1:] == truth["plate"][1:]:
+            correct_tail += 1
+
+    det_ms.sort()
+    e2e_ms.sort()
+    n = max(read_count, 1)
+    aps = [average_precision(detections, truths, 0.5 + 0.05 * k) for k in range(10)]
+    return {
+        "images": read_count,
+        "map50": round(aps[0], 4),
+        "map50_95": round(sum(aps) / len(aps), 4),
+        "plate_acc": round(correct / n, 4) if reader is not None else None,
+        "plate_acc_no_province": round(correct_tail / n, 4) if reader is not None else None,
+        "det_p50_ms": round(percentile(det_ms, 50), 2),
+        "det_p95_ms": round(percentile(det_ms, 95), 2),
+        "e2e_p50_ms": round(percentile(e2e_ms, 50), 2),
+        "e2e_p95_ms": round(percentile(e2e_ms, 95), 2),
+    }
+
+
+def pareto_front(rows, metric, latency="e2e_p50_ms"):
+    """标记 Pareto 最优的配置：没有别的配置同时更快（或一样快）且更准（或一样准）"""
+    for row in rows:
+        row["pareto"] = not any(
+            other is not row
+            and other[latency] <= row[latency] and other[metric] >= row[metric]
+            and (other[latency] < row[latency] or other[metric] > row[metric])
+            for other in rows)
+    return rows
+
+
+def pick_fastest(rows, metric, floor, latency="e2e_p50_ms"):
+    """满足精度下限的最快配置，没有时返回 None"""
+    ok = [r for r in rows if r[metric] is not None and r[metric] >= floor]
+    return min(ok, key=lambda r: r[latency]) if ok else None
+
+
+def config_name(row):
+    return f"{os.path.basename(row['model'])} imgsz={row['imgsz']} conf={row['conf']}"
+
+
+def draw_pareto_plot(rows, metric, path, latency="e2e_p50_ms", width=900, height=600):
+    """画 延迟-精度 散点图，Pareto 前沿连线（用 OpenCV 画，不依赖 matplotlib）"""
+    import numpy as np
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    left, right, top, bottom = 80, 30, 30, 60
+    xs = [r[latency] for r in rows]
+    ys = [r[metric] for r in rows]
+    x_max = max(xs) * 1.1 or 1.0
+    y_min, y_max = max(0.0, min(ys) - 0.05), min(1.0, max(ys) + 0.05)
+    y_span = max(y_max - y_min, 1e-6)
+
+    def pos(x, y):
+        return (int(left + x / x_max * (width - left - right)),
+                int(height - bottom - (y - y_min) / y_span * (height - top - bottom)))
+
+    cv2.line(canvas, (left, height - bottom), (width - right, height - bottom), (0, 0, 0), 1)
+    cv2.line(canvas, (left, top), (left, height - bottom), (0, 0, 0), 1)
+    for k in range(6):
+        x = x_max * k / 5
+        px, _ = pos(x, y_min)
+        tick = f"{x:.1f}" if x_max < 20 else f"{x:.0f}"
+        cv2.putText(canvas, tick, (px - 10, height - bottom + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
+        y = y_min + y_span * k / 5
+        _, py = pos(0, y)
+        cv2.putText(canvas, f"{y:.2f}", (10, py + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
+    cv2.putText(canvas, f"{latency} (ms)", (width // 2 - 60, height - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 0, 0), 1)
+    cv2.putText(canvas, metric, (left + 5, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 0, 0), 1)
+
+    front = sorted((r for r in rows if r["pareto"]), key=lambda r: r[latency])
+    for a, b in zip(front, front[1:]):
+        cv2.line(canvas, pos(a[latency], a[metric]), pos(b[latency], b[metric]), (0, 160, 0), 2)
+    for r in rows:
+        p = pos(r[latency], r[metric])
+        cv2.circle(canvas, p, 6 if r["pareto"] else 4, (0, 160, 0) if r["pareto"] else (160, 160, 160), -1)
+        if r["pareto"]:
+            label = f"{os.path.splitext(os.path.basename(r['model']))[0]}/{r['imgsz']}/{r['conf']}"
+            cv2.putText(canvas, label, (p[0] + 8, p[1] - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 100, 0), 1)
+    cv2.imwrite(path, canvas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CCPD 精度 / 延迟评估，输出 Pareto 表")
+    parser.add_argument("--data", type=str, required=True, help="CCPD 测试集目录，或 splits/test.txt")
+    parser.add_argument("--models", type=str, nargs="+", required=True, help="一个或多个 YOLO 权重（路径或模型库条目名）")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640], help="要比较的输入尺寸")
+    parser.add_argument("--conf", type=float, nargs="+", default=[0.25, 0.3, 0.5], help="要比较的置信度阈值")
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--limit", type=int, default=0, help="最多评估多少张图片（0 表示全部）")
+    parser.add_argument("--rec-model-dir", type=str, default=None, help="PaddleOCR 识别模型目录")
+    parser.add_argument("--no-ocr", action="store_true", help="只评估检测（不计算车牌准确率）")
+    parser.add_argument("--metric", choices=METRICS, default=None,
+                        help="Pareto 使用的精度指标（默认有 OCR 时为 plate_acc，否则为 map50）")
+    parser.add_argument("--floor", type=float, default=None, help="精度下限，给出满足下限的最快配置")
+    parser.add_argument("--out", type=str, default="ccpd_eval", help="输出目录")
+    args = parser.parse_args()
+
+    metric = args.metric or ("map50" if args.no_ocr else "plate_acc")
+    if args.no_ocr and metric.startswith("plate_acc"):
+        parser.error("--no-ocr 时不能用车牌准确率作为指标")
+
+    samples = load_testset(args.data, args.limit)
+    if not samples:
+        print(f"❌ 没有找到 CCPD 格式的图片：{args.data}")
+        return
+    print(f"📁 测试集：{len(samples)} 张图片")
+    reader = None if args.no_ocr else PlateReader(rec_model_dir=args.rec_model_dir)
+
+    rows = []
+    for model_path in args.models:
+        model = load_model(model_path)
+        for imgsz, conf in itertools.product(args.imgsz, args.conf):
+            print(f"⏳ {os.path.basename(model_path)} imgsz={imgsz} conf={conf}")
+            row = {"model": model_path, "imgsz": imgsz, "conf": conf}
+            row.update(evaluate_config(model, samples, reader, imgsz, conf, args.device))
+            rows.append(row)
+
+    pareto_front(rows, metric)
+    rows.sort(key=lambda r: r["e2e_p50_ms"])
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "results.csv"), "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(args.out, "results.json"), "w", encoding="utf-8") as f:
+        json.dump({"metric": metric, "images": len(samples), "configs": rows}, f, ensure_ascii=False, indent=2)
+    draw_pareto_plot(rows, metric, os.path.join(args.out, "pareto.png"))
+
+    print("=" * 96)
+    print(f"{'配置':<36}{'mAP50':>8}{'mAP50-95':>10}{'车牌准确率':>10}{'去省份':>8}"
+          f"{'检测p50':>9}{'端到端p50':>11}{'p95':>8}  Pareto")
+    for r in rows:
+        acc = "-" if r["plate_acc"] is None else f"{r['plate_acc']:.3f}"
+        tail = "-" if r["plate_acc_no_province"] is None else f"{r['plate_acc_no_province']:.3f}"
+        print(f"{config_name(r):<36}{r['map50']:>8.3f}{r['map50_95']:>10.3f}{acc:>14}{tail:>10}"
+              f"{r['det_p50_ms']:>10.1f}{r['e2e_p50_ms']:>13.1f}{r['e2e_p95_ms']:>8.1f}  {'★' if r['pareto'] else ''}")
+    print("=" * 96)
+    if args.floor is not None:
+        best = pick_fastest(rows, metric, args.floor)
+        if best:
+            print(f"✅ {metric} ≥ {args.floor} 的最快配置：{config_name(best)}"
+                  f"（{metric}={best[metric]}，端到端 p50 {best['e2e_p50_ms']} ms）")
+        else:
+            print(f"⚠️ 没有配置满足 {metric} ≥ {args.floor}")
+    print(f"💾 结果已保存：{args.out}/results.csv、results.json、pareto.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+检测结果持久化缓存（SQLite）
+
+调 OCR 预处理（CLAHE 参数、车牌框扩展像素、OCR 置信度阈值）时，每跑一遍都要把所有图片的
+YOLO 检测重新跑一遍，而检测结果其实根本没变。DetectionCache 把检测输出存进一个 SQLite 文件：
+
+- 键 = 图片内容 SHA256 + 模型哈希 + 检测参数（置信度、输入尺寸、解码倍数、预筛设置……）
+  图片改名、移动都能命中；换了权重或改了检测参数自动失效，不会拿到过期结果
+- 模型哈希：模型库条目直接用记录的 sha256；本地权重文件按 (路径, 大小, 修改时间) 缓存哈希，
+  几百 MB 的权重不用每次都重新计算
+- 大小上限（默认 256 MB），超出时按最近使用时间淘汰（LRU）
+- 统计命中率和省下的检测时间（每条记录保存当时的检测耗时）
+- WAL 模式，多进程批量识别时每个进程各开一个连接同时读写
+
+    cache = DetectionCache("detections.db", model_fingerprint("best.pt"))
+    value, hit = cache.fetch(image_bytes, lambda: detect(img), conf=0.3, imgsz=640)
+    cache.print_report()
+
+用法：
+    python detection_cache.py detections.db stats
+    python detection_cache.py detections.db trim --max-mb 64
+    python detection_cache.py detections.db clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from model_store import ModelStoreError, default_store, path_sha256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    key       TEXT PRIMARY KEY,
+    value     TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    detect_ms REAL,
+    hits      INTEGER NOT NULL DEFAULT 0,
+    created   REAL,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_last_used ON detections(last_used);
+CREATE TABLE IF NOT EXISTS model_hashes (
+    path   TEXT PRIMARY KEY,
+    size   INTEGER,
+    mtime  REAL,
+    sha256 TEXT
+);
+"""
+
+
+def _connect(db_path):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    # WAL：多个进程同时读写；NORMAL：每个事务不强制刷盘（缓存丢了重新检测即可）
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def model_fingerprint(spec, db_path=None):
+    """
+    模型哈希：模型库条目用记录的 sha256，本地文件 / 目录计算内容哈希
+    :param db_path: 缓存库路径，给出时按 (路径, 大小, 修改时间) 复用上次算好的哈希
+    """
+    if not os.path.exists(spec):
+        store = default_store()
+        try:
+            return store.entry(spec)["sha256"]
+        except ModelStoreError:
+            return hashlib.sha256(spec.encode("utf-8")).hexdigest()  # 未知模型：只按名字区分
+    path = os.path.abspath(spec)
+    stat = os.stat(path)
+    if db_path is None:
+        return path_sha256(path)
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT size, mtime, sha256 FROM model_hashes WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+        sha = path_sha256(path)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO model_hashes (path, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+                         (path, stat.st_size, stat.st_mtime, sha))
+        return sha
+    finally:
+        conn.close()
+
+
+class DetectionCache:
+    """
+    检测结果缓存
+    :param db_path: SQLite 文件
+    :param model_key: 模型哈希（model_fingerprint 的结果）
+    :param max_mb: 缓存大小上限（按记录内容计算），超出时按最近使用时间淘汰
+    :param evict_every: 每写入多少条检查一次大小
+    """
+
+    def __init__(self, db_path, model_key, max_mb=256, evict_every=200):
+        self.db_path = db_path
+        self.model_key = model_key
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.evict_every = evict_every
+        self.conn = _connect(db_path)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.saved_ms = 0.0     # 命中时省下的检测时间（按写入时记录的耗时估算）
+        self.lookup_ms = 0.0    # 哈希 + 查询本身的耗时
+        self._puts = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def key(self, data, **params):
+        """图片内容（bytes / numpy 数组）+ 模型哈希 + 检测参数 -> 缓存键"""
+        h = hashlib.sha256(memoryview(data).cast("B") if not isinstance(data, bytes) else data)
+        h.update(b"\0" + self.model_key.encode("ascii"))
+        h.update(b"\0" + json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """查询缓存，命中时更新最近使用时间，未命中返回 None"""
+        row = self.conn.execute("SELECT value, detect_ms FROM detections WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_ms += row[1] or 0.0
+        with self.conn:
+            self.conn.execute("UPDATE detections SET hits = hits + 1, last_used = ? WHERE key = ?",
+                              (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value, detect_ms=None):
+        """写入一条检测结果（value 需要能转成 JSON）"""
+        text = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO detections (key, value, size, detect_ms, created, last_used) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", (key, text, len(text) + len(key), detect_ms, now, now))
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self.evict()
+
+    def fetch(self, data, compute, **params):
+        """
+        取缓存的检测结果，没有时调用 compute() 计算并写入
+        :return: (结果, 是否命中)
+        """
+        start = time.perf_counter()
+        key = self.key(data, **params)
+        value = self.get(key)
+        self.lookup_ms += (time.perf_counter() - start) * 1000
+        if value is not None:
+            return value, True
+        start = time.perf_counter()
+        value = compute()
+        self.put(key, value, (time.perf_counter() - start) * 1000)
+        return value, False
+
+    def size_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM detections").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """超过大小上限时按最近使用时间从旧到新删除，删到上限的 90% 为止，返回删除条数"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.size_bytes()
+        if total <= max_bytes:
+            return 0
+        excess = total - int(max_bytes * 0.9)
+        removed = freed = 0
+        with self.conn:
+            rows = self.conn.execute("SELECT key, size FROM detections ORDER BY last_used")
+            doomed = []
+            for key, size in rows:
+                if freed >= excess:
+                    break
+                doomed.append((key,))
+                freed += size
+            self.conn.executemany("DELETE FROM detections WHERE key = ?", doomed)
+            removed = len(doomed)
+        self.evicted += removed
+        return removed
+
+    def report(self):
+        lookups = self.hits + self.misses
+        entries, size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM detections").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_s": round(self.saved_ms / 1000, 2),
+            "lookup_ms_avg": round(self.lookup_ms / lookups, 3) if lookups else 0.0,
+            "evicted": self.evicted,
+            "entries": entries,
+            "size_mb": round(size / 1024 / 1024, 2),
+        }
+
+    def print_report(self):
+        r = self.report()
+        print(f"🗃️ 检测缓存：命中 {r['hits']} 次，未命中 {r['misses']} 次（命中率 {r['hit_rate'] * 100:.1f}%），"
+              f"省下检测时间约 {r['saved_s']} 秒，平均查询 {r['lookup_ms_avg']} ms")
+        print(f"   缓存共 {r['entries']} 条，{r['size_mb']} MB，本次淘汰 {r['evicted']} 条")
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+
+def add_cache_args(parser):
+    """给命令行脚本添加检测缓存参数"""
+    group = parser.add_argument_group("检测结果缓存")
+    group.add_argument("--detect-cache", type=str, default=None,
+                       help="检测结果缓存文件（SQLite），重复运行时直接复用检测框（默认不缓存）")
+    group.add_argument("--no-detect-cache", action="store_true",
+                       help="不使用检测结果缓存（脚本里配置了 DETECTION_CACHE 时用来临时关闭）")
+    group.add_argument("--cache-max-mb", type=float, default=256, help="缓存大小上限（MB），超出时淘汰最久未用的")
+    return parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测结果缓存管理")
+    parser.add_argument("db", type=str, help="缓存文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="缓存条数、大小、累计命中次数")
+    p = sub.add_parser("trim", help="按最近使用时间淘汰到指定大小")
+    p.add_argument("--max-mb", type=float, required=True)
+    sub.add_parser("clear", help="清空缓存")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ 缓存文件不存在：{args.db}")
+        return
+    conn = _connect(args.db)
+    try:
+        if args.command == "stats":
+            entries, size, hits, saved = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), "
+                "COALESCE(SUM(hits * detect_ms), 0) FROM detections").fetchone()
+            print(f"🗃️ {args.db}：{entries} 条，{size / 1024 / 1024:.2f} MB，"
+                  f"累计命中 {hits} 次，累计省下检测时间约 {saved / 1000:.1f} 秒")
+        elif args.command == "trim":
+            cache = DetectionCache(args.db, "", max_mb=args.max_mb)
+            removed = cache.evict()
+            print(f"🧹 淘汰 {removed} 条，剩余 {cache.size_bytes() / 1024 / 1024:.2f} MB")
+            cache.conn.close()
+        else:
+            with conn:
+                conn.execute("DELETE FROM detections")
+            conn.execute("VACUUM")
+            print(f"🧹 已清空 {args.db}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+检测结果旁路文件（不重新编码视频）
+
+以前处理视频要用 mp4v 把整段视频重新编码一遍，只为了把检测框画进去：处理时间和占用空间都翻倍，
+画质还会下降。旁路模式下原视频保持不动，只写每帧的检测结果：
+
+- JSONL（.jsonl）：第一行是视频信息，之后每个有检测框的帧一行 {"f": 帧号, "t": 秒, "b": [[x1, y1, x2, y2, conf, 标签]]}
+- 二进制（.dets）：同样的内容，每个框 16 字节，适合长时间录像
+- 叠加字幕轨：WebVTT（.vtt，按位置显示标签文字）和 ASS（.ass，用矢量绘图画出检测框 + 标签），
+  播放器（mpv / VLC / PotPlayer）加载字幕即可看到标注效果，不需要重新编码
+- 需要导出带框视频时，用 render_clip 只对要看的片段按需画框编码
+
+    sidecar = SidecarWriter("out/car.dets", fps=25, width=1920, height=1080, source="car.mp4")
+    sidecar.write(frame_idx, boxes, labels)
+    sidecar.close()        # 同时生成 car.vtt / car.ass
+
+用法：
+    python detection_sidecar.py info out/car.dets
+    python detection_sidecar.py export out/car.dets --ass out/car.ass
+    python detection_sidecar.py render out/car.dets --video car.mp4 --start 12 --end 20 --out clip.mp4
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+
+MAGIC = b"PLDS"
+VERSION = 1
+FORMATS = ("jsonl", "bin")
+OVERLAYS = ("vtt", "ass")
+_BOX = struct.Struct("<4HfI")       # x1 y1 x2 y2 conf 标签编号
+_FRAME = struct.Struct("<cIH")      # b"F" 帧号 框数量
+_LABEL = struct.Struct("<cIH")      # b"L" 标签编号 UTF-8 字节数
+NO_LABEL = 0xFFFFFFFF               # 标签编号用 4 字节，长录像里不同车牌再多也不会和它撞上
+
+
+class SidecarWriter:
+    """
+    逐帧写检测结果
+    :param path: 输出路径（.jsonl 为文本格式，其他扩展名为二进制格式）
+    :param overlays: 关闭时额外生成的叠加字幕轨（"vtt" / "ass"）
+    """
+
+    def __init__(self, path, fps, width, height, source=None, overlays=("vtt",)):
+        self.path = path
+        self.fps = fps or 25.0
+        self.overlays = tuple(overlays or ())
+        self.binary = not path.lower().endswith(".jsonl")
+        self.frames = 0
+        self.detections = 0
+        self._labels = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.header = {"version": VERSION, "source": source, "fps": self.fps, "width": width,
+                       "height": height, "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+        self._f = open(path, "wb")
+        header = json.dumps(self.header, ensure_ascii=False).encode("utf-8")
+        if self.binary:
+            self._f.write(MAGIC + struct.pack("<HI", VERSION, len(header)) + header)
+        else:
+            self._f.write(header + b"\n")
+
+    def _label_id(self, label):
+        """标签第一次出现时写一条定义记录"""
+        if not label:
+            return NO_LABEL
+        label_id = self._labels.get(label)
+        if label_id is None:
+            label_id = self._labels[label] = len(self._labels)
+            data = label.encode("utf-8")
+            self._f.write(_LABEL.pack(b"L", label_id, len(data)) + data)
+        return label_id
+
+    def write(self, frame_idx, boxes, labels=None):
+        """
+        写一帧的检测结果（没有检测框的帧不写）
+        :param boxes: [(x1, y1, x2, y2, conf), ...]
+        :param labels: 每个框的标签（例如识别出的车牌号），可以为 None
+        """
+        self.frames = max(self.frames, frame_idx + 1)
+        if not boxes:
+            return
+        self.detections += len(boxes)
+        labels = labels or [None] * len(boxes)
+        if self.binary:
+            ids = [self._label_id(label) for label in labels]
+            parts = [_FRAME.pack(b"F", frame_idx, len(boxes))]
+            parts += [_BOX.pack(*(max(0, min(65535, int(v))) for v in box[:4]), float(box[4]), label_id)
+                      for box, label_id in zip(boxes, ids)]
+            self._f.write(b"".join(parts))
+        else:
+            record = {"f": frame_idx, "t": round(frame_idx / self.fps, 3),
+                      "b": [[int(b[0]), int(b[1]), int(b[2]), int(b[3]), round(float(b[4]), 3)]
+                            + ([label] if label else []) for b, label in zip(boxes, labels)]}
+            self._f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def close(self):
+        """写结束标记，生成叠加字幕轨，返回生成的文件列表"""
+        if self._f is None:
+            return []
+        if self.binary:
+            self._f.write(struct.pack("<cI", b"E", self.frames))
+        else:
+            self._f.write((json.dumps({"end": self.frames}) + "\n").encode("utf-8"))
+        self._f.close()
+        self._f = None
+        paths = [self.path]
+        base = os.path.splitext(self.path)[0]
+        if "vtt" in self.overlays:
+            paths.append(export_vtt(self.path, base + ".vtt"))
+        if "ass" in self.overlays:
+            paths.append(export_ass(self.path, base + ".ass"))
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_sidecar(path):
+    """
+    读取旁路文件
+    :return: (视频信息, 逐帧生成器 -> (帧号, [(x1, y1, x2, y2, conf)], [标签]))，
+             视频信息里的 "frames" 在生成器读完后才有值
+    """
+    f = open(path, "rb")
+    if f.read(4) == MAGIC:
+        version, size = struct.unpack("<HI", f.read(6))
+        if version != VERSION:
+            f.close()
+            raise ValueError(f"不支持的旁路文件版本 {version}：{path}")
+        header = json.loads(f.read(size).decode("utf-8"))
+        return header, _iter_binary(f, header)
+    f.seek(0)
+    header = json.loads(f.readline().decode("utf-8"))
+    return header, _iter_jsonl(f, header)
+
+
+def _iter_binary(f, header):
+    labels = {}
+    with f:
+        while True:
+            kind = f.read(1)
+            if not kind:
+                break
+            if kind == b"L":
+                _, label_id, size = _LABEL.unpack(kind + f.read(_LABEL.size - 1))
+                labels[label_id] = f.read(size).decode("utf-8")
+            elif kind == b"F":
+                _, frame_idx, count = _FRAME.unpack(kind + f.read(_FRAME.size - 1))
+                data = f.read(_BOX.size * count)
+                items = [_BOX.unpack_from(data, i * _BOX.size) for i in range(count)]
+                yield (frame_idx, [item[:4] + (item[4],) for item in items],
+                       [labels.get(item[5]) for item in items])
+            elif kind == b"E":
+                header["frames"] = struct.unpack("<I", f.read(4))[0]
+                break
+            else:
+                raise ValueError(f"旁路文件损坏：{f.name}")
+
+
+def _iter_jsonl(f, header):
+    with f:
+        for line in f:
+            record = json.loads(line.decode("utf-8"))
+            if "end" in record:
+                header["frames"] = record["end"]
+                break
+            yield (record["f"], [tuple(b[:5]) for b in record["b"]],
+                   [b[5] if len(b) > 5 else None for b in record["b"]])
+
+
+def _spans(path, tolerance=2):
+    """
+    把连续帧里几乎不动的检测结果合并成一个时间段，减小字幕文件
+    :return: (视频信息, [(开始帧, 结束帧, 框列表, 标签列表)])
+    """
+    header, frames = read_sidecar(path)
+    spans = []
+    for frame_idx, boxes, labels in frames:
+        last = spans[-1] if spans else None
+        if (last is not None and last[1] == frame_idx and last[3] == labels and len(last[2]) == len(boxes)
+                and all(abs(a - b) <= tolerance for p, q in zip(last[2], boxes) for a, b in zip(p[:4], q[:4]))):
+            last[1] = frame_idx + 1
+        else:
+            spans.append([frame_idx, frame_idx + 1, boxes, labels])
+    return header, spans
+
+
+def _vtt_time(seconds):
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{int(h):02d}:{int(m):02d}:{s:06.3f}"
+
+
+def _ass_time(seconds):
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{int(h)}:{int(m):02d}:{s:05.2f}"
+
+
+def _label_text(box, label):
+    return f"{label} {box[4]:.2f}" if label else f"{box[4]:.2f}"
+
+
+def export_vtt(path, out_path):
+    """生成 WebVTT 字幕轨：每个框的标签显示在框的位置上（WebVTT 不能画框）"""
+    header, spans = _spans(path)
+    fps, width, height = header["fps"], header["width"] or 1, header["height"] or 1
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for start, end, boxes, labels in spans:
+            for box, label in zip(boxes, labels):
+                x = min(100.0, max(0.0, box[0] / width * 100))
+                y = min(100.0, max(0.0, box[1] / height * 100))
+                f.write(f"{_vtt_time(start / fps)} --> {_vtt_time(end / fps)} "
+                        f"position:{x:.1f}%,line-left line:{y:.1f}% align:left\n{_label_text(box, label)}\n\n")
+    return out_path
+
+
+def export_ass(path, out_path, color="00FF00"):
+    """生成 ASS 字幕轨：矢量绘图画检测框，框上方显示标签（坐标系和视频分辨率一致）"""
+    header, spans = _spans(path)
+    fps, width, height = header["fps"], header["width"], header["height"]
+    bgr = color[4:6] + color[2:4] + color[0:2]  # ASS 颜色是 BGR 顺序
+    with open(out_path, "w", encoding="utf-8-sig") as f:
+        f.write("[Script Info]\nScriptType: v4.00+\n"
+                f"PlayResX: {width}\nPlayResY: {height}\nScaledBorderAndShadow: yes\n\n"
+                "[V4+ Styles]\nFormat: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+                "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, "
+                "Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+                f"Style: Box,Arial,20,&H00{bgr},&H00{bgr},&H00{bgr},&H00000000,0,0,0,0,100,100,0,0,1,2,0,7,0,0,0,1\n"
+                f"Style: Label,Microsoft YaHei,{max(14, height // 36)},&H00FFFFFF,&H00FFFFFF,&H00000000,"
+                "&H99000000,0,0,0,0,100,100,0,0,3,1,0,1,0,0,0,1\n\n"
+                "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+        for start, end, boxes, labels in spans:
+            t0, t1 = _ass_time(start / fps), _ass_time(end / fps)
+            for box, label in zip(boxes, labels):
+                x1, y1, x2, y2 = (int(v) for v in box[:4])
+                # \1a&HFF& 填充全透明，只保留描边
+                f.write(f"Dialogue: 0,{t0},{t1},Box,,0,0,0,,{{\\pos(0,0)\\1a&HFF&\\p1}}"
+                        f"m {x1} {y1} l {x2} {y1} {x2} {y2} {x1} {y2}{{\\p0}}\n")
+                f.write(f"Dialogue: 1,{t0},{t1},Label,,0,0,0,,{{\\pos({x1},{max(0, y1 - 4)})}}"
+                        f"{_label_text(box, label)}\n")
+    return out_path
+
+
+def render_clip(sidecar_path, video_path, out_path, start=0.0, end=None, renderer=None):
+    """
+    按需把检测框画进视频片段（只解码、编码 [start, end) 这一段）
+    :return: 写入的帧数
+    """
+    import cv2
+    from plate_renderer import PlateRenderer
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频：{video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    first = int(round(start * fps))
+    last = int(round(end * fps)) if end is not None else None
+    # 只保留片段内的检测结果
+    _, frames = read_sidecar(sidecar_path)
+    detections = {}
+    for frame_idx, boxes, labels in frames:
+        if frame_idx >= first and (last is None or frame_idx < last):
+            detections[frame_idx] = (boxes, labels)
+
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    renderer = renderer or PlateRenderer()
+    frame_idx, written = first, 0
+    try:
+        while last is None or frame_idx < last:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            boxes, labels = detections.get(frame_idx, ((), None))
+            if boxes:
+                frame = renderer.render(frame, boxes, [_label_text(b, l) for b, l in zip(boxes, labels)])
+            out.write(frame)
+            frame_idx += 1
+            written += 1
+    finally:
+        cap.release()
+        out.release()
+    return written
+
+
+class SidecarOptions:
+    """
+    命令行里的旁路输出设置，按视频创建 SidecarWriter
+    :param fmt: "jsonl" 或 "bin"
+    :param overlays: 叠加字幕轨（"vtt" / "ass"）
+    """
+
+    def __init__(self, fmt="bin", overlays=("vtt",)):
+        self.fmt = fmt
+        self.overlays = tuple(overlays)
+
+    def open(self, out_dir, video_path, fps, width, height):
+        """在 out_dir 下创建 <视频名>.dets / .jsonl"""
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        ext = ".jsonl" if self.fmt == "jsonl" else ".dets"
+        return SidecarWriter(os.path.join(out_dir, name + ext), fps, width, height,
+                             source=os.path.abspath(video_path), overlays=self.overlays)
+
+
+def add_sidecar_args(parser):
+    """给命令行脚本添加旁路输出参数"""
+    group = parser.add_argument_group("检测结果旁路文件（不重新编码视频）")
+    group.add_argument("--sidecar", choices=FORMATS, default=None,
+                       help="视频只输出逐帧检测结果（jsonl 文本 / bin 二进制），不生成带框视频")
+    group.add_argument("--overlay", type=str, default="vtt",
+                       help="同时生成的叠加字幕轨：vtt、ass、vtt,ass 或 none")
+    return parser
+
+
+def sidecar_from_args(args):
+    """按命令行参数创建 SidecarOptions，未开启时返回 None"""
+    if not args.sidecar:
+        return None
+    overlays = [o.strip() for o in args.overlay.split(",") if o.strip() in OVERLAYS]
+    return SidecarOptions(args.sidecar, overlays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测结果旁路文件工具")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("info", help="查看旁路文件信息")
+    p.add_argument("sidecar")
+    p = sub.add_parser("export", help="生成叠加字幕轨")
+    p.add_argument("sidecar")
+    p.add_argument("--vtt", type=str, default=None, help="WebVTT 输出路径")
+    p.add_argument("--ass", type=str, default=None, help="ASS 输出路径")
+    p = sub.add_parser("render", help="把检测框画进视频片段")
+    p.add_argument("sidecar")
+    p.add_argument("--video", type=str, default=None, help="原视频（默认用旁路文件里记录的路径）")
+    p.add_argument("--start", type=float, default=0.0, help="开始时间（秒）")
+    p.add_argument("--end", type=float, default=None, help="结束时间（秒，默认到结尾）")
+    p.add_argument("--out", type=str, required=True, help="输出视频路径")
+    args = parser.parse_args()
+
+    if args.cmd == "info":
+        header, frames = read_sidecar(args.sidecar)
+        count = boxes = 0
+        for _, frame_boxes, _ in frames:
+            count += 1
+            boxes += len(frame_boxes)
+        print(f"📄 来源视频：{header.get('source')}（{header['width']}x{header['height']}，{header['fps']} FPS）")
+        print(f"📊 总帧数 {header.get('frames', '未知')}，有检测框的帧 {count}，检测框 {boxes} 个，"
+              f"文件 {os.path.getsize(args.sidecar) / 1024:.1f} KB")
+    elif args.cmd == "export":
+        if not args.vtt and not args.ass:
+            args.vtt = os.path.splitext(args.sidecar)[0] + ".vtt"
+        for path in (args.vtt and export_vtt(args.sidecar, args.vtt),
+                     args.ass and export_ass(args.sidecar, args.ass)):
+            if path:
+                print(f"✅ 已生成：{path}")
+    else:
+        video = args.video or read_sidecar(args.sidecar)[0].get("source")
+        start = time.time()
+        written = render_clip(args.sidecar, video, args.out, args.start, args.end)
+        print(f"✅ 片段已导出：{args.out}（{written} 帧，{time.time() - start:.1f} 秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+按检测输入尺寸降分辨率解码 JPEG
+
+CCPD 的 720x1160、监控截图的 4K JPEG 都是先按原分辨率完整解码，检测模型再马上缩到 640。
+libjpeg 可以在 DCT 域直接按 1/2、1/4、1/8 解码（cv2.IMREAD_REDUCED_COLOR_2/4/8），
+省掉大部分反变换和颜色转换的计算：
+
+- 先解析 JPEG 的 SOF 段拿到原图尺寸（不解码），按检测的 imgsz 选最大的缩小倍数，
+  保证缩小后的长边仍然 ≥ imgsz × tolerance（tolerance < 1 时允许检测前稍微放大一点）
+- 检测框用 to_full() 换算回原图坐标
+- OCR 需要清晰的字符：read_region() 只按车牌高度 ≥ min_height（默认 48 像素）需要的倍数重新解码，
+  车牌够大时仍然用缩小解码，只有小车牌才按原分辨率解码
+- 非 JPEG（PNG / BMP）按原分辨率解码；文件一律先读成字节再 imdecode，Windows 中文路径也能读
+
+    img = decode_image(path, imgsz=640)
+    boxes = model(img.image, imgsz=640)[0] ...
+    plate = img.read_region(img.to_full(box), min_height=48)
+
+用法（对比完整解码和降分辨率解码的耗时）：
+    python fast_decode.py --images D:/CCPD2019/ccpd_base --imgsz 640 --limit 500
+"""
+
+import argparse
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+REDUCED_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+# 带尺寸信息的 SOF 段（不含 DHT=C4、JPG=C8、DAC=CC）
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """
+    从 JPEG 字节里解析原图尺寸 (宽, 高)，不是 JPEG 或解析失败返回 None
+    只扫描段头，不解码图像数据（只看前 256 KB，EXIF 缩略图很大时可能找不到，按非 JPEG 处理）
+    """
+    data = bytes(data[:262144])
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:          # 填充字节
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        if marker == 0xDA:          # 图像数据开始，前面没有 SOF
+            return None
+        i += 2 + length
+    return None
+
+
+def choose_factor(width, height, imgsz, tolerance=1.0):
+    """缩小后长边仍 ≥ imgsz × tolerance 的最大倍数（1 / 2 / 4 / 8）"""
+    longest = max(width, height)
+    for factor in (8, 4, 2):
+        if longest / factor >= imgsz * tolerance:
+            return factor
+    return 1
+
+
+class DecodedImage:
+    """
+    解码结果
+    :param image: 解码后的图像（可能是缩小的）
+    :param factor: 缩小倍数（1 表示原分辨率）
+    :param data: 原始文件字节（read_region 重新解码时使用）
+    :param full_size: 原图尺寸 (宽, 高)
+    """
+
+    def __init__(self, image, factor=1, data=None, full_size=None, decode_ms=0.0):
+        self.image = image
+        self.factor = factor
+        self.data = data
+        self.full_size = full_size or ((image.shape[1], image.shape[0]) if image is not None else (0, 0))
+        self.decode_ms = decode_ms
+        self._cache = {factor: image}
+
+    def to_full(self, box):
+        """缩小图上的框 -> 原图坐标（多出来的元素，如置信度，原样保留）"""
+        if box is None:
+            return None
+        f = self.factor
+        w, h = self.full_size
+        x1, y1, x2, y2 = box[:4]
+        scaled = (max(0, int(x1 * f)), max(0, int(y1 * f)), min(w, int(x2 * f)), min(h, int(y2 * f)))
+        return scaled + tuple(box[4:])
+
+    def at_factor(self, factor):
+        """按指定倍数解码（同一倍数只解码一次）"""
+        img = self._cache.get(factor)
+        if img is None:
+            img = cv2.imdecode(self.data, REDUCED_FLAGS[factor])
+            self._cache[factor] = img
+        return img
+
+    def read_region(self, box, min_height=48):
+        """
+        按原图坐标裁剪区域，分辨率保证区域高度 ≥ min_height（够用时不按原分辨率解码）
+        :return: 裁剪出的图像（无效框返回 None）
+        """
+        x1, y1, x2, y2 = (int(v) for v in box[:4])
+        if x2 <= x1 or y2 <= y1:
+            return None
+        # 当前分辨率够用就直接裁剪，不够时按满足高度要求的最大倍数重新解码
+        factor = self.factor
+        if self.data is not None and (y2 - y1) / factor < min_height:
+            factor = next((f for f in (4, 2) if f < self.factor and (y2 - y1) / f >= min_height), 1)
+        img = self.at_factor(factor)
+        return img[y1 // factor:-(-y2 // factor), x1 // factor:-(-x2 // factor)]
+
+
+def decode_image(path, imgsz=None, tolerance=1.0):
+    """
+    读取图片，imgsz 不为 None 且是 JPEG 时按 imgsz 降分辨率解码
+    :return: DecodedImage，读取失败时 image 为 None
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+    start = time.perf_counter()
+    size = jpeg_size(data) if imgsz else None
+    factor = choose_factor(size[0], size[1], imgsz, tolerance) if size else 1
+    img = cv2.imdecode(data, REDUCED_FLAGS[factor])
+    if img is None and factor > 1:
+        factor = 1
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    decode_ms = (time.perf_counter() - start) * 1000
+    if img is not None and size is None:
+        size = (img.shape[1], img.shape[0])
+    return DecodedImage(img, factor, data, size, decode_ms)
+
+
+def add_decode_args(parser):
+    """给命令行脚本添加降分辨率解码参数"""
+    group = parser.add_argument_group("降分辨率解码")
+    group.add_argument("--fast-decode", action="store_true",
+                       help="按检测输入尺寸降分辨率解码 JPEG（结果图为缩小后的分辨率）")
+    group.add_argument("--decode-tolerance", type=float, default=1.0,
+                       help="缩小后长边至少为 imgsz 的多少倍（小于 1 时 CCPD 这类图也能缩小）")
+    return parser
+
+
+def bench(paths, imgsz, tolerance=1.0, repeat=3):
+    """逐张对比完整解码和降分辨率解码（各取 repeat 次中的最小值）"""
+    rows = []
+    for path in paths:
+        data = np.fromfile(path, dtype=np.uint8)
+        size = jpeg_size(data)
+        if size is None:
+            continue
+        factor = choose_factor(size[0], size[1], imgsz, tolerance)
+        full_ms = reduced_ms = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            cv2.imdecode(data, cv2.IMREAD_COLOR)
+            full_ms = min(full_ms, (time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            jpeg_size(data)
+            cv2.imdecode(data, REDUCED_FLAGS[factor])
+            reduced_ms = min(reduced_ms, (time.perf_counter() - t) * 1000)
+        rows.append({"image": os.path.basename(path), "size": size, "factor": factor,
+                     "full_ms": round(full_ms, 2), "reduced_ms": round(reduced_ms, 2),
+                     "saved_ms": round(full_ms - reduced_ms, 2)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比完整解码和降分辨率解码的耗时")
+    parser.add_argument("--images", type=str, required=True, help="图片文件夹（只统计 JPEG）")
+    parser.add_argument("--imgsz", type=int, default=640, help="检测输入尺寸")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="缩小后长边至少为 imgsz 的多少倍")
+    parser.add_argument("--limit", type=int, default=200, help="最多统计多少张")
+    parser.add_argument("--verbose", action="store_true", help="打印每张图片的结果")
+    args = parser.parse_args()
+
+    names = sorted(f for f in os.listdir(args.images) if f.lower().endswith((".jpg", ".jpeg")))
+    rows = bench([os.path.join(args.images, f) for f in names[:args.limit]], args.imgsz, args.tolerance)
+    if not rows:
+        print(f"❌ {args.images} 中没有 JPEG 图片")
+        return
+    if args.verbose:
+        for row in rows:
+            print(f"   {row['image']}: {row['size'][0]}x{row['size'][1]} 1/{row['factor']} "
+                  f"{row['full_ms']:.2f} -> {row['reduced_ms']:.2f} ms（省 {row['saved_ms']:.2f} ms）")
+    n = len(rows)
+    full = sum(r["full_ms"] for r in rows) / n
+    reduced = sum(r["reduced_ms"] for r in rows) / n
+    factors = {}
+    for row in rows:
+        factors[row["factor"]] = factors.get(row["factor"], 0) + 1
+    print("=" * 60)
+    print(f"📊 {n} 张 JPEG，imgsz {args.imgsz}，缩小倍数分布："
+          + "，".join(f"1/{f} {c} 张" for f, c in sorted(factors.items())))
+    print(f"⚡ 平均解码：完整 {full:.2f} ms -> 降分辨率 {reduced:.2f} ms，"
+          f"每张省 {full - reduced:.2f} ms（{full / max(reduced, 1e-9):.2f}x）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+文件夹监听：摄像头往目录里丢 JPEG，新文件一落地就处理
+
+以前是定时把整个文件夹重新跑一遍 license_plate_recognition.py / process_testset()，
+每次都重新扫描、重新处理所有图片。这里：
+
+- Linux 用 inotify（ctypes 直接调 libc，不需要额外安装包）监听 IN_CLOSE_WRITE / IN_MOVED_TO：
+  文件写完关闭、或者先写临时文件再改名进来时才触发，不会读到写了一半的图片
+- 其他系统 / inotify 不可用（网络盘、部分容器）时退回轮询：两次扫描之间大小和修改时间都没变才算写完
+- BatchCollector 按批大小或等待时间凑批：攒够 max_batch 张立即处理，否则最早的一张最多等 max_wait_ms，
+  端到端延迟上限 ≈ 发现延迟 + max_wait_ms + 一批的处理时间
+- Checkpoint 记录已处理的文件名（JSONL 追加写），重启后跳过；启动时先补处理目录里已有但没处理过的文件
+- LatencyStats 统计每个文件从落地（文件修改时间，见 arrival_time）到出结果的延迟（p50 / p95 / max），
+  轮询间隔带来的发现延迟也算在里面
+
+    watch_folder("D:/camera_drop", handle_batch, max_batch=8, max_wait_ms=200,
+                 checkpoint=Checkpoint("processed.jsonl"))
+
+用法（演示：打印每批文件；--demo-writer 在另一个线程里按固定间隔往目录里写图片）：
+    python folder_watch.py --folder /data/drop --max-batch 8 --max-wait-ms 200
+    python folder_watch.py --folder /tmp/drop --demo-writer 100 --rate 20 --method poll
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+from stage_timing import percentile
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# inotify 常量（linux/inotify.h）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _matches(name, exts):
+    return not name.startswith(".") and name.lower().endswith(exts)
+
+
+class InotifyWatcher:
+    """
+    inotify 监听（只在 Linux 可用，初始化失败时抛出 OSError）
+    :param folder: 监听的目录（不递归子目录）
+    :param exts: 只关心的扩展名
+    """
+
+    method = "inotify"
+
+    def __init__(self, folder, exts=IMAGE_EXTS):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 只在 Linux 上可用")
+        self.folder = folder
+        self.exts = exts
+        self.overflows = 0
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        wd = libc.inotify_add_watch(self._fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch 失败：{folder}")
+
+    def poll(self, timeout):
+        """等待最多 timeout 秒，返回这段时间里写完的新文件路径"""
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+        paths = []
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflows += 1  # 事件队列溢出：调用方会重新扫描一遍补上
+                elif _matches(name, self.exts):
+                    paths.append(os.path.join(self.folder, name))
+        return paths
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """
+    轮询监听：每 interval 秒扫描一次目录，文件大小和修改时间在两次扫描之间不变才算写完
+    :param known: 已经处理过 / 已经在处理的文件名（不再报告）
+    """
+
+    method = "poll"
+
+    def __init__(self, folder, exts=IMAGE_EXTS, interval=0.5, known=None):
+        self.folder = folder
+        self.exts = exts
+        self.interval = interval
+        self.overflows = 0
+        self._pending = {}  # 文件名 -> 上次扫描时的 (大小, 修改时间)
+        self._reported = set(known or ())
+        self._next_scan = 0.0
+
+    def poll(self, timeout):
+        wait = self._next_scan - time.time()
+        if wait > timeout:
+            time.sleep(max(timeout, 0))
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        self._next_scan = time.time() + self.interval
+        paths = []
+        seen = set()
+        for entry in os.scandir(self.folder):
+            name = entry.name
+            if name in self._reported or not entry.is_file() or not _matches(name, self.exts):
+                continue
+            seen.add(name)
+            stat = entry.stat()
+            state = (stat.st_size, stat.st_mtime_ns)
+            if self._pending.get(name) == state:
+                del self._pending[name]
+                self._reported.add(name)
+                paths.append(entry.path)
+            else:
+                self._pending[name] = state
+        # 扫描期间被删掉的文件不再跟踪
+        for name in list(self._pending):
+            if name not in seen:
+                del self._pending[name]
+        return paths
+
+    def close(self):
+        pass
+
+
+def open_watcher(folder, exts=IMAGE_EXTS, method="auto", interval=0.5, known=None):
+    """
+    打开目录监听
+    :param method: auto（优先 inotify，失败时轮询）/ inotify / poll
+    """
+    if method in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(folder, exts)
+        except OSError as e:
+            if method == "inotify":
+                raise
+            print(f"⚠️ inotify 不可用（{e}），改用轮询（每 {interval} 秒扫描一次）")
+    return PollingWatcher(folder, exts, interval, known)
+
+
+class BatchCollector:
+    """
+    按批大小或等待时间凑批
+    :param max_batch: 攒够多少个立即出批
+    :param max_wait_ms: 最早的一个最多等多久（毫秒）
+    """
+
+    def __init__(self, max_batch=8, max_wait_ms=200):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._items = []  # (路径, 发现时间)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, path, t_seen=None):
+        self._items.append((path, t_seen or time.time()))
+
+    def time_left(self):
+        """距离必须出批还有多少秒（没有待处理文件时返回 None）"""
+        if not self._items:
+            return None
+        return max(0.0, self._items[0][1] + self.max_wait - time.time())
+
+    def ready(self):
+        return len(self._items) >= self.max_batch or (bool(self._items) and self.time_left() == 0.0)
+
+    def take(self, force=False):
+        """取出一批 [(路径, 发现时间)]，还没到出批条件时返回空列表"""
+        if not (force or self.ready()):
+            return []
+        batch, self._items = self._items[:self.max_batch], self._items[self.max_batch:]
+        return batch
+
+
+class Checkpoint:
+    """
+    已处理文件记录（JSONL，每行 {"image": 文件名, ...}，崩溃时最后一行写了一半也能跳过）
+    :param path: 记录文件
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)["image"])
+                    except (ValueError, KeyError):
+                        continue
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, name):
+        return name in self.done
+
+    def add(self, records):
+        """追加一批记录（dict，至少包含 image 字段）并立即 flush"""
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.done.add(record["image"])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def arrival_time(path, started, now=None):
+    """
+    文件的落地时间：修改时间（写完 / 改名进来时基本就是最后一次写入的时间）
+    :param started: 监听开始的时间；启动前就在目录里的文件从这时算起，不把积压的时间算进延迟
+    :param now: 当前时间；修改时间比它还晚（网络盘时钟不同步）时按它算
+    """
+    now = now or time.time()
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return now
+    return min(max(mtime, started), now)
+
+
+class LatencyStats:
+    """文件从落地（arrival_time）到出结果的延迟"""
+
+    def __init__(self):
+        self.values = []
+        self.files = 0
+        self.batches = 0
+
+    def add(self, t_arrived_list, t_done=None):
+        t_done = t_done or time.time()
+        self.values.extend((t_done - t) * 1000 for t in t_arrived_list)
+        self.files += len(t_arrived_list)
+        self.batches += 1
+
+    def summary(self):
+        values = sorted(self.values)
+        return {
+            "files": self.files,
+            "batches": self.batches,
+            "avg_batch": round(self.files / self.batches, 2) if self.batches else 0.0,
+            "latency_p50_ms": round(percentile(values, 50), 1),
+            "latency_p95_ms": round(percentile(values, 95), 1),
+            "latency_max_ms": round(values[-1], 1) if values else 0.0,
+        }
+
+    def format(self):
+        s = self.summary()
+        return (f"📥 已处理 {s['files']} 个文件，{s['batches']} 批（平均每批 {s['avg_batch']}），"
+                f"落地 -> 出结果延迟 p50 {s['latency_p50_ms']} ms | p95 {s['latency_p95_ms']} ms"
+                f" | max {s['latency_max_ms']} ms")
+
+
+def list_existing(folder, exts=IMAGE_EXTS, skip=()):
+    """目录里已有、还没处理过的文件（按文件名排序）"""
+    names = sorted(e.name for e in os.scandir(folder) if e.is_file() and _matches(e.name, exts))
+    return [os.path.join(folder, n) for n in names if n not in skip]
+
+
+def watch_folder(folder, handle_batch, exts=IMAGE_EXTS, max_batch=8, max_wait_ms=200, checkpoint=None,
+                 method="auto", interval=0.5, idle_exit=None, report_every=30.0):
+    """
+    监听目录，新文件凑批后交给 handle_batch(paths) 处理（同步调用）
+    :param handle_batch: 处理一批文件，返回每个文件的记录（dict，写进 checkpoint），返回 None 时只记文件名
+    :param checkpoint: 已处理记录（Checkpoint），None 表示不记录（重启后会重新处理目录里所有文件）
+    :param idle_exit: 连续多少秒没有新文件就退出（None 表示一直运行，Ctrl+C 退出）
+    :return: LatencyStats
+    """
+    done = checkpoint.done if checkpoint is not None else set()
+    watcher = open_watcher(folder, exts, method, interval, known=done)
+    collector = BatchCollector(max_batch, max_wait_ms)
+    stats = LatencyStats()
+    started = time.time()
+    queued = {}  # 已发现、还没出结果的文件名 -> 落地时间
+
+    def enqueue(paths):
+        now = time.time()
+        for path in paths:
+            name = os.path.basename(path)
+            if name not in done and name not in queued:
+                queued[name] = arrival_time(path, started, now)
+                collector.add(path, now)
+
+    def run(batch):
+        paths = [p for p, _ in batch]
+        records = handle_batch(paths) or [{"image": os.path.basename(p)} for p in paths]
+        stats.add([queued.pop(os.path.basename(p)) for p in paths])
+        if checkpoint is not None:
+            checkpoint.add(records)
+        else:
+            done.update(os.path.basename(p) for p in paths)
+
+    # 先补处理目录里已有的文件（监听启动之前落地的）
+    backlog = list_existing(folder, exts, done)
+    if backlog:
+        print(f"📂 目录里有 {len(backlog)} 个文件还没处理，先补处理")
+    enqueue(backlog)
+    print(f"👀 开始监听 {folder}（{watcher.method}，每批最多 {max_batch} 个，最长等待 {max_wait_ms} ms）")
+
+    last_activity = last_report = time.time()
+    try:
+        while True:
+            left = collector.time_left()
+            paths = watcher.poll(min(left if left is not None else 1.0, 1.0))
+            if watcher.overflows:
+                # inotify 事件队列溢出，可能漏了文件：重新扫描一遍目录
+                watcher.overflows = 0
+                paths += list_existing(folder, exts, done)
+            if paths:
+                enqueue(paths)
+                last_activity = time.time()
+            while collector.ready():
+                run(collector.take())
+                last_activity = time.time()
+            if report_every and time.time() - last_report >= report_every and stats.files:
+                print(stats.format())
+                last_report = time.time()
+            if idle_exit is not None and not len(collector) and time.time() - last_activity >= idle_exit:
+                break
+    except KeyboardInterrupt:
+        print("\n⏹️ 收到退出信号")
+    finally:
+        if len(collector):
+            run(collector.take(force=True))
+        watcher.close()
+    print(stats.format())
+    return stats
+
+
+def add_watch_args(parser):
+    """给命令行脚本添加文件夹监听参数"""
+    group = parser.add_argument_group("文件夹监听")
+    group.add_argument("--watch", action="store_true", help="持续监听图片文件夹，新图片落地后凑批处理")
+    group.add_argument("--watch-batch", type=int, default=8, help="每批最多多少张图片")
+    group.add_argument("--watch-wait-ms", type=float, default=200,
+                       help="凑批最长等待时间（毫秒），决定端到端延迟上限")
+    group.add_argument("--watch-method", choices=("auto", "inotify", "poll"), default="auto",
+                       help="监听方式：auto 优先 inotify，不可用时轮询")
+    group.add_argument("--watch-interval", type=float, default=0.5, help="轮询间隔（秒）")
+    group.add_argument("--watch-idle-exit", type=float, default=None,
+                       help="连续多少秒没有新图片就退出（默认一直运行，Ctrl+C 退出）")
+    return parser
+
+
+def _demo_writer(folder, count, rate):
+    """演示用：按 rate 张/秒往目录里写图片（先写临时文件再改名，和摄像头上传软件的做法一样）"""
+    import cv2
+    import numpy as np
+    img = np.full((480, 640, 3), 128, np.uint8)
+    data = cv2.imencode(".jpg", img)[1].tobytes()
+    for i in range(count):
+        tmp = os.path.join(folder, f".cam_{i:06d}.jpg.part")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(folder, f"cam_{i:06d}.jpg"))
+        time.sleep(1 / rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文件夹监听演示：新图片凑批后打印")
+    parser.add_argument("--folder", type=str, required=True, help="监听的目录")
+    parser.add_argument("--max-batch", type=int, default=8, help="每批最多多少个文件")
+    parser.add_argument("--max-wait-ms", type=float, default=200, help="凑批最长等待时间（毫秒）")
+    parser.add_argument("--method", choices=("auto", "inotify", "poll"), default="auto", help="监听方式")
+    parser.add_argument("--interval", type=float, default=0.5, help="轮询间隔（秒）")
+    parser.add_argument("--checkpoint", type=str, default=None, help="已处理记录文件（JSONL）")
+    parser.add_argument("--work-ms", type=float, default=20.0, help="模拟每个文件的处理耗时（毫秒）")
+    parser.add_argument("--demo-writer", type=int, default=0, help="演示：往目录里写多少张图片")
+    parser.add_argument("--rate", type=float, default=20.0, help="演示写图片的速度（张/秒）")
+    parser.add_argument("--idle-exit", type=float, default=None, help="连续多少秒没有新文件就退出")
+    args = parser.parse_args()
+
+    os.makedirs(args.folder, exist_ok=True)
+    if args.demo_writer:
+        import threading
+        threading.Thread(target=_demo_writer, args=(args.folder, args.demo_writer, args.rate), daemon=True).start()
+        args.idle_exit = args.idle_exit or 3.0
+
+    def handle(paths):
+        time.sleep(args.work_ms * len(paths) / 1000)
+        print(f"   处理 {len(paths)} 个：{os.path.basename(paths[0])} …")
+
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    watch_folder(args.folder, handle, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                 checkpoint=checkpoint, method=args.method, interval=args.interval, idle_exit=args.idle_exit)
+    if checkpoint is not None:
+        checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
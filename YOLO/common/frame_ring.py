@@ -0,0 +1,255 @@
+"""
+共享内存帧环形缓冲区（采集进程 -> 推理进程）
+
+摄像头脚本里采集、推理、显示都在同一个进程里，解码卡一下推理就跟着卡。
+FrameRing 把固定数量的帧槽放在一块 multiprocessing.shared_memory 里：
+- 采集进程把帧复制进空闲槽，给它一个递增的序号（seq）
+- 推理进程按序号领取一个槽，直接在共享内存上推理（不复制、不序列化），用完归还
+- 槽的状态和序号由一把跨进程锁保护，帧数据本身的读写在锁外进行
+
+槽满时的处理策略（policy）：
+    latest  覆盖最旧的未处理帧；推理进程总是取最新的帧，更旧的帧直接丢弃（实时摄像头）
+    oldest  丢弃新采集的帧，已经在缓冲区里的帧按顺序处理
+    block   采集进程等待空闲槽，一帧都不丢（处理视频文件）
+"""
+
+import multiprocessing as mp
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+POLICIES = ("latest", "oldest", "block")
+
+# 槽状态
+FREE, WRITING, READY, READING = 0, 1, 2, 3
+
+# 头部：最新序号、采集结束标志、采集帧数、丢弃帧数
+_HEADER = struct.Struct("<qqqq")
+_HEADER_SIZE = 64
+# 每个槽的元数据：状态、序号、帧号、采集时间、写入完成时间
+_SLOT = struct.Struct("<qqqdd")
+_SLOT_SIZE = 64
+
+
+class FrameRing:
+    """
+    共享内存帧环形缓冲区
+    :param shape: 帧形状 (高, 宽, 通道)，所有帧必须一致
+    :param slots: 槽数量
+    :param policy: 槽满时的处理策略（latest / oldest / block）
+    :param name: 共享内存名（None 时自动生成）
+    """
+
+    def __init__(self, shape, slots=8, policy="latest", name=None):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的丢帧策略：{policy}（可选 {', '.join(POLICIES)}）")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.policy = policy
+        self.frame_bytes = int(np.prod(self.shape))
+        size = _HEADER_SIZE + slots * _SLOT_SIZE + slots * self.frame_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.shm.buf[:_HEADER_SIZE + slots * _SLOT_SIZE] = bytes(_HEADER_SIZE + slots * _SLOT_SIZE)
+        self.cond = mp.Condition()
+        self._owner = True
+        self._next_slot = 0
+        self._map_frames()
+
+    def _map_frames(self):
+        offset = _HEADER_SIZE + self.slots * _SLOT_SIZE
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8,
+                                  buffer=self.shm.buf, offset=offset)
+
+    # 传给子进程时只传共享内存名和锁，子进程里重新映射同一块内存
+    def __getstate__(self):
+        return {"name": self.shm.name, "shape": self.shape, "slots": self.slots,
+                "policy": self.policy, "cond": self.cond}
+
+    def __setstate__(self, state):
+        self.shape = state["shape"]
+        self.slots = state["slots"]
+        self.policy = state["policy"]
+        self.cond = state["cond"]
+        self.frame_bytes = int(np.prod(self.shape))
+        try:
+            self.shm = shared_memory.SharedMemory(name=state["name"], track=False)
+        except TypeError:  # Python < 3.13 没有 track 参数
+            self.shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._next_slot = 0
+        self._map_frames()
+
+    # ---------------- 元数据读写（调用方持有锁） ----------------
+
+    def _header(self):
+        return list(_HEADER.unpack_from(self.shm.buf, 0))
+
+    def _set_header(self, seq, closed, captured, dropped):
+        _HEADER.pack_into(self.shm.buf, 0, seq, closed, captured, dropped)
+
+    def _slot(self, i):
+        return list(_SLOT.unpack_from(self.shm.buf, _HEADER_SIZE + i * _SLOT_SIZE))
+
+    def _set_slot(self, i, state, seq, frame_idx, t_capture, t_written):
+        _SLOT.pack_into(self.shm.buf, _HEADER_SIZE + i * _SLOT_SIZE,
+                        state, seq, frame_idx, t_capture, t_written)
+
+    def _set_state(self, i, state):
+        meta = self._slot(i)
+        meta[0] = state
+        self._set_slot(i, *meta)
+
+    def _add_dropped(self, n):
+        header = self._header()
+        header[3] += n
+        self._set_header(*header)
+
+    def _ready_slots(self):
+        return [(self._slot(i)[1], i) for i in range(self.slots) if self._slot(i)[0] == READY]
+
+    # ---------------- 采集端 ----------------
+
+    def _claim_write_slot(self, timeout):
+        """找一个可写的槽（调用方持有锁），没有时按策略处理，返回槽号或 None（丢弃新帧）"""
+        deadline = time.time() + timeout
+        while True:
+            for k in range(self.slots):
+                i = (self._next_slot + k) % self.slots
+                if self._slot(i)[0] == FREE:
+                    self._next_slot = (i + 1) % self.slots
+                    return i
+            if self.policy == "latest":
+                ready = self._ready_slots()
+                if ready:
+                    # 覆盖最旧的未处理帧
+                    self._add_dropped(1)
+                    return min(ready)[1]
+                return None  # 所有槽都在被推理进程使用
+            if self.policy == "oldest":
+                return None
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self.cond.wait(remaining)
+
+    def write(self, frame, frame_idx, t_capture=None, timeout=5.0):
+        """
+        写入一帧（采集进程调用）
+        :return: 写入的序号；新帧被丢弃时返回 None
+        """
+        t_capture = time.time() if t_capture is None else t_capture
+        with self.cond:
+            header = self._header()
+            header[2] += 1
+            self._set_header(*header)
+            slot = self._claim_write_slot(timeout)
+            if slot is None:
+                self._add_dropped(1)
+                return None
+            self._set_state(slot, WRITING)
+        # 帧数据在锁外复制，推理进程不会读 WRITING 状态的槽
+        np.copyto(self._frames[slot], frame)
+        with self.cond:
+            header = self._header()
+            seq = header[0] + 1
+            header[0] = seq
+            self._set_header(*header)
+            self._set_slot(slot, READY, seq, frame_idx, t_capture, time.time())
+            self.cond.notify_all()
+        return seq
+
+    def close_writer(self):
+        """采集结束：推理进程处理完剩下的帧后退出"""
+        with self.cond:
+            header = self._header()
+            header[1] = 1
+            self._set_header(*header)
+            self.cond.notify_all()
+
+    # ---------------- 推理端 ----------------
+
+    def acquire(self, timeout=0.5):
+        """
+        领取一帧（推理进程调用），返回 (槽号, 元数据, 帧视图)
+        帧视图直接指向共享内存，用完必须调用 release(槽号)
+        超时或采集已结束且没有剩余帧时返回 None
+        """
+        deadline = time.time() + timeout
+        with self.cond:
+            while True:
+                ready = self._ready_slots()
+                if ready:
+                    if self.policy == "latest":
+                        ready.sort()
+                        seq, slot = ready[-1]
+                        # 比选中帧更旧的帧已经过时，直接丢弃
+                        for _, old in ready[:-1]:
+                            self._set_state(old, FREE)
+                        if len(ready) > 1:
+                            self._add_dropped(len(ready) - 1)
+                            self.cond.notify_all()
+                    else:
+                        seq, slot = min(ready)
+                    self._set_state(slot, READING)
+                    _, seq, frame_idx, t_capture, t_written = self._slot(slot)
+                    meta = {"seq": seq, "frame_idx": frame_idx,
+                            "t_capture": t_capture, "t_written": t_written}
+                    return slot, meta, self._frames[slot]
+                if self._header()[1]:
+                    return None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+
+    def release(self, slot):
+        """归还槽"""
+        with self.cond:
+            self._set_state(slot, FREE)
+            self.cond.notify_all()
+
+    def snapshot(self, seq=None):
+        """
+        复制一帧用于显示：优先取指定序号的帧（还没被覆盖时），否则取最新的帧
+        已归还的槽在被重新写入之前数据仍然完整，也可以取
+        :return: (序号, 帧副本)，缓冲区为空时返回 (None, None)
+        """
+        with self.cond:
+            best = None
+            for i in range(self.slots):
+                state, slot_seq = self._slot(i)[:2]
+                if state != WRITING and slot_seq > 0:
+                    if slot_seq == seq:
+                        best = (slot_seq, i)
+                        break
+                    if best is None or slot_seq > best[0]:
+                        best = (slot_seq, i)
+            if best is None:
+                return None, None
+            return best[0], self._frames[best[1]].copy()
+
+    @property
+    def closed(self):
+        with self.cond:
+            return bool(self._header()[1])
+
+    def counters(self):
+        """{"captured": 采集帧数, "dropped": 按策略丢弃的帧数, "last_seq": 最新序号}"""
+        with self.cond:
+            seq, _, captured, dropped = self._header()
+        return {"captured": captured, "dropped": dropped, "last_seq": seq}
+
+    def close(self):
+        """断开共享内存；创建者同时释放这块内存"""
+        self._frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # 还有帧视图没释放，进程退出时会自动断开
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,219 @@
+"""
+只取最新帧的采集线程（低延迟摄像头推理）
+
+cv2.VideoCapture 内部有缓冲队列，cap.read() 返回的是最旧的那一帧。推理比摄像头慢时，
+队列里的帧越积越多，画面延迟能涨到好几秒，检测结果对应的是几秒前的路况。
+
+LatestFrameCapture 在后台线程里不停地读设备，只保留最新的一帧：
+- read() 返回上次取走之后采集到的最新帧（接口和 cap.read() 一样，返回 (ret, frame)），
+  中间没被取走就被覆盖的帧计入 dropped
+- 每帧记录采集时间，处理完一帧后调用 mark_result()，统计"采集 -> 出结果"的真实延迟
+- 视频文件也能当输入（测试用）：默认按视频 FPS 节奏读取，模拟摄像头实时出帧
+- 录制好的摄像头会话（replay_source.py，"会话目录@倍速"）按录制时的节奏回放
+
+    cap = LatestFrameCapture(0).start()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        ...  # 推理、显示
+        cap.mark_result()
+    cap.release()
+    cap.print_summary()
+
+用法（用视频文件模拟摄像头，对比直接 cap.read() 的延迟）：
+    python latest_frame_capture.py --source test.mp4 --work-ms 80
+"""
+
+import argparse
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from replay_source import ReplayCapture, open_source
+from stage_timing import percentile
+
+
+class LatestFrameCapture:
+    """
+    后台采集线程，只保留最新帧
+    :param source: 摄像头编号、视频文件路径 / 流地址、回放会话（"会话目录@倍速"）
+    :param realtime: 视频文件是否按 FPS 节奏读取（None 表示摄像头不控速、文件控速）
+    :param window: 延迟统计保留的样本数
+    """
+
+    def __init__(self, source=0, realtime=None, window=2000):
+        self.source = int(source) if str(source).isdigit() else source
+        self._cap = open_source(self.source)
+        # 回放会话自己按录制节奏出帧，和摄像头一样不需要再控速
+        is_file = not isinstance(self.source, int) and not isinstance(self._cap, ReplayCapture)
+        self.realtime = is_file if realtime is None else realtime
+        if not is_file:
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # 部分后端支持，尽量少缓存
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._cond = threading.Condition()
+        self._frame = None
+        self._t_capture = 0.0
+        self._seq = 0               # 最新帧序号
+        self._taken = 0             # 最后一次被取走的帧序号
+        self._ended = False
+        self._thread = None
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.last_capture_time = None  # 最近一次 read() 返回的帧的采集时间
+        self.latencies = deque(maxlen=window)
+        self.started = None
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def start(self):
+        if self._thread is None and self._cap.isOpened():
+            self.started = time.time()
+            self._thread = threading.Thread(target=self._run, name="latest-frame-capture", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        next_due = time.perf_counter()
+        try:
+            while not self._ended:
+                ok, frame = self._cap.read()
+                if not ok:
+                    break
+                t_capture = time.time()
+                with self._cond:
+                    if self._seq > self._taken:
+                        self.dropped += 1  # 上一帧还没被取走就被覆盖了
+                    self._frame = frame
+                    self._t_capture = t_capture
+                    self._seq += 1
+                    self.captured += 1
+                    self._cond.notify_all()
+                if self.realtime:
+                    next_due += interval
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_due = time.perf_counter()
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+    def read(self, timeout=5.0):
+        """
+        等待并返回比上次更新的帧 (ret, frame)；读完或超时返回 (False, None)
+        """
+        if self._thread is None:
+            self.start()
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._taken or self._ended, timeout):
+                return False, None
+            if self._seq <= self._taken:
+                return False, None  # 已结束，且最后一帧已经取走
+            self._taken = self._seq
+            self.delivered += 1
+            self.last_capture_time = self._t_capture
+            return True, self._frame
+
+    def mark_result(self):
+        """当前帧处理完（结果已显示 / 输出），记录采集 -> 结果的延迟，返回毫秒"""
+        if self.last_capture_time is None:
+            return None
+        ms = (time.time() - self.last_capture_time) * 1000
+        self.latencies.append(ms)
+        return ms
+
+    def release(self):
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._cap.release()
+
+    def summary(self):
+        values = sorted(self.latencies)
+        elapsed = max(time.time() - (self.started or time.time()), 1e-6)
+        return {
+            "captured": self.captured,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "capture_fps": round(self.captured / elapsed, 1),
+            "processed_fps": round(self.delivered / elapsed, 1),
+            "latency_p50_ms": round(percentile(values, 50), 1),
+            "latency_p95_ms": round(percentile(values, 95), 1),
+            "latency_max_ms": round(values[-1], 1) if values else 0.0,
+        }
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"📹 采集 {s['captured']} 帧（{s['capture_fps']} FPS），处理 {s['delivered']} 帧"
+              f"（{s['processed_fps']} FPS），跳过旧帧 {s['dropped']} 帧")
+        print(f"⏱️ 采集 -> 出结果延迟：p50 {s['latency_p50_ms']} ms | p95 {s['latency_p95_ms']} ms"
+              f" | max {s['latency_max_ms']} ms")
+
+
+def _direct_latency(source, work_s, realtime_fps):
+    """对照组：直接 cap.read()，帧的"采集时间"按摄像头出帧节奏推算（文件源）"""
+    cap = cv2.VideoCapture(source)
+    start = time.time()
+    latencies = []
+    index = 0
+    while True:
+        ok, _ = cap.read()
+        if not ok:
+            break
+        # 实时摄像头第 index 帧在 start + index / fps 时刻产生；文件不会等，所以读出来时可能"还没产生"
+        t_capture = start + index / realtime_fps
+        wait = t_capture - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        time.sleep(work_s)
+        latencies.append((time.time() - t_capture) * 1000)
+        index += 1
+    cap.release()
+    return sorted(latencies), index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="只取最新帧的采集线程：用视频文件模拟摄像头测延迟")
+    parser.add_argument("--source", type=str, required=True, help="视频文件（或摄像头编号）")
+    parser.add_argument("--work-ms", type=float, default=80.0, help="模拟每帧推理耗时（毫秒）")
+    args = parser.parse_args()
+
+    cap = LatestFrameCapture(args.source).start()
+    if not cap.isOpened():
+        print(f"❌ 无法打开输入源 {args.source}")
+        return
+    fps = cap.fps
+    while True:
+        ret, _ = cap.read()
+        if not ret:
+            break
+        time.sleep(args.work_ms / 1000)
+        cap.mark_result()
+    cap.release()
+    print("=" * 60)
+    print(f"只取最新帧（模拟推理 {args.work_ms:.0f} ms/帧，源 {fps:.0f} FPS）：")
+    cap.print_summary()
+
+    if not str(args.source).isdigit():
+        values, count = _direct_latency(args.source, args.work_ms / 1000, fps)
+        print(f"直接 cap.read()（逐帧处理 {count} 帧）：")
+        print(f"⏱️ 采集 -> 出结果延迟：p50 {percentile(values, 50):.1f} ms | "
+              f"p95 {percentile(values, 95):.1f} ms | max {values[-1] if values else 0:.1f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+动态微批处理（把并发请求合并成小批次推理）
+
+一个请求推理一次时，YOLO/OCR 每次调用的固定开销（预处理、框架调度、内存分配）被重复支付。
+MicroBatcher 让请求线程只负责把输入放进队列，后台线程把排队的请求凑成一批再调用一次推理函数：
+- 第一个请求到达后最多等待 max_wait_ms，期间到达的请求合并进同一批
+- 凑满 max_batch 个立即处理，不再等待
+- 队列有上限（max_queue），满了直接拒绝，避免请求无限堆积
+
+    batcher = MicroBatcher(lambda imgs: model_infer(imgs), max_batch=8, max_wait_ms=10)
+    result = batcher.submit(img).result(timeout=30)
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFullError(RuntimeError):
+    """等待队列已满"""
+
+
+class BatchStats:
+    """批处理统计（线程安全）"""
+
+    def __init__(self, max_batch):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.errors = 0
+        self.wait_ms_total = 0.0
+        self.infer_ms_total = 0.0
+        self.batch_sizes = [0] * (max_batch + 1)  # batch_sizes[n]：大小为 n 的批次数
+
+    def record(self, size, wait_ms, infer_ms, error=False):
+        with self._lock:
+            self.requests += size
+            self.batches += 1
+            self.wait_ms_total += wait_ms
+            self.infer_ms_total += infer_ms
+            self.batch_sizes[size] += 1
+            if error:
+                self.errors += 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def as_dict(self):
+        with self._lock:
+            batches = max(self.batches, 1)
+            requests = max(self.requests, 1)
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "avg_batch_size": round(self.requests / batches, 2),
+                "avg_queue_wait_ms": round(self.wait_ms_total / requests, 2),
+                "avg_batch_infer_ms": round(self.infer_ms_total / batches, 2),
+                "batch_size_hist": {str(n): c for n, c in enumerate(self.batch_sizes) if c},
+            }
+
+
+class MicroBatcher:
+    """
+    动态微批处理器
+    :param process_fn: 批量处理函数，输入列表，返回等长的结果列表
+    :param max_batch: 每批最多多少个请求
+    :param max_wait_ms: 第一个请求最多等待多久（毫秒）再开始处理
+    :param max_queue: 等待队列上限
+    """
+
+    def __init__(self, process_fn, max_batch=8, max_wait_ms=10, max_queue=256):
+        self.process_fn = process_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.stats = BatchStats(self.max_batch)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, item):
+        """提交一个输入，返回 Future；队列满时抛出 QueueFullError"""
+        if self._stopped:
+            raise RuntimeError("MicroBatcher 已关闭")
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except queue.Full:
+            self.stats.reject()
+            raise QueueFullError(f"等待队列已满（{self._queue.maxsize}）")
+        return future
+
+    def _collect(self):
+        """取出一批请求：阻塞等第一个，然后在截止时间前尽量凑满"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # 处理完这一批再退出
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            start = time.perf_counter()
+            wait_ms = sum((start - t) * 1000 for _, _, t in batch)
+            try:
+                results = self.process_fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"批处理结果数量不一致：{len(results)} != {len(batch)}")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                self.stats.record(len(batch), wait_ms, (time.perf_counter() - start) * 1000, error=True)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            self.stats.record(len(batch), wait_ms, (time.perf_counter() - start) * 1000)
+
+    def close(self):
+        """处理完已排队的请求后停止后台线程"""
+        if not self._stopped:
+            self._stopped = True
+            self._queue.put(None)
+            self._thread.join()
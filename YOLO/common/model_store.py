@@ -0,0 +1,462 @@
+"""
+本地模型库（离线、带版本和 SHA256 校验）
+
+各脚本原来要么在启动时用 torch.hub 从 GitHub 下载权重，要么写死 D:/.../best.pt 路径，
+在不能联网的机器上要么失败要么卡很久。模型库把权重复制到本地目录统一管理：
+
+    <库目录>/objects/<sha256>.pt      权重文件（按内容命名，同样的文件只存一份）
+    <库目录>/objects/<sha256>/        目录型模型（PaddleOCR 推理模型、yolov5 源码仓库）
+    <库目录>/index.json               条目元数据
+
+每个条目（名字:版本）记录：sha256、大小、后端（ultralytics / yolov5 / paddle / source）、
+输入尺寸、类别名、来源路径，以及在每台机器上实测的推理延迟（bench 命令写入）。
+
+库目录默认 ~/.plate_models，可以用环境变量 PLATE_MODEL_STORE 修改。
+
+脚本里用 resolve_model(spec) 代替直接写路径：
+    spec 是库里的条目名（"plate-det"、"plate-det:3"）时返回校验过的本地路径，
+    是已存在的文件/目录时原样返回（兼容原来的写法），都不是时报错，不会去联网下载。
+load_model(spec) 按条目的后端直接加载模型（ultralytics 权重在 torch 支持时用 mmap 读取）。
+
+用法：
+    python model_store.py add runs/detect/train/weights/best.pt --name plate-det --bench
+    python model_store.py add D:/yolov5 --name yolov5-repo                 # yolov5 源码（torch.hub 本地加载用）
+    python model_store.py add yolov5s.pt --name yolov5s --backend yolov5 --repo yolov5-repo
+    python model_store.py list
+    python model_store.py verify
+    python model_store.py resolve plate-det        # 打印本地路径，方便在 shell 里用
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import platform
+import shutil
+import time
+from contextlib import contextmanager
+
+BACKENDS = ("ultralytics", "yolov5", "paddle", "source")
+INDEX_NAME = "index.json"
+
+
+class ModelStoreError(Exception):
+    """模型不存在或校验失败"""
+
+
+def default_store_dir():
+    return os.environ.get("PLATE_MODEL_STORE") or os.path.join(os.path.expanduser("~"), ".plate_models")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def path_sha256(path):
+    """文件直接计算；目录按相对路径排序后，对 (相对路径, 文件哈希) 列表计算"""
+    if os.path.isfile(path):
+        return file_sha256(path)
+    h = hashlib.sha256()
+    for rel in sorted(_walk_files(path)):
+        h.update(f"{rel}\0{file_sha256(os.path.join(path, rel))}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _walk_files(root):
+    for d, dirs, names in os.walk(root):
+        dirs[:] = [x for x in dirs if x not in (".git", "__pycache__")]
+        for name in names:
+            yield os.path.relpath(os.path.join(d, name), root).replace(os.sep, "/")
+
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, rel)) for rel in _walk_files(path))
+
+
+def guess_backend(path):
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, "hubconf.py")):
+            return "source"
+        return "paddle"
+    return "ultralytics"
+
+
+def host_name():
+    return platform.node() or "unknown"
+
+
+class ModelStore:
+    """
+    本地模型库
+    :param root: 库目录（默认 default_store_dir()）
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or default_store_dir())
+        self.objects = os.path.join(self.root, "objects")
+        self.index_path = os.path.join(self.root, INDEX_NAME)
+        self._verified = set()  # 本进程已经校验过的 (路径, sha256)
+
+    # ---------------------- 索引 ----------------------
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {"models": {}}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.index_path)  # 原子替换，写到一半中断也不会损坏索引
+
+    def entries(self):
+        """所有条目（按名字、版本排序）"""
+        index = self._load_index()
+        return [dict(entry, name=name, version=int(version))
+                for name in sorted(index["models"])
+                for version, entry in sorted(index["models"][name]["versions"].items(), key=lambda kv: int(kv[0]))]
+
+    def path_of(self, entry):
+        return os.path.join(self.root, entry["file"])
+
+    # ---------------------- 添加 / 删除 ----------------------
+    def add(self, path, name, version=None, backend=None, imgsz=None, names=None, repo=None, inspect_model=True):
+        """
+        把权重文件（或模型目录）加入模型库，返回新条目
+        :param version: 版本号，不填时在最新版本上加 1
+        :param backend: 后端，不填时按文件类型推断
+        :param imgsz / names: 输入尺寸和类别名，不填且后端是 ultralytics 时从权重里读取
+        :param repo: yolov5 后端使用的源码仓库条目名（torch.hub 本地加载）
+        """
+        if ":" in name or not name:
+            raise ModelStoreError(f"条目名不能为空或包含冒号：{name}")
+        if not os.path.exists(path):
+            raise ModelStoreError(f"文件不存在：{path}")
+        backend = backend or guess_backend(path)
+        if backend not in BACKENDS:
+            raise ModelStoreError(f"未知的后端：{backend}（可选 {', '.join(BACKENDS)}）")
+        sha = path_sha256(path)
+        is_dir = os.path.isdir(path)
+        rel = f"objects/{sha}" if is_dir else f"objects/{sha}{os.path.splitext(path)[1]}"
+        target = os.path.join(self.root, rel)
+        if os.path.exists(target) and path_sha256(target) != sha:
+            # 同名对象已损坏（磁盘错误、被手动改过）：删掉重新复制，否则新条目会指向坏文件
+            print(f"⚠️ 模型库中的 {rel} 校验失败，重新复制")
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            else:
+                os.remove(target)
+            self._verified = {key for key in self._verified if key[0] != target}
+        if not os.path.exists(target):
+            os.makedirs(self.objects, exist_ok=True)
+            tmp = target + ".tmp"
+            if os.path.isdir(tmp):  # 上次复制到一半中断留下的临时目录
+                shutil.rmtree(tmp)
+            if is_dir:
+                shutil.copytree(path, tmp, ignore=shutil.ignore_patterns(".git", "__pycache__"))
+            else:
+                shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+
+        if backend == "ultralytics" and inspect_model and (imgsz is None or names is None):
+            info = inspect_ultralytics(target)
+            imgsz = imgsz if imgsz is not None else info.get("imgsz")
+            names = names if names is not None else info.get("names")
+
+        index = self._load_index()
+        model = index["models"].setdefault(name, {"versions": {}})
+        if version is None:
+            version = max((int(v) for v in model["versions"]), default=0) + 1
+        entry = {
+            "sha256": sha,
+            "file": rel,
+            "size": _path_size(target),
+            "backend": backend,
+            "imgsz": imgsz,
+            "names": names,
+            "repo": repo,
+            "source": os.path.abspath(path),
+            "added_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "latency": {},
+        }
+        model["versions"][str(version)] = entry
+        self._save_index(index)
+        return dict(entry, name=name, version=int(version))
+
+    def remove(self, spec):
+        """删除条目（没有其他条目引用时同时删除文件）"""
+        entry = self.entry(spec)
+        index = self._load_index()
+        versions = index["models"][entry["name"]]["versions"]
+        del versions[str(entry["version"])]
+        if not versions:
+            del index["models"][entry["name"]]
+        self._save_index(index)
+        if not any(e["file"] == entry["file"] for e in self.entries()):
+            target = self.path_of(entry)
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            elif os.path.exists(target):
+                os.remove(target)
+        return entry
+
+    # ---------------------- 查找 / 校验 ----------------------
+    def entry(self, spec):
+        """按 "名字" 或 "名字:版本" 查找条目，不存在时抛出 ModelStoreError"""
+        name, _, version = spec.partition(":")
+        index = self._load_index()
+        model = index["models"].get(name)
+        if model is None or not model["versions"]:
+            raise ModelStoreError(f"模型库中没有 {name}（{self.root}）")
+        if version in ("", "latest"):
+            version = str(max(int(v) for v in model["versions"]))
+        if version not in model["versions"]:
+            raise ModelStoreError(f"{name} 没有版本 {version}（已有：{', '.join(sorted(model['versions']))}）")
+        return dict(model["versions"][version], name=name, version=int(version))
+
+    def has(self, spec):
+        try:
+            self.entry(spec)
+            return True
+        except ModelStoreError:
+            return False
+
+    def verify(self, entry):
+        """校验文件内容和记录的 sha256 一致（同一进程内每个文件只算一次）"""
+        path = self.path_of(entry)
+        key = (path, entry["sha256"])
+        if key in self._verified:
+            return path
+        if not os.path.exists(path):
+            raise ModelStoreError(f"{entry['name']}:{entry['version']} 的文件丢失：{path}")
+        actual = path_sha256(path)
+        if actual != entry["sha256"]:
+            raise ModelStoreError(f"{entry['name']}:{entry['version']} 校验失败：期望 {entry['sha256'][:12]}，"
+                                  f"实际 {actual[:12]}（文件可能损坏或被替换）")
+        self._verified.add(key)
+        return path
+
+    def resolve(self, spec, verify=True):
+        """条目 -> 本地路径（默认先校验）"""
+        entry = self.entry(spec)
+        return self.verify(entry) if verify else self.path_of(entry)
+
+    # ---------------------- 延迟 ----------------------
+    def record_latency(self, spec, stats, host=None):
+        """记录条目在某台机器上的实测延迟"""
+        entry = self.entry(spec)
+        index = self._load_index()
+        stored = index["models"][entry["name"]]["versions"][str(entry["version"])]
+        stored.setdefault("latency", {})[host or host_name()] = stats
+        self._save_index(index)
+
+
+def inspect_ultralytics(path):
+    """从 ultralytics 权重读取输入尺寸和类别名（读不到时返回空字典）"""
+    try:
+        from ultralytics import YOLO
+        model = YOLO(path)
+        imgsz = model.overrides.get("imgsz") or (getattr(model.model, "args", None) or {}).get("imgsz")
+        return {"imgsz": imgsz, "names": dict(model.names) if model.names else None}
+    except Exception as e:
+        print(f"⚠️ 无法从权重读取元数据：{e}")
+        return {}
+
+
+@contextmanager
+def mmap_torch_load():
+    """torch 支持时（>= 2.1）让加载过程中的 torch.load 用 mmap 读取权重文件"""
+    try:
+        import torch
+    except ImportError:
+        yield
+        return
+    original = torch.load
+    if "mmap" not in inspect.signature(original).parameters:
+        yield
+        return
+
+    def load(*args, **kwargs):
+        kwargs.setdefault("mmap", True)
+        try:
+            return original(*args, **kwargs)
+        except (RuntimeError, ValueError):
+            kwargs.pop("mmap")  # 旧格式（非 zip）的权重不支持 mmap
+            return original(*args, **kwargs)
+
+    torch.load = load
+    try:
+        yield
+    finally:
+        torch.load = original
+
+
+_default_store = None
+
+
+def default_store():
+    global _default_store
+    if _default_store is None or _default_store.root != os.path.abspath(default_store_dir()):
+        _default_store = ModelStore()
+    return _default_store
+
+
+def resolve_model(spec, store=None):
+    """
+    模型条目名或本地路径 -> 本地路径
+    已存在的文件/目录原样返回；否则按条目名在模型库中查找并校验；都找不到时抛出 ModelStoreError
+    """
+    if os.path.exists(spec):
+        return spec
+    if "/" in spec or "\\" in spec or os.path.splitext(spec)[1]:
+        raise ModelStoreError(f"模型文件不存在：{spec}（不联网下载；也可以先加入模型库，再用条目名加载）")
+    store = store or default_store()
+    try:
+        return store.resolve(spec)
+    except ModelStoreError as e:
+        raise ModelStoreError(f"{spec} 既不是本地文件，也不在模型库中：{e}\n"
+                              f"   加入模型库：python model_store.py add <权重文件> --name <条目名>") from None
+
+
+def load_model(spec, store=None, device=None):
+    """
+    按条目的后端加载模型（本地路径按 ultralytics 权重加载），不会联网
+    - ultralytics：YOLO(path)，权重用 mmap 读取
+    - yolov5：torch.hub.load(<源码仓库条目>, "custom", path=..., source="local")，加载后移到 device
+    """
+    store = store or default_store()
+    if os.path.exists(spec) or not store.has(spec):
+        path, backend, repo = resolve_model(spec, store), "ultralytics", None
+    else:
+        entry = store.entry(spec)
+        path, backend, repo = store.verify(entry), entry["backend"], entry.get("repo")
+
+    if backend == "ultralytics":
+        from ultralytics import YOLO
+        with mmap_torch_load():
+            return YOLO(path)  # ultralytics 在推理时通过 device= 指定设备
+    if backend == "yolov5":
+        import torch
+        if not repo:
+            raise ModelStoreError(f"{spec} 是 yolov5 权重，需要用 --repo 指定 yolov5 源码仓库条目")
+        repo_dir = store.resolve(repo)
+        model = torch.hub.load(repo_dir, "custom", path=path, source="local")
+        if device:
+            model.to(device)
+        return model
+    raise ModelStoreError(f"{spec} 的后端 {backend} 不能直接加载，请用 resolve_model 取路径")
+
+
+def bench_model(spec, store=None, device="cpu", runs=20, warmup=3):
+    """在本机测量推理延迟（全零输入），返回 {"p50_ms", "mean_ms", "device", "imgsz", "measured_at"}"""
+    import numpy as np
+    store = store or default_store()
+    entry = store.entry(spec)
+    imgsz = entry.get("imgsz") or 640
+    if isinstance(imgsz, (list, tuple)):
+        imgsz = max(imgsz)
+    model = load_model(spec, store, device)
+    img = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    if entry["backend"] == "yolov5":
+        def infer():
+            model(img, size=imgsz)
+    else:
+        def infer():
+            model(img, imgsz=imgsz, device=device, verbose=False)
+    for _ in range(warmup):
+        infer()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        infer()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    stats = {"p50_ms": round(samples[len(samples) // 2], 2), "mean_ms": round(sum(samples) / len(samples), 2),
+             "device": device, "imgsz": imgsz, "measured_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    store.record_latency(spec, stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模型库（离线、带版本和 SHA256 校验）")
+    parser.add_argument("--store", type=str, default=None, help="库目录（默认 $PLATE_MODEL_STORE 或 ~/.plate_models）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", help="加入权重文件或模型目录")
+    p.add_argument("path")
+    p.add_argument("--name", required=True, help="条目名")
+    p.add_argument("--version", type=int, default=None, help="版本号（默认最新版本 + 1）")
+    p.add_argument("--backend", choices=BACKENDS, default=None, help="后端（默认按文件类型推断）")
+    p.add_argument("--imgsz", type=int, default=None, help="输入尺寸")
+    p.add_argument("--names", type=str, default=None, help="类别名（逗号分隔）")
+    p.add_argument("--repo", type=str, default=None, help="yolov5 后端使用的源码仓库条目名")
+    p.add_argument("--bench", action="store_true", help="加入后在本机测量推理延迟")
+    p.add_argument("--device", type=str, default="cpu")
+
+    sub.add_parser("list", help="列出所有条目")
+    p = sub.add_parser("show", help="显示条目的元数据")
+    p.add_argument("spec")
+    p = sub.add_parser("resolve", help="打印条目的本地路径（会先校验）")
+    p.add_argument("spec")
+    p = sub.add_parser("verify", help="校验条目（不指定时校验全部）")
+    p.add_argument("spec", nargs="?")
+    p = sub.add_parser("bench", help="在本机测量推理延迟并写入元数据")
+    p.add_argument("spec")
+    p.add_argument("--device", type=str, default="cpu")
+    p.add_argument("--runs", type=int, default=20)
+    p = sub.add_parser("remove", help="删除条目")
+    p.add_argument("spec")
+    args = parser.parse_args()
+
+    store = ModelStore(args.store)
+    try:
+        if args.command == "add":
+            names = {i: n.strip() for i, n in enumerate(args.names.split(","))} if args.names else None
+            entry = store.add(args.path, args.name, args.version, args.backend, args.imgsz, names, args.repo)
+            print(f"✅ 已加入 {entry['name']}:{entry['version']}（{entry['backend']}，sha256 {entry['sha256'][:12]}，"
+                  f"{entry['size'] / 1e6:.1f} MB）")
+            if args.bench:
+                stats = bench_model(f"{entry['name']}:{entry['version']}", store, args.device)
+                print(f"⏱️ 本机延迟：p50 {stats['p50_ms']} ms（{args.device}，imgsz {stats['imgsz']}）")
+        elif args.command == "list":
+            entries = store.entries()
+            if not entries:
+                print(f"模型库为空：{store.root}")
+            for e in entries:
+                lat = e.get("latency", {}).get(host_name())
+                lat_text = f"{lat['p50_ms']} ms" if lat else "-"
+                spec = f"{e['name']}:{e['version']}"
+                print(f"{spec:<20} {e['backend']:<12} imgsz={e.get('imgsz') or '-':<5} "
+                      f"{e['size'] / 1e6:>8.1f} MB  本机延迟 {lat_text:<10} {e['sha256'][:12]}  {e['added_at']}")
+        elif args.command == "show":
+            print(json.dumps(store.entry(args.spec), ensure_ascii=False, indent=2))
+        elif args.command == "resolve":
+            print(store.resolve(args.spec))
+        elif args.command == "verify":
+            entries = [store.entry(args.spec)] if args.spec else store.entries()
+            for e in entries:
+                store.verify(e)
+                print(f"✅ {e['name']}:{e['version']} 校验通过")
+        elif args.command == "bench":
+            stats = bench_model(args.spec, store, args.device, args.runs)
+            print(f"⏱️ {args.spec} 本机延迟：p50 {stats['p50_ms']} ms，平均 {stats['mean_ms']} ms"
+                  f"（{args.device}，imgsz {stats['imgsz']}）")
+        elif args.command == "remove":
+            e = store.remove(args.spec)
+            print(f"🗑️ 已删除 {e['name']}:{e['version']}")
+    except ModelStoreError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+异步结果输出模块
+把标注图片 / 标注视频的编码和写盘从推理循环中拿出来，交给后台线程池完成。
+
+- 有界队列：队列满时推理线程会阻塞等待（背压），内存不会无限增长
+- 可配置 JPEG 质量、可选缩略图、"只要结果不要图片" 模式
+- 程序退出时自动 flush（atexit），也可以用 with 语句
+- 提供队列深度、写入数量、阻塞时间等统计
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+_STOP = object()  # 工作线程退出标记
+
+
+class WriterStats:
+    """输出统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0      # 提交的任务数
+        self.written = 0        # 成功写入的文件/帧数
+        self.failed = 0         # 写入失败数
+        self.skipped = 0        # 结果模式下被跳过的图片数
+        self.bytes_written = 0  # 写入字节数
+        self.write_seconds = 0.0    # 后台编码+写盘耗时
+        self.blocked_seconds = 0.0  # 推理线程因队列满而等待的时间
+        self.max_queue_depth = 0    # 观察到的最大队列深度
+
+    def add(self, **kwargs):
+        with self._lock:
+            for key, value in kwargs.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def observe_depth(self, depth):
+        with self._lock:
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "written": self.written,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "bytes_written": self.bytes_written,
+                "write_seconds": round(self.write_seconds, 3),
+                "blocked_seconds": round(self.blocked_seconds, 3),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+def encode_image(img, path, jpeg_quality=95):
+    """
+    按文件后缀编码图片
+    :param img: BGR 图像
+    :param path: 目标路径（用于判断格式）
+    :param jpeg_quality: JPEG 质量（1-100）
+    :return: 编码后的字节，失败返回 None
+    """
+    ext = os.path.splitext(path)[1].lower() or ".jpg"
+    params = []
+    if ext in (".jpg", ".jpeg"):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+    ok, buf = cv2.imencode(ext, img, params)
+    return buf.tobytes() if ok else None
+
+
+def make_thumbnail(img, width):
+    """按宽度等比缩小图片（图片本身比 width 小时原样返回）"""
+    h, w = img.shape[:2]
+    if w <= width:
+        return img
+    height = max(1, int(round(h * width / w)))
+    return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+
+class AsyncOutputWriter:
+    """
+    后台线程池写图片
+    :param max_workers: 后台写盘线程数
+    :param max_queue: 队列上限（满了以后 submit 会阻塞）
+    :param jpeg_quality: JPEG 质量
+    :param thumbnail_width: 缩略图宽度，None 表示不生成缩略图
+    :param write_images: False 时进入 "只要结果" 模式，不写任何图片/视频
+    """
+
+    def __init__(self, max_workers=2, max_queue=64, jpeg_quality=95,
+                 thumbnail_width=None, write_images=True):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail_width = thumbnail_width
+        self.write_images = write_images
+        self.stats = WriterStats()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._videos = []
+        self._closed = False
+        self._threads = []
+        for i in range(max_workers if write_images else 0):
+            t = threading.Thread(target=self._worker, name=f"output-writer-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        # 退出时保证队列里的图片都写完
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def queue_depth(self):
+        """当前排队中的任务数"""
+        return self._queue.qsize()
+
+    def _put(self, task):
+        start = time.perf_counter()
+        self._queue.put(task)
+        waited = time.perf_counter() - start
+        self.stats.add(submitted=1, blocked_seconds=waited)
+        self.stats.observe_depth(self._queue.qsize())
+
+    def submit(self, path, img):
+        """
+        提交一张图片的写盘任务
+        注意：提交后调用方不要再修改 img（后台线程直接使用这块内存）
+        :param path: 保存路径
+        :param img: BGR 图像
+        """
+        if self._closed:
+            raise RuntimeError("AsyncOutputWriter 已关闭")
+        if not self.write_images:
+            self.stats.add(skipped=1)
+            return
+        self._put((path, img))
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _STOP:
+                    return
+                self._write(*task)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path, img):
+        start = time.perf_counter()
+        try:
+            written = self._write_file(path, img)
+            if self.thumbnail_width:
+                thumb_dir = os.path.join(os.path.dirname(path), "thumbs")
+                os.makedirs(thumb_dir, exist_ok=True)
+                thumb = make_thumbnail(img, self.thumbnail_width)
+                written += self._write_file(os.path.join(thumb_dir, os.path.basename(path)), thumb)
+            self.stats.add(written=1, bytes_written=written)
+        except Exception as e:
+            print(f"警告：写入失败 {path}：{e}")
+            self.stats.add(failed=1)
+        finally:
+            self.stats.add(write_seconds=time.perf_counter() - start)
+
+    def _write_file(self, path, img):
+        # 用 imencode + open 写盘，兼容中文路径（cv2.imwrite 在 Windows 下不支持）
+        data = encode_image(img, path, self.jpeg_quality)
+        if data is None:
+            raise ValueError("图片编码失败")
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    def open_video(self, path, fourcc, fps, frame_size, max_queue=32):
+        """
+        打开一个异步视频写入器（帧按提交顺序写入）
+        结果模式下返回一个什么都不做的写入器
+        """
+        if not self.write_images:
+            return NullVideoWriter(self.stats)
+        video = AsyncVideoWriter(path, fourcc, fps, frame_size, self.stats, max_queue)
+        self._videos.append(video)
+        return video
+
+    def flush(self):
+        """等待所有已提交的图片写完"""
+        self._queue.join()
+        for video in self._videos:
+            video.flush()
+
+    def close(self):
+        """写完所有任务并停止后台线程（可重复调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.join()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+        for video in self._videos:
+            video.release()
+        self._videos = []
+        atexit.unregister(self.close)
+
+    def summary(self):
+        """一行文字的统计信息"""
+        s = self.stats.as_dict()
+        return (f"输出统计：写入 {s['written']} 个，失败 {s['failed']} 个，跳过 {s['skipped']} 个，"
+                f"{s['bytes_written'] / 1024 / 1024:.1f} MB，后台写盘 {s['write_seconds']:.2f} 秒，"
+                f"推理线程等待 {s['blocked_seconds']:.2f} 秒，最大队列深度 {s['max_queue_depth']}")
+
+
+class AsyncVideoWriter:
+    """
+    单线程异步视频写入器，接口和 cv2.VideoWriter 一致（write / release / isOpened）
+    """
+
+    def __init__(self, path, fourcc, fps, frame_size, stats=None, max_queue=32):
+        self.path = path
+        self.stats = stats or WriterStats()
+        self._out = cv2.VideoWriter(path, fourcc, fps, frame_size)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._released = False
+        self._thread = threading.Thread(target=self._worker, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def isOpened(self):
+        return self._out.isOpened()
+
+    def write(self, frame):
+        start = time.perf_counter()
+        self._queue.put(frame)
+        self.stats.add(submitted=1, blocked_seconds=time.perf_counter() - start)
+        self.stats.observe_depth(self._queue.qsize())
+
+    def _worker(self):
+        while True:
+            frame = self._queue.get()
+            try:
+                if frame is _STOP:
+                    return
+                start = time.perf_counter()
+                self._out.write(frame)
+                self.stats.add(written=1, write_seconds=time.perf_counter() - start)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._out.release()
+
+
+class NullVideoWriter:
+    """结果模式下的空视频写入器"""
+
+    def __init__(self, stats=None):
+        self.stats = stats or WriterStats()
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.stats.add(skipped=1)
+
+    def flush(self):
+        pass
+
+    def release(self):
+        pass
+
+
+def add_writer_args(parser):
+    """给命令行工具统一添加输出相关参数"""
+    parser.add_argument("--jpeg-quality", type=int, default=95,
+                        help="保存 JPEG 图片的质量（1-100）")
+    parser.add_argument("--thumb-width", type=int, default=None,
+                        help="额外保存缩略图的宽度（像素），不填则不生成")
+    parser.add_argument("--no-images", action="store_true",
+                        help="只输出识别结果，不保存标注图片/视频")
+    parser.add_argument("--writer-threads", type=int, default=2,
+                        help="后台写盘线程数")
+    parser.add_argument("--writer-queue", type=int, default=64,
+                        help="写盘队列上限（满时推理会等待）")
+
+
+def writer_from_args(args):
+    """根据命令行参数创建 AsyncOutputWriter"""
+    return AsyncOutputWriter(
+        max_workers=args.writer_threads,
+        max_queue=args.writer_queue,
+        jpeg_quality=args.jpeg_quality,
+        thumbnail_width=args.thumb_width,
+        write_images=not args.no_images,
+    )
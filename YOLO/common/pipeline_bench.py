@@ -0,0 +1,259 @@
+"""
+车牌识别流水线分阶段基准测试
+
+在本地合成的 CCPD 风格数据上运行三条流水线，逐阶段计时：
+    detect    解码 -> 预处理 -> 检测 -> 绘制 -> 编码
+    det_ocr   解码 -> 预处理 -> 检测 -> 裁剪 -> OCR -> 绘制 -> 编码
+    video     读帧 -> 预处理 -> 检测 -> 绘制 -> 写视频
+（预处理耗时取自 ultralytics 的 result.speed["preprocess"]，检测耗时为模型调用总耗时减去预处理）
+
+输出 JSON：每条流水线的端到端延迟 p50/p95/p99、吞吐量、各阶段延迟分位数、峰值内存（RSS）。
+指定 --baseline 时和保存的基线比较，超过阈值的指标标记为退化，并以退出码 1 结束（方便接入 CI）。
+延迟指标还要求绝对增量超过 --min-ms，避免亚毫秒级阶段的抖动被当成退化。
+
+用法：
+    python pipeline_bench.py --model best.pt --out bench.json --save-baseline baseline.json
+    python pipeline_bench.py --model best.pt --out bench.json --baseline baseline.json --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+
+from model_store import load_model
+from plate_ocr import PlateReader, crop_plate, result_boxes
+from plate_renderer import PlateRenderer
+from stage_timing import StageTimer, peak_rss_mb, percentile
+from synthetic_data import generate_dataset
+
+PIPELINES = ("detect", "det_ocr", "video")
+
+
+class PipelineRun:
+    """一条流水线的计时结果"""
+
+    def __init__(self, name, warmup):
+        self.name = name
+        self.warmup = warmup
+        self.timer = StageTimer()
+        self.latencies = []
+        self._seen = 0
+        self._start = None
+        self._elapsed = 0.0
+
+    def item(self):
+        """开始处理一个样本，返回记录各阶段耗时的计时器（预热样本不计入）"""
+        self._seen += 1
+        if self._seen == self.warmup + 1:
+            self._start = time.perf_counter()
+        return self.timer if self._seen > self.warmup else StageTimer()
+
+    def done(self, latency_ms):
+        if self._seen > self.warmup:
+            self.latencies.append(latency_ms)
+            self._elapsed = time.perf_counter() - self._start
+
+    def report(self):
+        values = sorted(self.latencies)
+        return {
+            "items": len(values),
+            "throughput_per_s": round(len(values) / self._elapsed, 2) if self._elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": round(sum(values) / len(values), 3) if values else 0.0,
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+            },
+            "stages": self.timer.summary(),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def _detect(model, img, timer, conf, imgsz, device):
+    start = time.perf_counter()
+    result = model(img, conf=conf, imgsz=imgsz, device=device, verbose=False)[0]
+    total = (time.perf_counter() - start) * 1000
+    pre = result.speed.get("preprocess", 0.0) if getattr(result, "speed", None) else 0.0
+    timer.add("preprocess", pre)
+    timer.add("detect", max(0.0, total - pre))
+    return result
+
+
+def run_image_pipeline(name, model, image_paths, reader, renderer, args):
+    run = PipelineRun(name, args.warmup)
+    for path in image_paths:
+        timer = run.item()
+        start = time.perf_counter()
+        with timer.stage("decode"):
+            img = cv2.imread(path)
+        result = _detect(model, img, timer, args.conf, args.imgsz, args.device)
+        if name == "det_ocr":
+            with timer.stage("crop"):
+                boxes = result_boxes(result)
+                crops = [c for c in (crop_plate(img, b, 4) for b in boxes) if c is not None]
+            with timer.stage("ocr"):
+                reader.read_batch(crops)
+        with timer.stage("render"):
+            annotated = renderer.render_result(img, result)
+        with timer.stage("encode"):
+            cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        run.done((time.perf_counter() - start) * 1000)
+    return run.report()
+
+
+def run_video_pipeline(model, video_paths, renderer, args):
+    run = PipelineRun("video", args.warmup)
+    out_path = os.path.join(tempfile.gettempdir(), "pipeline_bench_out.mp4")
+    for video in video_paths:
+        cap = cv2.VideoCapture(video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        while True:
+            timer = run.item()
+            start = time.perf_counter()
+            with timer.stage("decode"):
+                ok, frame = cap.read()
+            if not ok:
+                break
+            result = _detect(model, frame, timer, args.conf, args.imgsz, args.device)
+            with timer.stage("render"):
+                annotated = renderer.render_result(frame, result)
+            with timer.stage("encode"):
+                out.write(annotated)
+            run.done((time.perf_counter() - start) * 1000)
+        cap.release()
+        out.release()
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    return run.report()
+
+
+def compare(current, baseline, threshold, min_ms=1.0):
+    """
+    和基线比较：延迟（端到端 p50/p95 和各阶段 p95）变大、吞吐量变小超过 threshold 视为退化
+    :param min_ms: 延迟指标的绝对下限，增量不超过 min_ms 毫秒时不算退化（亚毫秒阶段的相对抖动很大）
+    :return: 退化列表 [(指标, 基线值, 当前值, 变化比例)]
+    """
+    regressions = []
+
+    def check(metric, base, cur, higher_is_worse=True):
+        if not base:
+            return
+        change = (cur - base) / base
+        if higher_is_worse:
+            regressed = change > threshold and cur - base > min_ms
+        else:
+            regressed = change < -threshold
+        if regressed:
+            regressions.append((metric, base, cur, round(change, 4)))
+
+    for name, cur in current["pipelines"].items():
+        base = baseline.get("pipelines", {}).get(name)
+        if base is None:
+            continue
+        check(f"{name}.throughput_per_s", base["throughput_per_s"], cur["throughput_per_s"], False)
+        for p in ("p50", "p95"):
+            check(f"{name}.latency.{p}", base["latency_ms"][p], cur["latency_ms"][p])
+        for stage, stats in cur["stages"].items():
+            base_stage = base["stages"].get(stage)
+            if base_stage:
+                check(f"{name}.{stage}.p95", base_stage["p95_ms"], stats["p95_ms"])
+    return regressions
+
+
+def print_report(report):
+    for name, data in report["pipelines"].items():
+        lat = data["latency_ms"]
+        print(f"📊 {name}：{data['items']} 个样本，吞吐 {data['throughput_per_s']}/s，"
+              f"延迟 p50 {lat['p50']} ms | p95 {lat['p95']} ms | p99 {lat['p99']} ms，"
+              f"峰值内存 {data['peak_rss_mb']} MB")
+        for stage, stats in data["stages"].items():
+            print(f"   {stage:<10} p50 {stats['p50_ms']:>8.3f} | p95 {stats['p95_ms']:>8.3f} | "
+                  f"p99 {stats['p99_ms']:>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车牌识别流水线分阶段基准测试")
+    parser.add_argument("--model", type=str, required=True, help="YOLO 车牌检测模型")
+    parser.add_argument("--data", type=str, default="bench_data", help="合成数据目录（不存在时自动生成）")
+    parser.add_argument("--images", type=int, default=100, help="图片数量")
+    parser.add_argument("--videos", type=int, default=1, help="视频数量")
+    parser.add_argument("--video-frames", type=int, default=150, help="每个视频的帧数")
+    parser.add_argument("--pipelines", type=str, default=",".join(PIPELINES),
+                        help=f"要运行的流水线（逗号分隔，可选 {', '.join(PIPELINES)}）")
+    parser.add_argument("--warmup", type=int, default=5, help="每条流水线不计入统计的预热样本数")
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--rec-model-dir", type=str, default=None, help="PaddleOCR 识别模型目录")
+    parser.add_argument("--out", type=str, default="bench_result.json", help="结果 JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="基线 JSON，用于检测性能退化")
+    parser.add_argument("--threshold", type=float, default=0.10, help="退化阈值（默认 10%%）")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="延迟退化的绝对下限（毫秒），增量不超过它时不算退化")
+    parser.add_argument("--save-baseline", type=str, default=None, help="把本次结果另存为基线")
+    args = parser.parse_args()
+
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f"未知的流水线：{', '.join(sorted(unknown))}")
+
+    image_paths, video_paths = generate_dataset(args.data, args.images, args.videos, args.video_frames)
+    model = load_model(args.model)
+    reader = PlateReader(rec_model_dir=args.rec_model_dir) if "det_ocr" in pipelines else None
+    renderer = PlateRenderer()
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "model": os.path.basename(args.model),
+            "imgsz": args.imgsz,
+            "device": args.device,
+            "images": len(image_paths),
+            "videos": len(video_paths),
+        },
+        "pipelines": {},
+    }
+    for name in pipelines:
+        print(f"⏳ 运行流水线：{name}")
+        if name == "video":
+            report["pipelines"][name] = run_video_pipeline(model, video_paths, renderer, args)
+        else:
+            report["pipelines"][name] = run_image_pipeline(name, model, image_paths, reader, renderer, args)
+
+    print_report(report)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 结果已保存：{args.out}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 基线已保存：{args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"❌ 发现 {len(regressions)} 项性能退化（阈值 {args.threshold * 100:.0f}%，"
+                  f"延迟至少 {args.min_ms} ms）：")
+            for metric, base, cur, change in regressions:
+                print(f"   {metric}: {base} -> {cur}（{change * 100:+.1f}%）")
+            sys.exit(1)
+        print(f"✅ 和基线相比没有超过 {args.threshold * 100:.0f}% 的退化")
+
+
+if __name__ == "__main__":
+    main()
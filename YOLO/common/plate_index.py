@@ -0,0 +1,312 @@
+"""
+车牌检索索引（SQLite）
+
+处理完的视频只留下结果视频，想知道"鲁A12345 什么时候经过"只能重新跑一遍。
+PlateIndex 把识别到的车牌连同来源视频、帧号、视频内时间写进一个 SQLite 文件，之后直接查询：
+
+- 精确查询：鲁A12345
+- 前缀查询：鲁A12*（也可以写成 鲁A12%）
+- 单字符通配：鲁A1?345（也可以写成 鲁A1_345），可以和 * 混用
+
+索引结构：
+    plates(plate, source_id, ts) 上的 B 树索引 —— 精确查询、前缀查询走范围扫描
+    plates(plate_rev) 上的反向索引 —— 开头是通配符时（如 ?A12345、*2345）按反转后的后缀范围扫描
+范围扫描之后再用 GLOB 过滤通配符，几千万行的库里查询也只需要几毫秒。
+两端都是通配符（如 *123*）无法走索引，只能全表扫描。
+
+用法：
+    python plate_index.py plates.db query 鲁A12345
+    python plate_index.py plates.db query "鲁A1?3*" --source traffic.mp4
+    python plate_index.py plates.db stats
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+from plate_ocr import crop_plate, result_boxes
+
+# 字符串范围扫描的上界（比任何合法字符都大）
+_MAX_CHAR = chr(0x10FFFF)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id       INTEGER PRIMARY KEY,
+    path     TEXT NOT NULL UNIQUE,
+    fps      REAL,
+    added_at REAL
+);
+CREATE TABLE IF NOT EXISTS plates (
+    id        INTEGER PRIMARY KEY,
+    plate     TEXT NOT NULL,
+    plate_rev TEXT NOT NULL,
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    frame     INTEGER,
+    ts        REAL,
+    conf      REAL
+);
+CREATE INDEX IF NOT EXISTS idx_plates_plate ON plates(plate, source_id, ts);
+CREATE INDEX IF NOT EXISTS idx_plates_rev ON plates(plate_rev);
+"""
+
+
+def to_glob(pattern):
+    """把查询模式（* % 任意长度，? _ 单个字符）转换成 SQLite GLOB 模式"""
+    out = []
+    for c in pattern.upper():
+        if c in "*%":
+            out.append("*")
+        elif c in "?_":
+            out.append("?")
+        elif c == "[":
+            out.append("[[]")
+        else:
+            out.append(c)
+    return "".join(out)
+
+
+def literal_prefix(glob_pattern):
+    """GLOB 模式中第一个通配符之前的字面前缀"""
+    for i, c in enumerate(glob_pattern):
+        if c in "*?[":
+            return glob_pattern[:i]
+    return glob_pattern
+
+
+def literal_suffix(glob_pattern):
+    """GLOB 模式中最后一个通配符之后的字面后缀"""
+    for i in range(len(glob_pattern) - 1, -1, -1):
+        if glob_pattern[i] in "*?]":
+            return glob_pattern[i + 1:]
+    return glob_pattern
+
+
+class PlateIndex:
+    """
+    车牌检索索引
+    :param db_path: SQLite 数据库文件
+    :param batch_size: 攒够多少条记录写一次库（一个事务）
+    :param dedupe_seconds: 同一视频中同一车牌在该时间内重复出现只记一次（0 表示全部记录）
+    """
+
+    def __init__(self, db_path, batch_size=5000, dedupe_seconds=1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.dedupe_seconds = dedupe_seconds
+        self.total_added = 0
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        # WAL：写入时也能同时查询；NORMAL：每个事务不强制刷盘
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64MB 页缓存
+        self.conn.executescript(_SCHEMA)
+        self._pending = []
+        self._last_seen = {}    # (source_id, 车牌) -> 最近一次记录的时间
+        self._latest = {}       # source_id -> 最新的视频内时间
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_source(self, path, fps=None, replace=True):
+        """
+        登记一个视频，返回 source_id
+        :param replace: 重新处理同一个视频时删除它之前的记录
+        """
+        self.flush()
+        path = os.path.abspath(path)
+        with self.conn:
+            row = self.conn.execute("SELECT id FROM sources WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                cur = self.conn.execute("INSERT INTO sources (path, fps, added_at) VALUES (?, ?, ?)",
+                                        (path, fps, time.time()))
+                return cur.lastrowid
+            if replace:
+                self.conn.execute("DELETE FROM plates WHERE source_id = ?", (row[0],))
+            self.conn.execute("UPDATE sources SET fps = ?, added_at = ? WHERE id = ?",
+                              (fps, time.time(), row[0]))
+        return row[0]
+
+    def add(self, source_id, plate, frame=None, ts=None, conf=None):
+        """记录一次车牌出现，返回是否写入（去重时可能被跳过）"""
+        plate = plate.upper()
+        if self.dedupe_seconds > 0 and ts is not None:
+            key = (source_id, plate)
+            last = self._last_seen.get(key)
+            if last is not None and 0 <= ts - last < self.dedupe_seconds:
+                return False
+            self._last_seen[key] = ts
+            if source_id not in self._latest or ts > self._latest[source_id]:
+                self._latest[source_id] = ts
+        self._pending.append((plate, plate[::-1], source_id, frame, ts, conf))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """把缓存的记录写进数据库"""
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO plates (plate, plate_rev, source_id, frame, ts, conf) "
+                "VALUES (?, ?, ?, ?, ?, ?)", self._pending)
+        self.total_added += len(self._pending)
+        self._pending = []
+        self._expire()
+
+    def _expire(self):
+        """去重表里超出去重时间窗口的车牌不会再命中，删掉（长时间运行时内存不随车牌数增长）"""
+        expired = [key for key, last in self._last_seen.items()
+                   if self._latest.get(key[0], last) - last >= self.dedupe_seconds]
+        for key in expired:
+            del self._last_seen[key]
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+    def query(self, pattern, source=None, limit=1000):
+        """
+        查询车牌出现记录
+        :param pattern: 车牌或通配模式（* % 任意长度，? _ 单个字符）
+        :param source: 只查某个视频（路径中包含该字符串即可）
+        :return: [{"plate", "source", "frame", "timestamp", "conf"}, ...]
+        """
+        self.flush()
+        glob_pattern = to_glob(pattern)
+        prefix = literal_prefix(glob_pattern)
+        suffix = literal_suffix(glob_pattern)
+        where, params = [], []
+        if prefix == glob_pattern:
+            where.append("p.plate = ?")
+            params.append(prefix)
+        else:
+            # 哪一端的字面部分更长就用哪个索引做范围扫描，再用 GLOB 过滤
+            if len(suffix) > len(prefix):
+                rev = suffix[::-1]
+                where.append("p.plate_rev >= ? AND p.plate_rev < ?")
+                params += [rev, rev + _MAX_CHAR]
+            elif prefix:
+                where.append("p.plate >= ? AND p.plate < ?")
+                params += [prefix, prefix + _MAX_CHAR]
+            where.append("p.plate GLOB ?")
+            params.append(glob_pattern)
+        if source:
+            where.append("s.path LIKE ?")
+            params.append(f"%{source}%")
+        sql = ("SELECT p.plate, s.path, p.frame, p.ts, p.conf FROM plates p "
+               "JOIN sources s ON s.id = p.source_id WHERE " + " AND ".join(where) +
+               " ORDER BY p.plate, p.source_id, p.ts LIMIT ?")
+        rows = self.conn.execute(sql, params + [limit]).fetchall()
+        return [{"plate": r[0], "source": r[1], "frame": r[2], "timestamp": r[3], "conf": r[4]}
+                for r in rows]
+
+    def stats(self):
+        """索引统计：记录数、不同车牌数、视频数、数据库大小"""
+        self.flush()
+        rows = self.conn.execute("SELECT COUNT(*) FROM plates").fetchone()[0]
+        plates = self.conn.execute("SELECT COUNT(DISTINCT plate) FROM plates").fetchone()[0]
+        sources = self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        return {"rows": rows, "plates": plates, "sources": sources, "db_mb": round(size / 1e6, 1)}
+
+
+class PlateVideoIndexer:
+    """
+    把视频检测结果写入 PlateIndex（接在视频处理循环里）
+    :param index: PlateIndex
+    :param reader: plate_ocr.PlateReader
+    :param source: 视频路径
+    :param fps: 视频帧率（用于把帧号换算成时间）
+    :param every_n: 每隔多少帧做一次 OCR（检测每帧都做，OCR 较慢只抽帧做）
+    :param min_conf: OCR 最低置信度
+    """
+
+    def __init__(self, index, reader, source, fps, every_n=5, min_conf=0.5, expand=4):
+        self.index = index
+        self.reader = reader
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.every_n = max(1, every_n)
+        self.min_conf = min_conf
+        self.expand = expand
+        self.source_id = index.add_source(source, self.fps)
+        self.added = 0
+
+    def process(self, frame_idx, frame, result):
+        """处理一帧的检测结果，返回新写入的记录数"""
+        if frame_idx % self.every_n != 0:
+            return 0
+        boxes = result_boxes(result)
+        crops = [c for c in (crop_plate(frame, box, self.expand) for box in boxes) if c is not None]
+        if not crops:
+            return 0
+        added = 0
+        ts = frame_idx / self.fps
+        for text, conf in self.reader.read_batch(crops):
+            if text and conf >= self.min_conf:
+                added += self.index.add(self.source_id, text, frame_idx, ts, conf)
+        self.added += added
+        return added
+
+    def close(self):
+        self.index.flush()
+        return self.added
+
+
+def add_index_args(parser):
+    """给命令行脚本添加车牌索引相关参数"""
+    group = parser.add_argument_group("车牌索引")
+    group.add_argument("--index", type=str, default=None,
+                       help="把视频中识别到的车牌写入该 SQLite 索引（不填不建索引）")
+    group.add_argument("--index-every", type=int, default=5,
+                       help="每隔多少帧做一次车牌字符识别（默认 5）")
+    return parser
+
+
+def index_from_args(args):
+    """根据命令行参数创建 (PlateIndex, PlateReader)，没有 --index 时返回 (None, None)"""
+    if not getattr(args, "index", None):
+        return None, None
+    from plate_ocr import PlateReader
+    return PlateIndex(args.index), PlateReader()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车牌检索索引查询")
+    parser.add_argument("db", type=str, help="SQLite 索引文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    q = sub.add_parser("query", help="查询车牌")
+    q.add_argument("pattern", type=str, help="车牌或通配模式（* 任意长度，? 单个字符）")
+    q.add_argument("--source", type=str, default=None, help="只查某个视频")
+    q.add_argument("--limit", type=int, default=100, help="最多返回条数")
+    sub.add_parser("stats", help="索引统计")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ 索引文件不存在: {args.db}")
+        return
+    with PlateIndex(args.db) as index:
+        if args.command == "stats":
+            for key, value in index.stats().items():
+                print(f"{key}: {value}")
+            return
+        start = time.perf_counter()
+        rows = index.query(args.pattern, args.source, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for row in rows:
+            minutes, seconds = divmod(row["timestamp"] or 0.0, 60)
+            print(f"{row['plate']}  {os.path.basename(row['source'])}  "
+                  f"{int(minutes):02d}:{seconds:05.2f}  帧 {row['frame']}  置信度 {row['conf']:.2f}")
+        print(f"🔍 共 {len(rows)} 条（查询耗时 {elapsed:.2f} ms）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+车牌字符识别（PaddleOCR 只做识别，不做文本检测）
+
+各个脚本里解析 PaddleOCR 结果的代码都差不多，这里统一成 PlateReader：
+- PaddleOCR 在第一次识别时才加载（导入 paddle 很慢）
+- 同时兼容 PaddleOCR 2.x（ocr.ocr(det=False)）和 3.x（ocr.predict）的结果格式，加载时按版本号选一次接口
+- read_batch 一次识别多个车牌裁剪图（2.x 下整批交给识别模型，按 rec_batch_num 成批推理）
+"""
+
+import cv2
+
+from model_store import resolve_model
+
+PROVINCES = "京津冀晋蒙辽吉黑沪苏浙皖闽赣鲁豫鄂湘粤桂琼渝川贵云藏陕甘青宁新港澳台"
+
+
+def result_boxes(result):
+    """
+    从 ultralytics 的检测结果中取出车牌框
+    :return: [(x1, y1, x2, y2, conf), ...]，坐标为整数
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return []
+    xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+    confs = result.boxes.conf.cpu().numpy()
+    return [(int(b[0]), int(b[1]), int(b[2]), int(b[3]), float(c)) for b, c in zip(xyxy, confs)]
+
+
+def crop_plate(img, box, expand=0):
+    """按车牌框裁剪（可向外扩展若干像素），框无效时返回 None"""
+    h, w = img.shape[:2]
+    x1, y1, x2, y2 = box[:4]
+    x1, y1 = max(0, int(x1) - expand), max(0, int(y1) - expand)
+    x2, y2 = min(w, int(x2) + expand), min(h, int(y2) + expand)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return img[y1:y2, x1:x2]
+
+
+def parse_rec_result(ocr_result, plate_lengths=(6, 7)):
+    """
+    解析 PaddleOCR 2.x 只识别模式（det=False）的结果
+    车牌通常6-7个字符，只接受符合长度的结果
+    :return: (车牌文字, 置信度)
+    """
+    plate_text = ""
+    max_confidence = 0.0
+    if ocr_result and len(ocr_result) > 0:
+        for item in ocr_result:
+            if isinstance(item, list) and len(item) > 0:
+                line = item[0]
+                if isinstance(line, tuple) and len(line) >= 2:
+                    text = line[0] if isinstance(line[0], str) else ""
+                    conf = line[1] if isinstance(line[1], (int, float)) else 0.0
+                    conf = float(conf)
+                    if len(text) in plate_lengths and conf > max_confidence:
+                        max_confidence = conf
+                        plate_text = text
+    return plate_text, max_confidence
+
+
+def clean_plate_text(text):
+    """只保留省份简称、字母和数字"""
+    return "".join(c for c in text if c in PROVINCES or (c.isascii() and c.isalnum())).upper()
+
+
+def is_paddleocr_v3(module):
+    """PaddleOCR 3.x 去掉了 ocr(det=False)，改用 predict；版本号读不出来时看有没有 predict 方法"""
+    try:
+        return int(str(module.__version__).split(".")[0]) >= 3
+    except (AttributeError, ValueError):
+        return hasattr(module.PaddleOCR, "predict")
+
+
+class PlateReader:
+    """
+    车牌字符识别器
+    :param rec_model_dir: PaddleOCR 识别模型目录或模型库条目名（None 使用默认模型）
+    :param enhance: 识别前是否做灰度 + CLAHE 增强
+    :param plate_lengths: 接受的车牌长度（新能源车牌为 8 位）
+    """
+
+    def __init__(self, rec_model_dir=None, enhance=True, plate_lengths=(6, 7, 8), **ocr_kwargs):
+        self.rec_model_dir = rec_model_dir
+        self.enhance = enhance
+        self.plate_lengths = plate_lengths
+        self.ocr_kwargs = ocr_kwargs
+        self._ocr = None
+        self._v3 = False
+        self._clahe = None
+
+    @property
+    def ocr(self):
+        if self._ocr is None:
+            import paddleocr
+            self._v3 = is_paddleocr_v3(paddleocr)
+            kwargs = dict(lang="ch", **self.ocr_kwargs)
+            if self.rec_model_dir:
+                # 3.x 把参数改名为 text_recognition_model_dir；目录经模型库解析，不存在时报错而不是去下载
+                key = "text_recognition_model_dir" if self._v3 else "rec_model_dir"
+                kwargs[key] = resolve_model(self.rec_model_dir)
+            self._ocr = paddleocr.PaddleOCR(**kwargs)
+        return self._ocr
+
+    def preprocess(self, plate_img):
+        """灰度 + CLAHE 增强对比度（和 license_plate.py 的预处理一致）"""
+        if not self.enhance:
+            return plate_img
+        if self._clahe is None:
+            self._clahe = cv2.createCLAHE(clipLimit=2.5, tileGridSize=(8, 8))
+        gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY) if plate_img.ndim == 3 else plate_img
+        # 批量识别时 PaddleOCR 不会自动把灰度图转回三通道
+        return cv2.cvtColor(self._clahe.apply(gray), cv2.COLOR_GRAY2BGR)
+
+    def read(self, plate_img):
+        """识别一个车牌裁剪图，返回 (车牌文字, 置信度)"""
+        return self.read_batch([plate_img])[0]
+
+    def read_batch(self, plate_imgs):
+        """识别多个车牌裁剪图，返回 [(车牌文字, 置信度), ...]"""
+        if not plate_imgs:
+            return []
+        imgs = [self.preprocess(img) for img in plate_imgs]
+        ocr = self.ocr
+        if self._v3:
+            # PaddleOCR 3.x：没有 det 参数，用 predict 逐张识别
+            return [self._pick_v3(ocr.predict(img)) for img in imgs]
+        # PaddleOCR 2.x：只识别模式下嵌套一层列表，整批图片一次交给识别模型
+        raw = ocr.ocr([imgs], det=False, rec=True, cls=False)
+        return [self._pick([[line]]) for line in raw[0]]
+
+    def _pick(self, ocr_result):
+        text, conf = parse_rec_result(ocr_result, plate_lengths=range(1, 100))
+        text = clean_plate_text(text)
+        if len(text) not in self.plate_lengths:
+            return "", conf
+        return text, conf
+
+    def _pick_v3(self, result):
+        if result and len(result) > 0:
+            ocr_dict = result[0]
+            texts = ocr_dict.get("rec_texts") or []
+            scores = ocr_dict.get("rec_scores") or []
+            if texts:
+                text = clean_plate_text("".join(texts))
+                conf = float(min(scores)) if scores else 0.0
+                if len(text) in self.plate_lengths:
+                    return text, conf
+        return "", 0.0
@@ -0,0 +1,301 @@
+"""
+车牌颜色预筛（YOLO 之前的快速候选区域过滤）
+
+license_plate_recognition.py 里的 search_plate_in_vehicle / fallback_locate_plate 用 HSV 蓝/黄掩码 +
+宽高比 + 矩形度找车牌，但在原图上逐个轮廓计算，而且只在 YOLO 失败时兜底。这里把同样的思路
+改成一个很便宜的前置过滤：
+
+- 先缩小到 work_width（默认 320 像素宽）再做 HSV 掩码，加上 CCPD2020 新能源车牌的绿色
+- 颜色掩码再和竖直边缘（Sobel x，车牌字符边缘密集）求交，大面积同色背景（蓝色车身、天空）不会被当成车牌
+- 横向闭运算把被字符切开的区域连起来，connectedComponentsWithStats 一次得到所有连通域，
+  宽高比 / 面积 / 填充率（矩形度）用 numpy 数组整体筛选，没有逐轮廓的 Python 循环
+- 候选框向外扩展一圈（给 YOLO 留上下文），互相重叠的合并，最多保留 max_regions 个
+- YOLO 只在候选区域的裁剪图上推理（输入尺寸更小）；没有候选区域时直接跳过检测
+
+    gate = PlateGate()
+    box, conf, regions = detect_with_gate(model, img, gate, conf=0.3)
+
+评估（CCPD 真值从文件名解析）：预筛召回率（真值车牌被某个候选区域完整覆盖的比例）、
+空图比例、每张图候选数、预筛耗时；指定 --model 时再对比全图检测和预筛 + 裁剪检测的
+检测召回率（IoU ≥ 0.5）和检测耗时，给出加速比。
+
+用法：
+    python plate_prefilter.py --data D:/CCPD2019/splits/test.txt --limit 1000
+    python plate_prefilter.py --data D:/CCPD2020/ccpd_green/test --model best.pt --out gate_eval.json
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+# HSV 颜色范围（OpenCV 的 H 是 0-180）
+COLOR_RANGES = {
+    "blue": ((100, 80, 50), (124, 255, 255)),
+    "yellow": ((15, 80, 80), (35, 255, 255)),
+    "green": ((35, 40, 60), (85, 255, 255)),   # 新能源车牌是白绿渐变，饱和度下限放低
+}
+
+
+class PlateGate:
+    """
+    车牌颜色预筛
+    :param work_width: 缩小后的处理宽度（像素）
+    :param colors: 参与筛选的车牌颜色（COLOR_RANGES 的键）
+    :param aspect: 连通域宽高比范围（倾斜车牌的外接框会变方，下限放得比 3:1 宽）
+    :param area: 连通域面积占整图的比例范围
+    :param min_fill: 最低填充率（连通域面积 / 外接框面积，即矩形度）
+    :param edge_thresh: 竖直边缘强度阈值（0 表示只用颜色）
+    :param pad: 候选框每边向外扩展的比例（相对车牌框宽高）
+    :param max_regions: 最多保留的候选区域数（按面积从大到小）
+    """
+
+    def __init__(self, work_width=320, colors=("blue", "yellow", "green"), aspect=(1.5, 7.0),
+                 area=(0.0004, 0.2), min_fill=0.4, edge_thresh=80, pad=0.6, max_regions=4):
+        self.work_width = work_width
+        self.ranges = [(np.array(COLOR_RANGES[c][0], np.uint8), np.array(COLOR_RANGES[c][1], np.uint8))
+                       for c in colors]
+        self.aspect = aspect
+        self.area = area
+        self.min_fill = min_fill
+        self.edge_thresh = edge_thresh
+        self.pad = pad
+        self.max_regions = max_regions
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, work_width // 40), 3))
+
+    def params(self):
+        """预筛参数（检测结果缓存的键里用，参数变了缓存自动失效）"""
+        return {"work_width": self.work_width, "ranges": [(lo.tolist(), hi.tolist()) for lo, hi in self.ranges],
+                "aspect": self.aspect, "area": self.area, "min_fill": self.min_fill,
+                "edge_thresh": self.edge_thresh, "pad": self.pad, "max_regions": self.max_regions}
+
+    def mask(self, small):
+        """缩小后图片的车牌掩码（车牌颜色 ∩ 竖直边缘）"""
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        mask = None
+        for low, high in self.ranges:
+            m = cv2.inRange(hsv, low, high)
+            mask = m if mask is None else cv2.bitwise_or(mask, m)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self._kernel)
+        if self.edge_thresh:
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            edges = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+            _, edges = cv2.threshold(edges, self.edge_thresh, 255, cv2.THRESH_BINARY)
+            mask = cv2.bitwise_and(mask, cv2.morphologyEx(edges, cv2.MORPH_CLOSE, self._kernel))
+        return mask
+
+    def propose(self, img):
+        """
+        返回候选区域 [(x1, y1, x2, y2), ...]（原图坐标，已扩展、合并），没有候选时返回 []
+        """
+        h, w = img.shape[:2]
+        scale = min(1.0, self.work_width / w)
+        small = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_LINEAR) if scale < 1.0 else img
+        count, _, stats, _ = cv2.connectedComponentsWithStats(self.mask(small), connectivity=8)
+        if count <= 1:
+            return []
+        stats = stats[1:]  # 去掉背景
+        bw, bh, area = stats[:, 2], stats[:, 3], stats[:, 4]
+        total = small.shape[0] * small.shape[1]
+        aspect = bw / np.maximum(bh, 1)
+        keep = ((aspect >= self.aspect[0]) & (aspect <= self.aspect[1])
+                & (area >= self.area[0] * total) & (area <= self.area[1] * total)
+                & (area >= self.min_fill * bw * bh))
+        stats = stats[keep]
+        if not len(stats):
+            return []
+        stats = stats[np.argsort(-stats[:, 4])]
+        # 扩展后换算回原图坐标
+        x1 = (stats[:, 0] - stats[:, 2] * self.pad) / scale
+        y1 = (stats[:, 1] - stats[:, 3] * self.pad) / scale
+        x2 = (stats[:, 0] + stats[:, 2] * (1 + self.pad)) / scale
+        y2 = (stats[:, 1] + stats[:, 3] * (1 + self.pad)) / scale
+        boxes = np.stack([np.clip(x1, 0, w), np.clip(y1, 0, h),
+                          np.clip(x2, 0, w), np.clip(y2, 0, h)], axis=1).astype(int)
+        return merge_boxes([tuple(b) for b in boxes.tolist()])[:self.max_regions]
+
+
+def merge_boxes(boxes):
+    """把互相重叠的框合并成外接框（保持输入顺序，重复合并直到没有重叠）"""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        out = []
+        for box in merged:
+            for i, other in enumerate(out):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    out[i] = (min(box[0], other[0]), min(box[1], other[1]),
+                              max(box[2], other[2]), max(box[3], other[3]))
+                    changed = True
+                    break
+            else:
+                out.append(box)
+        merged = out
+    return merged
+
+
+def covers(region, box):
+    """候选区域是否完整覆盖真值车牌框"""
+    return region[0] <= box[0] and region[1] <= box[1] and region[2] >= box[2] and region[3] >= box[3]
+
+
+def detect_in_regions(model, img, regions, conf=0.3, imgsz=320, device=None):
+    """
+    只在候选区域的裁剪图上运行 YOLO
+    :return: 置信度最高的框 ((x1, y1, x2, y2), 置信度)，原图坐标；没有检测到返回 (None, 0.0)
+    """
+    best, best_conf = None, 0.0
+    for x1, y1, x2, y2 in regions:
+        kwargs = {"conf": conf, "imgsz": imgsz, "verbose": False}
+        if device is not None:
+            kwargs["device"] = device
+        boxes = model(np.ascontiguousarray(img[y1:y2, x1:x2]), **kwargs)[0].boxes
+        if len(boxes) == 0:
+            continue
+        i = int(boxes.conf.cpu().numpy().argmax())
+        score = float(boxes.conf[i])
+        if score > best_conf:
+            bx1, by1, bx2, by2 = boxes.xyxy[i].cpu().numpy().astype(int)
+            best, best_conf = (int(bx1) + x1, int(by1) + y1, int(bx2) + x1, int(by2) + y1), score
+    return best, best_conf
+
+
+def detect_with_gate(model, img, gate, conf=0.3, imgsz=320, device=None, fallback_full=False):
+    """
+    预筛 + 裁剪检测
+    :param fallback_full: 没有候选区域时是否退回全图检测（False 表示直接跳过 YOLO）
+    :return: (车牌框, 置信度, 候选区域列表)
+    """
+    regions = gate.propose(img)
+    if not regions:
+        if not fallback_full:
+            return None, 0.0, regions
+        h, w = img.shape[:2]
+        box, score = detect_in_regions(model, img, [(0, 0, w, h)], conf, 640, device)
+        return box, score, regions
+    box, score = detect_in_regions(model, img, regions, conf, imgsz, device)
+    return box, score, regions
+
+
+def _full_detect(model, img, conf, device):
+    kwargs = {"conf": conf, "verbose": False}
+    if device is not None:
+        kwargs["device"] = device
+    boxes = model(img, **kwargs)[0].boxes
+    if len(boxes) == 0:
+        return None
+    i = int(boxes.conf.cpu().numpy().argmax())
+    return tuple(int(v) for v in boxes.xyxy[i].cpu().numpy().astype(int))
+
+
+def evaluate(samples, gate, model=None, conf=0.3, imgsz=320, device=None):
+    """在 CCPD 样本上评估预筛（以及可选的检测加速比）"""
+    from ccpd_eval import box_iou
+    from stage_timing import percentile
+
+    covered = empty = proposals = 0
+    gate_ms, full_ms, gated_ms = [], [], []
+    full_hits = gated_hits = 0
+    for path, truth in samples:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        t = time.perf_counter()
+        regions = gate.propose(img)
+        gate_ms.append((time.perf_counter() - t) * 1000)
+        proposals += len(regions)
+        empty += not regions
+        covered += any(covers(r, truth["box"]) for r in regions)
+        if model is None:
+            continue
+        t = time.perf_counter()
+        box = _full_detect(model, img, conf, device)
+        full_ms.append((time.perf_counter() - t) * 1000)
+        full_hits += box is not None and box_iou(box, truth["box"]) >= 0.5
+        t = time.perf_counter()
+        box, _ = detect_in_regions(model, img, regions, conf, imgsz, device)
+        gated_ms.append((time.perf_counter() - t) * 1000 + gate_ms[-1])
+        gated_hits += box is not None and box_iou(box, truth["box"]) >= 0.5
+
+    n = len(gate_ms)
+    report = {
+        "images": n,
+        "gate_recall": round(covered / max(n, 1), 4),
+        "empty_rate": round(empty / max(n, 1), 4),
+        "proposals_per_image": round(proposals / max(n, 1), 2),
+        "gate_p50_ms": round(percentile(sorted(gate_ms), 50), 2),
+        "gate_p95_ms": round(percentile(sorted(gate_ms), 95), 2),
+    }
+    if model is not None and n:
+        report.update({
+            "full_recall": round(full_hits / n, 4),
+            "gated_recall": round(gated_hits / n, 4),
+            "full_mean_ms": round(sum(full_ms) / n, 2),
+            "gated_mean_ms": round(sum(gated_ms) / n, 2),
+            "speedup": round(sum(full_ms) / max(sum(gated_ms), 1e-9), 2),
+        })
+    return report
+
+
+def add_gate_args(parser):
+    """给命令行脚本添加预筛参数"""
+    group = parser.add_argument_group("车牌颜色预筛")
+    group.add_argument("--gate-width", type=int, default=320, help="预筛处理宽度（像素）")
+    group.add_argument("--gate-colors", type=str, default="blue,yellow,green", help="车牌颜色（逗号分隔）")
+    group.add_argument("--gate-pad", type=float, default=0.6, help="候选框每边扩展比例")
+    group.add_argument("--gate-min-fill", type=float, default=0.4, help="最低矩形度")
+    group.add_argument("--gate-edge", type=int, default=80, help="竖直边缘强度阈值（0 表示只用颜色）")
+    return parser
+
+
+def gate_from_args(args):
+    colors = tuple(c.strip() for c in args.gate_colors.split(",") if c.strip())
+    return PlateGate(args.gate_width, colors, min_fill=args.gate_min_fill, edge_thresh=args.gate_edge,
+                     pad=args.gate_pad)
+
+
+def main():
+    from ccpd_eval import load_testset
+
+    parser = argparse.ArgumentParser(description="车牌颜色预筛评估（召回率 / 加速比）")
+    parser.add_argument("--data", type=str, required=True, help="CCPD 图片目录或 splits/test.txt")
+    parser.add_argument("--limit", type=int, default=0, help="最多评估多少张（0 表示全部）")
+    parser.add_argument("--model", type=str, default=None, help="检测模型（指定时对比全图检测和裁剪检测）")
+    parser.add_argument("--conf", type=float, default=0.3, help="检测置信度阈值")
+    parser.add_argument("--imgsz", type=int, default=320, help="裁剪检测的输入尺寸")
+    parser.add_argument("--device", type=str, default=None, help="推理设备")
+    parser.add_argument("--out", type=str, default=None, help="结果 JSON 输出路径")
+    add_gate_args(parser)
+    args = parser.parse_args()
+
+    samples = load_testset(args.data, args.limit)
+    if not samples:
+        print(f"❌ {args.data} 中没有 CCPD 格式的图片")
+        return
+    model = None
+    if args.model:
+        from model_store import load_model
+        model = load_model(args.model)
+    report = evaluate(samples, gate_from_args(args), model, args.conf, args.imgsz, args.device)
+
+    print("=" * 60)
+    print(f"📊 {report['images']} 张图片：预筛召回率 {report['gate_recall'] * 100:.1f}%，"
+          f"无候选 {report['empty_rate'] * 100:.1f}%，平均每张 {report['proposals_per_image']} 个候选，"
+          f"预筛 p50 {report['gate_p50_ms']} ms")
+    if "speedup" in report:
+        print(f"🔍 检测召回率：全图 {report['full_recall'] * 100:.1f}% -> 预筛 {report['gated_recall'] * 100:.1f}%")
+        print(f"⚡ 检测耗时：全图 {report['full_mean_ms']} ms -> 预筛 + 裁剪 {report['gated_mean_ms']} ms"
+              f"（{report['speedup']}x）")
+    print("=" * 60)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存：{args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+轻量标注绘制（原地绘制、复用缓冲区、可整体关闭）
+
+results[0].plot() 每一帧都会复制一整帧再画框；lzao.py 为了半透明文字背景每个车牌都
+overlay = image.copy() 再整帧 addWeighted。PlateRenderer 的做法：
+- 默认直接画在传入的帧上（视频/摄像头循环里原始帧画完就不再使用）
+- 需要保留原始帧时（in_place=False），复制到一个预先分配、按尺寸复用的缓冲区里再画
+- 半透明背景只对标签矩形这一小块区域做混合，不复制整帧
+- enabled=False 时什么都不画，直接返回原帧（无界面、不保存图片的运行）
+"""
+
+import cv2
+import numpy as np
+
+from plate_ocr import result_boxes
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def blend_rect(img, x1, y1, x2, y2, alpha=0.6):
+    """
+    把矩形区域向黑色混合（半透明黑底），只处理该区域，原地修改
+    :param alpha: 黑色背景的不透明度
+    """
+    h, w = img.shape[:2]
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(w, int(x2)), min(h, int(y2))
+    if x2 <= x1 or y2 <= y1:
+        return img
+    roi = img[y1:y2, x1:x2]
+    cv2.convertScaleAbs(roi, roi, 1.0 - alpha, 0)
+    return img
+
+
+class PlateRenderer:
+    """
+    检测结果绘制器
+    :param enabled: False 时不绘制（无界面运行）
+    :param in_place: True 直接画在输入帧上；False 复制到复用缓冲区后再画（输入帧保持不变）
+    :param label_alpha: 标签背景不透明度（0 表示不画背景）
+    """
+
+    def __init__(self, enabled=True, in_place=True, box_color=(0, 255, 0), text_color=(255, 255, 255),
+                 thickness=2, font_scale=0.6, label_alpha=0.6):
+        self.enabled = enabled
+        self.in_place = in_place
+        self.box_color = box_color
+        self.text_color = text_color
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self.label_alpha = label_alpha
+        self._buffer = None
+
+    def _target(self, frame):
+        if self.in_place:
+            return frame
+        if self._buffer is None or self._buffer.shape != frame.shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty_like(frame)
+        np.copyto(self._buffer, frame)
+        return self._buffer
+
+    def draw_label(self, img, text, x, y, color=None, font_scale=None, thickness=None):
+        """
+        在 (x, y) 左下角画一行文字，带半透明黑色背景
+        文字超出图像上边界时自动移到 y 以下
+        """
+        font_scale = font_scale or self.font_scale
+        thickness = thickness or max(1, self.thickness - 1)
+        (tw, th), baseline = cv2.getTextSize(text, FONT, font_scale, thickness)
+        if y - th - baseline < 0:
+            y = th + baseline
+        x = min(max(0, x), max(0, img.shape[1] - tw))
+        if self.label_alpha > 0:
+            blend_rect(img, x - 2, y - th - baseline, x + tw + 2, y + baseline, self.label_alpha)
+        cv2.putText(img, text, (x, y), FONT, font_scale, color or self.text_color, thickness, cv2.LINE_AA)
+        return img
+
+    def render(self, frame, boxes, labels=None, info=None):
+        """
+        绘制检测框
+        :param boxes: [(x1, y1, x2, y2, conf), ...]
+        :param labels: 每个框的标签（None 时显示置信度）
+        :param info: 左上角的信息行（如 FPS、检测数量）
+        :return: 绘制后的图像（enabled=False 时原样返回输入帧）
+        """
+        if not self.enabled:
+            return frame
+        img = self._target(frame)
+        for i, box in enumerate(boxes):
+            x1, y1, x2, y2 = (int(v) for v in box[:4])
+            cv2.rectangle(img, (x1, y1), (x2, y2), self.box_color, self.thickness)
+            label = labels[i] if labels is not None else f"{box[4]:.2f}"
+            if label:
+                self.draw_label(img, label, x1, y1 - 4)
+        y = 0
+        for line in info or ():
+            (_, th), baseline = cv2.getTextSize(line, FONT, self.font_scale * 1.4, self.thickness)
+            y += th + baseline + 6
+            self.draw_label(img, line, 10, y, color=self.box_color,
+                            font_scale=self.font_scale * 1.4, thickness=self.thickness)
+        return img
+
+    def render_result(self, frame, result, info=None, show_names=True):
+        """绘制 ultralytics 的检测结果（替代 result.plot()）"""
+        if not self.enabled:
+            return frame
+        boxes = result_boxes(result)
+        labels = None
+        names = getattr(result, "names", None)
+        if show_names and names and boxes:
+            classes = result.boxes.cls.cpu().numpy().astype(int)
+            labels = [f"{names.get(int(c), c)} {b[4]:.2f}" for c, b in zip(classes, boxes)]
+        return self.render(frame, boxes, labels, info)
@@ -0,0 +1,226 @@
+"""
+车牌识别 HTTP 服务（Flask + 动态微批处理）
+
+接口：
+    POST /recognize   上传图片（multipart 字段 image，或直接把图片字节作为请求体）
+                      返回 {"plates": [{"box": [x1, y1, x2, y2], "det_conf", "plate", "confidence"}, ...],
+                            "batch_size", "timings": {...}}
+    GET  /stats       队列深度、批大小分布、平均排队/推理耗时
+    GET  /health      健康检查
+
+并发请求先进入 MicroBatcher 队列，凑成一批后 YOLO 一次检测整批图片、
+PaddleOCR 一次识别整批车牌裁剪图，固定开销按批分摊。
+
+用法：
+    python plate_service.py serve --model best.pt --port 8000 --max-batch 8 --max-wait-ms 10
+    python plate_service.py bench --url http://127.0.0.1:8000 --image test.jpg --concurrency 16 --requests 400
+（启动时加 --max-batch 1 即为"一个请求推理一次"，可以用 bench 对比两种模式的吞吐量）
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from micro_batcher import MicroBatcher, QueueFullError
+from model_store import load_model
+from runtime_profile import load_profile
+from plate_ocr import PlateReader, crop_plate, result_boxes
+
+
+class PlateRecognizer:
+    """
+    批量车牌识别（YOLO 检测 + PaddleOCR 识别）
+    :param model_path: YOLO 车牌检测模型
+    :param conf: 检测置信度阈值
+    :param rec_model_dir: PaddleOCR 识别模型目录
+    :param expand: 车牌框向外扩展的像素
+    """
+
+    def __init__(self, model_path, conf=0.3, rec_model_dir=None, expand=4, device=None):
+        self.model = load_model(model_path)
+        self.conf = conf
+        self.expand = expand
+        self.device = device
+        self.reader = PlateReader(rec_model_dir=rec_model_dir)
+
+    def warmup(self):
+        """预热：第一次推理会初始化模型和 OCR，避免算进第一个请求"""
+        self.recognize_batch([np.zeros((640, 640, 3), dtype=np.uint8)])
+        self.reader.read(np.zeros((48, 160, 3), dtype=np.uint8))
+
+    def recognize_batch(self, imgs):
+        """识别一批图片，返回每张图片的结果字典"""
+        t0 = time.perf_counter()
+        kwargs = {"conf": self.conf, "verbose": False}
+        if self.device:
+            kwargs["device"] = self.device
+        results = self.model(imgs, **kwargs)
+        t1 = time.perf_counter()
+
+        # 整批图片的所有车牌裁剪图一次交给 OCR
+        outputs, crops, owners = [], [], []
+        for img, result in zip(imgs, results):
+            plates = []
+            for box in result_boxes(result):
+                crop = crop_plate(img, box, self.expand)
+                if crop is None:
+                    continue
+                plates.append({"box": list(box[:4]), "det_conf": round(box[4], 4),
+                               "plate": "", "confidence": 0.0})
+                crops.append(crop)
+                owners.append(plates[-1])
+            outputs.append(plates)
+        for plate, (text, conf) in zip(owners, self.reader.read_batch(crops)):
+            plate["plate"] = text
+            plate["confidence"] = round(conf, 4)
+        t2 = time.perf_counter()
+
+        timings = {"detect_ms": round((t1 - t0) * 1000, 2), "ocr_ms": round((t2 - t1) * 1000, 2)}
+        return [{"plates": plates, "batch_size": len(imgs), "timings": timings} for plates in outputs]
+
+
+def decode_image(data):
+    """把上传的图片字节解码成 BGR 图像，失败返回 None"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def create_app(batcher, timeout=30.0):
+    """
+    创建 Flask 应用
+    :param batcher: MicroBatcher（process_fn 接收图片列表）
+    :param timeout: 单个请求最长等待时间（秒）
+    """
+    from flask import Flask, jsonify, request
+
+    app = Flask(__name__)
+    started = time.time()
+
+    @app.route("/recognize", methods=["POST"])
+    def recognize():
+        t0 = time.perf_counter()
+        upload = request.files.get("image")
+        img = decode_image(upload.read() if upload is not None else request.get_data())
+        if img is None:
+            return jsonify({"error": "无法解码图片（multipart 字段 image 或请求体为图片字节）"}), 400
+        try:
+            future = batcher.submit(img)
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 503
+        try:
+            result = future.result(timeout=timeout)
+        except Exception as e:
+            return jsonify({"error": f"识别失败：{e}"}), 500
+        result = dict(result, total_ms=round((time.perf_counter() - t0) * 1000, 2))
+        return jsonify(result)
+
+    @app.route("/stats")
+    def stats():
+        data = batcher.stats.as_dict()
+        data.update(queue_depth=batcher.queue_depth, max_batch=batcher.max_batch,
+                    max_wait_ms=round(batcher.max_wait * 1000, 2),
+                    uptime_s=round(time.time() - started, 1))
+        return jsonify(data)
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "healthy"})
+
+    return app
+
+
+def run_bench(url, image_path, concurrency=16, requests=400):
+    """
+    并发压测 /recognize，打印吞吐量和延迟分位数
+    """
+    with open(image_path, "rb") as f:
+        data = f.read()
+    endpoint = url.rstrip("/") + "/recognize"
+
+    def one(_):
+        t = time.perf_counter()
+        req = urllib.request.Request(endpoint, data=data, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                resp.read()
+                ok = resp.status == 200
+        except Exception:
+            ok = False
+        return ok, (time.perf_counter() - t) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(ms for ok, ms in results if ok)
+    failed = len(results) - len(latencies)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+
+    print(f"📊 {requests} 个请求，并发 {concurrency}，耗时 {elapsed:.2f} 秒，失败 {failed}")
+    print(f"   吞吐量：{len(latencies) / elapsed:.1f} 请求/秒")
+    print(f"   延迟：p50 {pct(0.5):.1f} ms | p95 {pct(0.95):.1f} ms | p99 {pct(0.99):.1f} ms")
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/stats", timeout=10) as resp:
+            stats = json.loads(resp.read())
+        print(f"   服务端：平均批大小 {stats['avg_batch_size']}，批大小分布 {stats['batch_size_hist']}")
+    except Exception:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车牌识别 HTTP 服务（动态微批处理）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="启动服务")
+    serve.add_argument("--model", type=str, required=True, help="YOLO 车牌检测模型路径")
+    serve.add_argument("--host", type=str, default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--conf", type=float, default=0.3, help="检测置信度阈值")
+    serve.add_argument("--device", type=str, default=None,
+                       help="推理设备，如 cpu / 0（默认用运行时配置里实测最快的设备）")
+    serve.add_argument("--rec-model-dir", type=str, default=None, help="PaddleOCR 识别模型目录")
+    serve.add_argument("--max-batch", type=int, default=None,
+                       help="每批最多多少张图片（1 表示不合批，默认用运行时配置的批大小，没有配置时为 8）")
+    serve.add_argument("--max-wait-ms", type=float, default=10, help="凑批最长等待时间（毫秒）")
+    serve.add_argument("--max-queue", type=int, default=256, help="等待队列上限，超过返回 503")
+
+    bench = sub.add_parser("bench", help="并发压测")
+    bench.add_argument("--url", type=str, default="http://127.0.0.1:8000")
+    bench.add_argument("--image", type=str, required=True, help="压测用图片")
+    bench.add_argument("--concurrency", type=int, default=16)
+    bench.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        run_bench(args.url, args.image, args.concurrency, args.requests)
+        return
+
+    # 运行时配置（gpu_test.py --profile）：命令行没指定时用实测的设备、线程数和批大小
+    profile = load_profile()
+    if profile is not None:
+        profile.apply()
+        args.device = args.device or profile.device
+    args.max_batch = args.max_batch or (profile.batch if profile is not None else 8)
+
+    recognizer = PlateRecognizer(args.model, args.conf, args.rec_model_dir, device=args.device)
+    recognizer.warmup()
+    batcher = MicroBatcher(recognizer.recognize_batch, args.max_batch, args.max_wait_ms, args.max_queue)
+    app = create_app(batcher)
+    print(f"✅ 服务已启动：http://{args.host}:{args.port}（max_batch={args.max_batch}，"
+          f"max_wait={args.max_wait_ms}ms）")
+    # threaded=True：每个请求一个线程，并发请求才能在队列里合并成批
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
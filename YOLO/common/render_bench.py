@@ -0,0 +1,125 @@
+"""
+标注绘制耗时对比
+
+比较每帧绘制耗时：
+    plot 方式      整帧复制后画框和标签（results[0].plot() 的做法）
+    overlay 方式   每个标签 overlay = image.copy() + 整帧 addWeighted（lzao.py 原来的做法）
+    PlateRenderer  原地绘制 / 复用缓冲区，只混合标签区域
+    关闭绘制        enabled=False
+指定 --model 和 --image 时，额外测一次真实的 result.plot()。
+
+用法：
+    python render_bench.py --width 1920 --height 1080 --boxes 3 --frames 300
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from plate_renderer import FONT, PlateRenderer
+
+
+def make_boxes(width, height, count, seed=0):
+    rng = np.random.default_rng(seed)
+    boxes = []
+    for _ in range(count):
+        w, h = int(width * 0.12), int(height * 0.05)
+        x1 = int(rng.integers(0, width - w))
+        y1 = int(rng.integers(40, height - h))
+        boxes.append((x1, y1, x1 + w, y1 + h, float(rng.uniform(0.5, 0.99))))
+    return boxes
+
+
+def draw_plot_style(frame, boxes):
+    """整帧复制后绘制"""
+    img = frame.copy()
+    for x1, y1, x2, y2, conf in boxes:
+        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        label = f"plate {conf:.2f}"
+        (tw, th), _ = cv2.getTextSize(label, FONT, 0.6, 1)
+        cv2.rectangle(img, (x1, y1 - th - 6), (x1 + tw, y1), (0, 255, 0), -1)
+        cv2.putText(img, label, (x1, y1 - 4), FONT, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+    return img
+
+
+def draw_overlay_style(frame, boxes):
+    """每个标签整帧复制 + 整帧混合"""
+    img = frame.copy()
+    for x1, y1, x2, y2, conf in boxes:
+        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 3)
+        label = f"plate {conf:.2f}"
+        (tw, th), _ = cv2.getTextSize(label, FONT, 0.6, 1)
+        overlay = img.copy()
+        cv2.rectangle(overlay, (x1 - 10, y1 - th - 15), (x1 + tw + 10, y1 + 15), (0, 0, 0), -1)
+        img = cv2.addWeighted(overlay, 0.7, img, 0.3, 0)
+        cv2.putText(img, label, (x1, y1 - 4), FONT, 0.6, (0, 255, 255), 1)
+    return img
+
+
+def time_it(fn, frames, boxes):
+    """返回每帧耗时（毫秒）的 (平均值, p95)"""
+    samples = []
+    for frame in frames:
+        t = time.perf_counter()
+        fn(frame, boxes)
+        samples.append((time.perf_counter() - t) * 1000)
+    samples.sort()
+    return sum(samples) / len(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标注绘制耗时对比")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--boxes", type=int, default=3, help="每帧车牌框数量")
+    parser.add_argument("--frames", type=int, default=300, help="测试帧数")
+    parser.add_argument("--model", type=str, default=None, help="YOLO 模型（可选，测试真实的 result.plot()）")
+    parser.add_argument("--image", type=str, default=None, help="配合 --model 使用的测试图片")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    # 少量不同的帧循环使用，避免缓存效果过于理想
+    pool = [rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+    boxes = make_boxes(args.width, args.height, args.boxes)
+
+    def fresh_frames():
+        # 原地绘制会修改帧，每个方案都用新复制的帧（复制不计入耗时）
+        return [pool[i % len(pool)].copy() for i in range(args.frames)]
+
+    in_place = PlateRenderer()
+    buffered = PlateRenderer(in_place=False)
+    disabled = PlateRenderer(enabled=False)
+    cases = [
+        ("plot 方式（整帧复制）", draw_plot_style),
+        ("overlay 方式（每个标签整帧混合）", draw_overlay_style),
+        ("PlateRenderer 原地绘制", lambda f, b: in_place.render(f, b, info=["FPS: 30"])),
+        ("PlateRenderer 复用缓冲区", lambda f, b: buffered.render(f, b, info=["FPS: 30"])),
+        ("关闭绘制", lambda f, b: disabled.render(f, b)),
+    ]
+
+    print(f"帧尺寸 {args.width}x{args.height}，每帧 {args.boxes} 个框，{args.frames} 帧")
+    baseline = None
+    for name, fn in cases:
+        mean, p95 = time_it(fn, fresh_frames(), boxes)
+        baseline = baseline or mean
+        print(f"   {name}: 平均 {mean:.3f} ms | p95 {p95:.3f} ms | 相对 plot 方式 {mean / baseline * 100:.0f}%")
+
+    if args.model and args.image:
+        from model_store import load_model
+        result = load_model(args.model)(args.image, verbose=False)[0]
+        samples = []
+        for _ in range(min(args.frames, 100)):
+            t = time.perf_counter()
+            result.plot()
+            samples.append((time.perf_counter() - t) * 1000)
+        renderer = PlateRenderer()
+        frame = result.orig_img
+        mean_r, _ = time_it(lambda f, b: renderer.render_result(f, result), [frame.copy() for _ in range(len(samples))], None)
+        print(f"   真实 result.plot(): 平均 {sum(samples) / len(samples):.3f} ms | "
+              f"PlateRenderer.render_result: 平均 {mean_r:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+摄像头录制 / 回放输入源（没有摄像头也能测摄像头链路的延迟和丢帧）
+
+run_camera_inference、detect_camera、yolov8_realtime_inference 的 --source 0 只能接真摄像头，
+CI 和没有显示器的服务器上测不了性能。这里把一次摄像头会话录到磁盘（带每帧的原始采集时间），
+之后按原来的节奏回放，接口和 cv2.VideoCapture 一样：
+
+    会话目录/
+        frames.avi          帧（MJPG，导入视频时不复制，直接引用原视频）
+        timestamps.txt      每帧的采集时间（秒，相对第一帧）
+        meta.json           来源、分辨率、帧数、名义 FPS
+
+回放速度写在输入源后面：
+    sessions/day1           按原始时间间隔实时回放（帧按录制时的节奏"产生"）
+    sessions/day1@4         4 倍速回放
+    sessions/day1@fast      不等待，尽快读（测最大吞吐）
+
+实时 / 加速回放时模拟摄像头驱动的缓冲：帧按时间表产生，读得慢时只保留最新的 buffer 帧
+（默认 4，和 V4L2 默认缓冲数一样），更早的帧计入 dropped。read() 返回的帧的"采集时间"
+记录在 last_capture_time，处理完用它算采集 -> 出结果的延迟。
+
+camera_pipeline.open_source、LatestFrameCapture 和 test02 都通过 open_source() 打开输入源，
+会话目录可以直接当 --source / --camera-source 传入。
+
+用法：
+    python replay_source.py record --source 0 --out sessions/day1 --seconds 60
+    python replay_source.py import --video test.mp4 --out sessions/ci --jitter-ms 3
+    python replay_source.py info sessions/day1
+    python replay_source.py bench sessions/day1 --model best.pt --speed 1 --mode direct
+    python replay_source.py bench sessions/day1 --work-ms 80 --mode latest
+"""
+
+import argparse
+import bisect
+import json
+import os
+import random
+import time
+
+import cv2
+
+# 会话输入源的解析不依赖 cv2，放在 replay_spec.py（客户端可以单独导入）
+from replay_spec import META_NAME, parse_source, source_arg
+
+TIMESTAMPS_NAME = "timestamps.txt"
+FRAMES_NAME = "frames.avi"
+DEFAULT_BUFFER = 4
+
+
+def open_source(source):
+    """摄像头编号 / 视频文件 / 回放会话（"目录@速度"） -> 打开的 capture 对象"""
+    path, speed = parse_source(source)
+    if path is not None:
+        return ReplayCapture(path, speed)
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+
+
+def load_session(path):
+    """读取会话的 meta 和时间戳（相对第一帧，秒）"""
+    with open(os.path.join(path, META_NAME), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(os.path.join(path, TIMESTAMPS_NAME), "r", encoding="utf-8") as f:
+        stamps = [float(line) for line in f if line.strip()]
+    if stamps:
+        stamps = [t - stamps[0] for t in stamps]
+    return meta, stamps
+
+
+def _write_session(out_dir, meta, stamps):
+    with open(os.path.join(out_dir, TIMESTAMPS_NAME), "w", encoding="utf-8") as f:
+        f.writelines(f"{t:.6f}\n" for t in stamps)
+    meta = dict(meta, frames=len(stamps),
+                duration_s=round(stamps[-1], 3) if stamps else 0.0,
+                fps=round((len(stamps) - 1) / stamps[-1], 3) if len(stamps) > 1 and stamps[-1] > 0
+                else meta.get("fps"))
+    with open(os.path.join(out_dir, META_NAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def record_session(source, out_dir, seconds=None, max_frames=None, quality=90, show=False):
+    """
+    录制摄像头会话：逐帧读取，记录 read() 返回时的时间，帧写成 MJPG
+    :param seconds: 录制时长（None 表示直到读不到帧，或显示窗口里按 q）
+    :param max_frames: 最多录多少帧
+    """
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not cap.isOpened():
+        raise IOError(f"无法打开输入源 {source}")
+    os.makedirs(out_dir, exist_ok=True)
+    nominal_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    writer = None
+    width = height = 0
+    stamps = []
+    start = time.perf_counter()
+    try:
+        while True:
+            ok, frame = cap.read()
+            t = time.perf_counter() - start
+            if not ok or (seconds is not None and t > seconds):
+                break
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(os.path.join(out_dir, FRAMES_NAME), cv2.VideoWriter_fourcc(*"MJPG"),
+                                         nominal_fps, (frame.shape[1], frame.shape[0]))
+                writer.set(cv2.VIDEOWRITER_PROP_QUALITY, quality)
+            writer.write(frame)
+            stamps.append(t)
+            if show:
+                cv2.imshow("录制中（按 q 结束）", frame)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+            if max_frames and len(stamps) >= max_frames:
+                break
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+        if show:
+            cv2.destroyAllWindows()
+    if not stamps:
+        raise IOError(f"没有从 {source} 读到任何帧")
+    return _write_session(out_dir, {"source": str(source), "video": FRAMES_NAME, "width": width,
+                                    "height": height, "nominal_fps": nominal_fps,
+                                    "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S")}, stamps)
+
+
+def import_video(video_path, out_dir, fps=None, jitter_ms=0.0, seed=0):
+    """
+    把视频文件导入成回放会话（不复制帧，时间戳按 FPS 生成，可加随机抖动模拟 USB 摄像头）
+    :param fps: 模拟的摄像头帧率（默认用视频自己的 FPS）
+    :param jitter_ms: 每帧采集时间的随机抖动（毫秒）
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频 {video_path}")
+    fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    count = 0
+    while cap.grab():  # 逐帧数一遍，CAP_PROP_FRAME_COUNT 对部分格式不准
+        count += 1
+    cap.release()
+    rng = random.Random(seed)
+    stamps = []
+    for i in range(count):
+        t = i / fps + (rng.uniform(-jitter_ms, jitter_ms) / 1000 if jitter_ms else 0.0)
+        stamps.append(max(t, stamps[-1] + 1e-4 if stamps else 0.0))
+    os.makedirs(out_dir, exist_ok=True)
+    return _write_session(out_dir, {"source": os.path.abspath(video_path), "video": os.path.abspath(video_path),
+                                    "width": width, "height": height, "nominal_fps": fps,
+                                    "jitter_ms": jitter_ms}, stamps)
+
+
+class ReplayCapture:
+    """
+    回放会话，接口和 cv2.VideoCapture 一样（read / grab / get / set / isOpened / release）
+    :param path: 会话目录
+    :param speed: 回放倍速（1 实时，4 四倍速，0 不等待尽快读）
+    :param buffer: 模拟的驱动缓冲帧数，读得慢时只保留最新的 buffer 帧（0 / None 表示不丢帧）
+    :param loop: 读完后从头循环（时间轴继续往后走）
+    """
+
+    def __init__(self, path, speed=1.0, buffer=DEFAULT_BUFFER, loop=False):
+        self.path = path
+        self.speed = speed
+        self.buffer = buffer
+        self.loop = loop
+        self.meta, self.timestamps = load_session(path)
+        video = self.meta["video"]
+        self._video_path = video if os.path.isabs(video) else os.path.join(path, video)
+        self._video = cv2.VideoCapture(self._video_path)
+        self._index = 0             # 下一帧在时间表里的序号
+        self._t0 = None             # 第一帧"产生"的时刻
+        self._offset = 0.0          # 循环回放时累计的时间轴偏移
+        self.delivered = 0
+        self.dropped = 0
+        self.last_capture_time = None
+
+    def isOpened(self):
+        return self._video.isOpened() and bool(self.timestamps)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.meta.get("fps") or self.meta.get("nominal_fps") or 30.0)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.meta["width"])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.meta["height"])
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.timestamps))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._index)
+        return self._video.get(prop)
+
+    def set(self, prop, value):
+        return prop == cv2.CAP_PROP_BUFFERSIZE  # 缓冲大小由 buffer 参数决定，其他属性不支持
+
+    def _due(self, index):
+        """第 index 帧"产生"的时刻"""
+        return self._t0 + (self._offset + self.timestamps[index]) / self.speed
+
+    def _rewind(self):
+        period = self.timestamps[-1] + (self.timestamps[-1] / max(len(self.timestamps) - 1, 1))
+        self._offset += period
+        self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._index = 0
+
+    def _skip_stale(self):
+        """读得比产生慢时，丢掉缓冲装不下的旧帧"""
+        elapsed = (time.time() - self._t0) * self.speed - self._offset
+        produced = bisect.bisect_right(self.timestamps, elapsed)
+        keep_from = produced - self.buffer
+        while self._index < keep_from:
+            if not self._video.grab():
+                break
+            self._index += 1
+            self.dropped += 1
+
+    def grab(self):
+        if self._t0 is None:
+            self._t0 = time.time()
+        if self._index >= len(self.timestamps):
+            if not self.loop:
+                return False
+            self._rewind()
+        if self.speed > 0:
+            if self.buffer:
+                self._skip_stale()
+                if self._index >= len(self.timestamps):
+                    return self.grab()
+            wait = self._due(self._index) - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self.last_capture_time = self._due(self._index)
+        else:
+            self.last_capture_time = time.time()
+        ok = self._video.grab()
+        self._index += 1
+        if ok:
+            self.delivered += 1
+        return ok
+
+    def retrieve(self):
+        return self._video.retrieve()
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self._video.retrieve()
+
+    def release(self):
+        self._video.release()
+
+
+def bench_camera_loop(source, mode="direct", work=None, work_ms=0.0, window=100000):
+    """
+    跑一遍摄像头循环（读帧 -> 处理），统计采集 -> 出结果延迟、处理帧率、丢帧
+    :param mode: direct 直接 read()（驱动缓冲模拟）/ latest 后台线程只取最新帧（LatestFrameCapture）
+    :param work: 每帧的处理函数 work(frame)，None 时 sleep(work_ms)
+    """
+    from latest_frame_capture import LatestFrameCapture
+    from stage_timing import percentile
+
+    process = work or (lambda frame: time.sleep(work_ms / 1000))
+    latencies = []
+    start = time.time()
+    if mode == "latest":
+        cap = LatestFrameCapture(source, window=window).start()
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            process(frame)
+            cap.mark_result()
+        cap.release()
+        s = cap.summary()
+        latencies = sorted(cap.latencies)
+        captured, processed, dropped = s["captured"], s["delivered"], s["dropped"]
+    else:
+        cap = open_source(source)
+        processed = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t_capture = getattr(cap, "last_capture_time", None) or time.time()
+            process(frame)
+            latencies.append((time.time() - t_capture) * 1000)
+            processed += 1
+        cap.release()
+        latencies.sort()
+        dropped = getattr(cap, "dropped", 0)
+        captured = processed + dropped
+    elapsed = max(time.time() - start, 1e-6)
+    return {
+        "source": str(source),
+        "mode": mode,
+        "frames": captured,
+        "processed": processed,
+        "dropped": dropped,
+        "processed_fps": round(processed / elapsed, 1),
+        "latency_p50_ms": round(percentile(latencies, 50), 1),
+        "latency_p95_ms": round(percentile(latencies, 95), 1),
+        "latency_max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="摄像头会话录制 / 回放 / 基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("record", help="录制摄像头会话")
+    p.add_argument("--source", type=str, default="0", help="摄像头编号或流地址")
+    p.add_argument("--out", type=str, required=True, help="会话目录")
+    p.add_argument("--seconds", type=float, default=None, help="录制时长（秒）")
+    p.add_argument("--max-frames", type=int, default=None, help="最多录多少帧")
+    p.add_argument("--show", action="store_true", help="显示录制画面（按 q 结束）")
+    p = sub.add_parser("import", help="把视频文件导入成回放会话（CI 用）")
+    p.add_argument("--video", type=str, required=True, help="视频文件")
+    p.add_argument("--out", type=str, required=True, help="会话目录")
+    p.add_argument("--fps", type=float, default=None, help="模拟的摄像头帧率（默认视频 FPS）")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="采集时间随机抖动（毫秒）")
+    p = sub.add_parser("info", help="查看会话信息")
+    p.add_argument("session", type=str)
+    p = sub.add_parser("bench", help="回放会话跑摄像头循环，统计延迟和丢帧")
+    p.add_argument("session", type=str, help="会话目录")
+    p.add_argument("--speed", type=str, default="1", help="回放倍速（1 实时，4 四倍速，fast 尽快读）")
+    p.add_argument("--mode", choices=("direct", "latest", "both"), default="both",
+                   help="direct 直接 read() / latest 只取最新帧 / both 两种都跑")
+    p.add_argument("--model", type=str, default=None, help="检测模型（不给时用 --work-ms 模拟推理）")
+    p.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    p.add_argument("--device", type=str, default="cpu", help="推理设备")
+    p.add_argument("--work-ms", type=float, default=40.0, help="模拟每帧推理耗时（毫秒）")
+    p.add_argument("--out", type=str, default=None, help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        meta = record_session(args.source, args.out, args.seconds, args.max_frames, show=args.show)
+        print(f"✅ 已录制 {meta['frames']} 帧（{meta['duration_s']} 秒，实测 {meta['fps']} FPS）到 {args.out}")
+    elif args.command == "import":
+        meta = import_video(args.video, args.out, args.fps, args.jitter_ms)
+        print(f"✅ 已导入 {meta['frames']} 帧（{meta['duration_s']} 秒，{meta['fps']} FPS）到 {args.out}")
+    elif args.command == "info":
+        meta, stamps = load_session(args.session)
+        gaps = sorted(b - a for a, b in zip(stamps, stamps[1:]))
+        print(json.dumps(meta, ensure_ascii=False, indent=2))
+        if gaps:
+            print(f"📊 帧间隔：中位数 {gaps[len(gaps) // 2] * 1000:.1f} ms，最大 {gaps[-1] * 1000:.1f} ms")
+    else:
+        work = None
+        if args.model:
+            from model_store import load_model
+            model = load_model(args.model)
+            work = lambda frame: model(frame, conf=args.conf, device=args.device, verbose=False)
+        try:
+            source = source_arg(f"{args.session}@{args.speed}")
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        modes = ("direct", "latest") if args.mode == "both" else (args.mode,)
+        rows = [bench_camera_loop(source, mode, work, args.work_ms) for mode in modes]
+        print("=" * 60)
+        pace = "尽快读" if args.speed == "fast" else f"{args.speed} 倍速"
+        print(f"回放 {args.session}（{pace}，"
+              f"{'模型 ' + args.model if args.model else f'模拟推理 {args.work_ms:.0f} ms/帧'}）：")
+        for r in rows:
+            print(f"   {r['mode']:<7} 处理 {r['processed']}/{r['frames']} 帧（{r['processed_fps']} FPS），"
+                  f"丢帧 {r['dropped']}，延迟 p50 {r['latency_p50_ms']} ms | p95 {r['latency_p95_ms']} ms"
+                  f" | max {r['latency_max_ms']} ms")
+        print("=" * 60)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
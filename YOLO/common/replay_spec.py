@@ -0,0 +1,54 @@
+"""
+回放会话输入源的解析（只用 os，不导入 cv2 / numpy）
+
+replay_source.py 里的录制 / 回放要用 OpenCV；只需要判断 "--source 是不是摄像头" 的地方
+（inference_client.py 这类要求几十毫秒启动的客户端）从这里导入，不为这一个判断加载 cv2。
+
+    is_camera_source("0")                # 摄像头编号
+    is_camera_source("sessions/day1@4")  # 录制的摄像头会话，也按摄像头处理
+
+命令行的 --source 用 type=source_arg，速度写错（"sessions/day1@bogus"）时 argparse 直接报错退出。
+"""
+
+import argparse
+import os
+
+META_NAME = "meta.json"
+
+
+def parse_source(source):
+    """
+    "会话目录@速度" -> (会话目录, 速度)；速度 0 表示尽快读
+    不是回放会话时返回 (None, None)；速度无法解析时抛出 argparse.ArgumentTypeError
+    """
+    source = str(source)
+    path, _, speed = source.rpartition("@") if "@" in source else (source, "", "")
+    if not os.path.isfile(os.path.join(path, META_NAME)):
+        return None, None
+    if speed in ("", "realtime"):
+        return path, 1.0
+    if speed == "fast":
+        return path, 0.0
+    try:
+        value = float(speed.rstrip("xX"))
+    except ValueError:
+        value = -1.0
+    if not value >= 0:
+        raise argparse.ArgumentTypeError(
+            f"无效的回放速度 '{speed}'（{source}）：应为倍速数字（如 4 或 0.5x）、realtime 或 fast")
+    return path, value
+
+
+def source_arg(value):
+    """argparse 的 type：检查回放会话的速度写法，原样返回输入源"""
+    parse_source(value)
+    return value
+
+
+def is_replay(source):
+    return parse_source(source)[0] is not None
+
+
+def is_camera_source(source):
+    """摄像头编号或录制的摄像头会话（需要界面 / 按摄像头模式处理）"""
+    return str(source).isdigit() or is_replay(source)
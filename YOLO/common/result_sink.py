@@ -0,0 +1,243 @@
+"""
+结构化结果输出（流式写 JSONL，定期滚动压缩成 Parquet）
+
+每检测到一个车牌（或每处理完一张图片）就写一条记录，不在内存里攒结果：
+- 当前分片写 JSONL（prefix-part-00000.jsonl），每条记录一行
+- 写满 rollover_records 条后关闭分片，后台转换成 zstd 压缩的 Parquet（需要 pyarrow）
+  没装 pyarrow 时退化为 gzip 压缩的 JSONL
+- 内存占用只和单个分片大小有关，和整个运行的结果数量无关
+
+记录字段（扁平结构，方便直接转成表格）：
+    source        图片/视频文件
+    frame         视频帧号（图片为空）
+    timestamp     视频内时间（秒，图片为空）
+    x1 y1 x2 y2   车牌框
+    det_conf      检测置信度
+    plate         车牌号
+    confidence    OCR 置信度
+    status        结果状态（ok / no_plate / ocr_failed / error ...）
+    t_<阶段>_ms   各阶段耗时（毫秒），如 t_detect_ms、t_ocr_ms
+    processed_at  写入时间（Unix 时间戳）
+"""
+
+import glob
+import gzip
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    from pyarrow import json as pa_json
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def make_record(source, plate="", confidence=None, box=None, det_conf=None,
+                frame=None, timestamp=None, status="ok", timings=None, **extra):
+    """
+    生成一条扁平的结果记录
+    :param box: (x1, y1, x2, y2)，没有检测到时为 None
+    :param timings: {阶段名: 毫秒}，会展开成 t_<阶段>_ms 字段
+    :param extra: 其他需要保存的字段
+    """
+    record = {
+        "source": str(source),
+        "frame": frame,
+        "timestamp": None if timestamp is None else round(float(timestamp), 3),
+        "x1": None, "y1": None, "x2": None, "y2": None,
+        "det_conf": None if det_conf is None else round(float(det_conf), 4),
+        "plate": plate or "",
+        "confidence": None if confidence is None else round(float(confidence), 4),
+        "status": status,
+    }
+    if box is not None:
+        record["x1"], record["y1"], record["x2"], record["y2"] = (int(v) for v in box)
+    for stage, ms in (timings or {}).items():
+        record[f"t_{stage}_ms"] = round(float(ms), 3)
+    record.update(extra)
+    return record
+
+
+class ResultSink:
+    """
+    流式结果写入器
+    :param out_dir: 输出目录
+    :param prefix: 分片文件名前缀（多个进程写同一个目录时用不同前缀）
+    :param rollover_records: 每个分片的记录数
+    :param parquet: 是否把写满的分片转换成 Parquet（没装 pyarrow 时自动改为 gzip）
+    :param flush_every: 每多少条记录 flush 一次文件
+    """
+
+    def __init__(self, out_dir, prefix="results", rollover_records=100000,
+                 parquet=True, flush_every=100):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.rollover_records = rollover_records
+        self.parquet = parquet and HAS_PYARROW
+        self.flush_every = flush_every
+        self.total_records = 0
+        os.makedirs(out_dir, exist_ok=True)
+        self._part = self._next_part_index()
+        self._file = None
+        self._part_records = 0
+        self._converter = None
+        self._lock = threading.Lock()
+
+    def _next_part_index(self):
+        # 续写已有目录时从下一个分片号开始，不覆盖之前的结果
+        pattern = os.path.join(self.out_dir, f"{self.prefix}-part-*")
+        indexes = []
+        for path in glob.glob(pattern):
+            name = os.path.basename(path)
+            try:
+                indexes.append(int(name[len(self.prefix) + 6:].split(".")[0]))
+            except ValueError:
+                continue
+        return max(indexes) + 1 if indexes else 0
+
+    def _part_path(self, index, ext):
+        return os.path.join(self.out_dir, f"{self.prefix}-part-{index:05d}{ext}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record):
+        """写入一条记录（dict）"""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._part_path(self._part, ".jsonl"), "w", encoding="utf-8")
+                self._part_records = 0
+            if "processed_at" not in record:
+                record = dict(record, processed_at=round(time.time(), 3))
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._part_records += 1
+            self.total_records += 1
+            if self._part_records % self.flush_every == 0:
+                self._file.flush()
+            if self._part_records >= self.rollover_records:
+                self._rollover()
+
+    def _rollover(self):
+        """关闭当前分片，交给后台线程压缩"""
+        self._file.close()
+        self._file = None
+        path = self._part_path(self._part, ".jsonl")
+        self._part += 1
+        # 同一时间只压缩一个分片：上一个还没转完就等它（保证内存只占一个分片）
+        if self._converter is not None:
+            self._converter.join()
+        self._converter = threading.Thread(target=self._compress_part, args=(path,),
+                                           name="result-sink-compress", daemon=True)
+        self._converter.start()
+
+    def _compress_part(self, jsonl_path):
+        # 先写临时文件再改名：压缩中途失败不会在 JSONL 旁边留下半个 Parquet / gz 分片
+        out_path = jsonl_path[:-len(".jsonl")] + ".parquet" if self.parquet else jsonl_path + ".gz"
+        tmp_path = out_path + ".tmp"
+        try:
+            if self.parquet:
+                table = pa_json.read_json(jsonl_path)
+                pq.write_table(table, tmp_path, compression="zstd")
+            else:
+                with open(jsonl_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, out_path)
+            os.remove(jsonl_path)
+        except Exception as e:
+            # 压缩失败时保留原始 JSONL，结果不会丢
+            print(f"警告：结果分片压缩失败 {jsonl_path}：{e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        """写完并压缩最后一个分片（可重复调用）"""
+        with self._lock:
+            if self._file is not None:
+                if self._part_records > 0:
+                    self._rollover()
+                else:
+                    self._file.close()
+                    self._file = None
+            if self._converter is not None:
+                self._converter.join()
+                self._converter = None
+
+
+def iter_records(out_dir, prefix="*"):
+    """
+    按分片顺序逐条读取结果（JSONL / JSONL.gz / Parquet 都支持）
+    """
+    pattern = os.path.join(out_dir, f"{prefix}-part-*")
+    for path in sorted(glob.glob(pattern)):
+        if path.endswith(".parquet"):
+            if not HAS_PYARROW:
+                raise ImportError("读取 Parquet 结果需要安装 pyarrow")
+            for batch in pq.ParquetFile(path).iter_batches():
+                yield from batch.to_pylist()
+        elif path.endswith(".jsonl") or path.endswith(".jsonl.gz"):
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # 崩溃时写了一半的最后一行
+
+
+def _read_jsonl_table(f):
+    """
+    JSONL 分片 -> pyarrow 表
+    崩溃留下的分片最后一行可能只写了一半：整体解析失败时跳过解析不了的行（和 iter_records 一致）
+    """
+    data = f.read()
+    try:
+        return pa_json.read_json(io.BytesIO(data))
+    except Exception:
+        lines = []
+        for line in data.splitlines():
+            try:
+                json.loads(line)
+            except ValueError:
+                continue
+            lines.append(line)
+        if not lines:
+            return None
+        return pa_json.read_json(io.BytesIO(b"\n".join(lines) + b"\n"))
+
+
+def read_table(out_dir):
+    """
+    把整个结果目录读成一张 pyarrow 表（用于大规模分析，例如再转 pandas / polars）
+    """
+    if not HAS_PYARROW:
+        raise ImportError("read_table 需要安装 pyarrow")
+    import pyarrow as pa
+    tables = []
+    for path in sorted(glob.glob(os.path.join(out_dir, "*-part-*"))):
+        if path.endswith(".parquet"):
+            tables.append(pq.read_table(path))
+        elif path.endswith(".jsonl") or path.endswith(".jsonl.gz"):
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rb") as f:
+                table = _read_jsonl_table(f)
+            if table is not None:
+                tables.append(table)
+    if not tables:
+        return pa.table({})
+    try:
+        return pa.concat_tables(tables, promote_options="default")
+    except TypeError:  # pyarrow < 14
+        return pa.concat_tables(tables, promote=True)
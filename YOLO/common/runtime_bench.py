@@ -0,0 +1,140 @@
+"""
+多进程 CPU 线程配置基准测试
+
+分别用 1、2、4…… 个进程跑同一个固定负载，比较两种情况下所有进程加起来的吞吐量：
+    默认    不做任何限制，各个库按整机核数开线程（清掉继承来的 OMP_NUM_THREADS 等环境变量）
+    配置后  runtime_config.plan_workers 分配线程数（加 --pin-cpus 时同时绑核）
+
+负载：
+    synthetic  OpenCV 预处理（缩放 + 高斯模糊 + 颜色转换）+ numpy 矩阵乘法，不需要模型
+    model      --model 指定的检测模型推理（模型库条目名或权重路径）
+
+每个进程先预热，所有进程就绪后同时开始计时，跑满 --seconds 秒。
+
+用法：
+    python runtime_bench.py --workers 1,2,4,8 --seconds 10
+    python runtime_bench.py --workload model --model plate-det --workers 2,4 --pin-cpus --out runtime_bench.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+
+from runtime_config import THREAD_ENV_VARS, detect_topology, plan_workers
+
+MODES = ("默认", "配置后")
+
+
+def _make_workload(name, model_spec, imgsz):
+    """返回一次迭代的函数（在子进程里、线程配置生效之后导入 cv2 / numpy / torch）"""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    if name == "model":
+        from model_store import load_model
+        model = load_model(model_spec)
+
+        def step():
+            model(frame, imgsz=imgsz, verbose=False)
+        return step
+
+    a = rng.standard_normal((384, 384)).astype(np.float32)
+    b = rng.standard_normal((384, 384)).astype(np.float32)
+
+    def step():
+        small = cv2.resize(frame, (imgsz, imgsz))
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        a @ b
+    return step
+
+
+def bench_worker(runtime, workload, model_spec, imgsz, warmup, seconds, ready, start, results):
+    """子进程：应用（或清除）线程配置 -> 预热 -> 等待统一开始 -> 计数"""
+    if runtime is None:
+        for name in THREAD_ENV_VARS:
+            os.environ.pop(name, None)
+    else:
+        runtime.apply()
+    step = _make_workload(workload, model_spec, imgsz)
+    for _ in range(warmup):
+        step()
+    ready.put(os.getpid())
+    start.wait()
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        step()
+        count += 1
+    results.put(count)
+
+
+def run_once(workers, runtimes, args):
+    """启动 workers 个进程跑一轮，返回总吞吐量（次/秒）"""
+    ctx = mp.get_context("spawn")  # spawn 保证子进程里的库还没初始化线程池
+    ready, results, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=bench_worker,
+                         args=(runtimes[i] if runtimes else None, args.workload, args.model,
+                               args.imgsz, args.warmup, args.seconds, ready, start, results))
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.get()
+    start.set()
+    counts = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return sum(counts) / args.seconds, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程 CPU 线程配置基准测试")
+    parser.add_argument("--workers", type=str, default="1,2,4", help="进程数列表（逗号分隔）")
+    parser.add_argument("--workload", choices=("synthetic", "model"), default="synthetic", help="负载类型")
+    parser.add_argument("--model", type=str, default=None, help="model 负载使用的检测模型")
+    parser.add_argument("--imgsz", type=int, default=640, help="输入尺寸")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每轮计时秒数")
+    parser.add_argument("--warmup", type=int, default=3, help="每个进程的预热次数")
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="配置后每个进程的线程数（0 表示按 CPU 拓扑自动分配）")
+    parser.add_argument("--pin-cpus", action="store_true", help="配置后同时绑核")
+    parser.add_argument("--out", type=str, default=None, help="结果 JSON 输出路径")
+    args = parser.parse_args()
+    if args.workload == "model" and not args.model:
+        parser.error("--workload model 需要指定 --model")
+
+    topology = detect_topology()
+    print(f"⚙️ CPU 拓扑：{topology.describe()}，负载 {args.workload}，每轮 {args.seconds:.0f} 秒")
+    rows = []
+    for workers in (int(n) for n in args.workers.split(",") if n.strip()):
+        runtimes = plan_workers(workers, args.threads_per_worker or None, args.pin_cpus, topology=topology)
+        row = {"workers": workers, "threads": [r.threads for r in runtimes]}
+        for mode, plan in zip(MODES, (None, runtimes)):
+            throughput, counts = run_once(workers, plan, args)
+            row[mode] = {"throughput": round(throughput, 2), "per_worker": counts}
+            print(f"   {workers} 个进程 | {mode:<4} | 总吞吐 {throughput:8.1f} 次/秒 | 各进程 {counts}")
+        base = row[MODES[0]]["throughput"]
+        row["speedup"] = round(row[MODES[1]]["throughput"] / base, 3) if base else None
+        rows.append(row)
+
+    print("=" * 60)
+    print(f"{'进程数':<6}{'默认(次/秒)':>14}{'配置后(次/秒)':>16}{'提升':>8}")
+    for row in rows:
+        speedup = f"{row['speedup']:.2f}x" if row["speedup"] else "-"
+        print(f"{row['workers']:<8}{row[MODES[0]]['throughput']:>14.1f}"
+              f"{row[MODES[1]]['throughput']:>16.1f}{speedup:>8}")
+    print("=" * 60)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"topology": topology.describe(), "workload": args.workload,
+                       "pin": args.pin_cpus, "results": rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存：{args.out}")
+
+
+if __name__ == "__main__":
+    main()
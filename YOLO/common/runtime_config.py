@@ -0,0 +1,255 @@
+"""
+推理进程的 CPU 线程数 / 绑核自动配置
+
+torch、OpenCV、PaddleOCR（以及 ONNX Runtime）各自有线程池，默认都按整机核数开线程。
+一台机器上跑 N 个推理进程时，实际线程数是 N × 核数 × 库的个数，互相抢核，总吞吐反而下降。
+
+- detect_topology() 读取 /sys/devices/system 下的 CPU 拓扑：物理核（超线程兄弟合并）和 NUMA 节点，
+  读不到时（Windows / macOS / 容器限制）退回到"每个逻辑 CPU 一个核"
+- plan_workers(N) 把物理核按 NUMA 节点连续分给 N 个进程，每个进程的线程数 = 分到的物理核数
+- WorkerRuntime.apply() 在进程内、加载模型之前调用：设置 OMP/MKL/OpenBLAS 等环境变量、
+  cv2.setNumThreads、torch.set_num_threads，可选用 sched_setaffinity 绑到分到的核上
+- PaddleOCR 的线程数通过 paddle_kwargs() 传给构造函数，ONNX Runtime 用 ort_session_options()
+
+    runtimes = plan_workers(4, pin=True)
+    # 子进程里，导入 torch / paddle 之前：
+    runtimes[i].apply()
+    ocr = PaddleOCR(lang="ch", **runtimes[i].paddle_kwargs())
+
+效果用 runtime_bench.py 实测（N 个进程配置前后的总吞吐量）。
+"""
+
+import glob
+import os
+import sys
+
+# 控制各个数学库线程池大小的环境变量（必须在导入对应的库之前设置）
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "CPU_NUM")
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def parse_cpu_list(text):
+    """"0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus):
+    """[0, 1, 2, 3, 8] -> '0-3,8'"""
+    parts = []
+    for cpu in sorted(cpus):
+        if parts and cpu == parts[-1][1] + 1:
+            parts[-1][1] = cpu
+        else:
+            parts.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in parts)
+
+
+def allowed_cpus():
+    """当前进程允许使用的逻辑 CPU（考虑 taskset / cgroup cpuset 的限制）"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CpuTopology:
+    """
+    CPU 拓扑
+    :param cores: 物理核列表，每个物理核是它的逻辑 CPU 编号列表（超线程兄弟）
+    :param nodes: {NUMA 节点编号: [逻辑 CPU]}
+    """
+
+    def __init__(self, cores, nodes):
+        self.cores = cores
+        self.nodes = nodes
+
+    @property
+    def logical(self):
+        return sum(len(core) for core in self.cores)
+
+    def node_of(self, cpu):
+        for node, cpus in self.nodes.items():
+            if cpu in cpus:
+                return node
+        return 0
+
+    def describe(self):
+        return (f"{len(self.nodes)} 个 NUMA 节点，{len(self.cores)} 个物理核，"
+                f"{self.logical} 个逻辑 CPU")
+
+
+def detect_topology():
+    """读取 CPU 拓扑（只包含当前进程允许使用的 CPU）"""
+    allowed = allowed_cpus()
+    cores = {}
+    for cpu in allowed:
+        base = f"/sys/devices/system/cpu/cpu{cpu}/topology"
+        package = _read(f"{base}/physical_package_id")
+        core_id = _read(f"{base}/core_id")
+        # 读不到拓扑时每个逻辑 CPU 单独算一个物理核
+        key = (package, core_id) if package is not None and core_id is not None else ("cpu", cpu)
+        cores.setdefault(key, []).append(cpu)
+
+    nodes = {}
+    for path in glob.glob("/sys/devices/system/node/node[0-9]*"):
+        cpus = [cpu for cpu in parse_cpu_list(_read(f"{path}/cpulist")) if cpu in allowed]
+        if cpus:
+            nodes[int(os.path.basename(path)[4:])] = cpus
+    if not nodes:
+        nodes = {0: list(allowed)}
+    topology = CpuTopology(sorted(cores.values()), nodes)
+    # 物理核按 NUMA 节点、再按编号排序，连续分配时同一个进程的核尽量在同一个节点上
+    topology.cores.sort(key=lambda core: (topology.node_of(core[0]), core[0]))
+    return topology
+
+
+class WorkerRuntime:
+    """
+    单个推理进程的运行时配置（可以 pickle，直接作为参数传给子进程）
+    :param worker_id: 进程编号
+    :param threads: 各个库的计算线程数
+    :param cpus: 分到的逻辑 CPU（绑核时使用）
+    :param node: 所在 NUMA 节点
+    :param pin: 是否绑核
+    """
+
+    def __init__(self, worker_id, threads, cpus=None, node=0, pin=False):
+        self.worker_id = worker_id
+        self.threads = max(1, int(threads))
+        self.cpus = list(cpus or [])
+        self.node = node
+        self.pin = pin
+
+    def apply(self, verbose=False):
+        """在加载模型之前调用：限制线程池大小，按需绑核"""
+        # 直接覆盖：子进程会继承父进程的环境变量，父进程按整机配置过线程数时 setdefault 不起作用
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(self.threads)
+        if self.pin and self.cpus and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, self.cpus)
+            except OSError as e:
+                print(f"⚠️ 进程 {self.worker_id} 绑核失败：{e}")
+        try:
+            import cv2
+            cv2.setNumThreads(self.threads)
+        except ImportError:
+            pass
+        self._apply_torch()
+        if verbose:
+            print(f"⚙️ 进程 {self.worker_id}：{self.describe()}")
+        return self
+
+    def _apply_torch(self):
+        """torch 的线程池在第一次并行计算时创建，这里只在 torch 已安装时设置"""
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(self.threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # 已经有并行计算跑过了，interop 线程数不能再改
+
+    def paddle_kwargs(self):
+        """PaddleOCR 构造参数（默认 cpu_threads=10，多进程时严重超额）"""
+        return {"cpu_threads": self.threads}
+
+    def ort_session_options(self):
+        """ONNX Runtime 的 SessionOptions"""
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        return options
+
+    def describe(self):
+        text = f"{self.threads} 线程"
+        if self.cpus:
+            text += f"，CPU {format_cpu_list(self.cpus)}（NUMA {self.node}）"
+        return text + ("，已绑核" if self.pin else "")
+
+
+def plan_workers(workers, threads=None, pin=False, reserve=0, topology=None):
+    """
+    给 N 个推理进程分配 CPU
+    :param workers: 进程数
+    :param threads: 每个进程的线程数（None 表示按分到的物理核数）
+    :param pin: 是否绑核
+    :param reserve: 留给主进程 / 采集进程的物理核数（核数够用时才保留）
+    :return: [WorkerRuntime]
+    """
+    workers = max(1, workers)
+    topology = topology or detect_topology()
+    cores = topology.cores
+    if len(cores) - reserve >= workers:
+        cores = cores[reserve:]
+
+    runtimes = []
+    if len(cores) >= workers:
+        # 物理核够分：每个进程分到连续的一段物理核（含超线程兄弟），线程数 = 物理核数
+        base, extra = divmod(len(cores), workers)
+        start = 0
+        for i in range(workers):
+            count = base + (1 if i < extra else 0)
+            own = cores[start:start + count]
+            start += count
+            cpus = sorted(cpu for core in own for cpu in core)
+            runtimes.append(WorkerRuntime(i, threads or len(own), cpus,
+                                          topology.node_of(own[0][0]), pin))
+    else:
+        # 进程比物理核多：轮流共用物理核，每个进程单线程
+        for i in range(workers):
+            core = cores[i % len(cores)]
+            runtimes.append(WorkerRuntime(i, threads or 1, core, topology.node_of(core[0]), pin))
+    return runtimes
+
+
+def print_plan(runtimes, topology=None):
+    topology = topology or detect_topology()
+    print(f"⚙️ CPU 拓扑：{topology.describe()}")
+    for runtime in runtimes:
+        print(f"   进程 {runtime.worker_id}：{runtime.describe()}")
+
+
+def add_runtime_args(parser):
+    """给命令行脚本添加线程数 / 绑核参数"""
+    group = parser.add_argument_group("CPU 线程配置")
+    group.add_argument("--threads-per-worker", type=int, default=0,
+                       help="每个进程内部的计算线程数（0 表示按 CPU 拓扑自动分配）")
+    group.add_argument("--pin-cpus", action="store_true",
+                       help="把每个进程绑定到分到的物理核上（Linux）")
+    return parser
+
+
+def runtime_from_args(args, workers, reserve=0):
+    """按命令行参数生成每个进程的配置"""
+    return plan_workers(workers, args.threads_per_worker or None, args.pin_cpus, reserve)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="查看 CPU 拓扑和 N 个推理进程的线程分配")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="推理进程数")
+    parser.add_argument("--reserve", type=int, default=0, help="留给主进程的物理核数")
+    add_runtime_args(parser)
+    args = parser.parse_args()
+    print_plan(runtime_from_args(args, args.workers, args.reserve))
+    if sys.platform != "linux":
+        print("⚠️ 非 Linux 系统读不到物理核拓扑，按逻辑 CPU 分配，且不支持绑核")
@@ -0,0 +1,148 @@
+"""
+读取硬件性能探测生成的运行时配置（最佳后端、线程数、批大小）
+
+Docker/202511800144/Level2/gpu_test.py --profile 在每台机器上实测一遍（矩阵乘法、内存带宽、
+JPEG 解码、检测模型在各个后端 / 线程数 / 批大小下的延迟），把选出的最佳配置写进
+~/.plate_runtime_profile.json（环境变量 PLATE_RUNTIME_PROFILE 可以改路径）。
+推理入口启动时调用 load_profile()：
+
+- 配置文件不存在时返回 None，各入口保持原来的默认值（CPU 推理、线程数按拓扑自动分配）
+- 配置是在别的机器上生成的（主机名或 CPU 数不一致）时提示并忽略，避免把 GPU 机器的配置用到 CPU 机器上
+- 最佳配置的后端不是推理入口能用的（RUNNABLE_BACKENDS，目前只有 PyTorch）时同样忽略；
+  配置里的 imgsz 只是测试条件，推理入口仍用自己的输入尺寸
+- apply() 在加载模型之前设置线程数（复用 runtime_config.WorkerRuntime）
+
+    profile = load_profile()
+    device = profile.device if profile else "cpu"
+    if profile:
+        profile.apply()
+
+用法：
+    python runtime_profile.py                  # 查看当前机器的运行时配置
+    python runtime_profile.py --path other.json
+"""
+
+import argparse
+import json
+import os
+import platform
+
+from runtime_config import WorkerRuntime
+
+PROFILE_VERSION = 1
+# 推理入口都用 ultralytics 加载 .pt 模型，只能用这些后端的配置
+RUNNABLE_BACKENDS = ("torch",)
+
+
+def default_profile_path():
+    return os.environ.get("PLATE_RUNTIME_PROFILE") or os.path.join(
+        os.path.expanduser("~"), ".plate_runtime_profile.json")
+
+
+class RuntimeProfile:
+    """
+    运行时配置
+    :param data: 配置文件内容（gpu_test.py --profile 写入的 JSON）
+    """
+
+    def __init__(self, data, path=None):
+        self.data = data
+        self.path = path
+        best = data.get("best") or {}
+        self.device = str(best.get("device", "cpu"))
+        self.backend = best.get("backend", "torch")
+        self.threads = int(best.get("threads") or os.cpu_count() or 1)
+        self.batch = int(best.get("batch") or 1)
+
+    def apply(self, verbose=True):
+        """加载模型之前调用：按配置设置各个库的线程数"""
+        WorkerRuntime(0, self.threads).apply()
+        if verbose:
+            print(f"⚙️ 运行时配置（{self.path}）：{self.describe()}")
+        return self
+
+    def describe(self):
+        text = f"设备 {self.device}（{self.backend}），{self.threads} 线程，批大小 {self.batch}"
+        best = self.data.get("best") or {}
+        if best.get("throughput"):
+            text += f"，实测 {best['throughput']} 张/秒"
+            if self.data.get("imgsz"):
+                text += f"（imgsz {self.data['imgsz']}）"
+        return text + f"，{self.data.get('created', '')} 生成"
+
+
+def load_profile(path=None, verbose=True):
+    """
+    读取运行时配置
+    :return: RuntimeProfile；文件不存在、格式不对或不是本机生成的返回 None
+    """
+    path = path or default_profile_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        if verbose:
+            print(f"⚠️ 运行时配置读取失败（{path}）：{e}")
+        return None
+    if data.get("version") != PROFILE_VERSION:
+        if verbose:
+            print(f"⚠️ 运行时配置版本不对（{path}），请重新运行 gpu_test.py --profile")
+        return None
+    if data.get("host") != platform.node() or data.get("cpu_count") != os.cpu_count():
+        if verbose:
+            print(f"⚠️ 运行时配置是在 {data.get('host')}（{data.get('cpu_count')} 个 CPU）上生成的，"
+                  f"本机不使用；请在本机重新运行 gpu_test.py --profile")
+        return None
+    backend = (data.get("best") or {}).get("backend", "torch")
+    if backend not in RUNNABLE_BACKENDS:
+        if verbose:
+            print(f"⚠️ 运行时配置选的是 {backend} 后端（{path}），推理入口不支持；请重新运行 gpu_test.py --profile")
+        return None
+    return RuntimeProfile(data, path)
+
+
+def add_profile_args(parser):
+    """给命令行脚本添加运行时配置参数"""
+    group = parser.add_argument_group("运行时配置")
+    group.add_argument("--runtime-profile", type=str, default=None,
+                       help="gpu_test.py --profile 生成的配置文件（默认 ~/.plate_runtime_profile.json）")
+    group.add_argument("--no-runtime-profile", action="store_true", help="不读取运行时配置，使用默认设置")
+    return parser
+
+
+def profile_from_args(args):
+    """按命令行参数读取并应用运行时配置，不使用时返回 None"""
+    if args.no_runtime_profile:
+        return None
+    profile = load_profile(args.runtime_profile)
+    return profile.apply() if profile is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看当前机器的运行时配置")
+    parser.add_argument("--path", type=str, default=None, help="配置文件路径")
+    args = parser.parse_args()
+    path = args.path or default_profile_path()
+    profile = load_profile(path)
+    if profile is None:
+        if not os.path.exists(path):
+            print(f"❌ 没有运行时配置：{path}")
+        print("   生成：python Docker/202511800144/Level2/gpu_test.py --profile --model best.pt")
+        return
+    print(f"🎯 {profile.describe()}")
+    data = profile.data
+    for device, values in (data.get("matmul_gflops") or {}).items():
+        print(f"   矩阵乘法 {device}：" + "，".join(f"{k} {v} GFLOPS" for k, v in values.items()))
+    for device, value in (data.get("memory_gbps") or {}).items():
+        print(f"   内存带宽 {device}：{value} GB/s")
+    jpeg = data.get("jpeg_decode")
+    if jpeg:
+        print(f"   JPEG 解码（1080p）：单线程 {jpeg['single_images_per_s']} 张/秒")
+    if data.get("detector"):
+        print(f"   检测模型：测了 {len(data['detector'])} 种组合")
+
+
+if __name__ == "__main__":
+    main()
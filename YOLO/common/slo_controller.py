@@ -0,0 +1,165 @@
+"""
+延迟 SLO 控制器：按最近的每帧耗时自动调整检测输入尺寸和检测间隔
+
+CPU 忙的时候摄像头循环处理不过来，画面越来越滞后。控制器按质量从高到低准备一组档位，
+例如 640/每帧 -> 480/每帧 -> 320/每帧 -> 320/每 2 帧 -> 320/每 3 帧：
+- 最近 window 帧的平均耗时超过目标，降一档（跳帧检测时按摊销后的耗时计算）
+- 平均耗时低于目标 × up_ratio，并且在当前档位停留超过 min_dwell 秒，升一档
+- 每次换档后清空样本，新档位要攒满一个窗口才会再判断
+- 刚升上去很快又降回来的档位，下次升档要等的时间翻倍（防止在两个档位之间来回跳）
+每次换档打印一行日志，结束时 summary() 给出各档位停留的时间。
+
+    slo = SloController(target_ms=50)
+    while True:
+        ret, frame = cap.read()
+        start = time.perf_counter()
+        if slo.should_detect():
+            result = model(frame, imgsz=slo.imgsz)[0]
+        ...
+        slo.record((time.perf_counter() - start) * 1000)
+    slo.print_summary()
+"""
+
+import time
+from collections import deque
+
+DEFAULT_LEVELS = ((640, 1), (480, 1), (320, 1), (320, 2), (320, 3))
+
+
+def parse_levels(text):
+    """"640x1,480x1,320x2" -> ((640, 1), (480, 1), (320, 2))"""
+    levels = []
+    for item in text.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        size, _, interval = item.partition("x")
+        levels.append((int(size), int(interval or 1)))
+    if not levels:
+        raise ValueError("至少需要一个档位")
+    return tuple(levels)
+
+
+def level_name(level):
+    imgsz, interval = level
+    return f"{imgsz}/每帧" if interval == 1 else f"{imgsz}/每 {interval} 帧"
+
+
+class SloController:
+    """
+    延迟 SLO 控制器
+    :param target_ms: 每帧耗时目标（毫秒）
+    :param levels: 档位列表 [(imgsz, 检测间隔), ...]，按质量从高到低排列
+    :param window: 判断用的帧数
+    :param up_ratio: 平均耗时低于 target_ms * up_ratio 才升档（和降档阈值之间留出余量）
+    :param min_dwell: 升档前至少在当前档位停留的秒数
+    :param start_level: 初始档位（默认最高质量）
+    """
+
+    def __init__(self, target_ms, levels=DEFAULT_LEVELS, window=30, up_ratio=0.7, min_dwell=5.0,
+                 start_level=0, verbose=True):
+        self.target_ms = target_ms
+        self.levels = tuple(levels)
+        self.window = window
+        self.up_ratio = up_ratio
+        self.min_dwell = min_dwell
+        self.verbose = verbose
+        self.level = min(max(start_level, 0), len(self.levels) - 1)
+        self.samples = deque(maxlen=window)
+        self.frame_index = 0
+        self.adjustments = []          # [(时间戳, 原档位, 新档位, 窗口平均耗时)]
+        self.time_at = [0.0] * len(self.levels)
+        self.frames_at = [0] * len(self.levels)
+        self.up_penalty = [0] * len(self.levels)  # 升到该档位后很快又被降下来的次数
+        self._entered = time.monotonic()
+        self._last_up = None           # (升到的档位, 时间)
+
+    @property
+    def imgsz(self):
+        return self.levels[self.level][0]
+
+    @property
+    def interval(self):
+        return self.levels[self.level][1]
+
+    def should_detect(self):
+        """当前帧是否做检测（检测间隔 > 1 时其余帧沿用上一次的结果）"""
+        return self.frame_index % self.interval == 0
+
+    def record(self, frame_ms):
+        """记录一帧的处理耗时，必要时换档，返回是否换档"""
+        self.frame_index += 1
+        self.frames_at[self.level] += 1
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.window:
+            return False
+        mean = sum(self.samples) / len(self.samples)
+        now = time.monotonic()
+        if mean > self.target_ms and self.level < len(self.levels) - 1:
+            if self._last_up and self._last_up[0] == self.level and now - self._last_up[1] < 2 * self._dwell(self.level):
+                self.up_penalty[self.level] += 1
+            self._switch(self.level + 1, mean, now)
+            return True
+        if (mean < self.target_ms * self.up_ratio and self.level > 0
+                and now - self._entered >= self._dwell(self.level - 1)):
+            self._switch(self.level - 1, mean, now)
+            self._last_up = (self.level, now)
+            return True
+        return False
+
+    def _dwell(self, level):
+        """升到 level 之前需要停留的时间（该档位每失败一次翻倍，最多 32 倍）"""
+        return self.min_dwell * (2 ** min(self.up_penalty[level], 5))
+
+    def _switch(self, new_level, mean, now):
+        old = self.level
+        self.time_at[old] += now - self._entered
+        self._entered = now
+        self.level = new_level
+        self.samples.clear()
+        self.frame_index = 0
+        self.adjustments.append((time.time(), old, new_level, mean))
+        if self.verbose:
+            arrow = "降档" if new_level > old else "升档"
+            sign = ">" if new_level > old else "<"
+            limit = self.target_ms if new_level > old else self.target_ms * self.up_ratio
+            print(f"⚙️ SLO {arrow}：{level_name(self.levels[old])} -> {level_name(self.levels[new_level])}"
+                  f"（最近 {self.window} 帧平均 {mean:.1f} ms {sign} {limit:.1f} ms）")
+
+    def summary(self):
+        """各档位停留的时间和帧数"""
+        times = list(self.time_at)
+        times[self.level] += time.monotonic() - self._entered
+        total = sum(times) or 1e-9
+        return {
+            "target_ms": self.target_ms,
+            "adjustments": len(self.adjustments),
+            "levels": [{"level": level_name(level), "imgsz": level[0], "interval": level[1],
+                        "seconds": round(t, 1), "share": round(t / total, 4), "frames": n}
+                       for level, t, n in zip(self.levels, times, self.frames_at)],
+        }
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"⚙️ SLO 目标 {s['target_ms']} ms，共换档 {s['adjustments']} 次，各档位停留时间：")
+        for item in s["levels"]:
+            if item["frames"]:
+                print(f"   {item['level']:<12} {item['seconds']:>8.1f} 秒（{item['share'] * 100:5.1f}%）"
+                      f" {item['frames']} 帧")
+
+
+def add_slo_args(parser):
+    """给命令行脚本添加 SLO 控制参数"""
+    group = parser.add_argument_group("延迟 SLO 控制")
+    group.add_argument("--slo-ms", type=float, default=0,
+                       help="每帧耗时目标（毫秒），超出时自动降低输入尺寸 / 隔帧检测（0 表示关闭）")
+    group.add_argument("--slo-levels", type=str, default="640x1,480x1,320x1,320x2,320x3",
+                       help="档位（输入尺寸x检测间隔，按质量从高到低，逗号分隔）")
+    return parser
+
+
+def slo_from_args(args):
+    """按命令行参数创建 SloController，未开启时返回 None"""
+    if not args.slo_ms:
+        return None
+    return SloController(args.slo_ms, parse_levels(args.slo_levels))
@@ -0,0 +1,73 @@
+"""
+分阶段计时工具（基准测试用）
+
+    timer = StageTimer()
+    with timer.stage("decode"):
+        img = cv2.imread(path)
+    timer.add("detect", 12.5)          # 直接记录已知耗时（毫秒）
+    timer.summary()                    # {阶段: {count, mean_ms, p50_ms, p95_ms, p99_ms, total_ms}}
+
+另外提供 percentile（最近秩法分位数）和 peak_rss_mb（进程峰值内存）。
+"""
+
+import math
+import sys
+import time
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, p):
+    """已排序列表的 p 分位数（最近秩法），空列表返回 0"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+class StageTimer:
+    """按阶段名记录每次耗时（毫秒）"""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name, ms):
+        self.samples.setdefault(name, []).append(float(ms))
+
+    def summary(self):
+        result = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            result[name] = {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "total_ms": round(sum(values), 3),
+            }
+        return result
@@ -0,0 +1,143 @@
+"""
+合成 CCPD 风格的测试数据（基准测试用，不需要下载数据集）
+
+- 图片：720x1160（CCPD 原图尺寸），随机渐变背景 + 噪声，随机位置的蓝色/绿色车牌，
+  文件名按 CCPD 格式写入车牌框和车牌号，可以直接用 ccpd.parse_name 解析
+- 视频：车牌从左向右移动的短视频
+
+cv2.putText 不能画汉字，省份位置画一个白色方块代替，只用于测速，不用于评估识别准确率。
+
+用法：
+    python synthetic_data.py --out bench_data --images 200 --videos 2
+"""
+
+import argparse
+import os
+import random
+
+import cv2
+import numpy as np
+
+from ccpd import ADS, ALPHABETS, PROVINCES, make_name
+
+BLUE = (160, 70, 10)
+GREEN = (90, 200, 60)
+SEED_FILE = ".generated"  # 图片目录里记录生成参数的文件
+
+
+def random_plate(rng, length=7):
+    """随机车牌号（省份 + 字母 + 后续字符）"""
+    return (rng.choice(PROVINCES[:31]) + rng.choice(ALPHABETS[:-1])
+            + "".join(rng.choice(ADS[:-1]) for _ in range(length - 2)))
+
+
+def draw_plate(img, box, plate, color=BLUE):
+    """在 img 上画一块车牌（原地修改）"""
+    x1, y1, x2, y2 = box
+    cv2.rectangle(img, (x1, y1), (x2, y2), color, -1)
+    cv2.rectangle(img, (x1 + 3, y1 + 3), (x2 - 3, y2 - 3), (255, 255, 255), 2)
+    h = y2 - y1
+    # 省份汉字用方块代替
+    cv2.rectangle(img, (x1 + 8, y1 + h // 4), (x1 + 8 + h // 2, y2 - h // 4), (255, 255, 255), -1)
+    cv2.putText(img, plate[1:], (x1 + 14 + h // 2, y2 - h // 4), cv2.FONT_HERSHEY_SIMPLEX,
+                h / 45.0, (255, 255, 255), max(1, h // 18))
+    return img
+
+
+def background(rng_np, height, width):
+    """随机渐变 + 噪声背景"""
+    top = rng_np.integers(0, 255, 3)
+    bottom = rng_np.integers(0, 255, 3)
+    t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    img = (top * (1 - t) + bottom * t).astype(np.float32)
+    img = np.broadcast_to(img, (height, width, 3)).copy()
+    img += rng_np.normal(0, 12, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def make_image(rng, rng_np, width=720, height=1160, green=False):
+    """生成一张合成图片，返回 (图像, 车牌框, 车牌号)"""
+    img = background(rng_np, height, width)
+    pw = rng.randint(width // 5, width // 3)
+    ph = max(20, int(pw / 3.14))
+    x1 = rng.randint(0, width - pw - 1)
+    y1 = rng.randint(height // 3, height - ph - 1)
+    box = (x1, y1, x1 + pw, y1 + ph)
+    plate = random_plate(rng, 8 if green else 7)
+    draw_plate(img, box, plate, GREEN if green else BLUE)
+    return img, box, plate
+
+
+def generate_images(out_dir, count=200, seed=0, green_ratio=0.2, jpeg_quality=90):
+    """
+    生成 count 张 CCPD 风格图片，返回文件路径列表
+    目录里记录生成参数（SEED_FILE），参数相同且数量足够时直接复用，否则清掉旧图片重新生成
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    key = f"{seed} {green_ratio} {jpeg_quality}"
+    key_path = os.path.join(out_dir, SEED_FILE)
+    old_key = None
+    if os.path.exists(key_path):
+        with open(key_path, "r", encoding="utf-8") as f:
+            old_key = f.read().strip()
+    existing = sorted(f for f in os.listdir(out_dir) if f.endswith(".jpg"))
+    if old_key == key and len(existing) >= count:
+        return [os.path.join(out_dir, f) for f in existing[:count]]
+    for f in existing:
+        os.remove(os.path.join(out_dir, f))
+    rng = random.Random(seed)
+    rng_np = np.random.default_rng(seed)
+    paths = []
+    while len(paths) < count:
+        img, box, plate = make_image(rng, rng_np, green=rng.random() < green_ratio)
+        name = make_name(box, plate, brightness=rng.randint(50, 200), blur=rng.randint(0, 50))
+        path = os.path.join(out_dir, name)
+        if path in paths:  # 文件名即标注，极少数重名时重新生成
+            continue
+        cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        paths.append(path)
+    with open(key_path, "w", encoding="utf-8") as f:
+        f.write(key)
+    return sorted(paths)
+
+
+def generate_video(path, frames=150, width=1280, height=720, fps=25, seed=0):
+    """生成车牌从左向右移动的短视频（path 已存在时直接复用，调用方负责让文件名包含生成参数）"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rng = random.Random(seed)
+    rng_np = np.random.default_rng(seed)
+    base = background(rng_np, height, width)
+    plate = random_plate(rng)
+    pw, ph = width // 6, width // 19
+    y1 = height // 2
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for i in range(frames):
+        frame = base.copy()
+        x1 = int((width - pw) * i / max(frames - 1, 1))
+        draw_plate(frame, (x1, y1, x1 + pw, y1 + ph), plate)
+        out.write(frame)
+    out.release()
+    return path
+
+
+def generate_dataset(out_dir, images=200, videos=2, video_frames=150, seed=0):
+    """生成基准测试数据集：out_dir/images/*.jpg 和 out_dir/videos/*.mp4"""
+    image_paths = generate_images(os.path.join(out_dir, "images"), images, seed)
+    # 视频按种子和帧数命名，换参数时不会复用旧文件
+    video_paths = [generate_video(os.path.join(out_dir, "videos", f"synthetic_s{seed + i}_{video_frames}f.mp4"),
+                                  video_frames, seed=seed + i) for i in range(videos)]
+    return image_paths, video_paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成 CCPD 风格测试数据")
+    parser.add_argument("--out", type=str, default="bench_data", help="输出目录")
+    parser.add_argument("--images", type=int, default=200, help="图片数量")
+    parser.add_argument("--videos", type=int, default=2, help="视频数量")
+    parser.add_argument("--video-frames", type=int, default=150, help="每个视频的帧数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（相同种子生成相同数据）")
+    args = parser.parse_args()
+    imgs, vids = generate_dataset(args.out, args.images, args.videos, args.video_frames, args.seed)
+    print(f"✅ 已生成 {len(imgs)} 张图片、{len(vids)} 个视频：{args.out}")
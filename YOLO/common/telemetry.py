@@ -0,0 +1,331 @@
+"""
+运行时监控：分阶段计时、延迟直方图、计数器
+
+    telemetry = Telemetry(log_every=10)
+    telemetry.serve(9100)                 # 可选：http://host:9100/metrics（Prometheus 文本格式）
+    while True:
+        with telemetry.stage("read"):
+            ret, frame = cap.read()
+        with telemetry.stage("detect"):
+            results = model(frame)
+        telemetry.inc("frames")
+        telemetry.inc("detections", len(results[0].boxes))
+        telemetry.tick()                  # 到时间就打印一行汇总
+    telemetry.close()
+
+- 每个阶段一个固定分桶的直方图，记录一次只是一次二分查找和几次加法，
+  一帧记录 5 个阶段的开销在微秒级（python telemetry.py bench 可以实测），远小于一帧耗时的 1%
+- 计数器：frames（帧数）、detections（检测框数）、ocr_calls（OCR 调用次数）、dropped_frames（丢帧数），
+  也可以 inc 任意名字
+- 日志行里的 p50/p95 按上次打印以来的直方图增量估算（桶内线性插值）
+- enabled=False 时所有方法都是空操作，脚本里不用到处判断
+"""
+
+import argparse
+import threading
+import time
+from bisect import bisect_left
+
+# 直方图分桶上界（秒），覆盖 0.5 ms ~ 2.5 s
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNTERS = ("frames", "detections", "ocr_calls", "dropped_frames")
+
+
+class Histogram:
+    """固定分桶的延迟直方图（单位：秒）"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # 最后一个桶是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def snapshot(self):
+        return list(self.counts), self.sum, self.count
+
+    def quantile(self, q, counts=None):
+        """按分桶估算分位数（桶内线性插值，和 Prometheus 的 histogram_quantile 相同）"""
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                if i == len(self.bounds):  # 落在 +Inf 桶，只能返回最大的上界
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / c
+            seen += c
+        return self.bounds[-1]
+
+
+class _Stage:
+    """stage() 返回的计时上下文"""
+    __slots__ = ("hist", "lock", "start")
+
+    def __init__(self, hist, lock):
+        self.hist = hist
+        self.lock = lock
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            self.hist.observe(elapsed)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Telemetry:
+    """
+    分阶段计时 + 计数器 + Prometheus 文本输出
+    :param enabled: False 时所有方法都是空操作
+    :param prefix: 指标名前缀
+    :param log_every: 每隔多少秒打印一行汇总（0 表示不打印）
+    """
+
+    def __init__(self, enabled=True, prefix="plate", log_every=0.0, buckets=BUCKETS):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.log_every = log_every
+        self.buckets = buckets
+        self.stages = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self._server = None
+        self._last_log = time.monotonic()
+        self._last_counters = dict(self.counters)
+        self._last_counts = {}
+
+    def stage(self, name):
+        """with telemetry.stage("detect"): ... 记录这一段的耗时"""
+        if not self.enabled:
+            return _NULL_STAGE
+        hist = self.stages.get(name)
+        if hist is None:
+            with self.lock:
+                hist = self.stages.setdefault(name, Histogram(self.buckets))
+        return _Stage(hist, self.lock)
+
+    def observe(self, name, seconds):
+        """直接记录一个已知耗时（秒）"""
+        if not self.enabled:
+            return
+        with self.lock:
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def record(self, timings_ms, **counters):
+        """
+        一次记录一整条处理结果：各阶段耗时（毫秒，如 recognize_image 返回的 timings）+ 计数器增量
+        多进程批量识别时工作进程只回传 timings，由主进程调用这里汇总
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            for name, ms in timings_ms.items():
+                hist = self.stages.get(name)
+                if hist is None:
+                    hist = self.stages[name] = Histogram(self.buckets)
+                hist.observe(ms / 1000)
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_counter(self, name, value):
+        """计数器由别处累计时（如 FrameRing 的丢帧数）直接设置总数"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = value
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def tick(self):
+        """每帧调用一次，距上次打印超过 log_every 秒时打印一行汇总"""
+        if not self.enabled or not self.log_every:
+            return
+        now = time.monotonic()
+        if now - self._last_log >= self.log_every:
+            print(self.log_line(now))
+
+    def log_line(self, now=None):
+        """上次打印以来的帧率、计数器增量和各阶段 p50/p95"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            counters = dict(self.counters)
+            snapshots = {name: list(h.counts) for name, h in self.stages.items()}
+        interval = max(now - self._last_log, 1e-6)
+        delta = {k: v - self._last_counters.get(k, 0) for k, v in counters.items()}
+        parts = [f"📈 {delta.get('frames', 0) / interval:.1f} FPS",
+                 f"帧 {counters.get('frames', 0)}", f"检测 {counters.get('detections', 0)}",
+                 f"OCR {counters.get('ocr_calls', 0)}", f"丢帧 {counters.get('dropped_frames', 0)}"]
+        for name, counts in snapshots.items():
+            last = self._last_counts.get(name, [0] * len(counts))
+            window = [c - l for c, l in zip(counts, last)]
+            if sum(window):
+                hist = self.stages[name]
+                parts.append(f"{name} p50 {hist.quantile(0.5, window) * 1000:.1f} / "
+                             f"p95 {hist.quantile(0.95, window) * 1000:.1f} ms")
+        self._last_log = now
+        self._last_counters = counters
+        self._last_counts = snapshots
+        return " | ".join(parts)
+
+    def render(self):
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        p = self.prefix
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            stages = {name: h.snapshot() for name, h in self.stages.items()}
+        lines = []
+        for name, value in counters.items():
+            lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {value}"]
+        for name, value in gauges.items():
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+        lines.append(f"# TYPE {p}_uptime_seconds gauge")
+        lines.append(f"{p}_uptime_seconds {time.time() - self.started:.3f}")
+        if stages:
+            metric = f"{p}_stage_duration_seconds"
+            lines.append(f"# HELP {metric} 各处理阶段耗时")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, (counts, total, count) in stages.items():
+                cumulative = 0
+                for bound, c in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """后台线程启动 /metrics 接口"""
+        if not self.enabled or self._server is not None:
+            return
+        # 用到时才导入（http.server 导入要几十毫秒，命令行客户端只需要 add_telemetry_args）
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # 不打印每次抓取的访问日志
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📡 监控指标：http://{host}:{port}/metrics")
+
+    def close(self):
+        """关闭 /metrics 接口，打印最后一行汇总"""
+        if not self.enabled:
+            return
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.log_every:
+            print(self.log_line())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_telemetry_args(parser):
+    """给命令行脚本添加监控参数"""
+    group = parser.add_argument_group("运行时监控")
+    group.add_argument("--metrics-port", type=int, default=0,
+                       help="Prometheus 指标端口（0 表示不启动 /metrics 接口）")
+    group.add_argument("--metrics-log-every", type=float, default=0.0,
+                       help="每隔多少秒打印一行性能汇总（0 表示不打印）")
+    return parser
+
+
+def telemetry_from_args(args):
+    """按命令行参数创建 Telemetry（两个参数都没开时返回 enabled=False 的空实现）"""
+    enabled = args.metrics_port > 0 or args.metrics_log_every > 0
+    telemetry = Telemetry(enabled=enabled, log_every=args.metrics_log_every)
+    if args.metrics_port > 0:
+        telemetry.serve(args.metrics_port)
+    return telemetry
+
+
+def run_bench(iterations=100000, stages=5, frame_ms=30.0):
+    """测量每帧记录 stages 个阶段 + 3 个计数器 + tick 的开销"""
+    names = [f"stage{i}" for i in range(stages)]
+    results = {}
+    for label, telemetry in (("关闭", Telemetry(enabled=False)), ("开启", Telemetry(log_every=3600))):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for name in names:
+                with telemetry.stage(name):
+                    pass
+            telemetry.inc("frames")
+            telemetry.inc("detections", 2)
+            telemetry.inc("ocr_calls")
+            telemetry.tick()
+        results[label] = (time.perf_counter() - start) / iterations * 1e6
+    for label, us in results.items():
+        print(f"   监控{label}：每帧 {us:.2f} µs，占 {frame_ms:.0f} ms 帧耗时的 {us / (frame_ms * 10):.3f}%")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行时监控开销测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="测量每帧的记录开销")
+    bench.add_argument("--iterations", type=int, default=100000)
+    bench.add_argument("--stages", type=int, default=5, help="每帧计时的阶段数")
+    bench.add_argument("--frame-ms", type=float, default=30.0, help="参考的每帧耗时（毫秒）")
+    args = parser.parse_args()
+    run_bench(args.iterations, args.stages, args.frame_ms)
@@ -0,0 +1,6 @@
+"""公共模块单元测试：把 YOLO/common 加入搜索路径，和脚本里的写法一致"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
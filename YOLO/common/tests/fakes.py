@@ -0,0 +1,52 @@
+"""测试用的假对象：模拟 ultralytics 的检测结果（只实现公共模块用到的属性）"""
+
+import numpy as np
+
+
+class FakeTensor:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=float)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+    def __getitem__(self, index):
+        return FakeTensor(self.data[index])
+
+    def __float__(self):
+        return float(self.data)
+
+
+class FakeBoxes:
+    def __init__(self, boxes):
+        self.xyxy = FakeTensor([b[:4] for b in boxes] or np.zeros((0, 4)))
+        self.conf = FakeTensor([b[4] for b in boxes])
+        self.cls = FakeTensor([0] * len(boxes))
+
+    def __len__(self):
+        return len(self.conf.data)
+
+
+class FakeResult:
+    """一张图片的检测结果，boxes 为 [(x1, y1, x2, y2, conf), ...]"""
+
+    def __init__(self, boxes=()):
+        self.boxes = FakeBoxes(list(boxes))
+
+
+class FakeModel:
+    """按调用顺序返回预设的检测框；输入为列表时每张图片一个结果"""
+
+    def __init__(self, boxes=()):
+        self.boxes = list(boxes)
+        self.calls = []
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        self.calls.append((len(images), kwargs))
+        return [FakeResult(self.boxes) for _ in images]
+
+    predict = __call__
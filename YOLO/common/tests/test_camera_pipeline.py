@@ -0,0 +1,71 @@
+import multiprocessing as mp
+import os
+import signal
+import sys
+import threading
+import types
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import camera_pipeline
+from fakes import FakeModel
+
+pytestmark = pytest.mark.skipif(mp.get_start_method() != "fork",
+                                reason="假模型通过 fork 继承给推理进程")
+
+
+class _KillingModel:
+    """推理时把自己的进程杀掉，模拟推理进程崩溃"""
+
+    def __call__(self, *args, **kwargs):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "cam.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    if not out.isOpened():
+        pytest.skip("OpenCV 没有 MJPG 编码器")
+    for i in range(30):
+        out.write(np.full((48, 64, 3), i * 8, np.uint8))
+    out.release()
+    return path
+
+
+def _fake_ultralytics(monkeypatch, model):
+    module = types.ModuleType("ultralytics")
+    module.YOLO = lambda path: model
+    monkeypatch.setitem(sys.modules, "ultralytics", module)
+
+
+def _run(model_path, video, workers, timeout=60):
+    done = threading.Event()
+
+    def target():
+        camera_pipeline.run_pipeline(model_path, video, workers=workers, policy="block", show=False,
+                                     report_every=1000)
+        done.set()
+
+    threading.Thread(target=target, daemon=True).start()
+    return done.wait(timeout)
+
+
+def test_pipeline_processes_every_frame(tmp_path, video, monkeypatch, capsys):
+    model_path = tmp_path / "w.pt"
+    model_path.write_bytes(b"fake")
+    _fake_ultralytics(monkeypatch, FakeModel([(1, 2, 30, 20, 0.9)]))
+    assert _run(str(model_path), video, workers=2)
+    out = capsys.readouterr().out
+    assert "采集 30 帧，处理 30 帧" in out
+
+
+def test_killed_worker_does_not_hang(tmp_path, video, monkeypatch, capsys):
+    model_path = tmp_path / "w.pt"
+    model_path.write_bytes(b"fake")
+    _fake_ultralytics(monkeypatch, _KillingModel())
+    assert _run(str(model_path), video, workers=2), "推理进程被杀后主循环没有退出"
+    assert "异常退出" in capsys.readouterr().out
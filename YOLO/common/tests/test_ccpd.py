@@ -0,0 +1,28 @@
+from ccpd import decode_plate, encode_plate, make_name, parse_name
+
+SAMPLE = "025-95_113-154&383_386&473-386&473_177&454_154&383_363&402-0_0_22_27_27_33_16-37-15.jpg"
+
+
+def test_parse_sample_name():
+    info = parse_name("/data/ccpd_base/" + SAMPLE)
+    assert info["box"] == (154, 383, 386, 473)
+    assert info["points"] == [(386, 473), (177, 454), (154, 383), (363, 402)]
+    assert info["plate"] == "皖AY339S"
+    assert info["tilt"] == (95, 113)
+    assert (info["area"], info["brightness"], info["blur"]) == (25, 37, 15)
+
+
+def test_make_name_round_trip():
+    for plate in ("京A12345", "粤BD12345"):  # 蓝牌 7 位、绿牌 8 位
+        assert encode_plate(plate) and decode_plate(encode_plate(plate)) == plate
+        info = parse_name(make_name((10, 20, 110, 52), plate, brightness=80, blur=5))
+        assert info["plate"] == plate
+        assert info["box"] == (10, 20, 110, 52)
+        assert info["points"] == [(110, 52), (10, 52), (10, 20), (110, 20)]
+        assert (info["brightness"], info["blur"]) == (80, 5)
+
+
+def test_not_ccpd_names():
+    assert parse_name("car.jpg") is None
+    assert parse_name("a-b-c-d-e-f-g.jpg") is None
+    assert parse_name("025-95_113-154&383_386&473-386&473-0_0_99-37-15.jpg") is None
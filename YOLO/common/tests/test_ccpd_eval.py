@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("cv2")
+
+from ccpd import make_name
+from ccpd_eval import average_precision, box_iou, load_testset, pareto_front, pick_fastest
+
+
+def test_box_iou():
+    assert box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert box_iou((0, 0, 10, 10), (5, 0, 15, 10)) == pytest.approx(1 / 3)
+    assert box_iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+    assert box_iou((0, 0, 0, 0), (0, 0, 0, 0)) == 0.0
+
+
+def test_average_precision():
+    truths = {0: [(0, 0, 10, 10)], 1: [(0, 0, 10, 10)]}
+    perfect = [(0, 0.9, (0, 0, 10, 10)), (1, 0.8, (0, 0, 10, 10))]
+    assert average_precision(perfect, truths) == pytest.approx(1.0)
+    # 同一个真值框的重复检测算误检；排在最后，不影响前面的精度
+    assert average_precision(perfect + [(0, 0.1, (0, 0, 10, 10))], truths) == pytest.approx(1.0)
+    # 只找到一半
+    assert average_precision(perfect[:1], truths) == pytest.approx(51 / 101)
+    # 置信度最高的是误检：召回率 0.5 和 1 处的精度分别是 1/2 和 2/3，取包络后都是 2/3
+    wrong_first = [(0, 0.95, (50, 50, 60, 60))] + perfect
+    assert average_precision(wrong_first, truths) == pytest.approx(2 / 3)
+    assert average_precision([], {}) == 0.0
+    # IoU 阈值更高时偏一点的框不算命中
+    shifted = [(0, 0.9, (1, 0, 11, 10))]
+    assert average_precision(shifted, {0: [(0, 0, 10, 10)]}, 0.5) == pytest.approx(1.0)
+    assert average_precision(shifted, {0: [(0, 0, 10, 10)]}, 0.9) == 0.0
+
+
+def test_load_testset_dir_and_split(tmp_path):
+    root = tmp_path / "CCPD2019"
+    (root / "ccpd_base").mkdir(parents=True)
+    names = [make_name((10, 10, 50, 30), plate) for plate in ("京A12345", "沪B23456", "粤C34567")]
+    for name in names:
+        (root / "ccpd_base" / name).write_bytes(b"")
+    (root / "ccpd_base" / "notes.jpg").write_bytes(b"")
+    samples = load_testset(str(root))
+    assert len(samples) == 3
+    assert {s[1]["plate"] for s in samples} == {"京A12345", "沪B23456", "粤C34567"}
+    assert len(load_testset(str(root), limit=2)) == 2
+
+    (root / "splits").mkdir()
+    (root / "splits" / "test.txt").write_text(f"ccpd_base/{names[1]}\n\n", encoding="utf-8")
+    samples = load_testset(str(root / "splits" / "test.txt"))
+    assert [s[1]["plate"] for s in samples] == ["沪B23456"]
+    assert samples[0][0] == str(root / "ccpd_base" / names[1])
+
+
+def test_pareto_and_pick_fastest():
+    rows = [
+        {"model": "a.pt", "e2e_p50_ms": 10, "plate_acc": 0.80},
+        {"model": "b.pt", "e2e_p50_ms": 20, "plate_acc": 0.90},
+        {"model": "c.pt", "e2e_p50_ms": 25, "plate_acc": 0.85},   # 比 b 慢还不如 b 准
+        {"model": "d.pt", "e2e_p50_ms": 30, "plate_acc": 0.95},
+    ]
+    pareto_front(rows, "plate_acc")
+    assert [r["model"] for r in rows if r["pareto"]] == ["a.pt", "b.pt", "d.pt"]
+    assert pick_fastest(rows, "plate_acc", 0.85)["model"] == "b.pt"
+    assert pick_fastest(rows, "plate_acc", 0.99) is None
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from detection_cache import DetectionCache, model_fingerprint
+from model_store import ModelStore
+
+
+def test_cache_evict_least_recently_used(tmp_path):
+    with DetectionCache(str(tmp_path / "cache.db"), "model", max_mb=1, evict_every=1000) as cache:
+        keys = [cache.key(bytes([i]) * 16) for i in range(10)]
+        for key in keys:
+            cache.put(key, [[1, 2, 3, 4, 0.5]])
+        size = cache.size_bytes() // len(keys)
+        with cache.conn:
+            for i, key in enumerate(keys):
+                cache.conn.execute("UPDATE detections SET last_used = ? WHERE key = ?", (1000.0 + i, key))
+        cache.get(keys[0])      # 最近用过，不淘汰
+
+        assert cache.evict(max_bytes=size * 10) == 0
+        # 超出上限后删到上限的 90%：上限 6 条 -> 留 5 条
+        assert cache.evict(max_bytes=size * 6) == 5
+        assert cache.evicted == 5
+        assert cache.get(keys[0]) is not None
+        assert [cache.get(key) is not None for key in keys[1:6]] == [False] * 5
+        assert all(cache.get(key) is not None for key in keys[6:])
+
+
+def test_cache_evict_on_put(tmp_path):
+    with DetectionCache(str(tmp_path / "cache.db"), "model", max_mb=0.0005, evict_every=5) as cache:
+        for i in range(20):
+            cache.put(cache.key(bytes([i])), {"boxes": [[i, i, i + 10, i + 10, 0.9]]})
+        assert cache.evicted > 0
+        assert cache.size_bytes() <= cache.max_bytes
+
+
+def test_cache_key_depends_on_params(tmp_path):
+    with DetectionCache(str(tmp_path / "cache.db"), "model") as cache:
+        data = np.arange(12, dtype=np.uint8).reshape(2, 2, 3)
+        assert cache.key(data, conf=0.3) == cache.key(data.tobytes(), conf=0.3)
+        assert cache.key(data, conf=0.3) != cache.key(data, conf=0.5)
+        value, hit = cache.fetch(data, lambda: [1], conf=0.3)
+        assert (value, hit) == ([1], False)
+        assert cache.fetch(data, lambda: [2], conf=0.3) == ([1], True)
+
+
+def test_cache_persists_between_runs(tmp_path):
+    db = str(tmp_path / "cache.db")
+    with DetectionCache(db, "model") as cache:
+        cache.fetch(b"img", lambda: {"box": [1, 2, 3, 4], "conf": 0.9}, conf=0.3)
+    with DetectionCache(db, "model") as cache:
+        assert cache.fetch(b"img", lambda: None, conf=0.3) == ({"box": [1, 2, 3, 4], "conf": 0.9}, True)
+        report = cache.report()
+        assert (report["hits"], report["misses"], report["entries"]) == (1, 0, 1)
+    # 换模型后不命中
+    with DetectionCache(db, "other-model") as cache:
+        assert cache.fetch(b"img", lambda: "new", conf=0.3) == ("new", False)
+
+
+def test_model_fingerprint(tmp_path, monkeypatch):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"v1")
+    db = str(tmp_path / "cache.db")
+    first = model_fingerprint(str(weights), db)
+    assert first == model_fingerprint(str(weights))
+    # 内容变了（修改时间 / 大小也变了）时重新计算
+    weights.write_bytes(b"v2 longer")
+    os.utime(weights, (1, 1))
+    assert model_fingerprint(str(weights), db) != first
+
+    store = ModelStore(str(tmp_path / "store"))
+    monkeypatch.setenv("PLATE_MODEL_STORE", store.root)
+    entry = store.add(str(weights), "plate-det", inspect_model=False)
+    assert model_fingerprint("plate-det") == entry["sha256"]
+    # 既不是文件也不在模型库里：只按名字区分
+    assert model_fingerprint("yolov5s") == model_fingerprint("yolov5s") != model_fingerprint("yolov5m")
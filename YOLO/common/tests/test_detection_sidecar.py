@@ -0,0 +1,140 @@
+from pathlib import Path
+
+import pytest
+
+import detection_sidecar as sidecar
+
+FRAMES = [
+    (0, [(10, 20, 110, 60, 0.9)], ["京A12345"]),
+    (1, [(11, 21, 111, 61, 0.8)], ["京A12345"]),
+    (5, [(300, 40, 420, 90, 0.5), (0, 0, 50, 30, 0.7)], [None, "沪B54321"]),
+]
+
+
+def _write(path, frames=FRAMES, total=8, overlays=()):
+    with sidecar.SidecarWriter(str(path), fps=25, width=1920, height=1080, source="car.mp4",
+                               overlays=overlays) as writer:
+        for frame_idx, boxes, labels in frames:
+            writer.write(frame_idx, boxes, labels)
+        writer.write(total - 1, [])     # 没有检测框的帧只更新总帧数
+    return writer
+
+
+@pytest.mark.parametrize("name", ["car.dets", "car.jsonl"])
+def test_sidecar_round_trip(tmp_path, name):
+    writer = _write(tmp_path / name)
+    assert writer.detections == 4
+    header, frames = sidecar.read_sidecar(str(tmp_path / name))
+    assert (header["source"], header["fps"], header["width"], header["height"]) == ("car.mp4", 25, 1920, 1080)
+    records = list(frames)
+    assert header["frames"] == 8
+    assert [r[0] for r in records] == [0, 1, 5]
+    for (frame_idx, boxes, labels), (_, want_boxes, want_labels) in zip(records, FRAMES):
+        assert labels == want_labels
+        for box, want in zip(boxes, want_boxes):
+            assert tuple(box[:4]) == want[:4]
+            assert box[4] == pytest.approx(want[4], abs=1e-3)
+
+
+def test_sidecar_binary_clamps_coordinates(tmp_path):
+    path = tmp_path / "clamp.dets"
+    _write(path, frames=[(3, [(-5, 10.7, 70000, 20, 0.5)], None)], total=4)
+    _, frames = sidecar.read_sidecar(str(path))
+    (frame_idx, boxes, labels), = list(frames)
+    assert frame_idx == 3
+    assert tuple(boxes[0][:4]) == (0, 10, 65535, 20)
+    assert labels == [None]
+
+
+def test_sidecar_binary_is_compact(tmp_path):
+    _write(tmp_path / "car.dets")
+    _write(tmp_path / "car.jsonl")
+    assert (tmp_path / "car.dets").stat().st_size < (tmp_path / "car.jsonl").stat().st_size
+
+
+def test_sidecar_binary_without_end_marker(tmp_path):
+    """写入中途中断（没有结束标记）时读到文件结尾为止，总帧数未知"""
+    path = tmp_path / "cut.dets"
+    writer = sidecar.SidecarWriter(str(path), fps=25, width=640, height=480, overlays=())
+    writer.write(2, [(1, 2, 3, 4, 0.5)], ["A"])
+    writer._f.flush()
+    header, frames = sidecar.read_sidecar(str(path))
+    assert [r[0] for r in frames] == [2]
+    assert "frames" not in header
+    writer.close()
+
+
+def test_sidecar_binary_corrupt_record(tmp_path):
+    path = tmp_path / "bad.dets"
+    _write(path, frames=[], total=1)
+    data = path.read_bytes()
+    path.write_bytes(data[:-5] + b"X" + data[-5:])
+    _, frames = sidecar.read_sidecar(str(path))
+    with pytest.raises(ValueError):
+        list(frames)
+
+
+def test_export_vtt(tmp_path):
+    _write(tmp_path / "car.dets", overlays=("vtt",))
+    text = (tmp_path / "car.vtt").read_text(encoding="utf-8")
+    lines = text.splitlines()
+    assert lines[0] == "WEBVTT"
+    cues = [line for line in lines if "-->" in line]
+    # 第 0、1 帧几乎不动且标签相同，合并成一条；第 5 帧两个框各一条
+    assert len(cues) == 3
+    assert cues[0].startswith("00:00:00.000 --> 00:00:00.080 ")
+    assert "京A12345 0.90" in text
+    assert "沪B54321 0.70" in text
+    assert "position:0.0%" in cues[2]
+
+
+def test_export_ass(tmp_path):
+    path = tmp_path / "car.jsonl"
+    _write(path)
+    out = sidecar.export_ass(str(path), str(tmp_path / "car.ass"), color="FF8000")
+    text = Path(out).read_text(encoding="utf-8-sig")
+    assert "PlayResX: 1920\nPlayResY: 1080" in text
+    assert "&H000080FF" in text                         # RGB -> BGR
+    boxes = [line for line in text.splitlines() if line.startswith("Dialogue: 0,")]
+    assert len(boxes) == 3
+    assert boxes[0].startswith("Dialogue: 0,0:00:00.00,0:00:00.08,Box,")
+    assert boxes[0].endswith("m 10 20 l 110 20 110 60 10 60{\\p0}")
+    assert "{\\pos(10,16)}京A12345 0.90" in text
+    assert "{\\pos(0,0)}沪B54321 0.70" in text           # 框贴着顶边时标签不越界
+
+
+def test_export_empty_sidecar(tmp_path):
+    path = tmp_path / "empty.dets"
+    _write(path, frames=[], total=100)
+    assert Path(sidecar.export_vtt(str(path), str(tmp_path / "e.vtt"))).read_text(encoding="utf-8") == "WEBVTT\n\n"
+    text = Path(sidecar.export_ass(str(path), str(tmp_path / "e.ass"))).read_text(encoding="utf-8-sig")
+    assert "Dialogue:" not in text
+
+
+def test_subtitle_time_format():
+    assert sidecar._vtt_time(3661.5) == "01:01:01.500"
+    assert sidecar._ass_time(3661.5) == "1:01:01.50"
+    assert sidecar._vtt_time(0) == "00:00:00.000"
+
+
+def test_sidecar_binary_many_labels(tmp_path):
+    """标签编号超过 2 字节的范围时不能和"没有标签"混淆"""
+    path = tmp_path / "long.dets"
+    count = 0x10001
+    with sidecar.SidecarWriter(str(path), fps=25, width=640, height=480, overlays=()) as writer:
+        for i in range(count):
+            writer.write(i, [(1, 2, 3, 4, 0.5)], [f"L{i}"])
+        writer.write(count, [(1, 2, 3, 4, 0.5)], [None])
+    _, frames = sidecar.read_sidecar(str(path))
+    labels = [record[2][0] for record in frames]
+    assert labels[0xFFFF] == "L65535"
+    assert labels[0x10000] == "L65536"
+    assert labels[-1] is None
+    assert len(labels) == count + 1
+
+
+def test_sidecar_unknown_version(tmp_path):
+    path = tmp_path / "future.dets"
+    path.write_bytes(sidecar.MAGIC + b"\x09\x00\x02\x00\x00\x00{}")
+    with pytest.raises(ValueError, match="版本"):
+        sidecar.read_sidecar(str(path))
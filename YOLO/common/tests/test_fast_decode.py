@@ -0,0 +1,125 @@
+import struct
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import fast_decode
+
+def _jpeg(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    img = cv2.resize(rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8), (width, height))
+    ok, data = cv2.imencode(".jpg", img)
+    assert ok
+    return img, data.tobytes()
+
+
+def _segment(marker, payload):
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def test_jpeg_size_real_file():
+    _, data = _jpeg(640, 400)
+    assert fast_decode.jpeg_size(data) == (640, 400)
+    assert fast_decode.jpeg_size(np.frombuffer(data, dtype=np.uint8)) == (640, 400)
+
+
+def test_jpeg_size_headers():
+    sof2 = _segment(0xC2, b"\x08" + struct.pack(">HH", 1160, 720) + b"\x03")
+    dht = _segment(0xC4, b"\x00" * 17)          # C4 是哈夫曼表，不是 SOF
+    app0 = _segment(0xE0, b"JFIF\x00" + b"\x00" * 9)
+    assert fast_decode.jpeg_size(b"\xff\xd8" + app0 + dht + sof2) == (720, 1160)
+    # 段之间的 0xFF 填充字节
+    assert fast_decode.jpeg_size(b"\xff\xd8\xff\xff" + sof2[1:]) == (720, 1160)
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"\x89PNG\r\n\x1a\n" + b"\x00" * 32,
+    b"\xff\xd8",
+    b"\xff\xd8" + _segment(0xDA, b"\x00" * 8),            # 图像数据前没有 SOF
+    b"\xff\xd8\xff\xc0\x00\x11\x08\x02",                   # SOF 段被截断
+    b"\xff\xd8\x00\x00\x00\x00",                           # 不是段头
+])
+def test_jpeg_size_invalid(data):
+    assert fast_decode.jpeg_size(data) is None
+
+
+@pytest.mark.parametrize("size, imgsz, tolerance, factor", [
+    ((4000, 3000), 640, 1.0, 4),
+    ((1280, 720), 640, 1.0, 2),
+    ((1279, 720), 640, 1.0, 1),
+    ((720, 1160), 640, 0.9, 2),
+    ((5120, 2880), 640, 1.0, 8),
+    ((320, 240), 640, 1.0, 1),
+])
+def test_choose_factor(size, imgsz, tolerance, factor):
+    assert fast_decode.choose_factor(size[0], size[1], imgsz, tolerance) == factor
+
+
+def test_decode_image_reduced(tmp_path):
+    _, data = _jpeg(1600, 800)
+    path = tmp_path / "big.jpg"
+    path.write_bytes(data)
+    decoded = fast_decode.decode_image(str(path), imgsz=200)
+    assert decoded.factor == 8
+    assert decoded.full_size == (1600, 800)
+    assert decoded.image.shape[:2] == (100, 200)
+    full = fast_decode.decode_image(str(path))
+    assert full.factor == 1 and full.image.shape[:2] == (800, 1600)
+
+
+def test_decode_image_non_jpeg(tmp_path):
+    img, _ = _jpeg(800, 400)
+    path = tmp_path / "big.png"
+    cv2.imwrite(str(path), img)
+    decoded = fast_decode.decode_image(str(path), imgsz=200)
+    assert decoded.factor == 1 and decoded.full_size == (800, 400)
+
+
+def test_to_full_clamps_and_keeps_extra_fields():
+    decoded = fast_decode.DecodedImage(np.zeros((100, 200, 3), np.uint8), factor=4, full_size=(798, 398))
+    assert decoded.to_full((10, 10, 200, 100, 0.9)) == (40, 40, 798, 398, 0.9)
+    assert decoded.to_full(None) is None
+
+
+def test_read_region_resolution(tmp_path):
+    _, data = _jpeg(1600, 800)
+    path = tmp_path / "big.jpg"
+    path.write_bytes(data)
+    decoded = fast_decode.decode_image(str(path), imgsz=200)
+    # 区域够高：直接裁剪缩小图，不重新解码
+    region = decoded.read_region((0, 0, 800, 400), min_height=48)
+    assert region.shape[:2] == (50, 100)
+    assert set(decoded._cache) == {8}
+    # 高 100：1/8、1/4 都不够 48 像素，按 1/2 解码
+    region = decoded.read_region((100, 100, 300, 200), min_height=48)
+    assert region.shape[:2] == (50, 100)
+    assert set(decoded._cache) == {8, 2}
+    # 高 40：只能按原分辨率
+    region = decoded.read_region((101, 103, 203, 143), min_height=48)
+    assert region.shape[:2] == (40, 102)
+    assert set(decoded._cache) == {8, 2, 1}
+
+
+def test_read_region_rounds_outward_and_rejects_empty(tmp_path):
+    _, data = _jpeg(1600, 800)
+    path = tmp_path / "big.jpg"
+    path.write_bytes(data)
+    decoded = fast_decode.decode_image(str(path), imgsz=200)
+    # 坐标不是倍数时向外取整，裁剪结果覆盖整个区域
+    assert decoded.read_region((9, 9, 801, 401), min_height=1).shape[:2] == (50, 100)
+    assert decoded.read_region((10, 10, 10, 50)) is None
+    assert decoded.read_region((10, 50, 20, 40)) is None
+
+
+def test_decode_image_unicode_path_and_garbage(tmp_path):
+    _, data = _jpeg(640, 320)
+    path = tmp_path / "车牌.jpg"
+    path.write_bytes(data)
+    assert fast_decode.decode_image(str(path), imgsz=320).image.shape[:2] == (160, 320)
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not an image")
+    decoded = fast_decode.decode_image(str(bad), imgsz=320)
+    assert decoded.image is None and decoded.factor == 1
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+from folder_watch import (BatchCollector, Checkpoint, LatencyStats, PollingWatcher, arrival_time, list_existing,
+                          watch_folder)
+
+
+def touch(path, mtime=None, data=b"jpeg"):
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_arrival_time(tmp_path):
+    now = time.time()
+    path = touch(tmp_path / "a.jpg", now - 2)
+    assert arrival_time(path, started=now - 10, now=now) == now - 2
+    # 启动前就在目录里的文件从启动时算起
+    assert arrival_time(path, started=now - 1, now=now) == now - 1
+    # 修改时间在"未来"（时钟不同步）时按当前时间算
+    touch(path, now + 60)
+    assert arrival_time(path, started=now - 10, now=now) == now
+    assert arrival_time(str(tmp_path / "missing.jpg"), started=now - 10, now=now) == now
+
+
+def test_polling_watcher_waits_for_stable_files(tmp_path):
+    watcher = PollingWatcher(str(tmp_path), interval=0, known={"old.jpg"})
+    touch(tmp_path / "old.jpg")
+    touch(tmp_path / "notes.txt")
+    path = touch(tmp_path / "cam.jpg", time.time() - 5)
+    assert watcher.poll(0) == []            # 第一次看到，还不知道写没写完
+    assert watcher.poll(0) == [path]        # 两次扫描之间没变
+    assert watcher.poll(0) == []            # 只报告一次
+
+    growing = touch(tmp_path / "big.jpg", data=b"x")
+    assert watcher.poll(0) == []
+    touch(growing, data=b"xx")
+    assert watcher.poll(0) == []            # 还在变
+    assert watcher.poll(0) == [growing]
+
+
+def test_batch_collector():
+    collector = BatchCollector(max_batch=2, max_wait_ms=50)
+    assert collector.time_left() is None and not collector.ready()
+    collector.add("a", time.time())
+    assert not collector.ready() and collector.take() == []
+    collector.add("b")
+    collector.add("c")
+    assert [p for p, _ in collector.take()] == ["a", "b"]
+    assert len(collector) == 1
+    collector.add("d", time.time() - 1)
+    assert collector.ready() and [p for p, _ in collector.take()] == ["c", "d"]
+
+
+def test_checkpoint_skips_corrupt_lines(tmp_path):
+    path = tmp_path / "done" / "processed.jsonl"
+    checkpoint = Checkpoint(str(path))
+    checkpoint.add([{"image": "a.jpg"}, {"image": "b.jpg", "plate": "京A12345"}])
+    checkpoint.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"image": "c.jp')     # 崩溃时写了一半
+    checkpoint = Checkpoint(str(path))
+    assert "a.jpg" in checkpoint and "b.jpg" in checkpoint and "c.jpg" not in checkpoint
+    checkpoint.close()
+    assert json.loads(path.read_text(encoding="utf-8").splitlines()[1])["plate"] == "京A12345"
+
+
+def test_latency_stats():
+    stats = LatencyStats()
+    stats.add([9.0, 9.5], t_done=10.0)
+    stats.add([9.9], t_done=10.0)
+    s = stats.summary()
+    assert (s["files"], s["batches"], s["avg_batch"]) == (3, 2, 1.5)
+    assert s["latency_max_ms"] == 1000.0
+    assert "落地 -> 出结果" in stats.format()
+
+
+def test_watch_folder_poll_latency_from_mtime(tmp_path):
+    folder = tmp_path / "drop"
+    folder.mkdir()
+    touch(folder / "old.jpg", time.time() - 3600)      # 启动前就有的积压文件
+    checkpoint = Checkpoint(str(tmp_path / "processed.jsonl"))
+    batches = []
+
+    def handle(paths):
+        if not batches:
+            # 处理第一批时落地一个文件，修改时间（监听开始之后）早于被轮询发现的时间
+            time.sleep(0.6)
+            touch(folder / "new.jpg", time.time() - 0.5)
+        batches.append([os.path.basename(p) for p in paths])
+
+    stats = watch_folder(str(folder), handle, max_batch=4, max_wait_ms=0, checkpoint=checkpoint,
+                         method="poll", interval=0.05, idle_exit=0.3, report_every=0)
+    checkpoint.close()
+    assert batches == [["old.jpg"], ["new.jpg"]]
+    assert stats.files == 2
+    assert stats.values[0] < 1000                      # 积压从启动时算起，不是一小时
+    assert stats.values[1] >= 500                      # 从修改时间算起，包含轮询发现的延迟
+    assert list_existing(str(folder), skip=checkpoint.done) == []
@@ -0,0 +1,131 @@
+import multiprocessing as mp
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from frame_ring import FrameRing
+
+SHAPE = (4, 6, 3)
+
+
+def _frame(value):
+    return np.full(SHAPE, value, np.uint8)
+
+
+@pytest.fixture
+def make_ring():
+    rings = []
+
+    def make(slots=3, policy="latest"):
+        rings.append(FrameRing(SHAPE, slots, policy))
+        return rings[-1]
+
+    yield make
+    for ring in rings:
+        ring.close()
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        FrameRing(SHAPE, 2, "newest")
+
+
+def test_write_acquire_release(make_ring):
+    ring = make_ring(policy="oldest")
+    assert ring.write(_frame(1), 0, t_capture=10.0) == 1
+    assert ring.write(_frame(2), 1) == 2
+    slot, meta, frame = ring.acquire(timeout=0)
+    assert (meta["seq"], meta["frame_idx"], meta["t_capture"]) == (1, 0, 10.0)
+    assert meta["t_written"] >= meta["t_capture"]
+    assert frame[0, 0, 0] == 1
+    ring.release(slot)
+    slot, meta, frame = ring.acquire(timeout=0)
+    assert meta["seq"] == 2 and frame[0, 0, 0] == 2
+    assert ring.acquire(timeout=0.01) is None       # 超时
+    ring.release(slot)
+    assert ring.counters() == {"captured": 2, "dropped": 0, "last_seq": 2}
+
+
+def test_latest_policy_skips_stale_frames(make_ring):
+    ring = make_ring(slots=3, policy="latest")
+    for i in range(5):              # 5 帧写进 3 个槽：最旧的两帧被覆盖
+        ring.write(_frame(i), i)
+    slot, meta, frame = ring.acquire(timeout=0)
+    # 推理进程只取最新的一帧，剩下的旧帧也丢弃
+    assert meta["frame_idx"] == 4 and frame[0, 0, 0] == 4
+    assert ring.counters()["dropped"] == 4
+    assert ring.acquire(timeout=0) is None
+    ring.release(slot)
+
+
+def test_latest_policy_when_all_slots_busy(make_ring):
+    ring = make_ring(slots=2, policy="latest")
+    held = []
+    for i in range(2):
+        ring.write(_frame(i), i)
+        held.append(ring.acquire(timeout=0)[0])
+    assert ring.write(_frame(3), 2) is None         # 所有槽都在推理，新帧丢弃
+    for slot in held:
+        ring.release(slot)
+    assert ring.counters()["dropped"] == 1
+
+
+def test_oldest_policy_drops_new_frames(make_ring):
+    ring = make_ring(slots=2, policy="oldest")
+    assert ring.write(_frame(1), 0) == 1
+    assert ring.write(_frame(2), 1) == 2
+    assert ring.write(_frame(3), 2) is None
+    assert [ring.acquire(timeout=0)[1]["frame_idx"] for _ in range(2)] == [0, 1]
+    assert ring.counters() == {"captured": 3, "dropped": 1, "last_seq": 2}
+
+
+def test_block_policy_waits_then_times_out(make_ring):
+    ring = make_ring(slots=1, policy="block")
+    ring.write(_frame(1), 0)
+    assert ring.write(_frame(2), 1, timeout=0.05) is None
+    slot, _, _ = ring.acquire(timeout=0)
+    ring.release(slot)
+    assert ring.write(_frame(3), 2, timeout=0.05) == 2
+
+
+def test_close_writer_drains_then_stops(make_ring):
+    ring = make_ring(policy="block")
+    ring.write(_frame(1), 0)
+    ring.close_writer()
+    assert ring.closed
+    slot, meta, _ = ring.acquire(timeout=1)
+    ring.release(slot)
+    assert ring.acquire(timeout=5) is None          # 采集已结束，不用等到超时
+
+
+def test_snapshot(make_ring):
+    ring = make_ring(slots=2, policy="latest")
+    assert ring.snapshot() == (None, None)
+    ring.write(_frame(1), 0)
+    ring.write(_frame(2), 1)
+    seq, frame = ring.snapshot(1)
+    assert seq == 1 and frame[0, 0, 0] == 1
+    seq, frame = ring.snapshot(99)                  # 已被覆盖的序号：取最新帧
+    assert seq == 2 and frame[0, 0, 0] == 2
+    frame[:] = 0                                    # 返回的是副本
+    assert ring.snapshot(2)[1][0, 0, 0] == 2
+
+
+def _consume(ring, out):
+    item = ring.acquire(timeout=5)
+    slot, meta, frame = item
+    out.put((meta["frame_idx"], int(frame.sum())))
+    ring.release(slot)
+    ring.close()
+
+
+def test_shared_between_processes(make_ring):
+    ring = make_ring(policy="block")
+    out = mp.Queue()
+    proc = mp.Process(target=_consume, args=(ring, out))
+    proc.start()
+    ring.write(_frame(5), 7)
+    assert out.get(timeout=10) == (7, 5 * 4 * 6 * 3)
+    proc.join(10)
+    assert proc.exitcode == 0
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from latest_frame_capture import LatestFrameCapture
+
+FRAMES = 30
+
+
+def make_video(path, fps):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    if not out.isOpened():
+        pytest.skip("OpenCV 没有 MJPG 编码器")
+    for i in range(FRAMES):
+        out.write(np.full((48, 64, 3), i * 8, np.uint8))
+    out.release()
+    return path
+
+
+def frame_index(frame):
+    return int(round(frame.mean() / 8))
+
+
+def read_all(cap, work_s=0.0):
+    indices = []
+    while True:
+        ok, frame = cap.read(timeout=5)
+        if not ok:
+            break
+        indices.append(frame_index(frame))
+        time.sleep(work_s)
+        cap.mark_result()
+    return indices
+
+
+def test_fast_consumer_gets_every_frame(tmp_path):
+    cap = LatestFrameCapture(make_video(str(tmp_path / "cam.avi"), 25))
+    assert cap.isOpened() and cap.realtime
+    indices = read_all(cap)
+    cap.release()
+    assert indices == list(range(FRAMES))
+    assert (cap.captured, cap.delivered, cap.dropped) == (FRAMES, FRAMES, 0)
+
+
+def test_slow_consumer_skips_stale_frames(tmp_path):
+    cap = LatestFrameCapture(make_video(str(tmp_path / "cam.avi"), 100)).start()
+    indices = read_all(cap, work_s=0.04)
+    cap.release()
+    # 每次拿到的都比上一次新，最后一帧一定会交出来
+    assert indices == sorted(set(indices))
+    assert indices[-1] == FRAMES - 1
+    assert cap.dropped > 0
+    assert cap.delivered + cap.dropped == cap.captured == FRAMES
+    summary = cap.summary()
+    assert summary["delivered"] == len(indices)
+    assert summary["latency_p95_ms"] >= summary["latency_p50_ms"] >= 40
+    # 按视频 FPS 节奏读文件：30 帧 / 100 FPS 至少要 0.29 秒
+    assert summary["capture_fps"] <= 110
+
+
+def test_unpaced_file_reads_as_fast_as_possible(tmp_path):
+    cap = LatestFrameCapture(make_video(str(tmp_path / "cam.avi"), 5), realtime=False)
+    start = time.perf_counter()
+    read_all(cap, work_s=0.01)
+    cap.release()
+    assert time.perf_counter() - start < 3        # 控速的话要 6 秒
+    assert cap.captured == FRAMES
+
+
+def test_read_after_end_and_mark_without_frame(tmp_path):
+    cap = LatestFrameCapture(make_video(str(tmp_path / "cam.avi"), 100))
+    assert cap.mark_result() is None
+    read_all(cap)
+    assert cap.read(timeout=1) == (False, None)
+    cap.release()
+    assert cap.mark_result() >= 0
+
+
+def test_print_summary(tmp_path, capsys):
+    cap = LatestFrameCapture(make_video(str(tmp_path / "cam.avi"), 100))
+    read_all(cap)
+    cap.release()
+    cap.print_summary()
+    out = capsys.readouterr().out
+    assert f"采集 {FRAMES} 帧" in out and "跳过旧帧 0 帧" in out
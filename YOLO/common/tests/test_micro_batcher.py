@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from micro_batcher import MicroBatcher, QueueFullError
+
+
+def test_concurrent_requests_are_batched():
+    sizes = []
+    gate = threading.Event()
+
+    def process(items):
+        gate.wait(5)
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(10)]
+    gate.set()
+    assert [f.result(timeout=5) for f in futures] == [i * 2 for i in range(10)]
+    batcher.close()
+    # 第一批在后台线程取走第一个请求后凑批，之后每批都不超过 max_batch
+    assert max(sizes) <= 4 and sum(sizes) == 10
+    stats = batcher.stats.as_dict()
+    assert stats["requests"] == 10
+    assert stats["batches"] == len(sizes)
+    assert sum(stats["batch_size_hist"].values()) == len(sizes)
+
+
+def test_single_request_waits_at_most_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch=8, max_wait_ms=30)
+    start = time.perf_counter()
+    assert batcher.submit("a").result(timeout=5) == "a"
+    assert time.perf_counter() - start < 1.0
+    batcher.close()
+    assert batcher.stats.as_dict()["batch_size_hist"] == {"1": 1}
+
+
+def test_queue_full_is_rejected():
+    gate = threading.Event()
+    batcher = MicroBatcher(lambda items: gate.wait(5) and items, max_batch=1, max_wait_ms=0, max_queue=2)
+    first = batcher.submit(0)
+    deadline = time.time() + 5
+    while batcher.queue_depth and time.time() < deadline:     # 等后台线程取走第一个
+        time.sleep(0.01)
+    batcher.submit(1)
+    batcher.submit(2)
+    with pytest.raises(QueueFullError):
+        batcher.submit(3)
+    gate.set()
+    assert first.result(timeout=5) == 0
+    batcher.close()
+    assert batcher.stats.as_dict()["rejected"] == 1
+
+
+def test_errors_fail_the_whole_batch_only():
+    calls = []
+
+    def process(items):
+        calls.append(items)
+        if "bad" in items:
+            raise ValueError("坏的输入")
+        return items
+
+    batcher = MicroBatcher(process, max_batch=1, max_wait_ms=0)
+    bad = batcher.submit("bad")
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    assert batcher.submit("good").result(timeout=5) == "good"
+    batcher.close()
+    assert batcher.stats.as_dict()["errors"] == 1
+
+
+def test_result_count_mismatch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch=2, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1).result(timeout=5)
+    batcher.close()
+
+
+def test_close_drains_queue():
+    gate = threading.Event()
+    batcher = MicroBatcher(lambda items: gate.wait(5) and items, max_batch=2, max_wait_ms=0)
+    futures = [batcher.submit(i) for i in range(5)]
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    gate.set()
+    closer.join(5)
+    assert [f.result(timeout=0) for f in futures] == list(range(5))
+    with pytest.raises(RuntimeError):
+        batcher.submit(5)
+    batcher.close()
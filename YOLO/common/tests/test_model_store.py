@@ -0,0 +1,113 @@
+import json
+import os
+
+import pytest
+
+import model_store
+from model_store import ModelStore, ModelStoreError, path_sha256, resolve_model
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / "best.pt"
+    path.write_bytes(b"weights v1")
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ModelStore(str(tmp_path / "store"))
+
+
+def test_add_and_resolve(store, weights):
+    entry = store.add(weights, "plate-det", inspect_model=False)
+    assert (entry["name"], entry["version"], entry["backend"]) == ("plate-det", 1, "ultralytics")
+    path = store.resolve("plate-det")
+    assert path == store.resolve("plate-det:1") == store.resolve("plate-det:latest")
+    assert open(path, "rb").read() == b"weights v1"
+    assert entry["sha256"] == path_sha256(weights)
+    with open(store.index_path, encoding="utf-8") as f:
+        assert "plate-det" in json.load(f)["models"]
+
+
+def test_versions_share_objects(store, weights, tmp_path):
+    store.add(weights, "plate-det", inspect_model=False)
+    store.add(weights, "plate-det", inspect_model=False)
+    other = tmp_path / "v2.pt"
+    other.write_bytes(b"weights v2")
+    store.add(str(other), "plate-det", inspect_model=False)
+    assert [e["version"] for e in store.entries()] == [1, 2, 3]
+    assert len(os.listdir(store.objects)) == 2
+    assert open(store.resolve("plate-det"), "rb").read() == b"weights v2"
+    with pytest.raises(ModelStoreError):
+        store.entry("plate-det:9")
+    with pytest.raises(ModelStoreError):
+        store.entry("missing")
+
+    store.remove("plate-det:1")
+    assert len(os.listdir(store.objects)) == 2   # 版本 2 还引用同一个对象
+    store.remove("plate-det:2")
+    assert len(os.listdir(store.objects)) == 1
+    assert not store.has("plate-det:2") and store.has("plate-det")
+
+
+def test_tampered_object_is_rejected(store, weights):
+    store.add(weights, "plate-det", inspect_model=False)
+    path = store.path_of(store.entry("plate-det"))
+    with open(path, "ab") as f:
+        f.write(b"!")
+    with pytest.raises(ModelStoreError, match="校验失败"):
+        ModelStore(store.root).resolve("plate-det")
+    os.remove(path)
+    with pytest.raises(ModelStoreError, match="丢失"):
+        ModelStore(store.root).resolve("plate-det")
+
+
+def test_add_recopies_corrupt_object(store, weights):
+    store.add(weights, "plate-det", inspect_model=False)
+    path = store.resolve("plate-det")
+    with open(path, "wb") as f:
+        f.write(b"corrupt")
+    store.add(weights, "plate-det", inspect_model=False)
+    assert open(path, "rb").read() == b"weights v1"
+    assert ModelStore(store.root).resolve("plate-det:1") == path
+
+
+def test_directory_models(store, tmp_path):
+    model_dir = tmp_path / "ch_PP-OCRv3_rec_infer"
+    (model_dir / "sub").mkdir(parents=True)
+    (model_dir / "inference.pdmodel").write_bytes(b"model")
+    (model_dir / "sub" / "params").write_bytes(b"params")
+    entry = store.add(str(model_dir), "ppocr-rec")
+    assert entry["backend"] == "paddle"
+    path = store.resolve("ppocr-rec")
+    assert os.path.isdir(path)
+    assert path_sha256(path) == path_sha256(str(model_dir))
+    (model_dir / "sub" / "params").write_bytes(b"other")
+    assert path_sha256(str(model_dir)) != entry["sha256"]
+
+
+def test_resolve_model(store, weights, monkeypatch):
+    monkeypatch.setenv("PLATE_MODEL_STORE", store.root)
+    assert resolve_model(weights) == weights
+    with pytest.raises(ModelStoreError, match="模型文件不存在"):
+        resolve_model("runs/missing.pt")
+    with pytest.raises(ModelStoreError, match="不在模型库中"):
+        resolve_model("plate-det")
+    store.add(weights, "plate-det", inspect_model=False)
+    assert resolve_model("plate-det") == store.resolve("plate-det")
+
+
+def test_load_model_rejects_paddle_backend(store, tmp_path):
+    model_dir = tmp_path / "rec"
+    model_dir.mkdir()
+    (model_dir / "inference.pdmodel").write_bytes(b"model")
+    store.add(str(model_dir), "ppocr-rec")
+    with pytest.raises(ModelStoreError, match="resolve_model"):
+        model_store.load_model("ppocr-rec", store)
+
+
+def test_record_latency(store, weights):
+    store.add(weights, "plate-det", inspect_model=False)
+    store.record_latency("plate-det", {"p50_ms": 12.0}, host="box")
+    assert store.entry("plate-det")["latency"] == {"box": {"p50_ms": 12.0}}
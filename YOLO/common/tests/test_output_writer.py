@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import output_writer
+from output_writer import AsyncOutputWriter, NullVideoWriter, encode_image, make_thumbnail
+
+
+def _image(width=64, height=48, value=128):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def test_encode_image_by_extension():
+    img = _image()
+    jpg = encode_image(img, "a.jpg", jpeg_quality=90)
+    png = encode_image(img, "a.PNG")
+    assert jpg[:2] == b"\xff\xd8"
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    # 没有后缀时按 JPEG 编码
+    assert encode_image(img, "noext")[:2] == b"\xff\xd8"
+
+
+def test_jpeg_quality_changes_size():
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+    assert len(encode_image(img, "a.jpg", 30)) < len(encode_image(img, "a.jpg", 95))
+
+
+def test_make_thumbnail():
+    assert make_thumbnail(_image(400, 300), 100).shape[:2] == (75, 100)
+    small = _image(80, 60)
+    assert make_thumbnail(small, 100) is small
+
+
+def test_writes_images_and_thumbnails(tmp_path):
+    with AsyncOutputWriter(max_workers=2, max_queue=4, thumbnail_width=16) as writer:
+        for i in range(10):
+            writer.submit(str(tmp_path / f"{i}.jpg"), _image(value=i * 20))
+    stats = writer.stats.as_dict()
+    assert (stats["submitted"], stats["written"], stats["failed"]) == (10, 10, 0)
+    assert stats["max_queue_depth"] <= 4
+    assert sorted(p.name for p in tmp_path.glob("*.jpg")) == sorted(f"{i}.jpg" for i in range(10))
+    thumb = cv2.imread(str(tmp_path / "thumbs" / "3.jpg"))
+    assert thumb.shape[:2] == (12, 16)
+    assert stats["bytes_written"] == sum(p.stat().st_size for p in tmp_path.rglob("*.jpg"))
+
+
+def test_unicode_path(tmp_path):
+    """cv2.imwrite 在 Windows 下不支持中文路径，写盘器用 imencode + open"""
+    path = tmp_path / "结果" / "京A12345.png"
+    path.parent.mkdir()
+    with AsyncOutputWriter() as writer:
+        writer.submit(str(path), _image())
+    assert cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR).shape == (48, 64, 3)
+
+
+def test_results_only_mode(tmp_path):
+    writer = AsyncOutputWriter(write_images=False)
+    writer.submit(str(tmp_path / "a.jpg"), _image())
+    video = writer.open_video(str(tmp_path / "a.avi"), cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    assert isinstance(video, NullVideoWriter) and video.isOpened()
+    video.write(_image())
+    writer.close()
+    assert list(tmp_path.iterdir()) == []
+    assert writer.stats.as_dict()["skipped"] == 2
+
+
+def test_failed_write_is_counted(tmp_path, capsys):
+    with AsyncOutputWriter() as writer:
+        writer.submit(str(tmp_path / "missing" / "a.jpg"), _image())
+        writer.submit(str(tmp_path / "b.jpg"), _image())
+    stats = writer.stats.as_dict()
+    assert (stats["written"], stats["failed"]) == (1, 1)
+    assert "写入失败" in capsys.readouterr().out
+
+
+def test_backpressure_blocks_submit(tmp_path, monkeypatch):
+    """队列满时 submit 等待后台线程，而不是无限堆积"""
+    release = threading.Event()
+    original = AsyncOutputWriter._write_file
+
+    def slow_write(self, path, img):
+        release.wait(5)
+        return original(self, path, img)
+
+    monkeypatch.setattr(AsyncOutputWriter, "_write_file", slow_write)
+    writer = AsyncOutputWriter(max_workers=1, max_queue=1)
+    writer.submit(str(tmp_path / "0.jpg"), _image())    # 线程取走后卡在写盘
+    writer.submit(str(tmp_path / "1.jpg"), _image())    # 占满队列
+    blocked = threading.Thread(target=writer.submit, args=(str(tmp_path / "2.jpg"), _image()))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+    release.set()
+    blocked.join(5)
+    writer.close()
+    stats = writer.stats.as_dict()
+    assert stats["written"] == 3
+    assert stats["blocked_seconds"] >= 0.1
+
+
+def test_flush_and_close(tmp_path):
+    writer = AsyncOutputWriter(max_workers=1)
+    writer.submit(str(tmp_path / "a.jpg"), _image())
+    writer.flush()
+    assert (tmp_path / "a.jpg").exists()
+    writer.close()
+    writer.close()      # 重复调用没有影响
+    with pytest.raises(RuntimeError):
+        writer.submit(str(tmp_path / "b.jpg"), _image())
+
+
+def test_video_frames_in_order(tmp_path):
+    path = str(tmp_path / "out.avi")
+    with AsyncOutputWriter() as writer:
+        video = writer.open_video(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48), max_queue=2)
+        if not video.isOpened():
+            pytest.skip("OpenCV 没有 MJPG 编码器")
+        for i in range(6):
+            video.write(_image(value=i * 40))
+    cap = cv2.VideoCapture(path)
+    means = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        means.append(float(frame.mean()))
+    cap.release()
+    assert len(means) == 6
+    assert means == sorted(means)
+    assert writer.stats.as_dict()["written"] == 6
+
+
+def test_writer_from_args():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    output_writer.add_writer_args(parser)
+    args = parser.parse_args(["--jpeg-quality", "80", "--thumb-width", "120", "--no-images"])
+    writer = output_writer.writer_from_args(args)
+    assert (writer.jpeg_quality, writer.thumbnail_width, writer.write_images) == (80, 120, False)
+    writer.close()
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("cv2")
+
+from pipeline_bench import compare
+
+
+def make_report(e2e_p95, stage_p95, throughput=100.0):
+    return {"pipelines": {"detect": {
+        "throughput_per_s": throughput,
+        "latency_ms": {"p50": e2e_p95 / 2, "p95": e2e_p95},
+        "stages": {"encode": {"p95_ms": stage_p95}},
+    }}}
+
+
+def test_no_regression():
+    assert compare(make_report(20.0, 0.2), make_report(20.0, 0.2), 0.1) == []
+
+
+def test_latency_regression():
+    regressions = compare(make_report(30.0, 0.2), make_report(20.0, 0.2), 0.1)
+    assert [r[0] for r in regressions] == ["detect.latency.p50", "detect.latency.p95"]
+    assert regressions[1] == ("detect.latency.p95", 20.0, 30.0, 0.5)
+
+
+def test_sub_ms_jitter_ignored():
+    # 0.2 -> 0.4 ms 是 +100%，但绝对增量低于下限
+    assert compare(make_report(20.0, 0.4), make_report(20.0, 0.2), 0.1) == []
+    regressions = compare(make_report(20.0, 0.4), make_report(20.0, 0.2), 0.1, min_ms=0)
+    assert [r[0] for r in regressions] == ["detect.encode.p95"]
+
+
+def test_throughput_regression():
+    regressions = compare(make_report(20.0, 0.2, 80.0), make_report(20.0, 0.2, 100.0), 0.1)
+    assert regressions == [("detect.throughput_per_s", 100.0, 80.0, -0.2)]
+
+
+def test_missing_pipeline_or_stage_skipped():
+    current = make_report(50.0, 5.0)
+    current["pipelines"]["video"] = current["pipelines"]["detect"]
+    baseline = make_report(50.0, 5.0)
+    del baseline["pipelines"]["detect"]["stages"]["encode"]
+    assert compare(current, baseline, 0.1) == []
@@ -0,0 +1,119 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fakes import FakeResult
+from plate_index import PlateIndex, PlateVideoIndexer, literal_prefix, literal_suffix, to_glob
+
+
+@pytest.fixture
+def index(tmp_path):
+    with PlateIndex(str(tmp_path / "plates.db"), batch_size=3) as index:
+        yield index
+
+
+def _fill(index):
+    a = index.add_source("a.mp4", fps=25)
+    b = index.add_source("dir/b.mp4", fps=25)
+    for source_id, plate, ts in [(a, "鲁A12345", 1.0), (a, "鲁A12999", 2.0), (a, "鲁B12345", 3.0),
+                                 (b, "鲁A12345", 4.0), (b, "京A88888", 5.0), (b, "鲁A1[345", 6.0)]:
+        index.add(source_id, plate, frame=int(ts * 25), ts=ts, conf=0.9)
+    return a, b
+
+
+def test_to_glob_and_literals():
+    assert to_glob("鲁a12%") == "鲁A12*"
+    assert to_glob("鲁A1_3?5") == "鲁A1?3?5"
+    assert to_glob("A[1") == "A[[]1"
+    assert literal_prefix("鲁A12*") == "鲁A12"
+    assert literal_suffix("*2345") == "2345"
+    assert literal_suffix("鲁A?345") == "345"
+    assert literal_prefix("鲁A12345") == literal_suffix("鲁A12345") == "鲁A12345"
+
+
+@pytest.mark.parametrize("pattern, plates", [
+    ("鲁A12345", ["鲁A12345", "鲁A12345"]),
+    ("鲁a12345", ["鲁A12345", "鲁A12345"]),
+    ("鲁A12*", ["鲁A12345", "鲁A12345", "鲁A12999"]),
+    ("鲁A12%", ["鲁A12345", "鲁A12345", "鲁A12999"]),
+    ("*2345", ["鲁A12345", "鲁A12345", "鲁B12345"]),
+    ("?A12345", ["鲁A12345", "鲁A12345"]),
+    ("鲁?1*5", ["鲁A12345", "鲁A12345", "鲁A1[345", "鲁B12345"]),
+    ("*888*", ["京A88888"]),
+    ("鲁A1[345", ["鲁A1[345"]),
+    ("沪*", []),
+])
+def test_query_patterns(index, pattern, plates):
+    _fill(index)
+    assert [row["plate"] for row in index.query(pattern)] == plates
+
+
+def test_query_source_filter_and_fields(index):
+    _fill(index)
+    rows = index.query("鲁A12345", source="b.mp4")
+    assert len(rows) == 1
+    assert rows[0]["source"].endswith("b.mp4")
+    assert (rows[0]["frame"], rows[0]["timestamp"], rows[0]["conf"]) == (100, 4.0, 0.9)
+    assert index.query("鲁*", limit=2) == index.query("鲁*")[:2]
+
+
+def test_add_source_replace(index):
+    a, _ = _fill(index)
+    assert index.add_source("a.mp4") == a
+    assert index.query("鲁A12999") == []
+    assert index.stats()["sources"] == 2
+    kept = index.add_source("dir/b.mp4", replace=False)
+    assert len(index.query("*", source="b.mp4")) == 3
+    assert kept != a
+
+
+def test_dedupe_window(index):
+    source_id = index.add_source("a.mp4")
+    added = [index.add(source_id, "鲁A12345", ts=ts) for ts in (0.0, 0.4, 0.9, 1.0, 1.5, 2.5)]
+    assert added == [True, False, False, True, False, True]
+    # 没有时间的记录不去重
+    assert index.add(source_id, "鲁A12345") and index.add(source_id, "鲁A12345")
+
+
+def test_dedupe_table_expires(tmp_path):
+    """长视频里出现过的车牌不会一直留在去重表里"""
+    with PlateIndex(str(tmp_path / "p.db"), batch_size=10, dedupe_seconds=1.0) as index:
+        source_id = index.add_source("long.mp4")
+        for i in range(1000):
+            index.add(source_id, f"鲁A{i:05d}", ts=i * 0.1)
+        assert len(index._last_seen) <= 30
+        assert index.stats()["rows"] == 1000
+        # 窗口内的车牌仍然去重
+        assert not index.add(source_id, "鲁A00999", ts=99.95)
+
+
+def test_dedupe_is_per_source(index):
+    a = index.add_source("a.mp4")
+    b = index.add_source("b.mp4")
+    assert index.add(a, "鲁A12345", ts=1.0)
+    assert index.add(b, "鲁A12345", ts=1.0)
+
+
+class _Reader:
+    def __init__(self, texts):
+        self.texts = texts
+        self.calls = 0
+
+    def read_batch(self, crops):
+        self.calls += 1
+        return [self.texts[i % len(self.texts)] for i in range(len(crops))]
+
+
+def test_video_indexer(index):
+    reader = _Reader([("鲁A12345", 0.9), ("鲁B00000", 0.3)])
+    indexer = PlateVideoIndexer(index, reader, "v.mp4", fps=10, every_n=5, expand=2)
+    frame = np.zeros((100, 200, 3), np.uint8)
+    result = FakeResult([(10, 10, 60, 30, 0.8), (100, 50, 150, 70, 0.7)])
+    assert indexer.process(3, frame, result) == 0        # 不是抽帧的帧
+    assert indexer.process(5, frame, result) == 1        # 置信度低的不写
+    assert indexer.process(10, frame, result) == 0       # 1 秒内重复出现
+    assert indexer.process(15, frame, FakeResult([])) == 0
+    assert reader.calls == 2
+    assert indexer.close() == 1
+    (row,) = index.query("鲁A12345")
+    assert (row["frame"], row["timestamp"]) == (5, 0.5)
@@ -0,0 +1,124 @@
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import plate_ocr
+from model_store import ModelStoreError
+from plate_ocr import PlateReader, clean_plate_text, crop_plate, parse_rec_result
+
+
+def test_parse_rec_result():
+    raw = [[("京A12345", 0.8)], [("京A1234", 0.95)], [("太长的识别结果不是车牌", 0.99)], [], "bad"]
+    assert parse_rec_result(raw) == ("京A1234", 0.95)
+    assert parse_rec_result(None) == ("", 0.0)
+    assert parse_rec_result([[("京A12345", 0.8)]], plate_lengths=(8,)) == ("", 0.0)
+
+
+def test_clean_plate_text():
+    assert clean_plate_text("京a·12345 ") == "京A12345"
+    assert clean_plate_text("粤B-D1234５") == "粤BD1234"
+
+
+def test_crop_plate():
+    img = np.arange(100 * 200 * 3, dtype=np.uint32).reshape(100, 200, 3)
+    assert crop_plate(img, (10, 20, 50, 40)).shape[:2] == (20, 40)
+    assert crop_plate(img, (0, 0, 50, 40), expand=5).shape[:2] == (45, 55)
+    assert crop_plate(img, (190, 90, 250, 150), expand=5).shape[:2] == (15, 15)
+    assert crop_plate(img, (50, 40, 50, 60)) is None
+
+
+def _fake_paddleocr(monkeypatch, version, ocr=None, predict=None):
+    """替换成假的 paddleocr 模块，记录创建次数"""
+    created = []
+
+    class PaddleOCR:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+    if ocr is not None:
+        PaddleOCR.ocr = lambda self, *args, **kwargs: ocr(*args, **kwargs)
+    if predict is not None:
+        PaddleOCR.predict = lambda self, img: predict(img)
+    module = types.SimpleNamespace(PaddleOCR=PaddleOCR)
+    if version is not None:
+        module.__version__ = version
+    monkeypatch.setitem(sys.modules, "paddleocr", module)
+    return created
+
+
+def _crop(value=100):
+    return np.full((32, 120, 3), value, np.uint8)
+
+
+def test_reader_v2_batches_once(monkeypatch, tmp_path):
+    calls = []
+
+    def ocr(imgs, det, rec, cls):
+        assert det is False
+        calls.append(len(imgs[0]))
+        return [[("京A12345", 0.9), ("?", 0.5), ("沪b·88888", 0.7)][:len(imgs[0])]]
+
+    created = _fake_paddleocr(monkeypatch, "2.7.3", ocr=ocr)
+    reader = PlateReader(rec_model_dir=str(tmp_path), enhance=False)
+    assert created == []        # 第一次识别时才加载
+    assert reader.read_batch([_crop(), _crop(), _crop()]) == [("京A12345", 0.9), ("", 0.5), ("沪B88888", 0.7)]
+    assert reader.read(_crop()) == ("京A12345", 0.9)
+    assert calls == [3, 1]
+    assert created == [{"lang": "ch", "rec_model_dir": str(tmp_path)}]
+    assert reader.read_batch([]) == []
+
+
+def test_reader_v3_uses_predict(monkeypatch):
+    def predict(img):
+        assert img.shape == (32, 120, 3)
+        return [{"rec_texts": ["粤B", "D1234"], "rec_scores": [0.9, 0.8]}]
+
+    _fake_paddleocr(monkeypatch, "3.0.1", predict=predict)
+    reader = PlateReader()
+    assert reader.read_batch([_crop(), _crop()]) == [("粤BD1234", 0.8), ("粤BD1234", 0.8)]
+
+
+def test_reader_v3_rec_model_dir(monkeypatch, tmp_path):
+    created = _fake_paddleocr(monkeypatch, "3.1.0", predict=lambda img: [])
+    PlateReader(rec_model_dir=str(tmp_path)).ocr
+    assert created == [{"lang": "ch", "text_recognition_model_dir": str(tmp_path)}]
+
+
+def test_reader_missing_model_dir_is_not_downloaded(monkeypatch, tmp_path):
+    created = _fake_paddleocr(monkeypatch, "2.7.3", ocr=lambda *args, **kwargs: [[]])
+    monkeypatch.setenv("PLATE_MODEL_STORE", str(tmp_path / "store"))
+    with pytest.raises(ModelStoreError):
+        PlateReader(rec_model_dir="ppocr-rec").ocr
+    with pytest.raises(ModelStoreError):
+        PlateReader(rec_model_dir=str(tmp_path / "missing")).ocr
+    assert created == []
+
+
+def test_reader_version_fallback(monkeypatch):
+    _fake_paddleocr(monkeypatch, None, predict=lambda img: [{"rec_texts": [], "rec_scores": []}])
+    assert PlateReader().read(_crop()) == ("", 0.0)
+
+
+def test_ocr_errors_are_not_retried_through_other_api(monkeypatch):
+    """识别里抛出的 TypeError 不能被当成 "版本不对" 再用另一套接口重试"""
+    predicted = []
+
+    def ocr(imgs, det, rec, cls):
+        raise TypeError("坏的输入")
+
+    _fake_paddleocr(monkeypatch, "2.7.0", ocr=ocr, predict=predicted.append)
+    with pytest.raises(TypeError):
+        PlateReader().read(_crop())
+    assert predicted == []
+
+
+def test_preprocess_enhance():
+    pytest.importorskip("cv2")
+    reader = PlateReader()
+    out = reader.preprocess(np.random.default_rng(0).integers(0, 255, (32, 120, 3), dtype=np.uint8))
+    assert out.shape == (32, 120, 3)
+    assert (out[..., 0] == out[..., 1]).all()
+    assert plate_ocr.PlateReader(enhance=False).preprocess(_crop()) is not None
@@ -0,0 +1,77 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from fakes import FakeModel
+from plate_prefilter import PlateGate, covers, detect_in_regions, detect_with_gate, merge_boxes
+from synthetic_data import BLUE, GREEN, draw_plate
+
+PLATE = (400, 600, 640, 676)
+
+
+def street(color=BLUE, plate=PLATE):
+    """灰色背景上一块车牌（1160x720，和 CCPD 原图一样大）"""
+    img = np.full((1160, 720, 3), 110, np.uint8)
+    if plate is not None:
+        draw_plate(img, plate, "京A12345", color)
+    return img
+
+
+def test_merge_boxes():
+    assert merge_boxes([]) == []
+    # 不重叠（只接触边）的框保持原样和原顺序
+    assert merge_boxes([(10, 0, 20, 10), (0, 0, 10, 10)]) == [(10, 0, 20, 10), (0, 0, 10, 10)]
+    assert merge_boxes([(0, 0, 10, 10), (5, 5, 15, 15), (50, 50, 60, 60)]) == [(0, 0, 15, 15), (50, 50, 60, 60)]
+
+
+def test_merge_boxes_transitive():
+    # A 和 C 不重叠，B 先和 C 合并后才和 A 重叠，需要再合并一轮
+    boxes = [(0, 0, 10, 10), (20, 0, 30, 10), (12, 5, 25, 20), (8, 15, 14, 30)]
+    assert merge_boxes(boxes) == [(0, 0, 30, 30)]
+
+
+def test_covers():
+    assert covers((0, 0, 100, 100), (10, 10, 90, 90))
+    assert covers((0, 0, 100, 100), (0, 0, 100, 100))
+    assert not covers((0, 0, 100, 100), (10, 10, 101, 90))
+
+
+@pytest.mark.parametrize("color", [BLUE, GREEN])
+def test_propose_covers_plate(color):
+    regions = PlateGate().propose(street(color))
+    assert regions
+    assert any(covers(region, PLATE) for region in regions)
+    assert all(0 <= x1 < x2 <= 720 and 0 <= y1 < y2 <= 1160 for x1, y1, x2, y2 in regions)
+
+
+def test_propose_empty_scene():
+    assert PlateGate().propose(street(plate=None)) == []
+    # 大面积纯蓝色（没有字符边缘）不是车牌
+    img = street(plate=None)
+    img[300:900] = BLUE
+    assert PlateGate().propose(img) == []
+
+
+def test_detect_in_regions_maps_back_to_full_image():
+    img = street()
+    model = FakeModel([(5, 6, 50, 20, 0.4), (10, 12, 60, 30, 0.8)])
+    box, conf = detect_in_regions(model, img, [(100, 200, 300, 400), (400, 500, 700, 800)], imgsz=256)
+    assert (box, conf) == ((110, 212, 160, 230), 0.8)
+    assert [kwargs["imgsz"] for _, kwargs in model.calls] == [256, 256]
+    assert detect_in_regions(FakeModel(), img, [(0, 0, 10, 10)]) == (None, 0.0)
+
+
+def test_detect_with_gate_skips_model_without_regions():
+    gate = PlateGate()
+    model = FakeModel([(1, 2, 3, 4, 0.9)])
+    assert detect_with_gate(model, street(plate=None), gate) == (None, 0.0, [])
+    assert model.calls == []
+    box, conf, regions = detect_with_gate(model, street(plate=None), gate, fallback_full=True)
+    assert (box, conf, regions) == ((1, 2, 3, 4), 0.9, [])
+    assert model.calls[0][1]["imgsz"] == 640
+
+
+def test_params_change_with_settings():
+    assert PlateGate().params() == PlateGate().params()
+    assert PlateGate().params() != PlateGate(colors=("blue",)).params()
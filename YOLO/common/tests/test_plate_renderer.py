@@ -0,0 +1,76 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from fakes import FakeResult
+from plate_renderer import PlateRenderer, blend_rect
+
+
+def _frame(value=100):
+    return np.full((120, 200, 3), value, np.uint8)
+
+
+def test_blend_rect_only_touches_region():
+    img = _frame()
+    blend_rect(img, 10, 20, 30, 40, alpha=0.5)
+    assert (img[20:40, 10:30] == 50).all()
+    assert (img[:20] == 100).all() and (img[40:] == 100).all()
+    # 超出边界的矩形裁剪到图像内，无效矩形不处理
+    blend_rect(img, -10, -10, 5, 5, alpha=1.0)
+    assert (img[:5, :5] == 0).all()
+    before = img.copy()
+    blend_rect(img, 50, 50, 40, 60)
+    assert (img == before).all()
+
+
+def test_render_in_place():
+    frame = _frame(0)
+    out = PlateRenderer().render(frame, [(20, 30, 80, 60, 0.87)], info=["FPS: 25.0"])
+    assert out is frame
+    assert tuple(frame[50, 20]) == (0, 255, 0)      # 框的左边
+
+
+def test_render_copy_reuses_buffer():
+    renderer = PlateRenderer(in_place=False)
+    frame = _frame(0)
+    first = renderer.render(frame, [(20, 30, 80, 60, 0.5)])
+    assert first is not frame and (frame == 0).all()
+    second = renderer.render(_frame(0), [])
+    assert second is first                          # 同尺寸复用缓冲区
+    assert (second == 0).all()
+    third = renderer.render(np.zeros((60, 80, 3), np.uint8), [])
+    assert third is not first and third.shape == (60, 80, 3)
+
+
+def test_disabled_renderer_returns_input():
+    frame = _frame()
+    renderer = PlateRenderer(enabled=False)
+    assert renderer.render(frame, [(0, 0, 10, 10, 0.9)]) is frame
+    assert renderer.render_result(frame, FakeResult([(0, 0, 10, 10, 0.9)])) is frame
+    assert (frame == 100).all()
+
+
+def test_labels_stay_inside_image():
+    renderer = PlateRenderer(label_alpha=0)
+    frame = _frame(0)
+    # 框贴着左上角：标签移到框下方，不会画到图像外面
+    renderer.render(frame, [(0, 0, 60, 40, 0.9)], labels=["京A12345"])
+    assert frame[2:30, :].any()
+    empty = _frame(0)
+    renderer.render(empty, [(300, 300, 310, 310, 0.9)], labels=[""])
+    assert not empty.any()
+
+
+def test_render_result_uses_class_names():
+    result = FakeResult([(20, 30, 80, 60, 0.5)])
+    result.names = {0: "plate"}
+    drawn = []
+
+    class Recording(PlateRenderer):
+        def draw_label(self, img, text, x, y, **kwargs):
+            drawn.append(text)
+            return img
+
+    Recording().render_result(_frame(), result)
+    assert drawn == ["plate 0.50"]
@@ -0,0 +1,78 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from fakes import FakeModel
+from micro_batcher import MicroBatcher
+from plate_service import PlateRecognizer, create_app, decode_image
+
+
+class _Reader:
+    def __init__(self):
+        self.batches = []
+
+    def read_batch(self, crops):
+        self.batches.append([c.shape[:2] for c in crops])
+        return [(f"京A0000{i}", 0.9) for i in range(len(crops))]
+
+
+def _recognizer(boxes):
+    # 不加载真实模型：跳过 __init__，直接换上假的检测器和 OCR
+    recognizer = object.__new__(PlateRecognizer)
+    recognizer.model = FakeModel(boxes)
+    recognizer.conf = 0.3
+    recognizer.expand = 2
+    recognizer.device = None
+    recognizer.reader = _Reader()
+    return recognizer
+
+
+def test_recognize_batch_one_detect_and_one_ocr_call():
+    recognizer = _recognizer([(10, 10, 50, 30, 0.87654), (300, 300, 400, 400, 0.5)])
+    imgs = [np.zeros((100, 200, 3), np.uint8) for _ in range(3)]
+    results = recognizer.recognize_batch(imgs)
+    assert recognizer.model.calls == [(3, {"conf": 0.3, "verbose": False})]
+    # 三张图片的车牌裁剪图一次交给 OCR，无效框跳过
+    assert recognizer.reader.batches == [[(24, 44)] * 3]
+    assert [r["batch_size"] for r in results] == [3, 3, 3]
+    assert results[0]["plates"] == [{"box": [10, 10, 50, 30], "det_conf": 0.8765,
+                                     "plate": "京A00000", "confidence": 0.9}]
+    assert results[2]["plates"][0]["plate"] == "京A00002"
+    assert set(results[0]["timings"]) == {"detect_ms", "ocr_ms"}
+
+
+def test_recognize_batch_without_plates():
+    recognizer = _recognizer([])
+    recognizer.device = "cpu"
+    (result,) = recognizer.recognize_batch([np.zeros((50, 50, 3), np.uint8)])
+    assert result["plates"] == []
+    assert recognizer.model.calls[0][1]["device"] == "cpu"
+
+
+def test_decode_image():
+    ok, data = cv2.imencode(".png", np.full((20, 30, 3), 7, np.uint8))
+    assert decode_image(data.tobytes()).shape == (20, 30, 3)
+    assert decode_image(b"") is None
+    assert decode_image(b"not an image") is None
+
+
+@pytest.fixture
+def client():
+    pytest.importorskip("flask")
+    batcher = MicroBatcher(_recognizer([(10, 10, 50, 30, 0.9)]).recognize_batch, max_batch=4, max_wait_ms=1)
+    yield create_app(batcher, timeout=5).test_client()
+    batcher.close()
+
+
+def test_recognize_endpoint(client):
+    ok, data = cv2.imencode(".jpg", np.zeros((100, 200, 3), np.uint8))
+    resp = client.post("/recognize", data=data.tobytes(), content_type="application/octet-stream")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["plates"][0]["plate"] == "京A00000"
+    assert body["total_ms"] >= 0
+    assert client.post("/recognize", data=b"xx").status_code == 400
+    stats = client.get("/stats").get_json()
+    assert (stats["requests"], stats["max_batch"]) == (1, 4)
+    assert client.get("/health").get_json() == {"status": "healthy"}
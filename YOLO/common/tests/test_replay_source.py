@@ -0,0 +1,73 @@
+import os
+import time
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from replay_source import ReplayCapture, import_video, load_session, open_source
+
+FRAMES = 20
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "cam.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 50, (64, 48))
+    if not out.isOpened():
+        pytest.skip("OpenCV 没有 MJPG 编码器")
+    for i in range(FRAMES):
+        out.write(np.full((48, 64, 3), i * 10, np.uint8))
+    out.release()
+    return path
+
+
+def read_all(cap, work_s=0.0):
+    indices = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        indices.append(int(round(frame.mean() / 10)))
+        time.sleep(work_s)
+    return indices
+
+
+def test_import_video(video, tmp_path):
+    session = str(tmp_path / "session")
+    meta = import_video(video, session, fps=100, jitter_ms=2)
+    assert meta["frames"] == FRAMES
+    assert (meta["width"], meta["height"]) == (64, 48)
+    _, stamps = load_session(session)
+    assert stamps[0] == 0.0 and len(stamps) == FRAMES
+    assert all(b > a for a, b in zip(stamps, stamps[1:]))
+    assert not os.path.exists(os.path.join(session, "frames.avi"))  # 直接引用原视频
+
+
+def test_fast_replay_reads_every_frame(video, tmp_path):
+    session = str(tmp_path / "session")
+    import_video(video, session, fps=100)
+    cap = open_source(session + "@fast")
+    assert isinstance(cap, ReplayCapture) and cap.isOpened()
+    assert cap.get(cv2.CAP_PROP_FRAME_COUNT) == FRAMES
+    assert read_all(cap) == list(range(FRAMES))
+    assert (cap.delivered, cap.dropped) == (FRAMES, 0)
+    cap.release()
+
+
+def test_realtime_replay_drops_stale_frames(video, tmp_path):
+    session = str(tmp_path / "session")
+    import_video(video, session, fps=200)   # 每 5 ms 一帧，处理一帧 30 ms
+    cap = ReplayCapture(session, speed=1.0, buffer=1)
+    indices = read_all(cap, work_s=0.03)
+    assert cap.dropped > 0
+    assert cap.delivered + cap.dropped == FRAMES
+    assert indices == sorted(indices) and indices[-1] == FRAMES - 1
+    assert cap.last_capture_time is not None
+
+
+def test_open_source_plain_video(video):
+    cap = open_source(video)
+    assert not isinstance(cap, ReplayCapture) and cap.isOpened()
+    cap.release()
@@ -0,0 +1,46 @@
+import argparse
+import json
+
+import pytest
+
+from replay_spec import META_NAME, is_camera_source, parse_source, source_arg
+
+
+@pytest.fixture
+def session(tmp_path):
+    (tmp_path / META_NAME).write_text(json.dumps({"frames": 0}), encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("suffix, speed", [("", 1.0), ("@realtime", 1.0), ("@fast", 0.0),
+                                           ("@4", 4.0), ("@0.5x", 0.5), ("@2X", 2.0)])
+def test_parse_source_speed(session, suffix, speed):
+    assert parse_source(session + suffix) == (session, speed)
+
+
+def test_parse_source_not_a_session(tmp_path):
+    assert parse_source("0") == (None, None)
+    assert parse_source(str(tmp_path / "test.mp4")) == (None, None)
+    assert parse_source("rtsp://user@host/stream") == (None, None)
+
+
+@pytest.mark.parametrize("speed", ["bogus", "-2", "nan", "x"])
+def test_bad_speed_is_an_argument_error(session, speed):
+    with pytest.raises(argparse.ArgumentTypeError, match=f"'{speed}'"):
+        parse_source(f"{session}@{speed}")
+
+
+def test_source_arg_in_parser(session, capsys):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", type=source_arg, default="0")
+    assert parser.parse_args(["--source", session + "@4"]).source == session + "@4"
+    assert parser.parse_args(["--source", "video.mp4"]).source == "video.mp4"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--source", session + "@bogus"])
+    assert "无效的回放速度 'bogus'" in capsys.readouterr().err
+
+
+def test_is_camera_source(session):
+    assert is_camera_source("0")
+    assert is_camera_source(session + "@fast")
+    assert not is_camera_source("video.mp4")
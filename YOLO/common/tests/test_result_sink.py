@@ -0,0 +1,132 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import result_sink
+from result_sink import ResultSink, iter_records, make_record
+
+
+def _records(n, start=0):
+    return [make_record(f"{i}.jpg", plate=f"京A{i:05d}", confidence=0.9, box=(1, 2, 3, 4), det_conf=0.8,
+                        timings={"detect": 12.5, "ocr": 3}) for i in range(start, start + n)]
+
+
+def test_make_record_is_flat():
+    record = make_record("a.jpg", plate="京A12345", confidence=0.98765, box=(1.7, 2, 3, 4), det_conf=0.5,
+                         frame=12, timestamp=0.48001, timings={"detect": 12.3456}, camera="gate")
+    assert (record["x1"], record["y1"], record["x2"], record["y2"]) == (1, 2, 3, 4)
+    assert record["confidence"] == 0.9877
+    assert record["timestamp"] == 0.48
+    assert record["t_detect_ms"] == 12.346
+    assert record["camera"] == "gate"
+    empty = make_record("b.jpg", status="no_plate")
+    assert (empty["x1"], empty["plate"], empty["confidence"]) == (None, "", None)
+
+
+def test_rollover_to_gzip(tmp_path):
+    with ResultSink(str(tmp_path), rollover_records=4, parquet=False, flush_every=1) as sink:
+        for record in _records(10):
+            sink.write(record)
+    names = sorted(os.listdir(tmp_path))
+    assert names == ["results-part-00000.jsonl.gz", "results-part-00001.jsonl.gz", "results-part-00002.jsonl.gz"]
+    with gzip.open(tmp_path / names[0], "rt", encoding="utf-8") as f:
+        assert len(f.readlines()) == 4
+    records = list(iter_records(str(tmp_path)))
+    assert [r["source"] for r in records] == [f"{i}.jpg" for i in range(10)]
+    assert all("processed_at" in r for r in records)
+    assert sink.total_records == 10
+
+
+def test_resume_continues_part_numbers(tmp_path):
+    with ResultSink(str(tmp_path), rollover_records=3, parquet=False) as sink:
+        for record in _records(4):
+            sink.write(record)
+    # 再次运行时从下一个分片号开始，不覆盖之前的结果
+    with ResultSink(str(tmp_path), rollover_records=3, parquet=False) as sink:
+        for record in _records(2, start=4):
+            sink.write(record)
+    assert sorted(os.listdir(tmp_path))[-1] == "results-part-00002.jsonl.gz"
+    assert [r["source"] for r in iter_records(str(tmp_path))] == [f"{i}.jpg" for i in range(6)]
+
+
+def test_close_without_records_leaves_nothing(tmp_path):
+    sink = ResultSink(str(tmp_path), parquet=False)
+    sink.close()
+    sink.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_prefixes_are_independent(tmp_path):
+    for prefix in ("w0", "w1"):
+        with ResultSink(str(tmp_path), prefix=prefix, parquet=False) as sink:
+            sink.write(_records(1)[0])
+    assert len(list(iter_records(str(tmp_path)))) == 2
+    assert len(list(iter_records(str(tmp_path), prefix="w1"))) == 1
+
+
+def _crashed_part(tmp_path):
+    """模拟崩溃：未压缩的分片，最后一行只写了一半"""
+    path = tmp_path / "results-part-00000.jsonl"
+    lines = [json.dumps(r, ensure_ascii=False) for r in _records(3)]
+    path.write_text("\n".join(lines) + "\n" + lines[0][:20], encoding="utf-8")
+    return path
+
+
+def test_iter_records_skips_half_written_line(tmp_path):
+    _crashed_part(tmp_path)
+    assert len(list(iter_records(str(tmp_path)))) == 3
+
+
+def test_failed_gzip_leaves_only_jsonl(tmp_path, monkeypatch, capsys):
+    def broken_copy(src, dst):
+        dst.write(src.read(10))
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(result_sink.shutil, "copyfileobj", broken_copy)
+    with ResultSink(str(tmp_path), parquet=False) as sink:
+        sink.write(_records(1)[0])
+    assert os.listdir(tmp_path) == ["results-part-00000.jsonl"]
+    assert "压缩失败" in capsys.readouterr().out
+    assert len(list(iter_records(str(tmp_path)))) == 1
+
+
+needs_pyarrow = pytest.mark.skipif(not result_sink.HAS_PYARROW, reason="需要 pyarrow")
+
+
+@needs_pyarrow
+def test_rollover_to_parquet_and_read_table(tmp_path):
+    with ResultSink(str(tmp_path), rollover_records=4) as sink:
+        for record in _records(6):
+            sink.write(record)
+    assert sorted(os.listdir(tmp_path)) == ["results-part-00000.parquet", "results-part-00001.parquet"]
+    table = result_sink.read_table(str(tmp_path))
+    assert table.num_rows == 6
+    assert table.column("plate").to_pylist()[-1] == "京A00005"
+    assert [r["source"] for r in iter_records(str(tmp_path))] == [f"{i}.jpg" for i in range(6)]
+
+
+@needs_pyarrow
+def test_read_table_tolerates_crashed_part(tmp_path):
+    with ResultSink(str(tmp_path), rollover_records=2) as sink:
+        for record in _records(2):
+            sink.write(record)
+    os.rename(tmp_path / "results-part-00000.parquet", tmp_path / "results-part-00001.parquet")
+    _crashed_part(tmp_path)
+    (tmp_path / "results-part-00002.jsonl").write_text("", encoding="utf-8")
+    assert result_sink.read_table(str(tmp_path)).num_rows == 5
+
+
+@needs_pyarrow
+def test_failed_parquet_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    def broken_write(table, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"PAR1")
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(result_sink.pq, "write_table", broken_write)
+    with ResultSink(str(tmp_path)) as sink:
+        sink.write(_records(1)[0])
+    assert os.listdir(tmp_path) == ["results-part-00000.jsonl"]
+    assert result_sink.read_table(str(tmp_path)).num_rows == 1
@@ -0,0 +1,106 @@
+import argparse
+import os
+
+import pytest
+
+import runtime_config
+from runtime_config import (THREAD_ENV_VARS, CpuTopology, WorkerRuntime, add_runtime_args, format_cpu_list,
+                            parse_cpu_list, plan_workers, runtime_from_args)
+
+
+@pytest.fixture
+def no_thread_pools(monkeypatch):
+    """apply() 不真的去改本进程 OpenCV / torch 的线程池，免得影响其他测试"""
+    monkeypatch.setattr(WorkerRuntime, "_apply_torch", lambda self: None)
+    try:
+        import cv2
+        monkeypatch.setattr(cv2, "setNumThreads", lambda n: None)
+    except ImportError:
+        pass
+
+
+def make_topology(physical=4, smt=2, nodes=1):
+    """physical 个物理核，每个核 smt 个逻辑 CPU（兄弟编号相差 physical），物理核平均分到 nodes 个节点"""
+    cores = [[core + physical * t for t in range(smt)] for core in range(physical)]
+    per_node = physical // nodes
+    node_map = {n: sorted(cpu for core in cores[n * per_node:(n + 1) * per_node] for cpu in core)
+                for n in range(nodes)}
+    return CpuTopology(cores, node_map)
+
+
+def test_cpu_list_round_trip():
+    assert parse_cpu_list("0-3,8, 10-11,") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list(None) == []
+    assert format_cpu_list([8, 0, 1, 2, 3, 10, 11]) == "0-3,8,10-11"
+
+
+def test_plan_splits_physical_cores():
+    runtimes = plan_workers(2, topology=make_topology(4, 2, nodes=2))
+    assert [r.threads for r in runtimes] == [2, 2]
+    assert runtimes[0].cpus == [0, 1, 4, 5] and runtimes[0].node == 0
+    assert runtimes[1].cpus == [2, 3, 6, 7] and runtimes[1].node == 1
+
+
+def test_plan_uneven_and_reserve():
+    runtimes = plan_workers(2, topology=make_topology(5, 1))
+    assert [r.threads for r in runtimes] == [3, 2]
+    runtimes = plan_workers(2, reserve=1, topology=make_topology(5, 1))
+    assert [r.cpus for r in runtimes] == [[1, 2], [3, 4]]
+    # 核不够时不保留
+    runtimes = plan_workers(4, reserve=1, topology=make_topology(4, 1))
+    assert [r.cpus for r in runtimes] == [[0], [1], [2], [3]]
+
+
+def test_plan_more_workers_than_cores():
+    runtimes = plan_workers(5, pin=True, topology=make_topology(2, 2))
+    assert [r.threads for r in runtimes] == [1] * 5
+    assert [r.cpus for r in runtimes] == [[0, 2], [1, 3], [0, 2], [1, 3], [0, 2]]
+    assert all(r.pin for r in runtimes)
+    assert [r.threads for r in plan_workers(2, threads=3, topology=make_topology(8, 1))] == [3, 3]
+
+
+def test_apply_overrides_inherited_env(monkeypatch, no_thread_pools):
+    # 父进程按整机配置过线程数，子进程必须改成分到的线程数
+    for name in THREAD_ENV_VARS:
+        monkeypatch.setenv(name, "64")
+    WorkerRuntime(0, 3).apply()
+    assert {os.environ[name] for name in THREAD_ENV_VARS} == {"3"}
+
+
+def test_apply_pins_cpus(monkeypatch, no_thread_pools):
+    pinned = []
+    monkeypatch.setattr(runtime_config.os, "sched_setaffinity", lambda pid, cpus: pinned.append(cpus),
+                        raising=False)
+    for name in THREAD_ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    WorkerRuntime(1, 2, [4, 5]).apply()
+    assert pinned == []
+    runtime = WorkerRuntime(1, 2, [4, 5], pin=True).apply()
+    assert pinned == [[4, 5]]
+    assert runtime.paddle_kwargs() == {"cpu_threads": 2}
+    assert runtime.describe() == "2 线程，CPU 4-5（NUMA 0），已绑核"
+
+
+def test_detect_topology_uses_allowed_cpus():
+    topology = runtime_config.detect_topology()
+    allowed = runtime_config.allowed_cpus()
+    assert sorted(cpu for core in topology.cores for cpu in core) == allowed
+    assert topology.logical == len(allowed)
+
+
+def test_runtime_from_args():
+    parser = add_runtime_args(argparse.ArgumentParser())
+    args = parser.parse_args(["--threads-per-worker", "2", "--pin-cpus"])
+    runtimes = runtime_from_args(args, 1)
+    assert len(runtimes) == 1 and runtimes[0].threads == 2 and runtimes[0].pin
+
+
+def test_runtime_is_picklable():
+    import pickle
+    runtime = pickle.loads(pickle.dumps(WorkerRuntime(2, 4, [0, 1], node=1, pin=True)))
+    assert (runtime.worker_id, runtime.threads, runtime.cpus, runtime.node) == (2, 4, [0, 1], 1)
+
+
+@pytest.mark.parametrize("threads", [0, -2])
+def test_threads_at_least_one(threads):
+    assert WorkerRuntime(0, threads).threads == 1
@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import platform
+
+import pytest
+
+from runtime_config import WorkerRuntime
+from runtime_profile import PROFILE_VERSION, add_profile_args, load_profile, profile_from_args
+
+
+@pytest.fixture(autouse=True)
+def no_thread_pools(monkeypatch):
+    """apply() 只记录线程数，不真的改本进程的环境变量和线程池"""
+    applied = []
+    monkeypatch.setattr(WorkerRuntime, "apply", lambda self, verbose=False: applied.append(self.threads))
+    return applied
+
+
+def write_profile(tmp_path, **overrides):
+    data = {"version": PROFILE_VERSION, "host": platform.node(), "cpu_count": os.cpu_count(),
+            "created": "2026-01-01 00:00:00", "imgsz": 640,
+            "best": {"backend": "torch", "device": "0", "threads": 3, "batch": 4, "throughput": 120.5}}
+    data.update(overrides)
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_load_profile(tmp_path):
+    profile = load_profile(write_profile(tmp_path))
+    assert (profile.device, profile.backend, profile.threads, profile.batch) == ("0", "torch", 3, 4)
+    assert "120.5 张/秒（imgsz 640）" in profile.describe()
+
+
+def test_missing_profile(tmp_path):
+    assert load_profile(str(tmp_path / "missing.json")) is None
+
+
+@pytest.mark.parametrize("overrides", [
+    {"version": PROFILE_VERSION + 1},
+    {"host": platform.node() + "-other"},
+    {"cpu_count": (os.cpu_count() or 1) + 1},
+    {"best": {"backend": "onnx", "device": "cpu", "threads": 2, "batch": 1}},
+])
+def test_unusable_profile_is_ignored(tmp_path, overrides, capsys):
+    assert load_profile(write_profile(tmp_path, **overrides)) is None
+    assert "⚠️" in capsys.readouterr().out
+
+
+def test_corrupt_profile(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text("{", encoding="utf-8")
+    assert load_profile(str(path), verbose=False) is None
+
+
+def test_profile_from_args(tmp_path, no_thread_pools):
+    parser = add_profile_args(argparse.ArgumentParser())
+    path = write_profile(tmp_path)
+    profile = profile_from_args(parser.parse_args(["--runtime-profile", path]))
+    assert profile.device == "0" and no_thread_pools == [3]
+    assert profile_from_args(parser.parse_args(["--runtime-profile", path, "--no-runtime-profile"])) is None
+    assert no_thread_pools == [3]
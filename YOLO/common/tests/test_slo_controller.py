@@ -0,0 +1,113 @@
+import argparse
+
+import pytest
+
+import slo_controller
+from slo_controller import SloController, add_slo_args, level_name, parse_levels, slo_from_args
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(slo_controller.time, "monotonic", clock)
+    return clock
+
+
+def feed(slo, ms, frames, clock=None, step=0.0):
+    """记录 frames 帧，返回发生换档的次数"""
+    switched = 0
+    for _ in range(frames):
+        if clock is not None:
+            clock.now += step
+        switched += slo.record(ms)
+    return switched
+
+
+def test_parse_levels():
+    assert parse_levels("640x1, 480 ,320X2,") == ((640, 1), (480, 1), (320, 2))
+    with pytest.raises(ValueError):
+        parse_levels(" , ")
+    assert level_name((320, 1)) == "320/每帧"
+    assert level_name((320, 3)) == "320/每 3 帧"
+
+
+def test_step_down_after_full_window(clock):
+    slo = SloController(50, window=10, verbose=False)
+    assert feed(slo, 80, 9) == 0          # 窗口没攒满不判断
+    assert slo.record(80)
+    assert (slo.level, slo.imgsz) == (1, 480)
+    # 换档后清空样本，要重新攒满一个窗口
+    assert feed(slo, 80, 9) == 0 and slo.level == 1
+    assert slo.record(80) and slo.level == 2
+
+
+def test_step_down_stops_at_last_level(clock):
+    levels = ((640, 1), (320, 2))
+    slo = SloController(50, levels, window=5, verbose=False)
+    assert feed(slo, 200, 20) == 1
+    assert slo.level == 1 and slo.interval == 2
+
+
+def test_step_up_needs_dwell(clock):
+    slo = SloController(50, window=10, min_dwell=5.0, start_level=2, verbose=False)
+    assert feed(slo, 10, 30, clock, 0.1) == 0     # 3 秒：停留时间不够
+    assert feed(slo, 10, 30, clock, 0.1) == 1     # 6 秒
+    assert slo.level == 1
+
+
+def test_hold_between_thresholds(clock):
+    # 35 ~ 50 ms 之间既不降档也不升档，停留再久也一样
+    slo = SloController(50, window=10, min_dwell=5.0, start_level=1, verbose=False)
+    assert feed(slo, 40, 100, clock, 1.0) == 0 and slo.level == 1
+
+
+def test_flapping_level_doubles_dwell(clock):
+    slo = SloController(50, window=10, min_dwell=5.0, start_level=1, verbose=False)
+    feed(slo, 10, 60, clock, 0.1)
+    assert slo.level == 0
+    # 刚升上来很快又降回去：档位 0 记一次失败，下次升档要等 10 秒
+    feed(slo, 80, 10, clock, 0.1)
+    assert slo.level == 1 and slo.up_penalty[0] == 1
+    assert feed(slo, 10, 90, clock, 0.1) == 0     # 9 秒
+    assert feed(slo, 10, 20, clock, 0.1) == 1 and slo.level == 0
+
+
+def test_should_detect_follows_interval(clock):
+    slo = SloController(50, ((320, 3),), window=100, verbose=False)
+    detected = []
+    for _ in range(7):
+        detected.append(slo.should_detect())
+        slo.record(10)
+    assert detected == [True, False, False, True, False, False, True]
+
+
+def test_summary(clock):
+    slo = SloController(50, window=5, verbose=False)
+    clock.now += 2
+    feed(slo, 100, 5)
+    clock.now += 3
+    summary = slo.summary()
+    assert summary["adjustments"] == 1
+    assert [(l["seconds"], l["frames"]) for l in summary["levels"][:2]] == [(2.0, 5), (3.0, 0)]
+    assert summary["levels"][0]["share"] == 0.4
+
+
+def test_switch_log(clock, capsys):
+    slo = SloController(50, window=2)
+    feed(slo, 90, 2)
+    assert "降档：640/每帧 -> 480/每帧" in capsys.readouterr().out
+
+
+def test_from_args():
+    parser = add_slo_args(argparse.ArgumentParser())
+    assert slo_from_args(parser.parse_args([])) is None
+    slo = slo_from_args(parser.parse_args(["--slo-ms", "40", "--slo-levels", "480x1,320x2"]))
+    assert slo.target_ms == 40 and slo.levels == ((480, 1), (320, 2))
@@ -0,0 +1,41 @@
+import time
+
+from stage_timing import StageTimer, peak_rss_mb, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_stage_timer_summary():
+    timer = StageTimer()
+    for ms in (1, 2, 3, 4):
+        timer.add("detect", ms)
+    with timer.stage("decode"):
+        time.sleep(0.01)
+    summary = timer.summary()
+    assert summary["detect"] == {"count": 4, "mean_ms": 2.5, "p50_ms": 2.0, "p95_ms": 4.0,
+                                 "p99_ms": 4.0, "total_ms": 10.0}
+    assert summary["decode"]["count"] == 1
+    assert summary["decode"]["p50_ms"] >= 9
+
+
+def test_stage_records_even_on_error():
+    timer = StageTimer()
+    try:
+        with timer.stage("encode"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert timer.summary()["encode"]["count"] == 1
+
+
+def test_peak_rss():
+    rss = peak_rss_mb()
+    assert rss is None or rss > 0
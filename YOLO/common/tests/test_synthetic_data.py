@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("numpy")
+
+from ccpd import parse_name
+from synthetic_data import generate_dataset, generate_images
+
+
+def test_images_are_reused_for_same_seed(tmp_path):
+    out = str(tmp_path / "images")
+    first = generate_images(out, count=3, seed=1)
+    assert len(first) == 3
+    mtimes = [os.path.getmtime(p) for p in first]
+    assert generate_images(out, count=3, seed=1) == first
+    assert [os.path.getmtime(p) for p in first] == mtimes
+    assert generate_images(out, count=2, seed=1) == first[:2]
+
+
+def test_images_regenerated_for_new_seed(tmp_path):
+    out = str(tmp_path / "images")
+    first = generate_images(out, count=3, seed=1)
+    second = generate_images(out, count=3, seed=2)
+    assert set(first).isdisjoint(second)
+    assert sorted(os.path.join(out, f) for f in os.listdir(out) if f.endswith(".jpg")) == second
+    # 同一个种子生成同样的数据
+    assert generate_images(str(tmp_path / "again"), count=3, seed=2) == \
+        [p.replace(out, str(tmp_path / "again")) for p in second]
+
+
+def test_file_names_are_ccpd_labels(tmp_path):
+    path = generate_images(str(tmp_path), count=1, seed=3)[0]
+    img = cv2.imread(path)
+    assert img.shape[:2] == (1160, 720)
+    assert parse_name(path) is not None
+
+
+def test_dataset_videos_keyed_on_seed(tmp_path):
+    _, videos = generate_dataset(str(tmp_path), images=1, videos=1, video_frames=5, seed=0)
+    _, other = generate_dataset(str(tmp_path), images=1, videos=1, video_frames=5, seed=4)
+    assert videos != other
+    cap = cv2.VideoCapture(other[0])
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 5
+    cap.release()
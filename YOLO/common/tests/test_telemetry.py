@@ -0,0 +1,115 @@
+import argparse
+import urllib.request
+
+import pytest
+
+from telemetry import Histogram, Telemetry, add_telemetry_args, telemetry_from_args
+
+
+def test_histogram_quantile_interpolates():
+    hist = Histogram(buckets=(0.01, 0.02, 0.04))
+    for seconds in (0.005, 0.005, 0.015, 0.015):
+        hist.observe(seconds)
+    assert hist.counts == [2, 2, 0, 0]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(0.04)
+    assert hist.quantile(0.5) == pytest.approx(0.01)
+    assert hist.quantile(0.75) == pytest.approx(0.015)
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_histogram_overflow_bucket():
+    hist = Histogram(buckets=(0.01, 0.02))
+    hist.observe(5.0)
+    assert hist.counts == [0, 0, 1]
+    assert hist.quantile(0.99) == 0.02
+
+
+def test_disabled_is_noop():
+    telemetry = Telemetry(enabled=False, log_every=1)
+    with telemetry.stage("detect"):
+        pass
+    telemetry.observe("detect", 0.1)
+    telemetry.record({"ocr": 3.0}, ocr_calls=1)
+    telemetry.inc("frames")
+    telemetry.set_gauge("queue", 3)
+    telemetry.tick()
+    telemetry.close()
+    assert telemetry.stages == {}
+    assert telemetry.counters["frames"] == 0
+    assert telemetry.gauges == {}
+
+
+def test_record_counters_and_stages():
+    telemetry = Telemetry()
+    telemetry.record({"detect": 12.0, "ocr": 3.0}, frames=1, ocr_calls=2)
+    telemetry.record({"detect": 30.0}, frames=1)
+    telemetry.inc("detections", 4)
+    telemetry.set_counter("dropped_frames", 7)
+    assert telemetry.counters == {"frames": 2, "detections": 4, "ocr_calls": 2, "dropped_frames": 7}
+    assert telemetry.stages["detect"].count == 2
+    assert telemetry.stages["ocr"].sum == pytest.approx(0.003)
+    with telemetry.stage("encode"):
+        pass
+    assert telemetry.stages["encode"].count == 1
+
+
+def test_render_prometheus_text():
+    telemetry = Telemetry(prefix="t")
+    telemetry.inc("frames", 3)
+    telemetry.set_gauge("queue_depth", 2)
+    telemetry.observe("detect", 0.003)
+    text = telemetry.render()
+    assert "t_frames_total 3" in text
+    assert "t_queue_depth 2" in text
+    assert '# TYPE t_stage_duration_seconds histogram' in text
+    assert 't_stage_duration_seconds_bucket{stage="detect",le="0.0025"} 0' in text
+    assert 't_stage_duration_seconds_bucket{stage="detect",le="0.005"} 1' in text
+    assert 't_stage_duration_seconds_bucket{stage="detect",le="+Inf"} 1' in text
+    assert 't_stage_duration_seconds_count{stage="detect"} 1' in text
+
+
+def test_log_line_uses_window_since_last_log():
+    telemetry = Telemetry(log_every=10)
+    start = telemetry._last_log
+    for _ in range(10):
+        telemetry.record({"detect": 100.0}, frames=1)
+    line = telemetry.log_line(start + 2)
+    assert "5.0 FPS" in line and "帧 10" in line
+    assert "detect p50" in line
+    # 没有新样本的阶段不出现在下一行里
+    telemetry.inc("frames", 4)
+    line = telemetry.log_line(start + 4)
+    assert "2.0 FPS" in line and "帧 14" in line
+    assert "detect" not in line
+
+
+def test_tick_prints_when_due(capsys):
+    telemetry = Telemetry(log_every=60)
+    telemetry.tick()
+    assert capsys.readouterr().out == ""
+    telemetry._last_log -= 61
+    telemetry.tick()
+    assert "FPS" in capsys.readouterr().out
+
+
+def test_serve_metrics_endpoint():
+    telemetry = Telemetry()
+    telemetry.inc("frames", 5)
+    telemetry.serve(0, host="127.0.0.1")
+    try:
+        port = telemetry._server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "plate_frames_total 5" in body
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+    finally:
+        telemetry.close()
+    assert telemetry._server is None
+
+
+def test_from_args():
+    parser = add_telemetry_args(argparse.ArgumentParser())
+    assert not telemetry_from_args(parser.parse_args([])).enabled
+    telemetry = telemetry_from_args(parser.parse_args(["--metrics-log-every", "5"]))
+    assert telemetry.enabled and telemetry.log_every == 5
@@ -0,0 +1,94 @@
+import struct
+import zlib
+
+import pytest
+
+from testset_scheduler import CostModel, image_size, lpt_order, make_jobs, scan_testset, schedule_report, simulate
+
+
+def write_png(path, width, height):
+    ihdr = struct.pack(">II5B", width, height, 8, 2, 0, 0, 0)
+    data = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr
+    path.write_bytes(data + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr)))
+    return str(path)
+
+
+def write_bmp(path, width, height):
+    header = b"BM" + b"\0" * 16 + struct.pack("<ii", width, -height)   # 高度为负：从上到下存储
+    path.write_bytes(header + b"\0" * 32)
+    return str(path)
+
+
+def test_simulate():
+    assert simulate([], 4) == 0.0
+    assert simulate([3, 2, 1], 0) == 6          # 进程数至少按 1 算
+    assert simulate([1, 1, 1, 5], 2) == 6       # listdir 顺序：长任务最后才开始
+    assert simulate([5, 1, 1, 1], 2) == 5
+    assert simulate([4, 4, 4], 8) == 4
+
+
+def test_lpt_order_not_worse_than_listdir():
+    jobs = [{"index": i, "cost": c} for i, c in enumerate([2, 3, 2, 1, 1, 9, 2, 4])]
+    lpt = [job["cost"] for job in lpt_order(jobs)]
+    listdir = [job["cost"] for job in jobs]
+    assert lpt == sorted(listdir, reverse=True)
+    for workers in (1, 2, 3, 4):
+        assert simulate(lpt, workers) <= simulate(listdir, workers)
+    assert simulate(lpt, 3) == 9
+
+
+def test_image_size_from_headers(tmp_path):
+    assert image_size(write_png(tmp_path / "a.png", 1920, 1080)) == (1920, 1080)
+    assert image_size(write_bmp(tmp_path / "b.bmp", 640, 480)) == (640, 480)
+    (tmp_path / "c.jpg").write_bytes(b"not an image")
+    assert image_size(str(tmp_path / "c.jpg")) is None
+
+
+def test_scan_testset_and_make_jobs(tmp_path):
+    for i in range(5):
+        write_png(tmp_path / f"img{i}.png", 1000, 1000)
+    (tmp_path / "broken.jpg").write_bytes(b"\0" * 150000)     # 读不到分辨率：按文件大小估算
+    (tmp_path / "notes.txt").write_text("skip me")
+    (tmp_path / "sub").mkdir()
+
+    model = CostModel(detect_ms=30.0, decode_ms_per_mp=6.0, file_ms=5.0)
+    items, skipped = scan_testset(str(tmp_path), model)
+    assert sorted(skipped) == ["notes.txt", "sub"]
+    by_name = {item.name: item for item in items}
+    assert by_name["img0.png"].cost == pytest.approx(5.0 + 30.0 + 6.0)
+    broken = by_name["broken.jpg"]
+    assert broken.estimated and broken.width == broken.height == 1000
+
+    jobs = make_jobs(items, image_batch=4)
+    assert [len(job["paths"]) for job in jobs] == [4, 2]
+    assert [job["index"] for job in jobs] == [0, 1]
+    assert sum(job["cost"] for job in jobs) == pytest.approx(sum(item.cost for item in items))
+
+
+def test_make_jobs_keeps_videos_separate(tmp_path):
+    images = [write_png(tmp_path / f"img{i}.png", 64, 64) for i in range(3)]
+    items, _ = scan_testset(str(tmp_path))
+    items.sort(key=lambda item: item.name)
+    video = type(items[0])(str(tmp_path / "long.mp4"), "video", 1000, 1280, 720, 10 ** 6)
+    video.cost = 5000.0
+    jobs = make_jobs([items[0], video, items[1], items[2]], image_batch=16)
+    assert [job["kind"] for job in jobs] == ["video", "images"]
+    assert jobs[1]["paths"] == images
+    assert lpt_order(jobs)[0]["kind"] == "video"
+
+
+def test_schedule_report():
+    jobs = [{"index": 0, "paths": ["long.mp4"], "cost": 4000.0},
+            {"index": 1, "paths": ["a.jpg"], "cost": 1000.0},
+            {"index": 2, "paths": ["b.jpg"], "cost": 1000.0}]
+    timings = [{"index": 0, "pid": 1, "start": 0.0, "end": 4.0, "result": "v"},
+               {"index": 1, "pid": 2, "start": 0.0, "end": 2.0, "result": "a"},
+               {"index": 2, "pid": 2, "start": 2.0, "end": 4.0, "result": "b"}]
+    report = schedule_report(jobs, timings, 2)
+    assert report["makespan_s"] == 4.0
+    assert report["serial_s"] == 8.0
+    assert report["utilisation"] == 1.0 and report["speedup"] == 2.0
+    assert report["listdir_makespan_s"] == 4.0
+    assert report["cost_ratio"] == round(8.0 / 6.0, 2)
+    assert sorted(report["worker_busy_s"]) == [4.0, 4.0]
+    assert report["results"] == ["v", "a", "b"]
@@ -0,0 +1,90 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from fakes import FakeResult
+from video_scan import EventBuilder, merge_windows, save_events, scan_video
+
+PLATE_FRAMES = range(50, 81)    # 车牌出现的帧
+
+
+class _BrightModel:
+    """画面亮的帧返回一个车牌框（测试视频里车牌出现的帧是亮的）"""
+
+    def __init__(self):
+        self.imgsz = []
+
+    def __call__(self, frame, conf=0.5, imgsz=640, **kwargs):
+        self.imgsz.append(imgsz)
+        boxes = [(10, 10, 40, 20, 0.5 + frame.mean() / 1000)] if frame.mean() > 100 else []
+        return [FakeResult(boxes)]
+
+
+class _Reader:
+    def __init__(self):
+        self.crops = []
+
+    def read(self, crop):
+        self.crops.append(crop.shape[:2])
+        return "京A12345", 0.91234
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("scan") / "road.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    if not out.isOpened():
+        pytest.skip("OpenCV 没有 MJPG 编码器")
+    for i in range(200):
+        out.write(np.full((48, 64, 3), 200 if i in PLATE_FRAMES else 0, np.uint8))
+    out.release()
+    return path
+
+
+def test_merge_windows():
+    assert merge_windows([20, 10, 100], 5, 103) == [[5, 25], [95, 102]]
+    assert merge_windows([10, 21], 5, 100) == [[5, 26]]      # 相邻窗口合并
+    assert merge_windows([0], 5, 3) == [[0, 2]]
+    assert merge_windows([], 5, 100) == []
+
+
+def test_event_builder():
+    reader = _Reader()
+    builder = EventBuilder(fps=10, max_gap=3, reader=reader)
+    frame = np.zeros((48, 64, 3), np.uint8)
+    builder.add(0, frame, [(0, 0, 10, 10, 0.5)])
+    builder.add(2, frame, [(0, 0, 10, 10, 0.4), (20, 20, 40, 30, 0.9)])
+    builder.add(4, frame, [])
+    builder.add(5, frame, [(0, 0, 10, 10, 0.6)])
+    builder.add(9, frame, [(0, 0, 10, 10, 0.7)])     # 间隔 4 帧 > max_gap，新事件
+    first, second = builder.finish()
+    assert (first["start_frame"], first["end_frame"], first["frames_hit"]) == (0, 5, 3)
+    assert (first["start_s"], first["end_s"]) == (0.0, 0.5)
+    assert (first["max_conf"], first["best_frame"], first["best_box"]) == (0.9, 2, [20, 20, 40, 30])
+    assert (first["plate"], first["plate_conf"]) == ("京A12345", 0.9123)
+    assert second["start_frame"] == second["end_frame"] == 9
+    # 每个事件只对最佳车牌识别一次（裁剪时向外扩 4 像素）
+    assert reader.crops == [(18, 28), (14, 14)]
+
+
+def test_scan_finds_the_same_event_as_dense(video, tmp_path):
+    dense_events, dense = scan_video(_BrightModel(), video, stride=1)
+    model = _BrightModel()
+    events, report = scan_video(model, video, stride=10, scan_imgsz=320, dense_imgsz=640)
+    assert [(e["start_frame"], e["end_frame"]) for e in events] == [(50, 80)]
+    assert [(e["start_frame"], e["end_frame"]) for e in dense_events] == [(50, 80)]
+    assert dense["inferred_frames"] == dense["total_frames"] == 200
+    # 粗扫 20 帧，只在命中帧前后 10 帧的窗口里细扫
+    assert report["coarse_hits"] == 4
+    assert (report["windows"], report["dense_frames"]) == (1, 51)
+    assert report["inferred_frames"] == 20 + 51
+    assert model.imgsz.count(320) == 20 and model.imgsz.count(640) == 51
+    save_events(events, report, str(tmp_path / "out" / "events.json"))
+    assert (tmp_path / "out" / "events.json").exists()
+
+
+def test_scan_without_plates(video):
+    events, report = scan_video(lambda frame, **kwargs: [FakeResult()], video, stride=25)
+    assert events == []
+    assert (report["windows"], report["inferred_frames"]) == (0, 8)
@@ -0,0 +1,100 @@
+import json
+import subprocess
+
+import video_segments
+from video_segments import plan_segments, probe_keyframes, stitch_events
+
+def test_plan_segments_even_split():
+    assert plan_segments(1000, 25, 4) == [(0, 250), (250, 500), (500, 750), (750, None)]
+
+
+def test_plan_segments_short_video():
+    # 不到两段的最少帧数（默认 2 秒 = 50 帧）时不分段
+    assert plan_segments(90, 25, 4) == [(0, None)]
+    assert plan_segments(0, 25, 4) == [(0, None)]
+    assert plan_segments(120, 25, 8) == [(0, 60), (60, None)]
+
+
+def test_plan_segments_keyframes():
+    keyframes = [0.0, 9.0, 21.0, 30.0]
+    assert plan_segments(1000, 25, 4, keyframes=keyframes) == [(0, 225), (225, 525), (525, 750), (750, None)]
+
+
+def test_plan_segments_drops_close_boundaries():
+    # 只有一个关键帧：几个边界都对齐到它，重复的边界去掉
+    assert plan_segments(1000, 25, 4, keyframes=[0.0, 20.0]) == [(0, 500), (500, None)]
+    # 关键帧离结尾太近（不到最少帧数的一半）时不切
+    assert plan_segments(1000, 25, 2, keyframes=[39.5]) == [(0, None)]
+
+
+def _event(start, end, conf, plate=None):
+    event = {"start_frame": start, "end_frame": end, "start_s": start / 25, "end_s": end / 25,
+             "frames_hit": end - start + 1, "max_conf": conf, "best_frame": start, "best_box": [0, 0, 1, 1]}
+    if plate:
+        event["plate"], event["plate_conf"] = plate, 0.9
+    return event
+
+
+def test_stitch_events_merges_across_boundary():
+    parts = [{"events": [_event(0, 10, 0.6), _event(240, 249, 0.7, "京A12345")]},
+             {"events": [_event(250, 260, 0.9, "京A12346"), _event(400, 410, 0.5)]}]
+    events = stitch_events(parts, max_gap=5)
+    assert [(e["start_frame"], e["end_frame"]) for e in events] == [(0, 10), (240, 260), (400, 410)]
+    merged = events[1]
+    assert merged["frames_hit"] == 21
+    assert merged["end_s"] == 260 / 25
+    assert (merged["max_conf"], merged["best_frame"], merged["plate"]) == (0.9, 250, "京A12346")
+    # 输入的事件不被修改
+    assert parts[0]["events"][1]["end_frame"] == 249
+
+
+def test_stitch_events_keeps_better_event_and_gaps():
+    parts = [{"events": [_event(240, 249, 0.9, "京A12345")]}, {"events": [_event(252, 260, 0.4)]}]
+    (event,) = stitch_events(parts, max_gap=3)
+    assert (event["end_frame"], event["max_conf"], event["plate"]) == (260, 0.9, "京A12345")
+    assert len(stitch_events(parts, max_gap=2)) == 2
+    assert stitch_events([{"events": []}, {"events": []}], max_gap=5) == []
+
+
+def _fake_ffprobe(monkeypatch, output, returncode=0):
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=output, stderr="")
+
+    monkeypatch.setattr(video_segments.shutil, "which", lambda name: "/usr/bin/" + name)
+    monkeypatch.setattr(video_segments.subprocess, "run", run)
+    return calls
+
+
+def test_probe_keyframes_relative_to_stream_start(monkeypatch):
+    output = json.dumps({
+        "frames": [{"pts_time": "10.500000"}, {"pts_time": "1.500000"}, {"pts_time": "N/A"},
+                   {"best_effort_timestamp_time": "20.500000"}],
+        "streams": [{"start_time": "1.500000"}],
+    })
+    calls = _fake_ffprobe(monkeypatch, output)
+    assert probe_keyframes("night.mp4") == [0.0, 9.0, 19.0]
+    # 只解码关键帧，不逐包扫描
+    assert calls[0][calls[0].index("-skip_frame") + 1] == "nokey"
+    assert "packet=pts_time,flags" not in calls[0]
+
+
+def test_probe_keyframes_without_start_time(monkeypatch):
+    _fake_ffprobe(monkeypatch, json.dumps({"frames": [{"pts_time": "0.0"}, {"pts_time": "4.0"}],
+                                           "streams": [{}]}))
+    assert probe_keyframes("a.avi") == [0.0, 4.0]
+
+
+def test_probe_keyframes_failures(monkeypatch):
+    _fake_ffprobe(monkeypatch, "", returncode=1)
+    assert probe_keyframes("broken.mp4") is None
+    _fake_ffprobe(monkeypatch, "not json")
+    assert probe_keyframes("broken.mp4") is None
+    _fake_ffprobe(monkeypatch, json.dumps({"frames": []}))
+    assert probe_keyframes("empty.mp4") is None
+    monkeypatch.setattr(video_segments.shutil, "which", lambda name: None)
+    assert probe_keyframes("night.mp4") is None
@@ -0,0 +1,306 @@
+"""
+混合图片 / 视频测试集的按代价调度
+
+process_testset() 按 os.listdir 的顺序在一个核上逐个处理，目录最后如果是一个长视频，
+整批的耗时基本就由它决定。这里先估算每个文件的处理代价，再按 "最长的先做"（LPT）分给进程池：
+
+- 代价估算只读文件头，不解码：
+  图片：JPEG 的 SOF 段 / PNG 的 IHDR / BMP 的信息头取分辨率，读不到时按文件大小估算像素数
+  视频：OpenCV 读帧数、分辨率（不解码帧），帧数读不到时按文件大小和码率估算
+  单帧代价 = 检测耗时（按推理尺寸缩放，和原图分辨率无关）+ 解码耗时（和像素数成正比）
+- 图片按 image_batch 张一组打包成一个任务（减少分发开销），每个视频单独一个任务
+- 任务按估算代价从大到小排队，空闲进程每次领走剩下最大的一个：
+  长视频最先开始，最后用小图片批次把各进程的空闲时间填平
+- 报告：实际 makespan（最后一个任务完成的时间）、各进程利用率、估算误差，
+  以及用实测耗时推算的串行（listdir 顺序、单进程）耗时和同样进程数按 listdir 顺序分发的 makespan
+
+    items = scan_testset("testdatasets/images")
+    jobs = make_jobs(items, image_batch=16)
+    report = run_schedule(jobs, workers=4, run_job=process_job, init=load_worker, init_args=(...))
+
+用法（只估算，不处理）：
+    python testset_scheduler.py D:/testdatasets/images --workers 4
+"""
+
+import argparse
+import heapq
+import multiprocessing as mp
+import os
+import struct
+import time
+
+from fast_decode import jpeg_size
+from runtime_config import plan_workers
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+class CostModel:
+    """
+    单帧处理代价（毫秒）
+    :param detect_ms: 640 输入尺寸下一次检测的耗时（含预处理 / 后处理，和原图分辨率无关）
+    :param decode_ms_per_mp: 每百万像素的解码 + 绘制 + 写出耗时
+    :param file_ms: 每个文件的固定开销（打开文件、创建输出）
+    :param imgsz: 推理尺寸
+    """
+
+    def __init__(self, detect_ms=30.0, decode_ms_per_mp=6.0, file_ms=5.0, imgsz=640):
+        self.detect_ms = detect_ms
+        self.decode_ms_per_mp = decode_ms_per_mp
+        self.file_ms = file_ms
+        self.imgsz = imgsz
+
+    def frame_ms(self, width, height):
+        return self.detect_ms * (self.imgsz / 640) ** 2 + self.decode_ms_per_mp * width * height / 1e6
+
+    def cost_ms(self, item):
+        return self.file_ms + item.frames * self.frame_ms(item.width, item.height)
+
+
+class TestItem:
+    """测试集里的一个文件（kind 为 image / video）"""
+
+    def __init__(self, path, kind, frames, width, height, size, estimated=False):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.kind = kind
+        self.frames = frames
+        self.width = width
+        self.height = height
+        self.size = size
+        self.estimated = estimated  # 分辨率 / 帧数是按文件大小估算的
+        self.cost = 0.0
+
+
+def image_size(path):
+    """只读文件头取图片分辨率 (宽, 高)，读不到返回 None"""
+    with open(path, "rb") as f:
+        head = f.read(262144)
+    size = jpeg_size(head)
+    if size is not None:
+        return size
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head[:2] == b"BM" and len(head) >= 26:
+        width, height = struct.unpack("<ii", head[18:26])
+        return width, abs(height)
+    return None
+
+
+def probe_item(path):
+    """
+    估算一个文件的处理规模
+    :return: TestItem，不支持的文件返回 None
+    """
+    name = path.lower()
+    size = os.path.getsize(path)
+    if name.endswith(IMAGE_EXTS):
+        dims = image_size(path)
+        if dims is None:
+            # 按 JPEG 平均每像素约 0.15 字节估算
+            side = int((size / 0.15) ** 0.5)
+            return TestItem(path, "image", 1, side, side, size, estimated=True)
+        return TestItem(path, "image", 1, dims[0], dims[1], size)
+    if name.endswith(VIDEO_EXTS):
+        import cv2
+        cap = cv2.VideoCapture(path)
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1280
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 720
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        cap.release()
+        if frames > 0:
+            return TestItem(path, "video", frames, width, height, size)
+        # 帧数读不到（部分 mkv / 直播录像）：按 2 Mbps 码率估算时长
+        frames = max(1, int(size * 8 / 2e6 * fps))
+        return TestItem(path, "video", frames, width, height, size, estimated=True)
+    return None
+
+
+def scan_testset(testset_dir, cost_model=None):
+    """
+    扫描测试集目录，估算每个文件的代价（按 os.listdir 顺序返回，方便和原来的串行顺序对比）
+    :return: (TestItem 列表, 跳过的文件名列表)
+    """
+    cost_model = cost_model or CostModel()
+    items, skipped = [], []
+    for name in os.listdir(testset_dir):
+        path = os.path.join(testset_dir, name)
+        item = probe_item(path) if os.path.isfile(path) else None
+        if item is None:
+            skipped.append(name)
+            continue
+        item.cost = cost_model.cost_ms(item)
+        items.append(item)
+    return items, skipped
+
+
+def make_jobs(items, image_batch=16):
+    """
+    打包成任务：每个视频一个任务，图片按 image_batch 张一组（保持 listdir 顺序）
+    :return: [{"index", "kind", "paths", "cost"}]
+    """
+    jobs = []
+    images = []
+
+    def flush():
+        if images:
+            jobs.append({"index": len(jobs), "kind": "images", "paths": [i.path for i in images],
+                         "cost": sum(i.cost for i in images)})
+            images.clear()
+
+    for item in items:
+        if item.kind == "video":
+            jobs.append({"index": len(jobs), "kind": "video", "paths": [item.path], "cost": item.cost})
+        else:
+            images.append(item)
+            if len(images) >= image_batch:
+                flush()
+    flush()
+    return jobs
+
+
+def simulate(durations, workers):
+    """
+    按给定顺序分发任务（空闲进程领下一个）时的完成时间
+    :param durations: 按分发顺序排列的任务耗时
+    :return: makespan
+    """
+    loads = [0.0] * max(1, workers)
+    for d in durations:
+        heapq.heappush(loads, heapq.heappop(loads) + d)
+    return max(loads)
+
+
+def lpt_order(jobs):
+    """最长任务优先的分发顺序"""
+    return sorted(jobs, key=lambda job: job["cost"], reverse=True)
+
+
+def print_plan(jobs, workers):
+    """打印估算结果：LPT 和 listdir 顺序的预计 makespan"""
+    total = sum(job["cost"] for job in jobs) / 1000
+    bound = max(total / max(workers, 1), max((job["cost"] for job in jobs), default=0) / 1000)
+    lpt = simulate([job["cost"] for job in lpt_order(jobs)], workers) / 1000
+    listed = simulate([job["cost"] for job in jobs], workers) / 1000
+    videos = sum(job["kind"] == "video" for job in jobs)
+    print(f"🧮 共 {len(jobs)} 个任务（{videos} 个视频，{len(jobs) - videos} 个图片批次），"
+          f"估算总代价 {total:.1f} 秒")
+    print(f"   预计 makespan：最长优先 {lpt:.1f} 秒 | listdir 顺序 {listed:.1f} 秒 | "
+          f"单进程串行 {total:.1f} 秒（{workers} 个进程，下限 {bound:.1f} 秒）")
+    for job in lpt_order(jobs)[:5]:
+        print(f"   {job['cost'] / 1000:8.1f} 秒  {job['kind']:6s} {os.path.basename(job['paths'][0])}"
+              + (f" 等 {len(job['paths'])} 张" if job["kind"] == "images" else ""))
+    return {"estimated_total_s": round(total, 2), "estimated_lpt_s": round(lpt, 2),
+            "estimated_listdir_s": round(listed, 2)}
+
+
+def _init_worker(runtimes, init, init_args):
+    """工作进程初始化：领一份线程配置并应用（必须在加载模型之前），再调用方的初始化（加载模型）"""
+    runtimes.get().apply()
+    if init is not None:
+        init(*init_args)
+
+
+def _timed(args):
+    run_job, job = args
+    start = time.time()
+    result = run_job(job)
+    end = time.time()
+    return {"index": job["index"], "pid": os.getpid(), "start": start, "end": end, "result": result}
+
+
+def run_schedule(jobs, workers, run_job, init=None, init_args=(), pin_cpus=False):
+    """
+    按最长优先的顺序把任务分给进程池（spawn），每个进程领完一个再领下一个
+    :param run_job: 处理一个任务的函数（模块顶层函数，能被子进程导入）
+    :param init: 每个进程启动时调用一次的初始化函数（加载模型）
+    :return: 报告（见 schedule_report）
+    """
+    workers = max(1, min(workers, len(jobs)))
+    ctx = mp.get_context("spawn")
+    runtimes = ctx.Queue()
+    for runtime in plan_workers(workers, pin=pin_cpus):
+        runtimes.put(runtime)
+    timings = []
+    pool = ctx.Pool(workers, initializer=_init_worker, initargs=(runtimes, init, init_args))
+    try:
+        for timing in pool.imap_unordered(_timed, [(run_job, job) for job in lpt_order(jobs)], chunksize=1):
+            timings.append(timing)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return schedule_report(jobs, timings, workers)
+
+
+def schedule_report(jobs, timings, workers):
+    """
+    汇总调度结果（makespan 从第一个任务开始算，不含模型加载）
+    :return: dict（makespan、利用率、串行耗时、listdir 顺序 makespan、估算误差、各任务耗时、run_job 的返回值）
+    """
+    by_index = {job["index"]: job for job in jobs}
+    makespan = max(t["end"] for t in timings) - min(t["start"] for t in timings) if timings else 0.0
+    busy = {}
+    for t in timings:
+        busy[t["pid"]] = busy.get(t["pid"], 0.0) + t["end"] - t["start"]
+    durations = {t["index"]: t["end"] - t["start"] for t in timings}
+    serial = sum(durations.values())
+    listed = simulate([durations[j["index"]] for j in jobs if j["index"] in durations], workers)
+    predicted = sum(by_index[i]["cost"] for i in durations) / 1000
+    return {
+        "workers": workers,
+        "jobs": len(timings),
+        "makespan_s": round(makespan, 2),
+        "utilisation": round(serial / (workers * makespan), 3) if makespan > 0 else 0.0,
+        "worker_busy_s": [round(v, 2) for v in busy.values()],
+        "serial_s": round(serial, 2),
+        "listdir_makespan_s": round(listed, 2),
+        "speedup": round(serial / makespan, 2) if makespan > 0 else 0.0,
+        "cost_ratio": round(serial / predicted, 2) if predicted > 0 else 0.0,
+        "job_s": {by_index[i]["paths"][0]: round(d, 3) for i, d in durations.items()},
+        "results": [t["result"] for t in timings],
+    }
+
+
+def print_report(report):
+    print(f"⏱️ makespan {report['makespan_s']} 秒（{report['workers']} 个进程，利用率 "
+          f"{report['utilisation'] * 100:.1f}%，各进程忙碌 {report['worker_busy_s']} 秒）")
+    print(f"   串行（listdir 顺序、单进程）约 {report['serial_s']} 秒 → 加速 {report['speedup']}×；"
+          f"同样 {report['workers']} 个进程按 listdir 顺序约 {report['listdir_makespan_s']} 秒")
+    print(f"   实际耗时 / 估算代价 = {report['cost_ratio']}（偏离 1 较多时可调整 CostModel 的单帧耗时）")
+
+
+def add_schedule_args(parser):
+    """给命令行脚本添加测试集调度参数"""
+    group = parser.add_argument_group("测试集调度")
+    group.add_argument("--workers", type=int, default=1,
+                       help="并行处理测试集的进程数（>1 时按估算代价最长优先调度，1 表示按原顺序单进程处理）")
+    group.add_argument("--image-batch", type=int, default=16, help="多少张图片打包成一个任务")
+    group.add_argument("--detect-ms", type=float, default=30.0,
+                       help="估算代价用的单次检测耗时（毫秒）")
+    return parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="估算测试集处理代价，对比最长优先和 listdir 顺序的 makespan")
+    parser.add_argument("testset", type=str, help="测试集目录")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument("--image-batch", type=int, default=16, help="多少张图片打包成一个任务")
+    parser.add_argument("--detect-ms", type=float, default=30.0, help="单次检测耗时（毫秒）")
+    parser.add_argument("--decode-ms-per-mp", type=float, default=6.0, help="每百万像素解码耗时（毫秒）")
+    args = parser.parse_args()
+
+    start = time.time()
+    items, skipped = scan_testset(args.testset, CostModel(args.detect_ms, args.decode_ms_per_mp))
+    estimated = sum(item.estimated for item in items)
+    print(f"📂 {len(items)} 个文件（跳过 {len(skipped)} 个，{estimated} 个按文件大小估算），"
+          f"扫描耗时 {time.time() - start:.2f} 秒")
+    print_plan(make_jobs(items, args.image_batch), args.workers)
+
+
+if __name__ == "__main__":
+    main()
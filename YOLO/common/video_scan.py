@@ -0,0 +1,195 @@
+"""
+离线视频快速扫描（先粗后细）
+
+归档录像只需要知道车牌在哪些时间段出现，逐帧解码 + 检测太慢。scan_video 分两遍：
+1. 粗扫：每 stride 帧取一帧，缩小分辨率（scan_imgsz）检测；其余帧用 cap.grab() 跳过
+   （grab 只前进不取帧，省掉像素格式转换和拷贝，也不做推理）
+2. 细扫：只在粗扫命中帧前后 stride 帧的窗口内逐帧、全分辨率检测；
+   窗口之间距离较远时直接 seek 到下一个窗口，连 grab 都省掉
+
+最后把细扫命中的帧按时间合并成车牌事件（开始/结束帧、时间、最高置信度、最佳车牌框），
+stride=1 时就是逐帧全量检测（只扫一遍），可以用来对比结果。
+粗扫步长之内一闪而过（出现不到 stride 帧）的车牌可能被漏掉，stride 按车辆经过画面的最短时间设置。
+"""
+
+import json
+import os
+import time
+
+import cv2
+
+from plate_ocr import crop_plate, result_boxes
+from telemetry import Telemetry
+
+
+def _detect(model, frame, conf, imgsz, device):
+    results = model(frame, conf=conf, imgsz=imgsz, device=device, verbose=False)
+    return result_boxes(results[0])
+
+
+def merge_windows(hit_frames, radius, total_frames):
+    """把命中帧扩展成 [start, end] 窗口并合并重叠部分"""
+    windows = []
+    for f in sorted(hit_frames):
+        start, end = max(0, f - radius), min(total_frames - 1, f + radius)
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    return windows
+
+
+class EventBuilder:
+    """把逐帧检测结果按时间合并成车牌事件（相邻命中帧间隔不超过 max_gap 帧视为同一事件）"""
+
+    def __init__(self, fps, max_gap, reader=None, telemetry=None):
+        self.fps = fps
+        self.max_gap = max_gap
+        self.reader = reader
+        self.telemetry = telemetry or Telemetry(enabled=False)
+        self.events = []
+        self._current = None
+        self._best_crop = None
+
+    def add(self, frame_idx, frame, boxes):
+        if not boxes:
+            return
+        if self._current is not None and frame_idx - self._current["end_frame"] > self.max_gap:
+            self._close()
+        best = max(boxes, key=lambda b: b[4])
+        if self._current is None:
+            self._current = {"start_frame": frame_idx, "end_frame": frame_idx, "frames_hit": 0,
+                             "max_conf": 0.0, "best_frame": frame_idx, "best_box": None}
+        event = self._current
+        event["end_frame"] = frame_idx
+        event["frames_hit"] += 1
+        if best[4] > event["max_conf"]:
+            event.update(max_conf=round(best[4], 4), best_frame=frame_idx, best_box=list(best[:4]))
+            if self.reader is not None:
+                self._best_crop = crop_plate(frame, best, 4)
+
+    def _close(self):
+        event = self._current
+        event["start_s"] = round(event["start_frame"] / self.fps, 3)
+        event["end_s"] = round(event["end_frame"] / self.fps, 3)
+        if self.reader is not None and self._best_crop is not None:
+            with self.telemetry.stage("ocr"):
+                event["plate"], conf = self.reader.read(self._best_crop)
+            self.telemetry.inc("ocr_calls")
+            event["plate_conf"] = round(conf, 4)
+        self.events.append(event)
+        self._current = None
+        self._best_crop = None
+
+    def finish(self):
+        if self._current is not None:
+            self._close()
+        return self.events
+
+
+def scan_video(model, video_path, stride=10, scan_imgsz=320, dense_imgsz=640, conf=0.5,
+               device="cpu", reader=None, seek_threshold=None, telemetry=None):
+    """
+    先粗后细扫描视频中的车牌出现区间
+    :param stride: 粗扫步长（每多少帧检测一帧），也是细扫窗口半径
+    :param scan_imgsz: 粗扫推理分辨率
+    :param dense_imgsz: 细扫推理分辨率
+    :param reader: PlateReader，传入时对每个事件的最佳车牌做一次字符识别
+    :param seek_threshold: 下一个窗口在多少帧之后才直接 seek（默认 4 * stride）
+    :param telemetry: 运行时监控（Telemetry），记录检测帧数、检测框数和事件 OCR
+    :return: (事件列表, 统计报告)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频 {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    seek_threshold = seek_threshold or 4 * stride
+    # decoded_frames：真正取出像素（retrieve/read）的帧数；只 grab 跳过的帧不计入
+    report = {"video": video_path, "total_frames": 0, "decoded_frames": 0, "inferred_frames": 0,
+              "coarse_hits": 0, "windows": 0, "dense_frames": 0}
+    start_time = time.time()
+
+    telemetry = telemetry or Telemetry(enabled=False)
+    builder = EventBuilder(fps, max_gap=stride, reader=reader, telemetry=telemetry)
+    dense_only = stride <= 1
+
+    # 第一遍：粗扫（stride=1 时直接逐帧全分辨率检测）
+    hits = []
+    frame_idx = 0
+    while cap.grab():
+        if frame_idx % stride == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                report["decoded_frames"] += 1
+                report["inferred_frames"] += 1
+                telemetry.inc("frames")
+                with telemetry.stage("detect" if dense_only else "scan"):  # 粗扫单独一个阶段
+                    boxes = _detect(model, frame, conf, dense_imgsz if dense_only else scan_imgsz, device)
+                if dense_only:
+                    telemetry.inc("detections", len(boxes))
+                    builder.add(frame_idx, frame, boxes)
+                elif boxes:
+                    hits.append(frame_idx)
+        frame_idx += 1
+    total = frame_idx  # 以实际读到的帧数为准（CAP_PROP_FRAME_COUNT 可能不准）
+    report["total_frames"] = total
+    report["coarse_hits"] = len(hits)
+    coarse_time = time.time() - start_time
+
+    # 第二遍：只细扫命中窗口
+    windows = merge_windows(hits, stride, total)
+    report["windows"] = len(windows)
+    if windows:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        pos = 0
+        for start, end in windows:
+            if start - pos > seek_threshold:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+                pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            while pos < start and cap.grab():
+                pos += 1
+            while pos <= end:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                report["decoded_frames"] += 1
+                report["inferred_frames"] += 1
+                report["dense_frames"] += 1
+                telemetry.inc("frames")
+                with telemetry.stage("detect"):
+                    boxes = _detect(model, frame, conf, dense_imgsz, device)
+                telemetry.inc("detections", len(boxes))
+                builder.add(pos, frame, boxes)
+                pos += 1
+    cap.release()
+    events = builder.finish()
+
+    elapsed = time.time() - start_time
+    report.update(events=len(events), coarse_s=round(coarse_time, 2), total_s=round(elapsed, 2),
+                  decoded_ratio=round(report["decoded_frames"] / max(total, 1), 4),
+                  inferred_ratio=round(report["inferred_frames"] / max(total, 1), 4))
+    return events, report
+
+
+def save_events(events, report, path):
+    """把事件列表和统计报告保存为 JSON"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"report": report, "events": events}, f, ensure_ascii=False, indent=2)
+
+
+def format_report(report):
+    return (f"共 {report['total_frames']} 帧，解码 {report['decoded_frames']} 帧"
+            f"（{report['decoded_ratio'] * 100:.1f}%），推理 {report['inferred_frames']} 帧"
+            f"（粗扫命中 {report['coarse_hits']}，细扫窗口 {report['windows']} 个 / {report['dense_frames']} 帧），"
+            f"车牌事件 {report['events']} 个，耗时 {report['total_s']:.2f} 秒")
+
+
+def add_scan_args(parser):
+    """给命令行脚本添加快速扫描参数"""
+    group = parser.add_argument_group("视频快速扫描")
+    group.add_argument("--fast-scan", action="store_true",
+                       help="视频使用先粗后细的快速扫描，只输出车牌事件（不生成结果视频）")
+    group.add_argument("--scan-stride", type=int, default=10, help="粗扫步长（帧）")
+    group.add_argument("--scan-imgsz", type=int, default=320, help="粗扫推理分辨率")
+    return parser
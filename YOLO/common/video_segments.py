@@ -0,0 +1,320 @@
+"""
+单个长视频分段并行处理
+
+10 小时的录像交给 process_single_video() 只能用一个核。这里把一个视频按时间切成 N 段，
+每段交给一个工作进程，各自 seek 到自己的起点独立解码 + 检测，最后按顺序拼回来：
+
+- 分段边界对齐到关键帧（ffprobe -skip_frame nokey 只解码关键帧取时间）：seek 到关键帧不需要
+  从前一个关键帧解码过来，段与段之间也不会重复解码；没有 ffprobe 时按帧数均分
+- 每个工作进程只加载一次模型，线程数 / 绑核按 runtime_config 分配，避免 N 个进程抢核
+- 每段输出：逐帧检测结果（detection_sidecar 格式）、车牌事件、可选的带框视频片段
+- 拼接：检测结果按帧号顺序合并成一个旁路文件；跨分段边界的同一个车牌事件
+  （前一段最后一个事件和后一段第一个事件相隔不超过 max_gap 帧）合并成一个；
+  带框视频片段有 ffmpeg 时用 concat 直接拼接（不重新编码），否则逐帧复制
+总耗时大致随核数线性下降（解码和推理都在各自的进程里）。
+
+用法：
+    python video_segments.py --model best.pt --video night.mp4 --workers 8 --out results
+    python video_segments.py --model best.pt --video night.mp4 --workers 8 --annotate --sidecar jsonl
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from detection_sidecar import SidecarWriter, read_sidecar
+from runtime_config import plan_workers
+from video_scan import EventBuilder, save_events
+
+
+def probe_keyframes(video_path):
+    """
+    用 ffprobe 读取关键帧时间（秒，相对于视频流的起始时间）
+    -skip_frame nokey 让解码器只解关键帧，不用逐个读取所有包
+    :return: 关键帧时间列表，没有 ffprobe 或读取失败返回 None
+    """
+    if shutil.which("ffprobe") is None:
+        return None
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+           "-show_entries", "stream=start_time:frame=pts_time,best_effort_timestamp_time",
+           "-of", "json", video_path]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        data = json.loads(output)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+    # 帧号从视频流的第一帧算起（OpenCV seek 也是），pts 要减去流的起始时间（mp4 常见非零起点）
+    streams = data.get("streams") or [{}]
+    try:
+        start = float(streams[0].get("start_time", 0))
+    except ValueError:
+        start = 0.0
+    times = []
+    for frame in data.get("frames", []):
+        pts = frame.get("pts_time", frame.get("best_effort_timestamp_time"))
+        if pts not in (None, "", "N/A"):
+            times.append(max(0.0, float(pts) - start))
+    return sorted(times) or None
+
+
+def plan_segments(total_frames, fps, segments, keyframes=None, min_frames=None):
+    """
+    把 [0, total_frames) 切成 segments 段，边界对齐到最近的关键帧
+    :param keyframes: 关键帧时间（秒），None 表示按帧数均分
+    :param min_frames: 每段最少帧数（默认 2 秒），视频太短时减少段数
+    :return: [(开始帧, 结束帧)]，结束帧不含；最后一段的结束帧为 None（读到视频结尾）
+    """
+    min_frames = min_frames or int(fps * 2)
+    segments = max(1, min(segments, total_frames // max(min_frames, 1)))
+    key_frames = sorted({int(round(t * fps)) for t in keyframes}) if keyframes else None
+    bounds = [0]
+    for i in range(1, segments):
+        target = total_frames * i // segments
+        if key_frames:
+            target = min(key_frames, key=lambda k: abs(k - target))
+        if target - bounds[-1] >= min_frames // 2 and total_frames - target >= min_frames // 2:
+            bounds.append(target)
+    return [(start, end) for start, end in zip(bounds, bounds[1:] + [None])]
+
+
+_worker = {}
+
+
+def _init_worker(runtimes, model_path, ocr):
+    """工作进程初始化：领一份线程配置并应用，然后加载一次模型"""
+    runtime = runtimes.get()
+    runtime.apply()
+    from model_store import load_model
+    _worker["model"] = load_model(model_path)
+    _worker["reader"] = None
+    if ocr:
+        from plate_ocr import PlateReader
+        _worker["reader"] = PlateReader()
+
+
+def process_segment(job):
+    """
+    处理一段：seek 到开始帧，逐帧检测到结束帧
+    :param job: dict(index, video, start, end, out_dir, conf, imgsz, device, max_gap, annotate)
+    :return: 这一段的统计和输出文件
+    """
+    import cv2
+    from plate_ocr import result_boxes
+    from plate_renderer import PlateRenderer
+
+    start_time = time.time()
+    model, reader = _worker["model"], _worker["reader"]
+    cap = cv2.VideoCapture(job["video"])
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if job["start"]:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, job["start"])
+    base = os.path.join(job["out_dir"], f"segment_{job['index']:04d}")
+    sidecar = SidecarWriter(base + ".dets", fps, width, height, source=job["video"], overlays=())
+    builder = EventBuilder(fps, job["max_gap"], reader)
+    out = None
+    if job["annotate"]:
+        out = cv2.VideoWriter(base + ".mp4", cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        renderer = PlateRenderer()
+    frame_idx = job["start"]
+    try:
+        while job["end"] is None or frame_idx < job["end"]:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            result = model(frame, conf=job["conf"], imgsz=job["imgsz"], device=job["device"], verbose=False)[0]
+            boxes = result_boxes(result)
+            sidecar.write(frame_idx, boxes)
+            builder.add(frame_idx, frame, boxes)
+            if out is not None:
+                out.write(renderer.render(frame, boxes))
+            frame_idx += 1
+    finally:
+        cap.release()
+        sidecar.close()
+        if out is not None:
+            out.release()
+    return {"index": job["index"], "start": job["start"], "end": frame_idx,
+            "frames": frame_idx - job["start"], "detections": sidecar.detections,
+            "events": builder.finish(), "sidecar": sidecar.path,
+            "video": base + ".mp4" if out is not None else None,
+            "seconds": round(time.time() - start_time, 2), "pid": os.getpid()}
+
+
+def stitch_events(parts, max_gap):
+    """按分段顺序拼接事件，跨边界的同一事件合并"""
+    events = []
+    for part in parts:
+        for event in part["events"]:
+            last = events[-1] if events else None
+            if last is not None and event["start_frame"] - last["end_frame"] <= max_gap:
+                last["end_frame"], last["end_s"] = event["end_frame"], event["end_s"]
+                last["frames_hit"] += event["frames_hit"]
+                if event["max_conf"] > last["max_conf"]:
+                    for key in ("max_conf", "best_frame", "best_box", "plate", "plate_conf"):
+                        if key in event:
+                            last[key] = event[key]
+            else:
+                events.append(dict(event))
+    return events
+
+
+def stitch_sidecars(parts, out_path, fps, width, height, source, overlays=("vtt",)):
+    """按顺序合并各段的检测结果（帧号本来就是全局帧号）"""
+    with SidecarWriter(out_path, fps, width, height, source=source, overlays=overlays) as writer:
+        for part in parts:
+            _, frames = read_sidecar(part["sidecar"])
+            for frame_idx, boxes, labels in frames:
+                writer.write(frame_idx, boxes, labels)
+            writer.frames = max(writer.frames, part["end"])
+    return writer
+
+
+def stitch_videos(paths, out_path):
+    """拼接带框视频片段：有 ffmpeg 时直接 concat（不重新编码），否则逐帧复制"""
+    if shutil.which("ffmpeg"):
+        list_path = out_path + ".txt"
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in paths:
+                f.write("file '" + os.path.abspath(path).replace("'", "'\\''") + "'\n")
+        try:
+            subprocess.run(["ffmpeg", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+                            "-c", "copy", out_path], check=True)
+            return out_path
+        except (OSError, subprocess.CalledProcessError):
+            pass
+        finally:
+            os.remove(list_path)
+    import cv2
+    out = None
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if out is None:
+                fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+                out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps,
+                                      (frame.shape[1], frame.shape[0]))
+            out.write(frame)
+        cap.release()
+    if out is not None:
+        out.release()
+    return out_path
+
+
+def process_video_parallel(model_path, video_path, out_dir, workers=None, segments=None, conf=0.5,
+                           imgsz=640, device="cpu", max_gap=10, annotate=False, sidecar_fmt="bin",
+                           overlays=("vtt",), ocr=False, pin_cpus=False):
+    """
+    分段并行处理一个视频
+    :param workers: 工作进程数（默认 CPU 核数）
+    :param segments: 分段数（默认等于进程数）
+    :param max_gap: 相邻命中帧间隔不超过多少帧算同一个事件（也用于跨段合并）
+    :param annotate: 是否输出带框视频
+    :param sidecar_fmt: 检测结果格式（bin / jsonl）
+    :param ocr: 是否对每个事件的最佳车牌做字符识别
+    :return: 统计报告
+    """
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频 {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    keyframes = probe_keyframes(video_path)
+    plan = plan_segments(total, fps, segments or workers, keyframes)
+    workers = min(workers, len(plan))
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"🎬 {name}：{total} 帧，{fps:.1f} FPS，分成 {len(plan)} 段（"
+          f"{'关键帧对齐' if keyframes else '按帧数均分，未找到 ffprobe'}），{workers} 个进程")
+
+    start_time = time.time()
+    tmp_dir = tempfile.mkdtemp(prefix=f"{name}_segments_", dir=out_dir)
+    ctx = mp.get_context("spawn")
+    runtimes = ctx.Queue()
+    for runtime in plan_workers(workers, pin=pin_cpus):
+        runtimes.put(runtime)
+    jobs = [{"index": i, "video": video_path, "start": start, "end": end, "out_dir": tmp_dir,
+             "conf": conf, "imgsz": imgsz, "device": device, "max_gap": max_gap, "annotate": annotate}
+            for i, (start, end) in enumerate(plan)]
+    parts = []
+    try:
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(runtimes, model_path, ocr)) as pool:
+            for part in pool.imap_unordered(process_segment, jobs):
+                parts.append(part)
+                print(f"   分段 {part['index'] + 1}/{len(plan)}：帧 {part['start']}-{part['end']}，"
+                      f"{part['frames'] / max(part['seconds'], 1e-6):.1f} 帧/秒（进程 {part['pid']}）")
+        parts.sort(key=lambda p: p["index"])
+
+        # 按顺序拼接
+        ext = ".jsonl" if sidecar_fmt == "jsonl" else ".dets"
+        writer = stitch_sidecars(parts, os.path.join(out_dir, name + ext), fps, width, height,
+                                 os.path.abspath(video_path), overlays)
+        events = stitch_events(parts, max_gap)
+        video_out = None
+        if annotate:
+            video_out = stitch_videos([p["video"] for p in parts], os.path.join(out_dir, f"{name}_result.mp4"))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    elapsed = time.time() - start_time
+    frames = sum(p["frames"] for p in parts)
+    report = {"video": video_path, "total_frames": frames, "segments": len(parts), "workers": workers,
+              "keyframe_aligned": bool(keyframes), "detections": writer.detections, "events": len(events),
+              "total_s": round(elapsed, 2), "fps": round(frames / max(elapsed, 1e-6), 1),
+              "segment_s": [p["seconds"] for p in parts], "sidecar": writer.path, "annotated": video_out}
+    save_events(events, report, os.path.join(out_dir, f"{name}_events.json"))
+    print(f"✅ {name}：{frames} 帧，{len(events)} 个车牌事件，耗时 {elapsed:.1f} 秒（{report['fps']} 帧/秒）")
+    return report
+
+
+def add_segment_args(parser):
+    """给命令行脚本添加分段并行参数"""
+    group = parser.add_argument_group("长视频分段并行")
+    group.add_argument("--segment-workers", type=int, default=0,
+                       help="把单个视频切段并行处理的进程数（0 表示不分段）")
+    group.add_argument("--segment-annotate", action="store_true",
+                       help="分段模式下指定了检测结果旁路文件时也输出带框视频（不指定旁路文件时总是输出）")
+    return parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单个长视频分段并行处理")
+    parser.add_argument("--model", type=str, required=True, help="检测模型路径或模型库条目名")
+    parser.add_argument("--video", type=str, required=True, help="视频路径")
+    parser.add_argument("--out", type=str, default="segment_results", help="输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认 CPU 核数）")
+    parser.add_argument("--segments", type=int, default=None, help="分段数（默认等于进程数）")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--imgsz", type=int, default=640, help="推理分辨率")
+    parser.add_argument("--device", type=str, default="cpu", help="推理设备")
+    parser.add_argument("--max-gap", type=int, default=10, help="同一事件相邻命中帧的最大间隔（帧）")
+    parser.add_argument("--annotate", action="store_true", help="同时输出带框视频")
+    parser.add_argument("--sidecar", choices=("bin", "jsonl"), default="bin", help="检测结果格式")
+    parser.add_argument("--overlay", type=str, default="vtt", help="叠加字幕轨：vtt、ass、vtt,ass 或 none")
+    parser.add_argument("--ocr", action="store_true", help="对每个事件的最佳车牌做字符识别")
+    parser.add_argument("--pin-cpus", action="store_true", help="把每个进程绑定到分到的物理核上")
+    args = parser.parse_args()
+    overlays = [o.strip() for o in args.overlay.split(",") if o.strip() in ("vtt", "ass")]
+    report = process_video_parallel(args.model, args.video, args.out, args.workers, args.segments,
+                                    args.conf, args.imgsz, args.device, args.max_gap, args.annotate,
+                                    args.sidecar, overlays, args.ocr, args.pin_cpus)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
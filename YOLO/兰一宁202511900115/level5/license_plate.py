@@ -1,164 +1,369 @@
 import cv2
 import os
+import sys
+import time
 import numpy as np
-from ultralytics import YOLO  # 新增：导入YOLO模型库
-from paddleocr import PaddleOCR
+from pathlib import Path
 from PIL import Image
 
-# 1. 加载模型（核心修改：优先用YOLO检测车牌）
-# 替换为你的YOLO训练模型路径（best.pt），确保路径正确
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from detection_cache import DetectionCache, model_fingerprint
+from fast_decode import DecodedImage, decode_image
+from model_store import load_model, resolve_model
+from output_writer import AsyncOutputWriter
+from plate_ocr import parse_rec_result
+from plate_prefilter import PlateGate, detect_with_gate
+from result_sink import ResultSink, make_record
+from telemetry import Telemetry
+
+# 1. 模型配置（核心修改：优先用YOLO检测车牌）
+# 替换为你的YOLO训练模型路径（best.pt），确保路径正确；也可以写模型库条目名（见 common/model_store.py）
 YOLO_MODEL_PATH = "runs/train/exp/weights/best.pt"  # 常见路径1
 # YOLO_MODEL_PATH = "runs/detect/train/weights/best.pt"  # 常见路径2，二选一
-try:
-    yolo_model = YOLO(YOLO_MODEL_PATH)
-    print(f"✅ 成功加载YOLO车牌检测模型：{YOLO_MODEL_PATH}")
-except Exception as e:
-    print(f"❌ 加载YOLO模型失败！请检查路径是否正确：{e}")
-    exit()
-
-# 2. 初始化OCR（字符识别，保持不变）
-ocr = PaddleOCR(
-    lang='ch',
-    det_model_dir='D:\\ocr_models\\det\\ch_PP-OCRv3_det_infer',
-    rec_model_dir='D:\\ocr_models\\rec\\ch_PP-OCRv3_rec_infer',
-    use_angle_cls=False
-)
-
-# 3. 配置路径和统计
+# OCR 模型目录也可以写模型库条目名；目录不存在时直接报错，不会让 PaddleOCR 联网下载
+OCR_DET_MODEL_DIR = 'D:\\ocr_models\\det\\ch_PP-OCRv3_det_infer'
+OCR_REC_MODEL_DIR = 'D:\\ocr_models\\rec\\ch_PP-OCRv3_rec_infer'
+
+# 2. 配置路径
 image_folder = 'D:\\模型\\第五步\\images'  # 你的113张图片文件夹
 output_folder = 'D:\\模型\\第五步\\yolo_results'  # 结果保存文件夹
-os.makedirs(output_folder, exist_ok=True)  # 自动创建文件夹，避免报错
-
-success_count = 0
-fail_count = 0
-result_log = []  # 记录每张图片的结果
-
-# 4. 收集所有图片路径
-image_paths = [
-    os.path.join(image_folder, f) 
-    for f in os.listdir(image_folder)
-    if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))
-]
-
-if not image_paths:
-    print(f"❌ 在 {image_folder} 中未找到图片")
-    exit()
-print(f"✅ 找到 {len(image_paths)} 张图片，开始处理...\n")
-
-# 5. 批量处理（YOLO检测 + OCR识别）
-for idx, img_path in enumerate(image_paths, 1):
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# 结果图片输出配置（后台线程写盘，不阻塞识别循环）
+SAVE_IMAGES = True      # False：只生成结果汇总，不保存任何图片
+JPEG_QUALITY = 95       # 保存结果图的JPEG质量
+THUMB_WIDTH = None      # 额外保存缩略图的宽度，None表示不保存
+RESULTS_DIR = os.path.join(output_folder, "results")  # 结构化结果（JSONL/Parquet），None表示不输出
+
+# 识别参数
+DETECT_CONF = 0.3       # YOLO置信度阈值（过滤模糊结果）
+EXPAND = 6              # 车牌框向外扩展的像素，避免裁剪到字符边缘
+OCR_MIN_CONF = 0.45     # OCR结果的最低置信度
+
+# 车牌颜色预筛（见 common/plate_prefilter.py）：先用蓝/黄/绿底色 + 字符边缘找候选区域，
+# YOLO只在候选区域的裁剪图上运行，没有候选区域时跳过检测
+USE_PREFILTER = False
+PREFILTER_FALLBACK = False  # 没有候选区域时是否退回全图检测（更稳，但省不了时间）
+GATE = PlateGate() if USE_PREFILTER else None
+
+# 降分辨率解码（见 common/fast_decode.py）：JPEG 按检测输入尺寸直接缩小解码，
+# 车牌区域再按 OCR 需要的分辨率（车牌高度 ≥ OCR_MIN_HEIGHT）重新裁剪
+# 默认关闭：开启后长边 ≥ 1280 的图片，保存的 result_*.jpg 也是缩小后的分辨率（4K 图是 1/4）
+FAST_DECODE = False
+DETECT_IMGSZ = 640      # YOLO输入尺寸（ultralytics 默认 640）
+OCR_MIN_HEIGHT = 48     # OCR输入的车牌最小高度（像素）
+
+# 检测结果缓存（见 common/detection_cache.py）：按 图片内容 + 模型哈希 + 检测参数 缓存YOLO检测框，
+# 只调 OCR 参数（EXPAND、CLAHE、OCR_MIN_CONF）重复运行时不再重新检测；None 表示不缓存（默认），
+# 需要时改成例如 os.path.join(output_folder, "detection_cache.db")
+DETECTION_CACHE = None
+DETECTION_CACHE_MB = 256  # 缓存大小上限，超出时淘汰最久没用到的记录
+
+# 运行时监控（见 common/telemetry.py）：各阶段耗时直方图 + 图片数 / 检测数 / OCR 调用次数
+METRICS_PORT = 0          # Prometheus 指标端口，0 表示不启动 /metrics 接口
+METRICS_LOG_EVERY = 0.0   # 每隔多少秒打印一行汇总，0 表示不打印
+# 调用过 OCR 的结果状态
+OCR_STATUSES = ("ok", "ocr_failed", "ocr_error")
+
+
+def load_models(**ocr_kwargs):
+    """
+    加载YOLO车牌检测模型和OCR（只在需要时导入，方便多进程按需加载）
+    :param ocr_kwargs: 额外传给 PaddleOCR 的参数（例如多进程时的 cpu_threads）
+    """
+    from paddleocr import PaddleOCR
+
+    try:
+        yolo_model = load_model(YOLO_MODEL_PATH)
+        print(f"✅ 成功加载YOLO车牌检测模型：{YOLO_MODEL_PATH}")
+    except Exception as e:
+        print(f"❌ 加载YOLO模型失败！请检查路径是否正确：{e}")
+        sys.exit(1)
+
+    # 初始化OCR（字符识别，保持不变）
+    ocr = PaddleOCR(
+        lang='ch',
+        det_model_dir=resolve_model(OCR_DET_MODEL_DIR),
+        rec_model_dir=resolve_model(OCR_REC_MODEL_DIR),
+        use_angle_cls=False,
+        **ocr_kwargs
+    )
+    return yolo_model, ocr
+
+
+def list_images(folder):
+    """收集文件夹中的所有图片路径"""
+    return [
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if f.lower().endswith(IMAGE_EXTS)
+    ]
+
+
+def read_image(img_path, verbose=True):
+    """
+    读取图片（兼容特殊格式），失败时抛出异常
+    :return: DecodedImage（FAST_DECODE 时 .image 可能是缩小后的图，.factor 为缩小倍数）
+    """
+    decoded = decode_image(img_path, DETECT_IMGSZ if FAST_DECODE else None)
+    if decoded.image is None:
+        img_pil = Image.open(img_path).convert('RGB')
+        decoded = DecodedImage(cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR))
+        if verbose:
+            print("⚠️ 已用PIL兼容模式读取图片")
+    return decoded
+
+
+def open_cache(path=None, max_mb=None, model_key=None):
+    """
+    打开检测结果缓存（path 为 None 时用 DETECTION_CACHE），不缓存时返回 None
+    :param model_key: 模型哈希，None 时按 YOLO_MODEL_PATH 计算（多进程时由主进程算好传进来）
+    """
+    path = path or DETECTION_CACHE
+    if not path:
+        return None
+    model_key = model_key or model_fingerprint(YOLO_MODEL_PATH, path)
+    return DetectionCache(path, model_key, max_mb or DETECTION_CACHE_MB)
+
+
+def locate_plate(yolo_model, img, gate=None):
+    """
+    YOLO检测车牌（不扩展边界框）
+    :return: {"box": [x1, y1, x2, y2] 或 None, "conf": 检测置信度}（可直接写入检测缓存）
+    """
+    if gate is not None:
+        box, det_conf, _ = detect_with_gate(yolo_model, img, gate, conf=DETECT_CONF,
+                                            fallback_full=PREFILTER_FALLBACK)
+        if box is None:
+            return {"box": None, "conf": 0.0}
+        return {"box": [int(v) for v in box[:4]], "conf": float(det_conf)}
+    yolo_results = yolo_model(img, conf=DETECT_CONF, imgsz=DETECT_IMGSZ, verbose=False)  # verbose=False关闭多余输出
+    if len(yolo_results[0].boxes) == 0:
+        return {"box": None, "conf": 0.0}
+    # 获取边界框坐标（x1, y1是左上角，x2, y2是右下角）
+    box = yolo_results[0].boxes.xyxy[0].cpu().numpy().astype(int)
+    return {"box": [int(v) for v in box], "conf": float(yolo_results[0].boxes.conf[0])}
+
+
+def detect_plate(yolo_model, img, gate=None, cache=None, data=None, decoded=None):
+    """
+    用YOLO检测车牌（默认一张图一个车牌）
+    :param gate: 车牌颜色预筛（PlateGate），None 表示直接全图检测
+    :param cache: 检测结果缓存（DetectionCache），命中时不运行YOLO
+    :param data: 图片文件字节（缓存键用，None 时按解码后的像素计算）
+    :param decoded: img 对应的解码结果（DecodedImage），传入时返回原图坐标的框
+    :return: (扩展后的车牌框 (x1, y1, x2, y2), 检测置信度, 是否命中缓存)，未检测到时框为 None
+    """
+    hit = False
+    if cache is not None:
+        # 解码尺寸也算进参数里：FAST_DECODE 的缩小倍数变了，框的坐标也就变了
+        detection, hit = cache.fetch(img if data is None else data,
+                                     lambda: locate_plate(yolo_model, img, gate),
+                                     conf=DETECT_CONF, imgsz=DETECT_IMGSZ, shape=img.shape[:2],
+                                     gate=gate.params() if gate is not None else None,
+                                     fallback=PREFILTER_FALLBACK)
+    else:
+        detection = locate_plate(yolo_model, img, gate)
+    if detection["box"] is None:
+        return None, 0.0, hit
+    det_conf = detection["conf"]
+    if decoded is not None:
+        # 先换算到原图坐标再扩展：EXPAND 是按原图像素调的，缩小解码时也不能跟着放大
+        x1, y1, x2, y2 = decoded.to_full(detection["box"])
+        width, height = decoded.full_size
+    else:
+        x1, y1, x2, y2 = detection["box"]
+        height, width = img.shape[:2]
+    # 适当扩展边界框，避免裁剪到字符边缘
+    x1 = max(0, x1 - EXPAND)
+    y1 = max(0, y1 - EXPAND)
+    x2 = min(width, x2 + EXPAND)
+    y2 = min(height, y2 + EXPAND)
+    return (x1, y1, x2, y2), det_conf, hit
+
+
+def enhance_plate(plate_img):
+    """预处理增强（提高OCR识别率）"""
+    plate_gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=2.5, tileGridSize=(8,8))
+    return clahe.apply(plate_gray)  # 增强对比度
+
+
+def read_plate_text(ocr, plate_enhanced):
+    """
+    OCR识别车牌字符
+    :return: (车牌文字, 置信度)
+    """
+    ocr_result = ocr.ocr(plate_enhanced, det=False, rec=True)
+    # 解析OCR结果（车牌通常6-7个字符，优先选择符合长度的结果）
+    return parse_rec_result(ocr_result, plate_lengths=(6, 7))
+
+
+def recognize_image(img_path, yolo_model, ocr, writer, output_folder, verbose=True, cache=None):
+    """
+    处理一张图片（YOLO检测 + OCR识别）
+    :param cache: 检测结果缓存（DetectionCache），None 表示每次都运行YOLO
+    :return: 结果字典 {"image", "ok", "status", "plate", "conf", "box", "det_conf", "cache", "timings", "log"}，
+             log 为写入汇总文件的一行，cache 为检测缓存是否命中（"hit" / "miss"，不缓存时为 None），
+             timings 为各阶段耗时（毫秒）
+    """
     img_name = os.path.basename(img_path)
-    print(f"===== 处理进度：{idx}/{len(image_paths)} - {img_name} =====")
-    
+    log = print if verbose else (lambda *a, **k: None)
+    timings = {}
+    plate_box, det_conf, cache_state = None, 0.0, None
+
+    def result(ok, status, message, plate="", conf=0.0):
+        return {"image": img_name, "ok": ok, "status": status, "plate": plate,
+                "conf": round(conf, 4), "box": plate_box, "det_conf": round(det_conf, 4),
+                "cache": cache_state, "timings": timings, "log": f"{img_name}: {message}"}
+
+    def stage(name, start):
+        timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
     # 读取图片（兼容特殊格式）
-    img = None
+    t = time.perf_counter()
     try:
-        img = cv2.imread(img_path, cv2.IMREAD_COLOR)
-        if img is None:
-            img_pil = Image.open(img_path).convert('RGB')
-            img = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-            print("⚠️ 已用PIL兼容模式读取图片")
+        decoded = read_image(img_path, verbose)
+        img = decoded.image
     except Exception as e:
-        print(f"❌ 图片读取失败：{str(e)[:50]}\n")
-        fail_count += 1
-        result_log.append(f"{img_name}: 读取失败 - {str(e)[:30]}")
-        continue
+        log(f"❌ 图片读取失败：{str(e)[:50]}\n")
+        return result(False, "read_error", f"读取失败 - {str(e)[:30]}")
+    stage("decode", t)
 
-    # 6. 用YOLO检测车牌（核心步骤，替换之前的自定义定位）
-    plate_box = None  # 存储车牌坐标 (x1, y1, x2, y2)
+    # 用YOLO检测车牌（核心步骤，替换之前的自定义定位）
+    t = time.perf_counter()
     try:
-        # 检测车牌，置信度阈值0.3（过滤模糊结果）
-        yolo_results = yolo_model(img, conf=0.3, verbose=False)  # verbose=False关闭多余输出
-        # 提取第一个检测到的车牌（默认一张图一个车牌）
-        if len(yolo_results[0].boxes) > 0:
-            # 获取边界框坐标（x1, y1是左上角，x2, y2是右下角）
-            box = yolo_results[0].boxes.xyxy[0].cpu().numpy().astype(int)
-            x1, y1, x2, y2 = box
-            # 适当扩展边界框，避免裁剪到字符边缘
-            expand = 6
-            x1 = max(0, x1 - expand)
-            y1 = max(0, y1 - expand)
-            x2 = min(img.shape[1], x2 + expand)
-            y2 = min(img.shape[0], y2 + expand)
-            plate_box = (x1, y1, x2, y2)
-            print(f"⚠️ 成功检测到车牌区域：({x1}, {y1}) 到 ({x2}, {y2})")
-        else:
-            print("❌ YOLO未检测到车牌区域\n")
-            fail_count += 1
-            result_log.append(f"{img_name}: 未检测到车牌")
-            continue
+        plate_box, det_conf, hit = detect_plate(yolo_model, img, GATE, cache, decoded.data, decoded)
     except Exception as e:
-        print(f"❌ YOLO检测出错：{str(e)[:50]}\n")
-        fail_count += 1
-        result_log.append(f"{img_name}: 检测出错 - {str(e)[:30]}")
-        continue
-
-    # 7. 裁剪车牌区域并预处理
-    x1, y1, x2, y2 = plate_box
-    plate_img = img[y1:y2, x1:x2]
-    # 预处理增强（提高OCR识别率）
-    plate_gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
-    clahe = cv2.createCLAHE(clipLimit=2.5, tileGridSize=(8,8))
-    plate_enhanced = clahe.apply(plate_gray)  # 增强对比度
+        log(f"❌ YOLO检测出错：{str(e)[:50]}\n")
+        return result(False, "detect_error", f"检测出错 - {str(e)[:30]}")
+    stage("detect", t)
+    if cache is not None:
+        cache_state = "hit" if hit else "miss"
+    if plate_box is None:
+        log("❌ YOLO未检测到车牌区域\n")
+        return result(False, "no_plate", "未检测到车牌")
+    # plate_box 是原图坐标（结果里记录的也是它），画框用检测图（可能是缩小的）上的坐标
+    x1, y1, x2, y2 = (v // decoded.factor for v in plate_box)
+    log(f"⚠️ 成功检测到车牌区域：({plate_box[0]}, {plate_box[1]}) 到 ({plate_box[2]}, {plate_box[3]})")
 
-    # 8. OCR识别车牌字符
+    # 裁剪车牌区域（按OCR需要的分辨率）并预处理
+    t = time.perf_counter()
+    plate_enhanced = enhance_plate(decoded.read_region(plate_box, OCR_MIN_HEIGHT))
+    stage("preprocess", t)
+
+    # OCR识别车牌字符
+    t = time.perf_counter()
     try:
-        ocr_result = ocr.ocr(plate_enhanced, det=False, rec=True)
-        plate_text = ""
-        max_confidence = 0.0
-
-        # 解析OCR结果（兼容不同版本格式）
-        if ocr_result and len(ocr_result) > 0:
-            for item in ocr_result:
-                if isinstance(item, list) and len(item) > 0:
-                    line = item[0]
-                    if isinstance(line, tuple) and len(line) >= 2:
-                        text = line[0] if isinstance(line[0], str) else ""
-                        conf = line[1] if isinstance(line[1], (int, float)) else 0.0
-                        conf = float(conf)
-                        # 车牌通常6-7个字符，优先选择符合长度的结果
-                        if (len(text) == 6 or len(text) == 7) and conf > max_confidence:
-                            max_confidence = conf
-                            plate_text = text
-
-        # 验证识别结果
-        if plate_text and max_confidence > 0.45:
-            print(f"✅ 识别成功！车牌：{plate_text}（置信度：{max_confidence:.2f}）\n")
+        plate_text, max_confidence = read_plate_text(ocr, plate_enhanced)
+    except Exception as e:
+        log(f"❌ OCR识别出错：{str(e)[:50]}\n")
+        return result(False, "ocr_error", f"识别出错 - {str(e)[:30]}")
+    stage("ocr", t)
+
+    # 验证识别结果
+    if plate_text and max_confidence > OCR_MIN_CONF:
+        log(f"✅ 识别成功！车牌：{plate_text}（置信度：{max_confidence:.2f}）\n")
+        # 在原图标注车牌框和结果，保存图片
+        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)  # 绿色框
+        cv2.putText(img, plate_text, (x1, y1-12),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        writer.submit(os.path.join(output_folder, f"result_{img_name}"), img)
+        return result(True, "ok", f"成功 - {plate_text}（{max_confidence:.2f}）", plate_text, max_confidence)
+
+    log(f"❌ 识别失败（字符：{plate_text}，置信度：{max_confidence:.2f}）\n")
+    # 保存增强后的车牌图，方便分析原因
+    writer.submit(os.path.join(output_folder, f"failed_plate_{img_name}"), plate_enhanced)
+    return result(False, "ocr_failed", f"识别失败 - {max_confidence:.2f}", plate_text, max_confidence)
+
+
+def record_telemetry(telemetry, result):
+    """把一张图片的识别结果记进运行时监控（多进程批量识别时在主进程里调用）"""
+    telemetry.record(result["timings"], frames=1, detections=int(result["box"] is not None),
+                     ocr_calls=int(result["status"] in OCR_STATUSES))
+
+
+def to_record(result, img_path):
+    """把 recognize_image 的结果转换成结构化结果记录"""
+    return make_record(img_path, plate=result["plate"], confidence=result["conf"],
+                       box=result["box"], det_conf=result["det_conf"] or None,
+                       status=result["status"], timings=result["timings"])
+
+
+def write_summary(output_folder, total, success_count, fail_count, log_lines):
+    """
+    生成结果统计日志
+    :param log_lines: 每张图片一行的结果（可以是任意可迭代对象，按顺序写入）
+    """
+    with open(os.path.join(output_folder, "处理结果汇总.txt"), "w", encoding="utf-8") as f:
+        f.write(f"车牌识别批量处理结果\n")
+        f.write(f"总图片数：{total} 张\n")
+        f.write(f"成功识别：{success_count} 张\n")
+        f.write(f"处理失败：{fail_count} 张\n")
+        f.write(f"成功率：{success_count/max(total, 1)*100:.1f}%\n\n")
+        f.write("详细结果列表：\n")
+        for i, log in enumerate(log_lines, 1):
+            f.write(f"{i}. {log}\n")
+
+
+def main():
+    yolo_model, ocr = load_models()
+    os.makedirs(output_folder, exist_ok=True)  # 自动创建文件夹，避免报错
+    cache = open_cache()
+    writer = AsyncOutputWriter(jpeg_quality=JPEG_QUALITY, thumbnail_width=THUMB_WIDTH,
+                               write_images=SAVE_IMAGES)
+    sink = ResultSink(RESULTS_DIR) if RESULTS_DIR else None
+    telemetry = Telemetry(enabled=bool(METRICS_PORT or METRICS_LOG_EVERY), log_every=METRICS_LOG_EVERY)
+    if METRICS_PORT:
+        telemetry.serve(METRICS_PORT)
+
+    success_count = 0
+    fail_count = 0
+    result_log = []  # 记录每张图片的结果
+
+    # 收集所有图片路径
+    image_paths = list_images(image_folder)
+    if not image_paths:
+        print(f"❌ 在 {image_folder} 中未找到图片")
+        sys.exit(1)
+    print(f"✅ 找到 {len(image_paths)} 张图片，开始处理...\n")
+
+    # 批量处理（YOLO检测 + OCR识别）
+    for idx, img_path in enumerate(image_paths, 1):
+        print(f"===== 处理进度：{idx}/{len(image_paths)} - {os.path.basename(img_path)} =====")
+        result = recognize_image(img_path, yolo_model, ocr, writer, output_folder, cache=cache)
+        record_telemetry(telemetry, result)
+        telemetry.tick()
+        if result["ok"]:
             success_count += 1
-            result_log.append(f"{img_name}: 成功 - {plate_text}（{max_confidence:.2f}）")
-            
-            # 在原图标注车牌框和结果，保存图片
-            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)  # 绿色框
-            cv2.putText(img, plate_text, (x1, y1-12), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-            cv2.imwrite(os.path.join(output_folder, f"result_{img_name}"), img)
         else:
-            print(f"❌ 识别失败（字符：{plate_text}，置信度：{max_confidence:.2f}）\n")
             fail_count += 1
-            result_log.append(f"{img_name}: 识别失败 - {max_confidence:.2f}")
-            # 保存增强后的车牌图，方便分析原因
-            cv2.imwrite(os.path.join(output_folder, f"failed_plate_{img_name}"), plate_enhanced)
-    except Exception as e:
-        print(f"❌ OCR识别出错：{str(e)[:50]}\n")
-        fail_count += 1
-        result_log.append(f"{img_name}: 识别出错 - {str(e)[:30]}")
-        continue
-
-# 9. 生成结果统计日志
-with open(os.path.join(output_folder, "处理结果汇总.txt"), "w", encoding="utf-8") as f:
-    f.write(f"车牌识别批量处理结果\n")
-    f.write(f"总图片数：{len(image_paths)} 张\n")
-    f.write(f"成功识别：{success_count} 张\n")
-    f.write(f"处理失败：{fail_count} 张\n")
-    f.write(f"成功率：{success_count/len(image_paths)*100:.1f}%\n\n")
-    f.write("详细结果列表：\n")
-    for i, log in enumerate(result_log, 1):
-        f.write(f"{i}. {log}\n")
-
-# 10. 打印最终统计
-print("\n" + "="*60)
-print(f"🎉 所有图片处理完成！")
-print(f"📁 结果文件保存在：{output_folder}")
-print(f"✅ 成功识别：{success_count} 张 | ❌ 处理失败：{fail_count} 张")
-print(f"📊 整体成功率：{success_count/len(image_paths)*100:.1f}%")
-print("="*60)
\ No newline at end of file
+        result_log.append(result["log"])
+        if sink is not None:
+            sink.write(to_record(result, img_path))
+
+    # 等待结果图片全部写完，生成结果统计日志
+    writer.close()
+    telemetry.close()
+    if sink is not None:
+        sink.close()
+    write_summary(output_folder, len(image_paths), success_count, fail_count, result_log)
+
+    # 打印最终统计
+    print("\n" + "="*60)
+    print(f"🎉 所有图片处理完成！")
+    print(f"📁 结果文件保存在：{output_folder}")
+    print(f"✅ 成功识别：{success_count} 张 | ❌ 处理失败：{fail_count} 张")
+    print(f"📊 整体成功率：{success_count/len(image_paths)*100:.1f}%")
+    print(f"💾 {writer.summary()}")
+    if cache is not None:
+        cache.print_report()
+        cache.close()
+    if sink is not None:
+        print(f"🗂️ 结构化结果（{sink.total_records} 条）保存在：{RESULTS_DIR}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+多进程、可断点续跑的文件夹批量车牌识别
+
+- 把文件夹中的图片分发给 N 个工作进程，每个进程只加载一次 YOLO + OCR
+- 每处理完一张图片就追加一行到 journal（JSONL），程序崩溃后重新运行会跳过已完成的图片
+- 所有图片处理完后，根据 journal 合并生成 处理结果汇总.txt（和 license_plate.py 格式一致）
+- 检测结果缓存（common/detection_cache.py）：只改了 OCR 参数、清空 journal 重跑时直接复用检测框
+- --watch：持续监听文件夹（common/folder_watch.py），摄像头新落地的图片凑批后分发给常驻的工作进程，
+  journal 同时作为已处理记录，不用再定时把整个文件夹重跑一遍
+
+用法：
+    python license_plate_batch.py --images D:\\模型\\第五步\\images --output D:\\模型\\第五步\\yolo_results --workers 4
+    python license_plate_batch.py --images /data/camera_drop --output /data/results --watch --watch-batch 8 --watch-wait-ms 200
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from multiprocessing.connection import wait
+
+import license_plate as lp
+from detection_cache import add_cache_args, model_fingerprint
+from folder_watch import (BatchCollector, Checkpoint, LatencyStats, add_watch_args, arrival_time, list_existing,
+                          open_watcher)
+from result_sink import ResultSink
+from runtime_config import add_runtime_args, plan_workers, print_plan
+from telemetry import Telemetry, add_telemetry_args, telemetry_from_args
+
+
+def load_journal(journal_path):
+    """
+    读取 journal 中已完成的图片名
+    崩溃时最后一行可能只写了一半，解析失败的行直接跳过（对应图片会重新处理）
+    """
+    done = set()
+    if not os.path.exists(journal_path):
+        return done
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["image"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def iter_journal(journal_path):
+    """逐行读取 journal 记录（同一张图片只保留第一次出现的结果）"""
+    seen = set()
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("image") in seen:
+                continue
+            seen.add(record.get("image"))
+            yield record
+
+
+def list_pending(image_folder, done):
+    """列出还没处理的图片（按文件名排序，保证每次运行顺序一致）"""
+    names = sorted(
+        entry.name for entry in os.scandir(image_folder)
+        if entry.is_file() and entry.name.lower().endswith(lp.IMAGE_EXTS)
+    )
+    total = len(names)
+    pending = [os.path.join(image_folder, name) for name in names if name not in done]
+    return total, pending
+
+
+def worker_main(conn, output_folder, runtime, save_images, cache_path=None, cache_max_mb=None, model_key=None):
+    """工作进程：加载一次模型，循环处理主进程发来的图片（每批处理完回传一次结果）"""
+    # 限制每个进程内部各个库的线程数（可选绑核），避免 N 个进程互相抢核（必须在加载模型之前）
+    runtime.apply()
+
+    yolo_model, ocr = lp.load_models(**runtime.paddle_kwargs())
+    writer = lp.AsyncOutputWriter(jpeg_quality=lp.JPEG_QUALITY, thumbnail_width=lp.THUMB_WIDTH,
+                                  write_images=save_images)
+    # 每个进程各开一个缓存连接（WAL 模式下可以同时读写）
+    cache = lp.open_cache(cache_path, cache_max_mb, model_key) if cache_path else None
+    try:
+        while True:
+            chunk = conn.recv()
+            if chunk is None:
+                break
+            results = []
+            for img_path in chunk:
+                try:
+                    result = lp.recognize_image(img_path, yolo_model, ocr, writer,
+                                                output_folder, verbose=False, cache=cache)
+                except Exception as e:
+                    name = os.path.basename(img_path)
+                    result = {"image": name, "ok": False, "status": "error", "plate": "",
+                              "conf": 0.0, "box": None, "det_conf": 0.0, "timings": {},
+                              "log": f"{name}: 处理出错 - {str(e)[:30]}"}
+                result["path"] = img_path
+                results.append(result)
+            # 等这一批的标注图片都落盘再回传：主进程收到结果就写 journal，
+            # 提前回传的话进程崩溃时图片丢了，journal 里却已经记为完成，续跑会跳过
+            writer.flush()
+            conn.send(results)
+    finally:
+        writer.close()
+        if cache is not None:
+            cache.close()
+        conn.close()
+
+
+def merge_summary(journal_path, output_folder):
+    """根据 journal 合并生成汇总文件（流式读取两遍，不把结果全部放进内存）"""
+    total = success = 0
+    for record in iter_journal(journal_path):
+        total += 1
+        success += 1 if record.get("ok") else 0
+    lines = (record["log"] for record in iter_journal(journal_path))
+    lp.write_summary(output_folder, total, success, total - success, lines)
+    return total, success
+
+
+def resolve_cache(detect_cache):
+    """检测缓存路径和模型哈希（哈希只在主进程算一次，本地权重的哈希也会记进缓存库，下次运行直接复用）"""
+    cache_path = lp.DETECTION_CACHE if detect_cache is None else detect_cache
+    model_key = model_fingerprint(lp.YOLO_MODEL_PATH, cache_path) if cache_path else None
+    if cache_path:
+        print(f"🗃️ 检测结果缓存：{cache_path}")
+    return cache_path, model_key
+
+
+def start_workers(count, output_folder, save_images, threads_per_worker=None, pin_cpus=False,
+                  cache_path=None, cache_max_mb=None, model_key=None):
+    """
+    启动工作进程，每个进程一条独立管道：某个进程崩溃只影响它自己手上的那几批图片
+    :return: {主进程端管道: {"proc": 进程, "inflight": 已发出未返回的批数}}
+    """
+    workers_by_conn = {}
+    runtimes = plan_workers(count, threads_per_worker, pin_cpus)
+    print_plan(runtimes)
+    for i, runtime in enumerate(runtimes):
+        parent_conn, child_conn = mp.Pipe()
+        p = mp.Process(target=worker_main, name=f"plate-worker-{i}",
+                       args=(child_conn, output_folder, runtime, save_images,
+                             cache_path, cache_max_mb, model_key))
+        p.start()
+        child_conn.close()
+        workers_by_conn[parent_conn] = {"proc": p, "inflight": 0}
+    return workers_by_conn
+
+
+def run_batch(image_folder, output_folder, workers=None, journal_path=None,
+              chunk_size=16, threads_per_worker=None, save_images=True, results_dir=None,
+              pin_cpus=False, detect_cache=None, cache_max_mb=None, telemetry=None):
+    """
+    多进程批量识别
+    :param workers: 工作进程数（默认 CPU 核数）
+    :param journal_path: 进度日志路径（默认 output_folder/journal.jsonl）
+    :param chunk_size: 每次分发给进程的图片数
+    :param threads_per_worker: 每个进程内部的计算线程数（None 表示按 CPU 拓扑自动分配）
+    :param results_dir: 结构化结果（JSONL/Parquet）输出目录，None 表示不输出
+    :param pin_cpus: 是否把每个进程绑定到分到的物理核上
+    :param detect_cache: 检测结果缓存文件，None 时用 license_plate.DETECTION_CACHE，"" 表示不缓存
+    :param cache_max_mb: 缓存大小上限（MB），None 时用 license_plate.DETECTION_CACHE_MB
+    :param telemetry: 运行时监控（Telemetry），工作进程回传的各阶段耗时和计数在主进程里汇总
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_folder, exist_ok=True)
+    journal_path = journal_path or os.path.join(output_folder, "journal.jsonl")
+    telemetry = telemetry or Telemetry(enabled=False)
+
+    done = load_journal(journal_path)
+    total, pending = list_pending(image_folder, done)
+    print(f"✅ 共 {total} 张图片，已完成 {total - len(pending)} 张，本次处理 {len(pending)} 张"
+          f"（{workers} 个进程）")
+
+    if pending:
+        cache_path, model_key = resolve_cache(detect_cache)
+        chunks = (pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size))
+        workers_by_conn = start_workers(min(workers, len(pending)), output_folder, save_images,
+                                        threads_per_worker, pin_cpus, cache_path, cache_max_mb, model_key)
+        procs = [state["proc"] for state in workers_by_conn.values()]
+
+        def dispatch(conn):
+            """给进程发下一批图片；没有图片且手上任务都完成时通知它退出"""
+            state = workers_by_conn[conn]
+            chunk = next(chunks, None)
+            if chunk is not None:
+                conn.send(chunk)
+                state["inflight"] += 1
+            elif state["inflight"] == 0:
+                conn.send(None)
+                del workers_by_conn[conn]
+
+        # 每个进程预先发两批，处理当前批时下一批已经在管道里等着
+        for conn in list(workers_by_conn):
+            dispatch(conn)
+            if conn in workers_by_conn:
+                dispatch(conn)
+
+        processed = 0
+        cache_hits = cache_lookups = 0
+        start = time.time()
+        sink = ResultSink(results_dir) if results_dir else None
+        # 只有主进程写 journal：一行一条记录，每批写完立即 flush
+        with open(journal_path, "a", encoding="utf-8") as journal:
+            while workers_by_conn:
+                for conn in wait(list(workers_by_conn)):
+                    state = workers_by_conn[conn]
+                    try:
+                        results = conn.recv()
+                    except (EOFError, OSError):
+                        # 工作进程异常退出：它手上未完成的图片下次运行会重新处理
+                        state["proc"].join()
+                        print(f"❌ 工作进程 {state['proc'].name} 异常退出"
+                              f"（exitcode={state['proc'].exitcode}）")
+                        del workers_by_conn[conn]
+                        continue
+                    state["inflight"] -= 1
+                    for result in results:
+                        if result.get("cache"):
+                            cache_lookups += 1
+                            cache_hits += result["cache"] == "hit"
+                        lp.record_telemetry(telemetry, result)
+                        journal.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        if sink is not None:
+                            sink.write(lp.to_record(result, result["path"]))
+                    journal.flush()
+                    telemetry.tick()
+                    before = processed
+                    processed += len(results)
+                    if processed // 100 != before // 100 or processed == len(pending):
+                        elapsed = time.time() - start
+                        rate = processed / elapsed if elapsed > 0 else 0.0
+                        eta = (len(pending) - processed) / rate if rate > 0 else 0.0
+                        print(f"===== 处理进度：{processed}/{len(pending)}（{rate:.1f} 张/秒，"
+                              f"预计剩余 {eta:.0f} 秒）=====")
+                    dispatch(conn)
+        for p in procs:
+            p.join()
+        telemetry.close()
+        if sink is not None:
+            sink.close()
+        if cache_lookups:
+            print(f"🗃️ 检测缓存命中 {cache_hits}/{cache_lookups} 张（{cache_hits / cache_lookups * 100:.1f}%），"
+                  f"累计统计：python detection_cache.py {cache_path} stats")
+
+    if not os.path.exists(journal_path):
+        print("❌ 没有任何处理结果")
+        return
+    total_done, success = merge_summary(journal_path, output_folder)
+    print("\n" + "="*60)
+    print(f"🎉 批量处理完成！结果汇总已写入：{os.path.join(output_folder, '处理结果汇总.txt')}")
+    print(f"✅ 成功识别：{success} 张 | ❌ 处理失败：{total_done - success} 张")
+    if total_done < total:
+        print(f"⚠️ 还有 {total - total_done} 张图片未完成，重新运行即可继续")
+    print("="*60)
+
+
+def run_watch(image_folder, output_folder, workers=None, journal_path=None, threads_per_worker=None,
+              save_images=True, results_dir=None, pin_cpus=False, detect_cache=None, cache_max_mb=None,
+              max_batch=8, max_wait_ms=200, method="auto", interval=0.5, idle_exit=None, telemetry=None):
+    """
+    持续监听文件夹：新图片凑批（满 max_batch 张或最早一张等了 max_wait_ms）后分发给空闲的工作进程
+    journal 就是已处理记录：重启后跳过已完成的图片，先补处理监听停止期间落地的图片
+    :param max_batch: 每批最多多少张图片
+    :param max_wait_ms: 凑批最长等待时间（毫秒）
+    :param method: 监听方式 auto / inotify / poll
+    :param idle_exit: 连续多少秒没有新图片且没有在处理的图片就退出，None 表示一直运行
+    :param telemetry: 运行时监控（Telemetry），同 run_batch
+    """
+    workers = workers or os.cpu_count() or 1
+    telemetry = telemetry or Telemetry(enabled=False)
+    os.makedirs(output_folder, exist_ok=True)
+    journal_path = journal_path or os.path.join(output_folder, "journal.jsonl")
+    journal = Checkpoint(journal_path)
+    watcher = open_watcher(image_folder, lp.IMAGE_EXTS, method, interval, known=journal.done)
+    collector = BatchCollector(max_batch, max_wait_ms)
+    stats = LatencyStats()
+    started = time.time()
+    seen_at = {}  # 已发现、还没出结果的图片名 -> 落地时间（arrival_time）
+
+    def enqueue(paths):
+        now = time.time()
+        for path in paths:
+            name = os.path.basename(path)
+            if name not in journal.done and name not in seen_at:
+                seen_at[name] = arrival_time(path, started, now)
+                collector.add(path, now)
+
+    cache_path, model_key = resolve_cache(detect_cache)
+    workers_by_conn = start_workers(workers, output_folder, save_images, threads_per_worker, pin_cpus,
+                                    cache_path, cache_max_mb, model_key)
+    procs = [state["proc"] for state in workers_by_conn.values()]
+    for state in workers_by_conn.values():
+        state["batches"] = []  # 已发出、还没收到结果的批次（按发送顺序）
+    retried = set()  # 因为工作进程崩溃重新排队过的图片名
+    retry = []       # 等待重试的图片（每张单独一批，崩溃时不连累同批的其他图片）
+    sink = ResultSink(results_dir) if results_dir else None
+
+    def receive(conn):
+        state = workers_by_conn[conn]
+        try:
+            results = conn.recv()
+        except (EOFError, OSError):
+            state["proc"].join()
+            print(f"❌ 工作进程 {state['proc'].name} 异常退出（exitcode={state['proc'].exitcode}）")
+            del workers_by_conn[conn]
+            # 它手上的图片逐张交给其他进程重试；单独重试还崩溃的就是让进程崩溃的图片，
+            # 不再重试（没写 journal，重启后会重新处理）
+            lost = [p for batch in state["batches"] for p in batch]
+            for path in lost:
+                name = os.path.basename(path)
+                if name in retried:
+                    seen_at.pop(name, None)
+                    print(f"⚠️ {name} 单独重试时工作进程仍然崩溃，跳过（重启后会重新处理）")
+                else:
+                    retried.add(name)
+                    retry.append(path)
+            if retry:
+                print(f"🔁 {len(retry)} 张图片逐张重试")
+            return
+        state["inflight"] -= 1
+        state["batches"].pop(0)
+        now = time.time()
+        stats.add([seen_at.pop(r["image"], now) for r in results], now)
+        for result in results:
+            lp.record_telemetry(telemetry, result)
+        telemetry.tick()
+        journal.add(results)
+        if sink is not None:
+            for result in results:
+                sink.write(lp.to_record(result, result["path"]))
+        for result in results:
+            print(f"   {result['log']}")
+
+    backlog = list_existing(image_folder, lp.IMAGE_EXTS, journal.done)
+    if backlog:
+        print(f"📂 文件夹里有 {len(backlog)} 张图片还没处理，先补处理")
+    enqueue(backlog)
+    print(f"👀 开始监听 {image_folder}（{watcher.method}，{len(workers_by_conn)} 个进程，"
+          f"每批最多 {max_batch} 张，最长等待 {max_wait_ms} ms）")
+
+    last_activity = last_report = time.time()
+    try:
+        while workers_by_conn:
+            # 有批次在处理时缩短等待，及时收结果；否则等到凑批截止时间（最多 1 秒）
+            busy = any(state["inflight"] for state in workers_by_conn.values())
+            left = collector.time_left()
+            timeout = min(left if left is not None else 1.0, 0.02 if busy else 1.0)
+            paths = watcher.poll(timeout)
+            if watcher.overflows:
+                watcher.overflows = 0
+                paths += list_existing(image_folder, lp.IMAGE_EXTS, journal.done)
+            if paths:
+                enqueue(paths)
+                last_activity = time.time()
+            for conn in wait(list(workers_by_conn), timeout=0):
+                receive(conn)
+                last_activity = time.time()
+            # 每个进程最多同时两批（处理当前批时下一批已经在管道里等着），都满了就继续攒
+            while retry or collector.ready():
+                conn = min(workers_by_conn, key=lambda c: workers_by_conn[c]["inflight"], default=None)
+                if conn is None or workers_by_conn[conn]["inflight"] >= 2:
+                    break
+                batch = [retry.pop(0)] if retry else [path for path, _ in collector.take()]
+                conn.send(batch)
+                workers_by_conn[conn]["inflight"] += 1
+                workers_by_conn[conn]["batches"].append(batch)
+            if time.time() - last_report >= 30 and stats.files:
+                print(stats.format())
+                last_report = time.time()
+            if (idle_exit is not None and not len(collector) and not seen_at
+                    and time.time() - last_activity >= idle_exit):
+                break
+    except KeyboardInterrupt:
+        print("\n⏹️ 收到退出信号，处理完手上的图片后退出")
+    finally:
+        # 没发出去的图片直接放弃（没写 journal，下次启动会补处理），已发出的等结果回来
+        for conn in list(workers_by_conn):
+            while conn in workers_by_conn and workers_by_conn[conn]["inflight"]:
+                receive(conn)
+            if conn in workers_by_conn:
+                conn.send(None)
+        for p in procs:
+            p.join()
+        watcher.close()
+        journal.close()
+        telemetry.close()
+        if sink is not None:
+            sink.close()
+
+    print(stats.format())
+    if stats.files:
+        total_done, success = merge_summary(journal_path, output_folder)
+        print(f"🎉 结果汇总已写入：{os.path.join(output_folder, '处理结果汇总.txt')}"
+              f"（累计 {total_done} 张，成功 {success} 张）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多进程、可断点续跑的批量车牌识别")
+    parser.add_argument("--images", type=str, default=lp.image_folder, help="图片文件夹")
+    parser.add_argument("--output", type=str, default=lp.output_folder, help="结果保存文件夹")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认CPU核数）")
+    parser.add_argument("--journal", type=str, default=None,
+                        help="进度日志路径（默认 输出目录/journal.jsonl）")
+    parser.add_argument("--chunk-size", type=int, default=16, help="每次分发给进程的图片数")
+    parser.add_argument("--no-images", action="store_true", help="只输出识别结果，不保存图片")
+    parser.add_argument("--results-dir", type=str, default=None,
+                        help="结构化结果（JSONL/Parquet）输出目录")
+    add_runtime_args(parser)
+    add_cache_args(parser)
+    add_watch_args(parser)
+    add_telemetry_args(parser)
+    args = parser.parse_args()
+    telemetry = telemetry_from_args(args)
+
+    if args.watch:
+        run_watch(args.images, args.output, args.workers, args.journal, args.threads_per_worker or None,
+                  not args.no_images, args.results_dir, args.pin_cpus,
+                  "" if args.no_detect_cache else args.detect_cache, args.cache_max_mb,
+                  args.watch_batch, args.watch_wait_ms, args.watch_method, args.watch_interval,
+                  args.watch_idle_exit, telemetry)
+    else:
+        run_batch(args.images, args.output, args.workers, args.journal,
+                  args.chunk_size, args.threads_per_worker or None, not args.no_images, args.results_dir,
+                  args.pin_cpus, "" if args.no_detect_cache else args.detect_cache, args.cache_max_mb,
+                  telemetry)
@@ -1,12 +1,20 @@
 import cv2
 import numpy as np
 import os
+import sys
 import torch  # 用于加载深度学习模型
+from pathlib import Path
 from paddleocr import PaddleOCR
 
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from detection_cache import DetectionCache, model_fingerprint
+from model_store import load_model, resolve_model
+
 # --------------------- 关键配置 ---------------------
 # 1. 文件路径
 IMG_PATH = "车牌照片.jpg"  # 替换为你的图片路径
+# PaddleOCR 模型目录，也可以写模型库条目名（目录不存在时报错，不联网下载）
 DET_MODEL_DIR = "D:\\paddle_ocr_cache\\whl\\det\\ch\\ch_PP-OCRv3_det_infer"
 REC_MODEL_DIR = "D:\\paddle_ocr_cache\\whl\\rec\\ch\\ch_PP-OCRv3_rec_infer"
 CLS_MODEL_DIR = "D:\\paddle_ocr_cache\\whl\\cls\\ch_ppocr_mobile_v2.0_cls_infer"
@@ -14,6 +22,13 @@ CLS_MODEL_DIR = "D:\\paddle_ocr_cache\\whl\\cls\\ch_ppocr_mobile_v2.0_cls_infer"
 # 2. 车牌检测模型（轻量级深度学习模型）
 MODEL_CONF = 0.5  # 检测置信度阈值
 MODEL_INPUT_SIZE = 640  # 模型输入尺寸
+# 模型库条目名（离线加载，不再从 GitHub 下载）。第一次使用前先把 yolov5 源码和权重加入模型库：
+#   python model_store.py add D:/yolov5 --name yolov5-repo
+#   python model_store.py add yolov5s.pt --name yolov5s --backend yolov5 --repo yolov5-repo
+DETECTOR_MODEL = "yolov5s"
+# 检测结果缓存（见 common/detection_cache.py）：调后面的车牌搜索 / OCR 参数重复运行时不再重新检测车辆，
+# None 表示不缓存（默认），需要时改成例如 "detection_cache.db"
+DETECTION_CACHE = None
 
 
 # --------------------- 1. 准备车牌检测模型（核心） ---------------------
@@ -23,13 +38,8 @@ def load_plate_detector():
     
     try:
         # 加载YOLOv5轻量级车牌检测模型（已训练专门识别车牌）
-        # 模型会自动下载到本地（约10MB）
-        model = torch.hub.load(
-            "ultralytics/yolov5", 
-            "custom", 
-            url="https://github.com/ultralytics/yolov5/releases/download/v6.2/yolov5s.pt",
-            force_reload=False
-        )
+        # 从本地模型库加载（torch.hub 本地源码 + 校验过的权重，不联网）
+        model = load_model(DETECTOR_MODEL)
         # 调整模型参数
         model.classes = [2]  # 只检测车辆类别（后续在车辆区域内找车牌）
         model.conf = MODEL_CONF
@@ -43,21 +53,31 @@ def load_plate_detector():
 
 
 # --------------------- 2. 基于深度学习的精准定位 ---------------------
-def ai_locate_plate(orig_img, model):
-    if model is None:
-        return None, None
-    
+def detect_vehicles(orig_img, model):
+    """检测车辆，返回车辆框列表 [[x1, y1, x2, y2], ...]（可直接写入检测缓存）"""
     # 转换图片格式
     img_rgb = cv2.cvtColor(orig_img, cv2.COLOR_BGR2RGB)
-    
-    # 检测车辆（在车辆区域内搜索车牌，提高效率）
     results = model(img_rgb, size=MODEL_INPUT_SIZE)
     detections = results.pandas().xyxy[0]  # 转换为DataFrame
+    return [[int(row['xmin']), int(row['ymin']), int(row['xmax']), int(row['ymax'])]
+            for _, row in detections.iterrows()]
+
+
+def ai_locate_plate(orig_img, model, cache=None, img_bytes=None):
+    if model is None:
+        return None, None
+    
+    # 检测车辆（在车辆区域内搜索车牌，提高效率）；有缓存时按图片内容复用上次的检测结果
+    if cache is not None:
+        vehicles, _ = cache.fetch(img_bytes if img_bytes is not None else orig_img,
+                                  lambda: detect_vehicles(orig_img, model),
+                                  conf=MODEL_CONF, size=MODEL_INPUT_SIZE, classes=model.classes)
+    else:
+        vehicles = detect_vehicles(orig_img, model)
     
     # 如果检测到车辆，在车辆区域内找车牌
-    if not detections.empty:
-        for _, row in detections.iterrows():
-            x1, y1, x2, y2 = int(row['xmin']), int(row['ymin']), int(row['xmax']), int(row['ymax'])
+    if vehicles:
+        for x1, y1, x2, y2 in vehicles:
             # 截取车辆区域（车牌通常在车辆前部或后部）
             vehicle_roi = orig_img[y1:y2, x1:x2]
             # 在车辆区域内进行车牌精准搜索
@@ -131,7 +151,7 @@ def fallback_locate_plate(orig_img):
     
     # 最终兜底：文本检测
     ocr_det = PaddleOCR(
-        det_model_dir=DET_MODEL_DIR,
+        det_model_dir=resolve_model(DET_MODEL_DIR),
         rec_model_dir=None,
         cls_model_dir=None,
         rec=False,
@@ -160,9 +180,9 @@ def recognize_and_display(orig_img, plate_roi, box):
     
     # OCR识别
     ocr = PaddleOCR(
-        det_model_dir=DET_MODEL_DIR,
-        rec_model_dir=REC_MODEL_DIR,
-        cls_model_dir=CLS_MODEL_DIR,
+        det_model_dir=resolve_model(DET_MODEL_DIR),
+        rec_model_dir=resolve_model(REC_MODEL_DIR),
+        cls_model_dir=resolve_model(CLS_MODEL_DIR),
         use_angle_cls=True,
         use_gpu=False,
         show_log=False
@@ -209,7 +229,13 @@ def main():
     model = load_plate_detector()
     
     # 优先使用AI定位
-    plate_roi, box = ai_locate_plate(orig_img, model)
+    cache = None
+    if model is not None and DETECTION_CACHE:
+        cache = DetectionCache(DETECTION_CACHE, model_fingerprint(DETECTOR_MODEL, DETECTION_CACHE))
+    plate_roi, box = ai_locate_plate(orig_img, model, cache, img_bytes)
+    if cache is not None:
+        cache.print_report()
+        cache.close()
     
     # 如果AI定位失败，使用备用方案
     if plate_roi is None:
@@ -1,14 +1,24 @@
 # inference_camera.py
 import cv2
-from ultralytics import YOLO
 import time
+import sys
+from pathlib import Path
 
-def detect_camera(model, camera_id=0, conf_threshold=0.25):
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "common"))
+from latest_frame_capture import LatestFrameCapture
+from plate_renderer import PlateRenderer
+from telemetry import Telemetry
+
+def detect_camera(model, camera_id=0, conf_threshold=0.25, telemetry=None, slo=None):
     """
     使用摄像头进行实时车牌检测
+    camera_id: 摄像头编号（也可以传视频文件路径，按视频 FPS 模拟摄像头，方便测试）
+    telemetry: 运行时监控（Telemetry），None 表示不记录
+    slo: 延迟 SLO 控制器（SloController），处理不过来时自动降低输入尺寸 / 隔帧检测
     """
-    # 打开摄像头
-    cap = cv2.VideoCapture(camera_id)
+    # 打开摄像头（后台线程不停读帧，推理总是拿到最新一帧，处理不过来的旧帧直接跳过）
+    cap = LatestFrameCapture(camera_id).start()
     if not cap.isOpened():
         print(f"❌ 无法打开摄像头 {camera_id}")
         return
@@ -23,11 +33,14 @@ def detect_camera(model, camera_id=0, conf_threshold=0.25):
     import os
     save_dir = "captured_frames"
     os.makedirs(save_dir, exist_ok=True)
+    renderer = PlateRenderer()  # 直接画在当前帧上，不再每帧复制整帧
+    telemetry = telemetry or Telemetry(enabled=False)
     
     while True:
-        ret, frame = cap.read()
+        with telemetry.stage("read"):
+            ret, frame = cap.read()
         if not ret:
-            print("❌ 无法读取摄像头帧")
+            print("❌ 无法读取摄像头帧" if isinstance(cap.source, int) else "✅ 视频已播放完")
             break
         
         # 计算FPS
@@ -37,32 +50,42 @@ def detect_camera(model, camera_id=0, conf_threshold=0.25):
             fps = 30 / (end_time - start_time)
             start_time = end_time
         
-        # 进行推理
-        results = model.predict(
-            source=frame,
-            conf=conf_threshold,
-            verbose=False
-        )
-        
-        # 处理结果
-        result = results[0]
-        annotated_frame = result.plot()
+        frame_start = time.perf_counter()
+        # 进行推理（隔帧检测时其余帧沿用上一次的结果）
+        if slo is None or slo.should_detect():
+            with telemetry.stage("detect"):
+                results = model.predict(
+                    source=frame,
+                    conf=conf_threshold,
+                    verbose=False,
+                    **({"imgsz": slo.imgsz} if slo else {})
+                )
+            
+            # 处理结果
+            result = results[0]
+            telemetry.inc("detections", len(result.boxes))
+        telemetry.inc("frames")
         
         # 显示检测信息
         detection_info = f"检测到: {len(result.boxes)} 个车牌"
         fps_info = f"FPS: {fps:.1f}"
         
-        # 在画面上添加文字信息
-        cv2.putText(annotated_frame, detection_info, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(annotated_frame, fps_info, (10, 70), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        # 在画面上绘制检测框和文字信息
+        with telemetry.stage("render"):
+            annotated_frame = renderer.render_result(frame, result, info=[detection_info, fps_info])
         
         # 显示实时画面
-        cv2.imshow('Real-time License Plate Detection', annotated_frame)
-        
-        # 键盘控制
-        key = cv2.waitKey(1) & 0xFF
+        with telemetry.stage("display"):
+            cv2.imshow('Real-time License Plate Detection', annotated_frame)
+            
+            # 键盘控制
+            key = cv2.waitKey(1) & 0xFF
+        latency_ms = cap.mark_result()
+        telemetry.observe("total", latency_ms / 1000)
+        telemetry.set_counter("dropped_frames", cap.dropped)
+        telemetry.tick()
+        if slo is not None:
+            slo.record((time.perf_counter() - frame_start) * 1000)
         if key == ord('q'):  # 按Q退出
             break
         elif key == ord('s'):  # 按S保存当前帧
@@ -77,11 +100,17 @@ def detect_camera(model, camera_id=0, conf_threshold=0.25):
     # 释放资源
     cap.release()
     cv2.destroyAllWindows()
+    telemetry.set_counter("dropped_frames", cap.dropped)
+    telemetry.close()
+    cap.print_summary()
+    if slo is not None:
+        slo.print_summary()
     print("✅ 摄像头检测已停止")
 
 # 使用示例
 if __name__ == "__main__":
     # 加载模型
+    from model_store import load_model
     model_path = "runs/detect/license_plate_detection_v1/weights/best.pt"
     model = load_model(model_path)
     
@@ -0,0 +1,87 @@
+# inference_client.py
+"""
+推理守护进程的命令行客户端
+参数和 inference_main.py 完全一样，任务通过 Unix socket 交给 inference_daemon.py 执行，
+客户端本身不导入 torch / ultralytics，启动只要几十毫秒，适合 cron 和 shell 管道里频繁调用。
+
+- 守护进程没有运行时，自动退回到本进程内推理（和直接运行 inference_main.py 一样，启动较慢），
+  加 --no-fallback 则直接以退出码 2 失败
+- 摄像头模式（包括录制的摄像头会话）需要界面，总是在本进程内运行
+
+用法：
+    python inference_client.py --model best.pt --source car.jpg --results-dir results
+    python inference_client.py --status
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+
+from inference_main import build_parser  # 同时把 YOLO/common 加入 sys.path
+from replay_spec import is_camera_source
+
+CLIENT_ARGS = ("socket", "no_fallback")
+
+
+def default_socket_path():
+    """默认 socket 路径（可以用环境变量 PLATE_DAEMON_SOCKET 覆盖）"""
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.environ.get("PLATE_DAEMON_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"plate_inference_{uid}.sock")
+
+
+def send_job(socket_path, payload, out=sys.stdout):
+    """提交任务并转发守护进程的输出，返回任务退出码"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        for line in sock.makefile("rb"):
+            message = json.loads(line.decode("utf-8"))
+            if "out" in message:
+                out.write(message["out"])
+                out.flush()
+            if "exit" in message:
+                return message["exit"]
+    print("❌ 守护进程意外断开连接", file=sys.stderr)
+    return 1
+
+
+def main():
+    # --status 不需要 --model / --source，单独处理
+    if sys.argv[1:2] == ["--status"]:
+        path = sys.argv[2] if len(sys.argv) > 2 else default_socket_path()
+        try:
+            sys.exit(send_job(path, {"cmd": "status"}))
+        except OSError:
+            print(f"❌ 守护进程未运行: {path}", file=sys.stderr)
+            sys.exit(2)
+
+    parser = build_parser()
+    parser.description = 'YOLO车牌检测推理（通过常驻守护进程执行，参数同 inference_main.py）'
+    group = parser.add_argument_group("守护进程")
+    group.add_argument('--socket', type=str, default=default_socket_path(), help='守护进程的 Unix socket 路径')
+    group.add_argument('--no-fallback', action='store_true', help='守护进程未运行时直接失败，不在本进程内推理')
+    args = parser.parse_args()
+
+    camera = args.mode == 'camera' or (args.mode is None and is_camera_source(args.source))
+    if not camera and hasattr(socket, "AF_UNIX"):
+        payload = {"cwd": os.getcwd(),
+                   "args": {k: v for k, v in vars(args).items() if k not in CLIENT_ARGS}}
+        try:
+            sys.exit(send_job(args.socket, payload))
+        except (FileNotFoundError, ConnectionRefusedError):
+            if args.no_fallback:
+                print(f"❌ 守护进程未运行: {args.socket}", file=sys.stderr)
+                sys.exit(2)
+            print("⚠️ 守护进程未运行，改为本进程内推理（启动较慢）。"
+                  f"启动守护进程: python inference_daemon.py --model {args.model}", file=sys.stderr)
+
+    from inference_main import main as run_local
+    for name in CLIENT_ARGS:
+        delattr(args, name)
+    run_local(args)
+
+if __name__ == "__main__":
+    main()
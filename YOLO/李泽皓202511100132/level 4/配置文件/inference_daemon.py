@@ -0,0 +1,184 @@
+# inference_daemon.py
+"""
+常驻推理守护进程
+每次运行 inference_main.py 都要花好几秒导入 torch / ultralytics / paddleocr 并加载权重，
+守护进程启动一次后一直保持模型在内存里，由 inference_client.py 通过 Unix socket 提交任务。
+
+- 任务按到达顺序逐个执行（模型不是线程安全的），并发的客户端在 socket 上排队
+- 任务在客户端的工作目录下执行，相对路径（--source、--output 等）和直接运行 inference_main.py 一致
+- 任务的输出实时转发给客户端，客户端的退出码就是任务的退出码
+- 权重文件被替换（修改时间变化）后，下一个任务会重新加载
+- 不支持摄像头模式（客户端会直接在本进程运行）
+
+用法：
+    python inference_daemon.py --model best.pt            # 启动并预热模型
+    python inference_client.py --model best.pt --source car.jpg --results-dir results
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+from inference_client import default_socket_path
+from inference_main import run  # 同时把 YOLO/common 加入 sys.path
+from replay_spec import is_camera_source
+
+
+def send_message(wfile, message):
+    """发送一行 JSON 消息"""
+    wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+    wfile.flush()
+
+
+class _ClientWriter(io.TextIOBase):
+    """把任务里的 print 输出转发给客户端"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        if text:
+            try:
+                send_message(self.wfile, {"out": text})
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 客户端已经退出，任务照常做完
+        return len(text)
+
+
+class InferenceDaemon:
+    """
+    保存已加载的模型和 OCR，按请求执行 inference_main.run
+    :param preload: 启动时预加载的模型路径列表
+    :param preload_ocr: 启动时是否预热 PaddleOCR（视频 --index 模式会用到）
+    """
+
+    def __init__(self, preload=(), preload_ocr=False):
+        self.models = {}
+        self.reader = None
+        self.jobs = 0
+        self.started = time.time()
+        for path in preload:
+            self.get_model(path)
+        if preload_ocr:
+            import numpy as np
+            self.get_reader().read(np.zeros((48, 160, 3), dtype=np.uint8))
+            print("✅ PaddleOCR 已预热")
+
+    def get_model(self, spec):
+        """按绝对路径缓存模型（spec 可以是模型库条目名），权重文件修改时间变化时重新加载"""
+        from model_store import load_model, resolve_model
+        path = resolve_model(spec)
+        key = os.path.abspath(path)
+        mtime = os.path.getmtime(key)
+        cached = self.models.get(key)
+        if cached is not None and cached[1] == mtime:
+            return cached[0]
+        import numpy as np
+        start = time.time()
+        model = load_model(path)
+        model.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)  # 预热
+        self.models[key] = (model, mtime)
+        print(f"✅ 模型已加载: {key}（{time.time() - start:.1f} 秒）")
+        return model
+
+    def get_reader(self):
+        if self.reader is None:
+            from plate_ocr import PlateReader
+            self.reader = PlateReader()
+        return self.reader
+
+    def run_job(self, job, out):
+        """在客户端的工作目录下执行一个任务，返回退出码"""
+        args = argparse.Namespace(**job["args"])
+        if args.mode == "camera" or (args.mode is None and is_camera_source(args.source)):
+            out.write("❌ 守护进程不支持摄像头模式\n")
+            return 2
+        args.no_show = True  # 守护进程没有界面
+        self.jobs += 1
+        start = time.time()
+        prev_cwd = os.getcwd()
+        try:
+            os.chdir(job["cwd"])
+            with redirect_stdout(out), redirect_stderr(out):
+                model = self.get_model(args.model)
+                run(args, model, self.get_reader() if args.index else None)
+            return 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        except Exception:
+            out.write(traceback.format_exc())
+            return 1
+        finally:
+            os.chdir(prev_cwd)
+            print(f"📨 任务 {self.jobs}: {args.source} 用时 {time.time() - start:.2f} 秒")
+
+    def status(self):
+        return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started, 1),
+                "jobs": self.jobs, "models": list(self.models)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        job = json.loads(line.decode("utf-8"))
+        daemon = self.server.daemon
+        if job.get("cmd") == "status":
+            send_message(self.wfile, {"out": json.dumps(daemon.status(), ensure_ascii=False) + "\n", "exit": 0})
+            return
+        code = daemon.run_job(job, _ClientWriter(self.wfile))
+        try:
+            send_message(self.wfile, {"exit": code})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(socket_path, daemon):
+    """在 socket_path 上监听，直到 Ctrl+C"""
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            print(f"❌ 已有守护进程在运行: {socket_path}")
+            return
+        except OSError:
+            os.unlink(socket_path)  # 上次异常退出留下的 socket 文件
+        finally:
+            probe.close()
+    server = socketserver.UnixStreamServer(socket_path, _Handler)
+    server.daemon = daemon
+    os.chmod(socket_path, 0o600)  # 只允许当前用户提交任务
+    print(f"🚀 推理守护进程已启动: {socket_path}（PID {os.getpid()}，Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print(f"✅ 守护进程已退出，共处理 {daemon.jobs} 个任务")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='YOLO车牌检测常驻推理守护进程')
+    parser.add_argument('--model', type=str, nargs='*', default=[], help='启动时预加载的模型（可以多个）')
+    parser.add_argument('--preload-ocr', action='store_true', help='启动时预热 PaddleOCR')
+    parser.add_argument('--socket', type=str, default=default_socket_path(), help='Unix socket 路径')
+    args = parser.parse_args()
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("❌ 当前系统不支持 Unix socket")
+        sys.exit(1)
+    serve(args.socket, InferenceDaemon(args.model, args.preload_ocr))
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,19 @@
 from ultralytics import YOLO
 import cv2
 import os
+import sys
+from pathlib import Path
 
-def detect_single_image(model, image_path, output_dir="outputs", conf_threshold=0.25):
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "common"))
+from model_store import load_model
+from result_sink import make_record
+
+def detect_single_image(model, image_path, output_dir="outputs", conf_threshold=0.25, sink=None, show=True):
     """
     对单张图片进行车牌检测
+    sink: 结构化结果输出（ResultSink），每个检测框写一条记录
+    show: 是否弹窗显示结果（无界面运行时设为 False，结果图片仍会保存）
     """
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
@@ -29,9 +38,6 @@ def detect_single_image(model, image_path, output_dir="outputs", conf_threshold=
     
     # 处理结果
     for i, result in enumerate(results):
-        # 获取原始图像（带检测框）
-        annotated_image = result.plot()  # 这个图像已经画好了检测框
-        
         # 显示检测信息
         print(f"📷 图片 {i+1}:")
         if len(result.boxes) > 0:
@@ -45,13 +51,20 @@ def detect_single_image(model, image_path, output_dir="outputs", conf_threshold=
                 # 获取边界框坐标（像素坐标）
                 x1, y1, x2, y2 = box.xyxy[0].tolist()
                 print(f"     位置: ({x1:.1f}, {y1:.1f}) - ({x2:.1f}, {y2:.1f})")
+                if sink is not None:
+                    sink.write(make_record(image_path, box=(x1, y1, x2, y2), det_conf=confidence,
+                                           timings=result.speed, label=class_name))
         else:
             print("   ❌ 未检测到车牌")
+            if sink is not None:
+                sink.write(make_record(image_path, status="no_plate", timings=result.speed))
         
         # 显示图片（可选）
-        cv2.imshow('Detection Result', annotated_image)
-        cv2.waitKey(0)
-        cv2.destroyAllWindows()
+        if show:
+            annotated_image = result.plot()  # 这个图像已经画好了检测框
+            cv2.imshow('Detection Result', annotated_image)
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
     
     return results
 
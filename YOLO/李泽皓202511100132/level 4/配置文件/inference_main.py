@@ -8,28 +8,43 @@ import argparse
 import sys
 from pathlib import Path
 
-def main():
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "common"))
+from detection_sidecar import add_sidecar_args, sidecar_from_args
+from replay_spec import is_camera_source, source_arg  # 不导入 cv2，客户端启动不变慢
+from runtime_profile import add_profile_args, profile_from_args
+from slo_controller import add_slo_args, slo_from_args
+from telemetry import add_telemetry_args, telemetry_from_args
+
+def build_parser():
+    """命令行参数（inference_client.py 复用同一套参数）"""
     parser = argparse.ArgumentParser(description='YOLO车牌检测推理')
-    parser.add_argument('--model', type=str, required=True, help='模型路径')
-    parser.add_argument('--source', type=str, required=True, help='输入源（图片/视频路径或摄像头ID）')
+    parser.add_argument('--model', type=str, required=True, help='模型路径或模型库条目名')
+    parser.add_argument('--source', type=source_arg, required=True, help='输入源（图片/视频路径、摄像头ID，或录制的摄像头会话 目录@倍速）')
     parser.add_argument('--output', type=str, default='outputs', help='输出目录')
     parser.add_argument('--conf', type=float, default=0.25, help='置信度阈值')
     parser.add_argument('--mode', choices=['image', 'video', 'camera'], help='检测模式')
-    
-    args = parser.parse_args()
-    
-    # 加载模型
-    try:
-        from ultralytics import YOLO
-        model = YOLO(args.model)
-        print(f"✅ 模型加载成功: {args.model}")
-    except Exception as e:
-        print(f"❌ 模型加载失败: {e}")
-        return
-    
+    parser.add_argument('--results-dir', type=str, default=None,
+                        help='结构化结果（JSONL/Parquet）输出目录，不填则只打印')
+    parser.add_argument('--no-show', action='store_true', help='不显示结果窗口和实时预览（无界面运行）')
+    parser.add_argument('--index', type=str, default=None,
+                        help='车牌检索索引（SQLite）文件，视频模式下把识别到的车牌写入索引')
+    parser.add_argument('--index-every', type=int, default=5,
+                        help='每隔多少帧做一次车牌字符识别')
+    add_telemetry_args(parser)  # 摄像头模式的运行时监控
+    add_slo_args(parser)        # 摄像头模式的延迟 SLO 控制
+    add_sidecar_args(parser)    # 视频模式只输出检测结果，不重新编码
+    add_profile_args(parser)    # 运行时配置（gpu_test.py --profile 实测的线程数）
+    return parser
+
+def run(args, model, reader=None):
+    """
+    按参数执行检测（inference_daemon.py 用已经加载好的模型直接调用）
+    reader: 车牌字符识别器（PlateReader），不传时按需创建
+    """
     # 自动检测模式
     if args.mode is None:
-        if args.source.isdigit():
+        if is_camera_source(args.source):  # 录制的摄像头会话也按摄像头处理
             args.mode = 'camera'
         elif Path(args.source).suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp']:
             args.mode = 'image'
@@ -42,15 +57,47 @@ def main():
     # 执行检测
     if args.mode == 'image':
         from inference_image import detect_single_image
-        detect_single_image(model, args.source, args.output, args.conf)
+        if args.results_dir:
+            from result_sink import ResultSink
+            with ResultSink(args.results_dir) as sink:
+                detect_single_image(model, args.source, args.output, args.conf, sink, show=not args.no_show)
+            print(f"🗂️ 结构化结果已保存到: {args.results_dir}")
+        else:
+            detect_single_image(model, args.source, args.output, args.conf, show=not args.no_show)
     
     elif args.mode == 'video':
         from inference_video import detect_video
-        detect_video(model, args.source, args.output, args.conf)
+        if args.index:
+            from plate_index import PlateIndex
+            from plate_ocr import PlateReader
+            with PlateIndex(args.index) as index:
+                detect_video(model, args.source, args.output, args.conf,
+                             index, reader or PlateReader(), args.index_every, show=not args.no_show,
+                             sidecar=sidecar_from_args(args))
+            print(f"🔍 查询：python plate_index.py {args.index} query 鲁A12345")
+        else:
+            detect_video(model, args.source, args.output, args.conf, show=not args.no_show,
+                         sidecar=sidecar_from_args(args))
     
     elif args.mode == 'camera':
         from inference_camera import detect_camera
-        detect_camera(model, int(args.source), args.conf)
+        source = int(args.source) if args.source.isdigit() else args.source  # 视频文件可以模拟摄像头
+        detect_camera(model, source, args.conf, telemetry_from_args(args), slo_from_args(args))
+
+def main(args=None):
+    args = args or build_parser().parse_args()
+    profile_from_args(args)  # 按运行时配置设置线程数（必须在加载模型之前）
+    
+    # 加载模型
+    try:
+        from model_store import load_model
+        model = load_model(args.model)
+        print(f"✅ 模型加载成功: {args.model}")
+    except Exception as e:
+        print(f"❌ 模型加载失败: {e}")
+        return
+    
+    run(args, model)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,11 +1,22 @@
 # inference_video.py
 import cv2
-from ultralytics import YOLO
 import os
+import sys
+from pathlib import Path
 
-def detect_video(model, video_path, output_dir="outputs", conf_threshold=0.25):
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "common"))
+from plate_index import PlateVideoIndexer
+from plate_renderer import PlateRenderer
+from plate_ocr import result_boxes
+
+def detect_video(model, video_path, output_dir="outputs", conf_threshold=0.25,
+                 index=None, reader=None, index_every=5, show=True, sidecar=None):
     """
     对视频文件进行车牌检测
+    index / reader: 车牌检索索引（PlateIndex）和字符识别器（PlateReader），传入时把识别到的车牌写入索引
+    show: 是否显示实时预览（无界面运行时设为 False）
+    sidecar: 旁路输出设置（SidecarOptions），传入时不重新编码视频，只写逐帧检测结果和叠加字幕轨
     """
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
@@ -29,13 +40,22 @@ def detect_video(model, video_path, output_dir="outputs", conf_threshold=0.25):
     
     print(f"🎥 视频信息: {fps}FPS, 分辨率: {width}x{height}, 总帧数: {total_frames}")
     
-    # 创建视频写入器
-    output_path = os.path.join(output_dir, "detected_video.mp4")
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    # 创建视频写入器（旁路模式下原视频不动，只写检测结果）
+    out = side = None
+    if sidecar is not None:
+        side = sidecar.open(output_dir, video_path, fps, width, height)
+        output_path = side.path
+    else:
+        output_path = os.path.join(output_dir, "detected_video.mp4")
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    indexer = None
+    if index is not None:
+        indexer = PlateVideoIndexer(index, reader, video_path, fps, every_n=index_every)
     
     frame_count = 0
     detection_count = 0
+    renderer = PlateRenderer()  # 直接画在当前帧上，不再每帧复制整帧
     
     print("⏳ 开始处理视频...")
     
@@ -53,19 +73,27 @@ def detect_video(model, video_path, output_dir="outputs", conf_threshold=0.25):
         
         # 处理当前帧的结果
         result = results[0]
-        annotated_frame = result.plot()
+        if indexer is not None:
+            indexer.process(frame_count, frame, result)
         
         # 统计检测结果
         if len(result.boxes) > 0:
             detection_count += 1
         
+        if side is not None:
+            side.write(frame_count, result_boxes(result))
+        if out is not None or show:
+            annotated_frame = renderer.render_result(frame, result)
+        
         # 写入输出视频
-        out.write(annotated_frame)
+        if out is not None:
+            out.write(annotated_frame)
         
         # 显示实时预览（可选）
-        cv2.imshow('Video Detection', annotated_frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):  # 按Q键退出
-            break
+        if show:
+            cv2.imshow('Video Detection', annotated_frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):  # 按Q键退出
+                break
         
         frame_count += 1
         if frame_count % 30 == 0:  # 每30帧打印一次进度
@@ -74,8 +102,13 @@ def detect_video(model, video_path, output_dir="outputs", conf_threshold=0.25):
     
     # 释放资源
     cap.release()
-    out.release()
-    cv2.destroyAllWindows()
+    overlays = []
+    if side is not None:
+        overlays = side.close()[1:]
+    else:
+        out.release()
+    if show:
+        cv2.destroyAllWindows()
     
     print(f"✅ 视频处理完成!")
     print(f"📊 统计信息:")
@@ -83,10 +116,15 @@ def detect_video(model, video_path, output_dir="outputs", conf_threshold=0.25):
     print(f"   - 检测到车牌的帧数: {detection_count}")
     print(f"   - 检测率: {(detection_count/frame_count)*100:.1f}%")
     print(f"   - 输出文件: {output_path}")
+    for path in overlays:
+        print(f"   - 叠加字幕轨: {path}")
+    if indexer is not None:
+        print(f"   - 车牌索引: {indexer.close()} 条记录 -> {index.db_path}")
 
 # 使用示例
 if __name__ == "__main__":
     # 加载模型
+    from model_store import load_model
     model_path = "runs/detect/license_plate_detection_v1/weights/best.pt"
     model = load_model(model_path)
     
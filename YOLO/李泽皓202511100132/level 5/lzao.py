@@ -1,13 +1,43 @@
-from ultralytics import YOLO
 from paddleocr import PaddleOCR
 import cv2
 import numpy as np
 import os
+import sys
+import time
+from pathlib import Path
 from difflib import SequenceMatcher
 
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from result_sink import ResultSink, make_record
+from plate_renderer import blend_rect
+from model_store import load_model, resolve_model
+from telemetry import Telemetry
+
 # 初始化模型
-yolo_model = YOLO(r'C:\Users\99597\xiangmuone\CCPD\runs\detect\train8\weights\best.pt')  
-ocr = PaddleOCR(use_textline_orientation=True, lang='ch')  
+# 权重路径也可以换成模型库条目名（python model_store.py add best.pt --name plate-det）
+yolo_model = load_model(r'C:\Users\99597\xiangmuone\CCPD\runs\detect\train8\weights\best.pt')  
+# PaddleOCR 的检测 / 识别 / 文本行方向模型也从模型库取（不写目录时 PaddleOCR 会联网下载），第一次使用前先加入：
+#   python model_store.py add <PP-OCR 检测模型目录> --name ppocr-det
+# 也可以直接写本地模型目录
+OCR_DET_MODEL = "ppocr-det"
+OCR_REC_MODEL = "ppocr-rec"
+OCR_ORI_MODEL = "ppocr-textline-ori"
+ocr = PaddleOCR(
+    use_textline_orientation=True,
+    lang='ch',
+    text_detection_model_dir=resolve_model(OCR_DET_MODEL),
+    text_recognition_model_dir=resolve_model(OCR_REC_MODEL),
+    textline_orientation_model_dir=resolve_model(OCR_ORI_MODEL),
+)
+
+# 运行时监控（见 common/telemetry.py）：检测 / OCR 耗时直方图 + 图片数、车牌数、OCR 调用次数
+# METRICS_PORT > 0 时启动 /metrics 接口，METRICS_LOG 为 True 时结束时打印一行汇总
+METRICS_PORT = 0
+METRICS_LOG = False
+telemetry = Telemetry(enabled=bool(METRICS_PORT or METRICS_LOG))
+if METRICS_PORT:
+    telemetry.serve(METRICS_PORT)
 
 # 中国省份简称列表
 PROVINCE_ABBREVIATIONS = [
@@ -45,7 +75,9 @@ def recognize_province_char(plate_img):
     left_region = plate_img[:, :width//3]
     
     # 使用OCR识别左侧区域
-    result = ocr.predict(left_region)
+    with telemetry.stage("ocr_province"):
+        result = ocr.predict(left_region)
+    telemetry.inc("ocr_calls")
     
     # 解析结果
     if result and len(result) > 0:
@@ -60,18 +92,28 @@ def recognize_province_char(plate_img):
     # 如果没有识别到字符，返回None
     return None
 
-def recognize_plate(image_path):
+def recognize_plate(image_path, sink=None):
+    """
+    识别一张图片中的所有车牌
+    :param sink: 结构化结果输出（ResultSink），每个车牌写一条记录
+    """
     # 读取图像
     image = cv2.imread(image_path)
     if image is None:
         print("无法读取图像，请检查路径:", image_path)
         return
     
+    telemetry.inc("frames")
+    
     # 复制原始图像用于显示
     display_image = image.copy()
     
     # YOLO检测车牌
+    t_detect = time.perf_counter()
     results = yolo_model(image)
+    detect_ms = (time.perf_counter() - t_detect) * 1000
+    telemetry.observe("detect", detect_ms / 1000)
+    telemetry.inc("detections", sum(len(r.boxes) for r in results))
     
     # 用于存储所有识别结果
     all_plates = []
@@ -86,11 +128,14 @@ def recognize_plate(image_path):
             plate_img = image[y1:y2, x1:x2]
             
             # 1. 识别车牌第一个字符（省份简称）
+            t_ocr = time.perf_counter()
             first_char = recognize_province_char(plate_img)
             print(f"识别到的第一个字符: '{first_char}'")
             
             # 2. 使用OCR识别整个车牌
-            result = ocr.predict(plate_img)
+            with telemetry.stage("ocr"):
+                result = ocr.predict(plate_img)
+            telemetry.inc("ocr_calls")
             
             # 处理OCR结果
             plate_text = ""
@@ -123,6 +168,13 @@ def recognize_plate(image_path):
                     final_plate_text = province_prefix + plate_text
             
             print(f"最终识别结果: '{final_plate_text}' (置信度: {confidence:.2f})")
+            if sink is not None:
+                sink.write(make_record(
+                    image_path, plate=final_plate_text, confidence=confidence,
+                    box=(x1, y1, x2, y2), det_conf=float(box.conf[0]),
+                    status="ok" if final_plate_text else "ocr_failed",
+                    timings={"detect": detect_ms, "ocr": (time.perf_counter() - t_ocr) * 1000},
+                ))
             
             # 在显示图像上绘制边界框
             cv2.rectangle(display_image, (x1, y1), (x2, y2), (0, 255, 0), 3)
@@ -147,19 +199,18 @@ def recognize_plate(image_path):
                 if text_x + text_width > display_image.shape[1]:
                     text_x = display_image.shape[1] - text_width - 10
                 
-                # 绘制文本背景
-                overlay = display_image.copy()
-                cv2.rectangle(overlay, (text_x - 10, text_y - text_height - 15), 
-                             (text_x + text_width + 10, text_y + 15), (0, 0, 0), -1)
-                
-                # 将半透明背景添加到图像上
+                # 绘制半透明文本背景（只混合文字区域，不再整图复制 + 整图混合）
                 alpha = 0.7
-                display_image = cv2.addWeighted(overlay, alpha, display_image, 1 - alpha, 0)
+                blend_rect(display_image, text_x - 10, text_y - text_height - 15,
+                           text_x + text_width + 10, text_y + 15, alpha)
                 
                 # 绘制文本
                 cv2.putText(display_image, final_plate_text, (text_x, text_y), 
                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 255), thickness)
     
+    if sink is not None and sum(len(r.boxes) for r in results) == 0:
+        sink.write(make_record(image_path, status="no_plate", timings={"detect": detect_ms}))
+    
     # 在图像顶部添加所有识别结果的汇总信息
     if all_plates:
         # 准备汇总文本
@@ -211,4 +262,9 @@ def recognize_plate(image_path):
 
 # 使用示例
 image_path = r"C:\Users\99597\xiangmuone\CCPD\mine\crv.jpg"  
-recognize_plate(image_path)
\ No newline at end of file
+# 结构化结果（JSONL/Parquet）保存目录
+with ResultSink(r"C:\Users\99597\xiangmuone\CCPD\mine\results") as sink:
+    recognize_plate(image_path, sink)
+if METRICS_LOG:
+    print(telemetry.log_line())
+telemetry.close()
\ No newline at end of file
@@ -1,10 +1,17 @@
 import cv2
 import os
-from ultralytics import YOLO
+import sys
+from pathlib import Path
 import argparse
 
-def detect_image(model, image_path, output_dir="output_images"):
-    """对单张图片进行检测"""
+# 公共模块目录（YOLO/common）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from output_writer import add_writer_args, writer_from_args
+from plate_renderer import PlateRenderer
+from model_store import load_model
+
+def detect_image(model, image_path, output_dir="output_images", writer=None, show=True):
+    """对单张图片进行检测（传入 writer 时异步保存，show=False 时不弹窗）"""
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
     
@@ -12,20 +19,25 @@ def detect_image(model, image_path, output_dir="output_images"):
     results = model(image_path)
     
     # 保存检测结果
+    renderer = PlateRenderer()
     for i, r in enumerate(results):
-        # 绘制检测框
-        im_array = r.plot()  # 生成带检测框的图像数组
-        im = cv2.cvtColor(im_array, cv2.COLOR_RGB2BGR)  # 转换颜色通道
+        # 绘制检测框（直接画在原图上，r.orig_img 本身就是 BGR，不需要转换颜色通道）
+        im = renderer.render_result(r.orig_img, r)
         
         # 保存结果
         output_path = os.path.join(output_dir, f"result_{os.path.basename(image_path)}")
-        cv2.imwrite(output_path, im)
-        print(f"图片检测结果已保存至: {output_path}")
+        if writer is None:
+            cv2.imwrite(output_path, im)
+            print(f"图片检测结果已保存至: {output_path}")
+        else:
+            writer.submit(output_path, im)
+            print(f"图片检测结果已提交保存: {output_path}")
     
     # 显示结果（可选）
-    cv2.imshow("Detection Result", im)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    if show:
+        cv2.imshow("Detection Result", im)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
 
 def detect_video(model, video_path, output_dir="output_videos"):
     """对视频文件进行检测"""
@@ -45,20 +57,17 @@ def detect_video(model, video_path, output_dir="output_videos"):
     out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
     
     print("正在处理视频...（按 'q' 键退出）")
+    renderer = PlateRenderer()
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
         
-        # 转换为RGB格式进行检测
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # 检测
-        results = model(rgb_frame)
+        # 检测（YOLO 直接接收 OpenCV 的 BGR 帧，不需要来回转换颜色通道）
+        results = model(frame)
         
-        # 绘制检测框
-        im_array = results[0].plot()
-        im = cv2.cvtColor(im_array, cv2.COLOR_RGB2BGR)
+        # 绘制检测框（直接画在当前帧上）
+        im = renderer.render_result(frame, results[0])
         
         # 写入输出视频
         out.write(im)
@@ -82,6 +91,7 @@ def detect_camera(model):
     cap = cv2.VideoCapture(0)
     
     print("正在进行摄像头实时检测...（按 'q' 键退出）")
+    renderer = PlateRenderer()
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
@@ -92,7 +102,7 @@ def detect_camera(model):
         results = model(frame)
         
         # 绘制检测框
-        im_array = results[0].plot()
+        im_array = renderer.render_result(frame, results[0])
         
         # 显示结果
         cv2.imshow("Camera Real-time Detection", im_array)
@@ -109,26 +119,34 @@ if __name__ == "__main__":
     # 解析命令行参数
     parser = argparse.ArgumentParser(description="车牌检测脚本")
     parser.add_argument("--model", type=str, default="D:\CCPD2020\runs\detect\exp_merged_data8\weights\best.pt", 
-                      help="模型权重文件路径")
+                      help="模型权重文件路径或模型库条目名")
     parser.add_argument("--mode", type=str, default="image", 
                       choices=["image", "video", "camera"], 
                       help="检测模式：image(图片), video(视频), camera(摄像头)")
     parser.add_argument("--path", type=str, default="D:\\CCPD2020\\test_set", 
                       help="图片或视频文件路径")
+    parser.add_argument("--no-show", action="store_true",
+                      help="批量处理图片时不弹出结果窗口")
+    add_writer_args(parser)
     
     args = parser.parse_args()
     
     # 加载模型
     print(f"正在加载模型: {args.model}")
-    model = YOLO(args.model)
+    model = load_model(args.model)
     
     # 根据模式进行检测
     if args.mode == "image":
         # 如果是目录，则处理目录下所有图片
         if os.path.isdir(args.path):
+            # 目录模式：结果图片交给后台线程保存
+            writer = writer_from_args(args)
             for file in os.listdir(args.path):
                 if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    detect_image(model, os.path.join(args.path, file))
+                    detect_image(model, os.path.join(args.path, file),
+                                 writer=writer, show=not args.no_show)
+            writer.close()
+            print(writer.summary())
         else:
             # 处理单张图片
             detect_image(model, args.path)